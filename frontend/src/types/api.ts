@@ -30,7 +30,8 @@ export interface BatchEssayRequest {
 
 export interface BatchEssayResponse {
   essay_id: string;
-  status: string;
+  status: string; // "pending", or "failed" when the essay could not be stored or enqueued
+  error?: string;
 }
 
 export interface ClassMetricsResponse {
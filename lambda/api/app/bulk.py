@@ -0,0 +1,164 @@
+"""
+Chunked DynamoDB BatchGetItem/BatchWriteItem and SQS SendMessageBatch with retries.
+
+Chunks (100 keys, 25 write requests, 10 messages) are issued concurrently
+from a thread pool. Unprocessed keys and items and failed batch entries are
+retried with exponential backoff; whatever still fails is returned to the
+caller instead of raised, so a bulk request can report failures per item.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+GET_CHUNK_SIZE = 100  # BatchGetItem limit
+WRITE_CHUNK_SIZE = 25  # BatchWriteItem limit
+MESSAGE_CHUNK_SIZE = 10  # SendMessageBatch limit
+MAX_ATTEMPTS = 4
+BACKOFF_SECONDS = 0.05
+MAX_CONCURRENCY = 8
+
+
+def _chunks(values: List[Any], size: int) -> List[List[Any]]:
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def _get_chunk(
+    dynamodb,
+    table_name: str,
+    keys: List[Dict[str, Any]],
+    read_kwargs: Dict[str, Any],
+    backoff_seconds: float,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    items: List[Dict[str, Any]] = []
+    request = {table_name: dict(read_kwargs, Keys=keys)}
+    for attempt in range(MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(backoff_seconds * 2 ** (attempt - 1))
+        try:
+            response = dynamodb.batch_get_item(RequestItems=request)
+        except Exception:
+            return items, request[table_name]['Keys']
+        items.extend(response.get('Responses', {}).get(table_name, []))
+        request = response.get('UnprocessedKeys') or {}
+        if not request:
+            return items, []
+    return items, request[table_name]['Keys']
+
+
+def batch_get(
+    dynamodb,
+    table_name: str,
+    keys: List[Dict[str, Any]],
+    backoff_seconds: float = BACKOFF_SECONDS,
+    **read_kwargs,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Read items by key in 100-key BatchGetItem chunks. `read_kwargs` (e.g.
+    ProjectionExpression) apply to every chunk. Keys must be unique.
+
+    Returns:
+        Tuple of (items found, keys that could not be read)
+    """
+    chunks = _chunks(keys, GET_CHUNK_SIZE)
+    if not chunks:
+        return [], []
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENCY, len(chunks))) as executor:
+        results = list(executor.map(
+            lambda chunk: _get_chunk(dynamodb, table_name, chunk, read_kwargs, backoff_seconds),
+            chunks,
+        ))
+    items = [item for found, _ in results for item in found]
+    unread = [key for _, failed in results for key in failed]
+    return items, unread
+
+
+def _write_chunk(
+    dynamodb, table_name: str, requests: List[Dict[str, Any]], backoff_seconds: float
+) -> List[Tuple[Dict[str, Any], str]]:
+    pending = requests
+    for attempt in range(MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(backoff_seconds * 2 ** (attempt - 1))
+        try:
+            response = dynamodb.batch_write_item(RequestItems={table_name: pending})
+        except Exception as e:
+            return [(request, str(e)) for request in pending]
+        pending = response.get('UnprocessedItems', {}).get(table_name, [])
+        if not pending:
+            return []
+    return [(request, "Unprocessed after retries") for request in pending]
+
+
+def batch_write(
+    dynamodb,
+    table_name: str,
+    requests: List[Dict[str, Any]],
+    backoff_seconds: float = BACKOFF_SECONDS,
+) -> List[Tuple[Dict[str, Any], str]]:
+    """
+    Write PutRequest/DeleteRequest entries to one table in 25-request chunks.
+
+    Returns:
+        (request, error) for every request that was not written
+    """
+    chunks = _chunks(requests, WRITE_CHUNK_SIZE)
+    if not chunks:
+        return []
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENCY, len(chunks))) as executor:
+        results = executor.map(
+            lambda chunk: _write_chunk(dynamodb, table_name, chunk, backoff_seconds), chunks
+        )
+        return [failure for failures in results for failure in failures]
+
+
+def _send_chunk(
+    sqs, queue_url: str, entries: List[Dict[str, str]], backoff_seconds: float
+) -> Dict[str, str]:
+    errors: Dict[str, str] = {}
+    pending = entries
+    for attempt in range(MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(backoff_seconds * 2 ** (attempt - 1))
+        try:
+            response = sqs.send_message_batch(QueueUrl=queue_url, Entries=pending)
+        except Exception as e:
+            errors.update({entry['Id']: str(e) for entry in pending})
+            return errors
+        failed = {f['Id']: f for f in response.get('Failed', [])}
+        retry = []
+        for entry in pending:
+            failure = failed.get(entry['Id'])
+            if failure is None:
+                errors.pop(entry['Id'], None)
+                continue
+            errors[entry['Id']] = failure.get('Message') or failure.get('Code', 'Failed')
+            # Sender faults (malformed entries) would fail the same way again
+            if not failure.get('SenderFault'):
+                retry.append(entry)
+        pending = retry
+        if not pending:
+            break
+    return errors
+
+
+def send_message_batches(
+    sqs,
+    queue_url: str,
+    bodies: List[str],
+    backoff_seconds: float = BACKOFF_SECONDS,
+) -> Dict[int, str]:
+    """
+    Send message bodies in 10-entry SendMessageBatch chunks.
+
+    Returns:
+        {index into bodies: error} for every message that was not sent
+    """
+    entries = [{'Id': str(i), 'MessageBody': body} for i, body in enumerate(bodies)]
+    chunks = _chunks(entries, MESSAGE_CHUNK_SIZE)
+    if not chunks:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENCY, len(chunks))) as executor:
+        results = executor.map(
+            lambda chunk: _send_chunk(sqs, queue_url, chunk, backoff_seconds), chunks
+        )
+        return {int(i): error for errors in results for i, error in errors.items()}
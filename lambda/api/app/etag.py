@@ -0,0 +1,66 @@
+"""
+Strong ETags and conditional GETs for polled essay and metrics reads.
+
+An ETag is a hash of the version attributes of the essays behind a response
+(status, processed_at, revision, ...) and of the parameters that shape it,
+not of the serialized body, so a request whose If-None-Match still matches
+is answered with 304 before the response is built.
+"""
+import json
+import hashlib
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi import Request, Response
+
+# Essay attributes that change whenever anything returned for the essay does:
+# the worker sets processed_at, revisions bump revision, overrides set updated_at
+ESSAY_VERSION_ATTRIBUTES = (
+    'essay_id', 'status', 'processed_at', 'revision', 'revised_at', 'updated_at',
+)
+
+# A processed essay only changes again if it is revised or overridden, so
+# clients may reuse it briefly without asking; anything else is revalidated
+PROCESSED_MAX_AGE_SECONDS = 60
+PROCESSED_CACHE_CONTROL = f'private, max-age={PROCESSED_MAX_AGE_SECONDS}'
+REVALIDATE_CACHE_CONTROL = 'private, no-cache'
+
+
+def essay_version(item: Dict[str, Any]) -> list:
+    return [item.get(attribute) for attribute in ESSAY_VERSION_ATTRIBUTES]
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag over JSON-serializable parts (Decimals are stringified)."""
+    raw = json.dumps(parts, default=str, sort_keys=True, separators=(',', ':'))
+    return '"' + hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def essays_etag(items: Iterable[Dict[str, Any]], *parts: Any) -> str:
+    return make_etag([essay_version(item) for item in items], *parts)
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # If-None-Match uses weak comparison
+    tags = (tag.strip() for tag in if_none_match.split(','))
+    return etag in (tag[2:] if tag.startswith('W/') else tag for tag in tags)
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    cache_control: str = REVALIDATE_CACHE_CONTROL,
+) -> Optional[Response]:
+    """
+    Set ETag and Cache-Control on the response; return a 304 to send instead
+    when the request's If-None-Match already has this ETag.
+    """
+    headers = {'ETag': etag, 'Cache-Control': cache_control, 'Vary': 'Authorization'}
+    if _matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
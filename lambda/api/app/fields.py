@@ -0,0 +1,48 @@
+"""
+Sparse fieldsets for essay read routes.
+
+`fields` is a comma-separated list of response fields (e.g. `fields=status`).
+Routes read only the attributes those fields need, through a DynamoDB
+ProjectionExpression (see pagination.projection), and return only those
+fields. Without `fields` the full response is returned.
+"""
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from fastapi import HTTPException
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """
+    Requested fields in order, or None when `fields` is absent or blank.
+
+    Raises:
+        HTTPException: 400 if a field is not one of `allowed`
+    """
+    if fields is None:
+        return None
+    requested = list(dict.fromkeys(name.strip() for name in fields.split(',') if name.strip()))
+    if not requested:
+        return None
+    allowed = list(allowed)
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)} (allowed: {', '.join(allowed)})",
+        )
+    return requested
+
+
+def attributes_for(
+    fields: List[str], attribute_map: Optional[Mapping[str, str]] = None
+) -> List[str]:
+    """Item attributes behind the requested response fields (renamed ones via `attribute_map`)."""
+    attribute_map = attribute_map or {}
+    return [attribute_map.get(name, name) for name in fields]
+
+
+def select(record: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """`record` trimmed to the requested fields (unchanged without a fieldset)."""
+    if fields is None:
+        return record
+    return {name: value for name, value in record.items() if name in fields}
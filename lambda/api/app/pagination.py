@@ -0,0 +1,107 @@
+"""
+Cursor pagination for DynamoDB queries.
+
+A cursor is the query's LastEvaluatedKey, JSON-encoded and URL-safe base64'd.
+Paginated routes return it in the X-Next-Cursor response header (absent on
+the last page) and take it back as the `cursor` query parameter.
+"""
+import json
+import base64
+import binascii
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from boto3.dynamodb.conditions import Key
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+MAX_PAGE_SIZE = 100
+
+
+def _json_default(value: Any):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(last_key: Dict[str, Any]) -> str:
+    raw = json.dumps(last_key, default=_json_default, separators=(',', ':'), sort_keys=True)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        last_key = json.loads(raw, parse_float=Decimal)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(last_key, dict) or not last_key:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return last_key
+
+
+def query_page(
+    table,
+    key_name: str,
+    key_value: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    **query_kwargs,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Query one partition, following LastEvaluatedKey until `limit` items
+    (after any FilterExpression) are collected or the partition is exhausted.
+
+    Each request asks for only the items still missing, so the returned
+    cursor never skips filtered-in items. Without a limit the whole partition
+    is returned.
+
+    Returns:
+        Tuple of (items, next cursor or None)
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed or belongs to another partition
+    """
+    kwargs = dict(query_kwargs, KeyConditionExpression=Key(key_name).eq(key_value))
+    if cursor:
+        start_key = decode_cursor(cursor)
+        # A cursor from another partition would page through someone else's key range
+        if start_key.get(key_name) != key_value:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        kwargs['ExclusiveStartKey'] = start_key
+
+    items: List[Dict[str, Any]] = []
+    while True:
+        if limit:
+            kwargs['Limit'] = limit - len(items)
+        response = table.query(**kwargs)
+        items.extend(response.get('Items', []))
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return items, None
+        if limit and len(items) >= limit:
+            return items, encode_cursor(last_key)
+        kwargs['ExclusiveStartKey'] = last_key
+
+
+def projection(attributes: Iterable[str]) -> Dict[str, Any]:
+    """
+    ProjectionExpression kwargs for a query reading only `attributes`.
+
+    Every name goes through a placeholder, so reserved words (status, name)
+    need no special casing.
+    """
+    names = {f'#p{i}': attribute for i, attribute in enumerate(dict.fromkeys(attributes))}
+    return {
+        'ProjectionExpression': ', '.join(names),
+        'ExpressionAttributeNames': names,
+    }
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,122 @@
+"""
+Processing progress of an assignment, for the server-sent events stream.
+
+A progress feed reports (essay_id, status) observations for one assignment
+each time it is polled:
+
+- EventTableFeed reads the completion events the worker records in the
+  progress table (ESSAY_PROGRESS_TABLE), one range query for what is new
+  since the last poll.
+- EssayPollingFeed re-reads the statuses of the assignment's essays. It is
+  the fallback when no progress table is configured (local runs, tests).
+
+ProgressTracker turns observations into per-essay transitions and running
+counts, so both feeds behave the same to the stream.
+"""
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from boto3.dynamodb.conditions import Attr, Key
+
+from app.pagination import projection, query_page
+
+# Completion event statuses as essay statuses; a skipped essay was already done
+EVENT_STATUSES = {'processed': 'processed', 'skipped': 'processed', 'failed': 'failed'}
+# Events are read from slightly before the snapshot, so none falls between the two
+EVENT_OVERLAP = timedelta(seconds=5)
+
+Observation = Tuple[str, str]
+
+
+def essay_statuses(essays_table, assignment_id: str, teacher_id: str) -> Dict[str, str]:
+    """{essay_id: status} of the teacher's essays in the assignment."""
+    essays, _ = query_page(
+        essays_table,
+        'assignment_id',
+        assignment_id,
+        FilterExpression=Attr('teacher_id').eq(teacher_id),
+        **projection(['essay_id', 'status']),
+    )
+    return {essay['essay_id']: essay.get('status', 'pending') for essay in essays}
+
+
+class EssayPollingFeed:
+    """Observes statuses by re-reading the assignment's essays."""
+
+    def __init__(self, essays_table, assignment_id: str, teacher_id: str):
+        self.essays_table = essays_table
+        self.assignment_id = assignment_id
+        self.teacher_id = teacher_id
+
+    def poll(self) -> List[Observation]:
+        statuses = essay_statuses(self.essays_table, self.assignment_id, self.teacher_id)
+        return list(statuses.items())
+
+
+class EventTableFeed:
+    """Observes statuses from the completion events recorded in the progress table."""
+
+    def __init__(
+        self,
+        progress_table,
+        assignment_id: str,
+        teacher_id: str,
+        since: Optional[datetime] = None,
+    ):
+        self.progress_table = progress_table
+        self.assignment_id = assignment_id
+        self.teacher_id = teacher_id
+        self.cursor = ((since or datetime.utcnow()) - EVENT_OVERLAP).isoformat()
+
+    def poll(self) -> List[Observation]:
+        kwargs = {
+            'KeyConditionExpression': (
+                Key('assignment_id').eq(self.assignment_id) & Key('event_key').gt(self.cursor)
+            ),
+        }
+        observations = []
+        while True:
+            response = self.progress_table.query(**kwargs)
+            for event in response.get('Items', []):
+                self.cursor = event['event_key']
+                status = EVENT_STATUSES.get(event.get('status'))
+                if status and event.get('teacher_id') == self.teacher_id:
+                    observations.append((event['essay_id'], status))
+            if 'LastEvaluatedKey' not in response:
+                return observations
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+class ProgressTracker:
+    """Current status per essay; applies observations and reports what changed."""
+
+    def __init__(self, statuses: Dict[str, str]):
+        self.statuses = dict(statuses)
+
+    def apply(self, observations: List[Observation]) -> List[Dict[str, Any]]:
+        transitions = []
+        for essay_id, status in observations:
+            previous = self.statuses.get(essay_id)
+            if previous == status:
+                continue
+            self.statuses[essay_id] = status
+            transitions.append({'essay_id': essay_id, 'status': status, 'previous': previous})
+        return transitions
+
+    def counts(self) -> Dict[str, int]:
+        counts = {'total': len(self.statuses), 'pending': 0, 'processed': 0, 'failed': 0}
+        for status in self.statuses.values():
+            counts[status if status in counts else 'pending'] += 1
+        return counts
+
+    def done(self) -> bool:
+        """Every essay has finished (processed or failed)."""
+        return bool(self.statuses) and self.counts()['pending'] == 0
+
+
+def sse_event(event: str, data: Dict[str, Any], retry_ms: Optional[int] = None) -> str:
+    """One server-sent event."""
+    lines = [f"retry: {retry_ms}"] if retry_ms else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, default=str)}"]
+    return "\n".join(lines) + "\n\n"
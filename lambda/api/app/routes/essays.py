@@ -4,17 +4,40 @@ Provides endpoints for essay batch upload, retrieval, and feedback overrides.
 """
 import os
 import json
+import asyncio
 import uuid
 import boto3
 import logging
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from boto3.dynamodb.conditions import Attr, Key
+from boto3.dynamodb.types import TypeSerializer
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from starlette.concurrency import run_in_threadpool
 
 from app.deps import get_teacher_context, get_optional_teacher_context, TeacherContext
 from app.db.students import list_students
+from app.bulk import batch_get, batch_write, send_message_batches
+from app.pagination import MAX_PAGE_SIZE, projection, query_page, set_next_cursor
+from app.fields import attributes_for, parse_fields, select
+from app.progress import (
+    EssayPollingFeed,
+    EventTableFeed,
+    ProgressTracker,
+    essay_statuses,
+    sse_event,
+)
+from app.etag import (
+    ESSAY_VERSION_ATTRIBUTES,
+    PROCESSED_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    conditional_response,
+    essays_etag,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -25,11 +48,117 @@ dynamodb = boto3.resource('dynamodb')
 sqs = boto3.client('sqs')
 ESSAYS_TABLE = os.environ.get('ESSAYS_TABLE')
 ESSAY_PROCESSING_QUEUE_URL = os.environ.get('ESSAY_PROCESSING_QUEUE_URL')
+ESSAY_REVISIONS_TABLE = os.environ.get('ESSAY_REVISIONS_TABLE')
+ESSAY_PROGRESS_TABLE = os.environ.get('ESSAY_PROGRESS_TABLE')
+ESSAY_SIGNATURES_TABLE = os.environ.get('ESSAY_SIGNATURES_TABLE')
+WORKER_FUNCTION_NAME = os.environ.get('WORKER_FUNCTION_NAME')
+# Batch uploads enqueue one SQS message per this many essays
+ESSAYS_PER_MESSAGE = max(1, int(os.environ.get('ESSAYS_PER_MESSAGE', '10')))
+# Streamed uploads are written this many essays at a time, with at most
+# STREAM_MAX_IN_FLIGHT writes running while the body is still being read
+STREAM_FLUSH_SIZE = 100
+STREAM_MAX_IN_FLIGHT = 2
+# DynamoDB items are capped at 400KB
+MAX_NDJSON_LINE_BYTES = 400 * 1024
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+# Direct (synchronous) demo analysis must finish well inside API Gateway's 29s limit
+DIRECT_ANALYSIS_TIMEOUT_SECONDS = int(os.environ.get('DIRECT_ANALYSIS_TIMEOUT_SECONDS', '20'))
+# Queue fallback is delayed so a timed-out direct invocation can still finish first
+DIRECT_FALLBACK_DELAY_SECONDS = int(os.environ.get('DIRECT_FALLBACK_DELAY_SECONDS', '30'))
+# API Gateway buffers responses, so progress "streams" are long polls: each
+# one ends at the first change or after this long, and the client reconnects
+PROGRESS_STREAM_SECONDS = float(os.environ.get('PROGRESS_STREAM_SECONDS', '10'))
+PROGRESS_POLL_SECONDS = float(os.environ.get('PROGRESS_POLL_SECONDS', '2'))
+PROGRESS_RETRY_MS = 1000
+# Essays per POST /essays/status request
+MAX_STATUS_LOOKUP = 500
+
+# No retries: a retried invoke would blow the time budget and duplicate the LLM call
+lambda_client = boto3.client('lambda', config=Config(
+    connect_timeout=2,
+    read_timeout=DIRECT_ANALYSIS_TIMEOUT_SECONDS,
+    retries={'max_attempts': 0},
+))
 
 essays_table = dynamodb.Table(ESSAYS_TABLE) if ESSAYS_TABLE else None
+# GSI on essay_id (projects teacher_id and student_id) for routes that only have the essay_id
+ESSAY_ID_INDEX = 'essay_id-index'
+# GSI on teacher_student ("{teacher_id}#{student_id}") sorted by created_at, for student history
+TEACHER_STUDENT_INDEX = 'teacher_student-index'
+# False between the two deploys that add the Essays GSIs (DynamoDB creates one
+# GSI per table update); student routes scan instead until the index exists
+TEACHER_STUDENT_INDEX_ENABLED = os.environ.get('TEACHER_STUDENT_INDEX_ENABLED', 'true').lower() == 'true'
+
+# Attributes read for assignment essay listings; essay_text only on request
+ASSIGNMENT_ESSAY_ATTRIBUTES = (
+    'essay_id', 'assignment_id', 'student_id', 'status', 'created_at',
+    'processed_at', 'vocabulary_analysis', 'duplicate_of',
+)
+
+# Fields selectable with `fields=` on the essay read routes
+ESSAY_FIELDS = ASSIGNMENT_ESSAY_ATTRIBUTES + ('essay_text', 'revision')
+STUDENT_ESSAY_FIELDS = ('essay_id', 'assignment_id', 'created_at', 'metrics')
+REVISION_FIELDS = ('revision', 'essay_text', 'created_at', 'superseded_at', 'vocabulary_analysis')
+
+revisions_table = dynamodb.Table(ESSAY_REVISIONS_TABLE) if ESSAY_REVISIONS_TABLE else None
+# Completion events recorded by the worker, read by the progress stream
+progress_table = dynamodb.Table(ESSAY_PROGRESS_TABLE) if ESSAY_PROGRESS_TABLE else None
 # Legacy METRICS_TABLE and ESSAY_UPDATE_QUEUE_URL removed - use Essays table instead
 
 
+def teacher_student_key(teacher_id: str, student_id: Optional[str]) -> Optional[str]:
+    """teacher_student index key; None for essays without a student, which stay out of the index."""
+    return f"{teacher_id}#{student_id}" if student_id else None
+
+
+def query_student_essays(
+    table,
+    teacher_id: str,
+    student_id: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    **query_kwargs,
+):
+    """
+    A student's processed essays in created_at order, one page with `limit`.
+    
+    Reads the teacher_student index. Without it (TEACHER_STUDENT_INDEX_ENABLED
+    off) the table is scanned as before the index, and every essay is
+    returned with no cursor.
+    
+    Returns:
+        Tuple of (essays, next cursor or None)
+    """
+    if TEACHER_STUDENT_INDEX_ENABLED:
+        return query_page(
+            table,
+            'teacher_student',
+            teacher_student_key(teacher_id, student_id),
+            limit=limit,
+            cursor=cursor,
+            IndexName=TEACHER_STUDENT_INDEX,
+            FilterExpression=Attr('status').eq('processed'),
+            ScanIndexForward=True,
+            **query_kwargs,
+        )
+    
+    kwargs = dict(
+        query_kwargs,
+        FilterExpression=Attr('teacher_id').eq(teacher_id)
+        & Attr('student_id').eq(student_id)
+        & Attr('status').eq('processed'),
+    )
+    essays = []
+    while True:
+        response = table.scan(**kwargs)
+        essays.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    essays.sort(key=lambda essay: essay.get('created_at', ''))
+    return essays, None
+
+
 class FeedbackItem(BaseModel):
     """Model for a single feedback item."""
     word: str
@@ -65,26 +194,121 @@ class BatchEssayResponse(BaseModel):
     """Response model for a single essay in batch upload response."""
     essay_id: str
     status: str
+    error: Optional[str] = None  # Why a "failed" essay was not created
 
 
 class StudentEssayResponse(BaseModel):
-    """Response model for a single student essay."""
-    essay_id: str
+    """Response model for a single student essay (only the requested `fields` are set)."""
+    essay_id: Optional[str] = None
     assignment_id: Optional[str] = None
-    created_at: str
-    metrics: Dict[str, Any]
+    created_at: Optional[str] = None
+    metrics: Optional[Dict[str, Any]] = None
+
+
+class EssayRevisionRequest(BaseModel):
+    """Request model for replacing an essay's text with a revised draft."""
+    essay_text: str
+
+
+class EssayRevisionResponse(BaseModel):
+    """Response model for an essay revision."""
+    essay_id: str
+    revision: int
+    status: str
+
+
+class EssayRevisionItem(BaseModel):
+    """A previous version of an essay (only the requested `fields` are set)."""
+    revision: Optional[int] = None
+    essay_text: Optional[str] = None
+    created_at: Optional[str] = None
+    superseded_at: Optional[str] = None
+    vocabulary_analysis: Optional[Dict[str, Any]] = None
 
 
 class PublicEssayRequest(BaseModel):
     """Request model for public essay upload (demo)."""
     essay_text: str
     student_name: str
+    direct: bool = False  # Analyze inline under a time budget instead of queueing
 
 
 class PublicEssayResponse(BaseModel):
     """Response model for public essay upload."""
     essay_id: str
     status: str
+    vocabulary_analysis: Optional[Dict[str, Any]] = None
+
+
+class EssayKey(BaseModel):
+    """Table key of an essay."""
+    assignment_id: str
+    essay_id: str
+
+
+class EssayStatusRequest(BaseModel):
+    """Request model for a bulk status lookup."""
+    essays: List[EssayKey] = Field(..., min_length=1, max_length=MAX_STATUS_LOOKUP)
+
+
+class EssayStatus(BaseModel):
+    """Status and timestamps of one essay."""
+    status: str
+    created_at: Optional[str] = None
+    processed_at: Optional[str] = None
+
+
+class EssayStatusResponse(BaseModel):
+    """Response model for a bulk status lookup."""
+    essays: Dict[str, EssayStatus]  # By essay_id
+    not_found: List[str]  # Missing or another teacher's
+    unresolved: List[str]  # Could not be read right now; ask again
+
+
+def _create_essays(items: List[Dict[str, Any]], student_id: str) -> Dict[str, str]:
+    """
+    Write pending essay items with BatchWriteItem and enqueue their IDs with
+    SendMessageBatch, ESSAYS_PER_MESSAGE essays per message.
+    
+    Essays whose message could not be sent are deleted again, since nothing
+    would ever process them.
+    
+    Returns:
+        {essay_id: error} for essays that were not created
+    """
+    table_name = essays_table.name
+    failures = {
+        request['PutRequest']['Item']['essay_id']: error
+        for request, error in batch_write(
+            dynamodb, table_name, [{'PutRequest': {'Item': item}} for item in items]
+        )
+    }
+    
+    # Enqueue multi-essay SQS messages (ONLY IDs, no essay_text)
+    written = [item for item in items if item['essay_id'] not in failures]
+    chunks = [written[i:i + ESSAYS_PER_MESSAGE] for i in range(0, len(written), ESSAYS_PER_MESSAGE)]
+    bodies = [
+        json.dumps({
+            'teacher_id': chunk[0]['teacher_id'],
+            'assignment_id': chunk[0]['assignment_id'],
+            'student_id': student_id,
+            'essay_ids': [item['essay_id'] for item in chunk],
+            'attempt': 1,
+        })
+        for chunk in chunks
+    ]
+    unqueued = {
+        item['essay_id']: f"Failed to enqueue: {error}"
+        for index, error in send_message_batches(sqs, ESSAY_PROCESSING_QUEUE_URL, bodies).items()
+        for item in chunks[index]
+    }
+    if unqueued:
+        batch_write(dynamodb, table_name, [
+            {'DeleteRequest': {'Key': {'assignment_id': item['assignment_id'], 'essay_id': item['essay_id']}}}
+            for item in written if item['essay_id'] in unqueued
+        ])
+        failures.update(unqueued)
+    return failures
 
 
 @router.post("/batch", response_model=List[BatchEssayResponse])
@@ -96,7 +320,10 @@ async def upload_batch_essays(
     Upload multiple essays in a batch.
     
     Creates DynamoDB records with status "pending" and enqueues SQS messages
-    for async processing. Returns immediately with pending statuses.
+    for async processing, each carrying up to ESSAYS_PER_MESSAGE essay IDs.
+    Items and messages are written in concurrent batch chunks. Returns
+    immediately with a status per essay: "pending", or "failed" with an error
+    for essays that could not be stored or enqueued.
     """
     if not essays_table:
         raise HTTPException(status_code=500, detail="Essays table not configured")
@@ -107,57 +334,61 @@ async def upload_batch_essays(
     if not request.essays:
         raise HTTPException(status_code=400, detail="No essays provided")
     
-    results = []
     now = datetime.utcnow().isoformat()
+    items = []
+    for essay_item in request.essays:
+        item = {
+            'assignment_id': request.assignment_id,
+            'essay_id': str(uuid.uuid4()),
+            'teacher_id': teacher_ctx.teacher_id,
+            'student_id': request.student_id or '',
+            'essay_text': essay_item.text,
+            'status': 'pending',
+            'created_at': now,
+        }
+        if request.student_id:
+            item['teacher_student'] = teacher_student_key(teacher_ctx.teacher_id, request.student_id)
+        items.append(item)
     
     try:
-        for essay_item in request.essays:
-            essay_id = str(uuid.uuid4())
-            
-            # Create DynamoDB record with status "pending"
-            essays_table.put_item(
-                Item={
-                    'assignment_id': request.assignment_id,
-                    'essay_id': essay_id,
-                    'teacher_id': teacher_ctx.teacher_id,
-                    'student_id': request.student_id or '',
-                    'essay_text': essay_item.text,
-                    'status': 'pending',
-                    'created_at': now,
-                }
-            )
-            
-            # Enqueue SQS message (ONLY IDs, no essay_text)
-            sqs.send_message(
-                QueueUrl=ESSAY_PROCESSING_QUEUE_URL,
-                MessageBody=json.dumps({
-                    'teacher_id': teacher_ctx.teacher_id,
-                    'assignment_id': request.assignment_id,
-                    'student_id': request.student_id or '',
-                    'essay_id': essay_id,
-                })
+        # The batch calls block, so keep them off the event loop
+        failures = await run_in_threadpool(_create_essays, items, request.student_id or '')
+        
+        results = [
+            BatchEssayResponse(
+                essay_id=item['essay_id'],
+                status='failed' if item['essay_id'] in failures else 'pending',
+                error=failures.get(item['essay_id']),
             )
-            
-            results.append(BatchEssayResponse(
-                essay_id=essay_id,
-                status='pending'
-            ))
-            
-            logger.info("Essay enqueued for processing", extra={
-                "teacher_id": teacher_ctx.teacher_id,
-                "assignment_id": request.assignment_id,
-                "student_id": request.student_id,
-                "essay_id": essay_id,
-            })
+            for item in items
+        ]
         
         logger.info("Batch upload complete", extra={
             "teacher_id": teacher_ctx.teacher_id,
             "assignment_id": request.assignment_id,
-            "essay_count": len(results),
+            "student_id": request.student_id,
+            "essay_count": len(items) - len(failures),
+            "failed_count": len(failures),
+            "message_count": -(-(len(items) - len(failures)) // ESSAYS_PER_MESSAGE),
         })
+        if failures:
+            logger.warning("Batch upload partially failed", extra={
+                "teacher_id": teacher_ctx.teacher_id,
+                "assignment_id": request.assignment_id,
+                "failed_count": len(failures),
+                "error": next(iter(failures.values())),
+            })
+        
+        if len(failures) == len(items):
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to upload essays: {next(iter(failures.values()))}",
+            )
         
         return results
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Failed to upload batch essays", extra={
             "teacher_id": teacher_ctx.teacher_id,
@@ -167,6 +398,160 @@ async def upload_batch_essays(
         raise HTTPException(status_code=500, detail=f"Failed to upload essays: {str(e)}")
 
 
+async def _ndjson_lines(chunks, max_line_bytes: int):
+    """
+    Split a byte stream into lines without holding more than one line.
+    
+    Yields each line's bytes, or None for a line longer than max_line_bytes
+    (the rest of which is skipped).
+    """
+    buffer = b''
+    oversized = False
+    async for chunk in chunks:
+        buffer += chunk
+        while True:
+            newline = buffer.find(b'\n')
+            if newline < 0:
+                break
+            line, buffer = buffer[:newline], buffer[newline + 1:]
+            if oversized:
+                oversized = False
+            else:
+                yield line if len(line) <= max_line_bytes else None
+        if len(buffer) > max_line_bytes:
+            if not oversized:
+                oversized = True
+                yield None
+            buffer = b''
+    if buffer and not oversized:
+        yield buffer if len(buffer) <= max_line_bytes else None
+
+
+def _parse_ndjson_essay(line: Optional[bytes]) -> Dict[str, Any]:
+    """
+    Raises:
+        ValueError: If the line is not a JSON object with essay text
+    """
+    if line is None:
+        raise ValueError(f"Line exceeds {MAX_NDJSON_LINE_BYTES} bytes")
+    try:
+        record = json.loads(line)
+    except ValueError:
+        raise ValueError("Invalid JSON")
+    if not isinstance(record, dict) or not isinstance(record.get('text'), str) or not record['text'].strip():
+        raise ValueError("Essay text is required")
+    return record
+
+
+@router.post("/batch/stream")
+async def upload_essay_stream(
+    request: Request,
+    assignment_id: str,
+    student_id: Optional[str] = None,
+    teacher_ctx: TeacherContext = Depends(get_teacher_context)
+):
+    """
+    Upload essays as NDJSON, one {"filename", "text"} object per line.
+    
+    The body is parsed line by line and written in STREAM_FLUSH_SIZE chunks
+    through the same bulk writers as POST /essays/batch. Returns NDJSON with
+    one result per non-blank input line ({"line", "essay_id", "status",
+    "error"}) followed by a {"done", "pending", "failed"} summary line.
+    
+    Behind API Gateway and Lambda nothing is actually streamed: the request
+    body arrives fully buffered (6MB Lambda payload limit) and the results
+    are sent once every line is written. The line-wise parsing bounds the
+    work per chunk, not the upload size; larger uploads go through the S3
+    presigned URL from POST /assignments/{assignment_id}/upload-url and the
+    ingest Lambda.
+    """
+    if not essays_table:
+        raise HTTPException(status_code=500, detail="Essays table not configured")
+    
+    if not ESSAY_PROCESSING_QUEUE_URL:
+        raise HTTPException(status_code=500, detail="Processing queue not configured")
+    
+    content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    if content_type not in NDJSON_CONTENT_TYPES:
+        raise HTTPException(status_code=415, detail="Expected an application/x-ndjson body")
+    
+    results: List[Dict[str, Any]] = []
+    in_flight = []
+    
+    async def collect(batch, task):
+        try:
+            failures = await task
+        except Exception as e:
+            failures = {item['essay_id']: str(e) for _, item in batch}
+        for line_no, item in batch:
+            error = failures.get(item['essay_id'])
+            result = {'line': line_no, 'essay_id': item['essay_id'], 'status': 'failed' if error else 'pending'}
+            if error:
+                result['error'] = error
+            results.append(result)
+    
+    def flush(batch):
+        items = [item for _, item in batch]
+        task = asyncio.ensure_future(run_in_threadpool(_create_essays, items, student_id or ''))
+        in_flight.append((batch, task))
+    
+    batch = []
+    line_no = 0
+    now = datetime.utcnow().isoformat()
+    async for line in _ndjson_lines(request.stream(), MAX_NDJSON_LINE_BYTES):
+        line_no += 1
+        if line is not None and not line.strip():
+            continue
+        try:
+            record = _parse_ndjson_essay(line)
+        except ValueError as e:
+            results.append({'line': line_no, 'status': 'failed', 'error': str(e)})
+            continue
+        
+        item = {
+            'assignment_id': assignment_id,
+            'essay_id': str(uuid.uuid4()),
+            'teacher_id': teacher_ctx.teacher_id,
+            'student_id': student_id or '',
+            'essay_text': record['text'],
+            'status': 'pending',
+            'created_at': now,
+        }
+        if student_id:
+            item['teacher_student'] = teacher_student_key(teacher_ctx.teacher_id, student_id)
+        batch.append((line_no, item))
+        
+        if len(batch) >= STREAM_FLUSH_SIZE:
+            flush(batch)
+            batch = []
+            # Backpressure: wait for the oldest write before reading further
+            while len(in_flight) > STREAM_MAX_IN_FLIGHT:
+                await collect(*in_flight.pop(0))
+    
+    if batch:
+        flush(batch)
+    while in_flight:
+        await collect(*in_flight.pop(0))
+    
+    results.sort(key=lambda result: result['line'])
+    failed = sum(1 for result in results if result['status'] == 'failed')
+    
+    logger.info("Essay stream upload complete", extra={
+        "teacher_id": teacher_ctx.teacher_id,
+        "assignment_id": assignment_id,
+        "student_id": student_id,
+        "essay_count": len(results) - failed,
+        "failed_count": failed,
+    })
+    
+    def lines():
+        for result in results:
+            yield json.dumps(result) + '\n'
+        yield json.dumps({'done': True, 'pending': len(results) - failed, 'failed': failed}) + '\n'
+    
+    return StreamingResponse(lines(), media_type='application/x-ndjson')
+
+
 def normalize_name(name: str) -> str:
     """Normalize a name for comparison (lowercase, trim whitespace)."""
     return name.lower().strip()
@@ -282,6 +667,47 @@ async def check_student_exists(student_name: str):
         raise HTTPException(status_code=500, detail=f"Failed to check student: {str(e)}")
 
 
+def _analyze_directly(message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Invoke the worker Lambda synchronously for one essay.
+    
+    Returns:
+        The worker's result ({"status", "vocabulary_analysis"}) if the essay was
+        processed within DIRECT_ANALYSIS_TIMEOUT_SECONDS, otherwise None
+    """
+    if not WORKER_FUNCTION_NAME:
+        return None
+    
+    try:
+        response = lambda_client.invoke(
+            FunctionName=WORKER_FUNCTION_NAME,
+            InvocationType='RequestResponse',
+            Payload=json.dumps({'direct': message}).encode('utf-8'),
+        )
+        if response.get('FunctionError'):
+            logger.warning("Direct analysis failed in worker", extra={
+                "essay_id": message['essay_id'],
+                "function_error": response.get('FunctionError'),
+            })
+            return None
+        
+        result = json.loads(response['Payload'].read())
+        if result.get('status') != 'processed':
+            logger.warning("Direct analysis did not complete", extra={
+                "essay_id": message['essay_id'],
+                "error_class": result.get('error_class'),
+            })
+            return None
+        return result
+    except Exception as e:
+        # Read timeouts land here: the budget was exceeded
+        logger.warning("Direct analysis unavailable, falling back to queue", extra={
+            "essay_id": message['essay_id'],
+            "error": str(e),
+        })
+        return None
+
+
 @router.post("/public", response_model=PublicEssayResponse)
 async def upload_public_essay(request: PublicEssayRequest):
     """
@@ -290,6 +716,11 @@ async def upload_public_essay(request: PublicEssayRequest):
     Creates a demo essay with a special assignment_id and processes it
     through the same async pipeline. Requires student_name to match against
     existing students for the demo teacher.
+    
+    With direct=true the worker is invoked synchronously and the analysis is
+    returned in the response. If that does not finish within
+    DIRECT_ANALYSIS_TIMEOUT_SECONDS the essay is queued as usual (delayed by
+    DIRECT_FALLBACK_DELAY_SECONDS) and the response is "pending".
     """
     if not essays_table:
         raise HTTPException(status_code=500, detail="Essays table not configured")
@@ -347,27 +778,50 @@ async def upload_public_essay(request: PublicEssayRequest):
                 'essay_id': essay_id,
                 'teacher_id': DEMO_TEACHER_ID,
                 'student_id': matched_student_id,
+                'teacher_student': teacher_student_key(DEMO_TEACHER_ID, matched_student_id),
                 'essay_text': request.essay_text,
                 'status': 'pending',
                 'created_at': now,
             }
         )
         
-        # Enqueue SQS message (only IDs, no essay_text)
+        message = {
+            'teacher_id': DEMO_TEACHER_ID,
+            'assignment_id': DEMO_ASSIGNMENT_ID,
+            'student_id': matched_student_id,
+            'essay_id': essay_id,
+        }
+        
+        if request.direct:
+            result = _analyze_directly(message)
+            if result:
+                logger.info("Public essay analyzed directly", extra={
+                    "essay_id": essay_id,
+                    "assignment_id": DEMO_ASSIGNMENT_ID,
+                    "student_id": matched_student_id,
+                })
+                return PublicEssayResponse(
+                    essay_id=essay_id,
+                    status="processed",
+                    vocabulary_analysis=result.get('vocabulary_analysis'),
+                )
+        
+        # Enqueue SQS message (only IDs, no essay_text). The worker skips
+        # essays that are no longer pending, so a late direct result wins.
+        send_kwargs = {}
+        if request.direct and WORKER_FUNCTION_NAME:
+            send_kwargs['DelaySeconds'] = DIRECT_FALLBACK_DELAY_SECONDS
         sqs.send_message(
             QueueUrl=ESSAY_PROCESSING_QUEUE_URL,
-            MessageBody=json.dumps({
-                'teacher_id': DEMO_TEACHER_ID,
-                'assignment_id': DEMO_ASSIGNMENT_ID,
-                'student_id': matched_student_id,
-                'essay_id': essay_id,
-            })
+            MessageBody=json.dumps(message),
+            **send_kwargs,
         )
         
         logger.info("Public essay uploaded", extra={
             "essay_id": essay_id,
             "assignment_id": DEMO_ASSIGNMENT_ID,
             "student_id": matched_student_id,
+            "direct_fallback": request.direct,
         })
         
         return PublicEssayResponse(
@@ -384,38 +838,60 @@ async def upload_public_essay(request: PublicEssayRequest):
 @router.get("/assignment/{assignment_id}", response_model=List[Dict[str, Any]])
 async def list_assignment_essays(
     assignment_id: str,
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_text: bool = False,
+    status: Optional[str] = None,
+    fields: Optional[str] = None,
     teacher_ctx: TeacherContext = Depends(get_teacher_context)
 ):
     """
-    List all essays for a specific assignment.
+    List essays for a specific assignment.
     
     Returns essays with their vocabulary_analysis for the given assignment_id.
-    Only returns essays that belong to the authenticated teacher.
-    Returns all essays regardless of status (pending or processed).
+    Only returns essays that belong to the authenticated teacher, optionally
+    only those with the given `status` (pending or processed). essay_text is
+    left out of the read unless `include_text=true` (or listed in `fields`).
+    With `limit`, returns one page; the X-Next-Cursor header carries the
+    `cursor` for the next. Responses carry an ETag over the listed essays'
+    versions; a matching If-None-Match gets 304.
     """
     if not essays_table:
         raise HTTPException(status_code=500, detail="Essays table not configured")
     
     try:
-        essays = []
-        
-        # Query essays by assignment_id (partition key)
-        # Filter by teacher_id only (include both pending and processed)
-        response = essays_table.query(
-            KeyConditionExpression=Key('assignment_id').eq(assignment_id),
-            FilterExpression=Attr('teacher_id').eq(teacher_ctx.teacher_id)
+        requested = parse_fields(fields, ESSAY_FIELDS)
+        filter_expression = Attr('teacher_id').eq(teacher_ctx.teacher_id)
+        if status:
+            status_condition = Attr('status').eq(status)
+            # Essays without a status are pending
+            if status == 'pending':
+                status_condition = status_condition | Attr('status').not_exists()
+            filter_expression = filter_expression & status_condition
+
+        attributes = list(requested or ASSIGNMENT_ESSAY_ATTRIBUTES)
+        if include_text:
+            attributes.append('essay_text')
+        if requested is not None:
+            requested = list(attributes)
+
+        essays, next_cursor = query_page(
+            essays_table,
+            'assignment_id',
+            assignment_id,
+            limit=limit,
+            cursor=cursor,
+            FilterExpression=filter_expression,
+            **projection(attributes + list(ESSAY_VERSION_ATTRIBUTES)),
         )
-        
-        essays.extend(response.get('Items', []))
-        
-        # Handle pagination
-        while 'LastEvaluatedKey' in response:
-            response = essays_table.query(
-                KeyConditionExpression=Key('assignment_id').eq(assignment_id),
-                FilterExpression=Attr('teacher_id').eq(teacher_ctx.teacher_id),
-                ExclusiveStartKey=response['LastEvaluatedKey']
-            )
-            essays.extend(response.get('Items', []))
+        set_next_cursor(response, next_cursor)
+
+        etag = essays_etag(essays, attributes, status, limit, cursor, next_cursor)
+        not_modified = conditional_response(request, response, etag)
+        if not_modified:
+            return not_modified
         
         # Format response
         result = []
@@ -429,15 +905,21 @@ async def list_assignment_essays(
                 'processed_at': essay.get('processed_at'),
             }
             
-            # Include essay_text for metrics computation
             if 'essay_text' in essay:
                 essay_data['essay_text'] = essay.get('essay_text')
             
             # Include vocabulary_analysis if available
             if 'vocabulary_analysis' in essay:
                 essay_data['vocabulary_analysis'] = essay['vocabulary_analysis']
+
+            # Flag potential copies detected by the worker
+            if 'duplicate_of' in essay:
+                essay_data['duplicate_of'] = essay['duplicate_of']
+
+            if 'revision' in essay:
+                essay_data['revision'] = essay['revision']
             
-            result.append(essay_data)
+            result.append(select(essay_data, requested))
         
         logger.info("Assignment essays retrieved", extra={
             "teacher_id": teacher_ctx.teacher_id,
@@ -447,6 +929,8 @@ async def list_assignment_essays(
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Failed to list assignment essays", extra={
             "teacher_id": teacher_ctx.teacher_id,
@@ -456,66 +940,146 @@ async def list_assignment_essays(
         raise HTTPException(status_code=500, detail=f"Failed to retrieve assignment essays: {str(e)}")
 
 
-@router.get("/student/{student_id}", response_model=List[StudentEssayResponse])
+@router.get("/assignment/{assignment_id}/events")
+async def stream_assignment_progress(
+    assignment_id: str,
+    teacher_ctx: TeacherContext = Depends(get_teacher_context)
+):
+    """
+    Server-sent events with the processing progress of an assignment.
+    
+    Sends a `snapshot` event with the counts (total, pending, processed,
+    failed) of the teacher's essays, then an `essay` event per status change
+    and a `progress` event with the new counts, and `done` once no essay is
+    pending. Changes come from the worker's completion events when the
+    progress table is configured, otherwise from re-reading the essays.
+    
+    API Gateway and Lambda buffer the whole response, so this is a long poll
+    in SSE framing rather than a live stream: the response ends after the
+    first batch of changes or after PROGRESS_STREAM_SECONDS without any, and
+    the client reconnects for a fresh snapshot.
+    """
+    if not essays_table:
+        raise HTTPException(status_code=500, detail="Essays table not configured")
+    
+    teacher_id = teacher_ctx.teacher_id
+    try:
+        started_at = datetime.utcnow()
+        statuses = await run_in_threadpool(essay_statuses, essays_table, assignment_id, teacher_id)
+    except Exception as e:
+        logger.error("Failed to read assignment progress", extra={
+            "teacher_id": teacher_id,
+            "assignment_id": assignment_id,
+            "error": str(e),
+        }, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to read assignment progress: {str(e)}")
+    
+    if progress_table:
+        feed = EventTableFeed(progress_table, assignment_id, teacher_id, since=started_at)
+    else:
+        feed = EssayPollingFeed(essays_table, assignment_id, teacher_id)
+    tracker = ProgressTracker(statuses)
+    
+    async def events():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + PROGRESS_STREAM_SECONDS
+        yield sse_event('snapshot', tracker.counts(), retry_ms=PROGRESS_RETRY_MS)
+        while not tracker.done():
+            if loop.time() + PROGRESS_POLL_SECONDS > deadline:
+                return
+            await asyncio.sleep(PROGRESS_POLL_SECONDS)
+            try:
+                transitions = tracker.apply(await run_in_threadpool(feed.poll))
+            except Exception as e:
+                # Ending the stream makes the client reconnect and start over
+                logger.error("Failed to poll assignment progress", extra={
+                    "teacher_id": teacher_id,
+                    "assignment_id": assignment_id,
+                    "error": str(e),
+                }, exc_info=True)
+                return
+            if not transitions:
+                continue
+            for transition in transitions:
+                yield sse_event('essay', transition)
+            yield sse_event('progress', tracker.counts())
+            if not tracker.done():
+                # Nothing reaches the client before the response ends
+                return
+        yield sse_event('done', tracker.counts())
+    
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@router.get(
+    "/student/{student_id}",
+    response_model=List[StudentEssayResponse],
+    response_model_exclude_unset=True,
+)
 async def list_student_essays(
     student_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     teacher_ctx: TeacherContext = Depends(get_teacher_context)
 ):
     """
-    List all processed essays for a specific student.
+    List processed essays for a specific student.
     
     Returns essays sorted by created_at (ascending) with their vocabulary_analysis.
-    Only returns essays that belong to the authenticated teacher.
+    Only returns essays that belong to the authenticated teacher. With `limit`,
+    returns one page; the X-Next-Cursor header carries the `cursor` for the next.
     """
     if not essays_table:
         raise HTTPException(status_code=500, detail="Essays table not configured")
     
     try:
-        essays = []
-        
-        # Scan with filter to get all essays for this student
-        # Note: This is a scan operation - consider adding GSI if performance becomes an issue
-        response = essays_table.scan(
-            FilterExpression=Attr('teacher_id').eq(teacher_ctx.teacher_id) &
-                            Attr('student_id').eq(student_id) &
-                            Attr('status').eq('processed')
-        )
-        
-        essays.extend(response.get('Items', []))
-        
-        # Handle pagination
-        while 'LastEvaluatedKey' in response:
-            response = essays_table.scan(
-                FilterExpression=Attr('teacher_id').eq(teacher_ctx.teacher_id) &
-                                Attr('student_id').eq(student_id) &
-                                Attr('status').eq('processed'),
-                ExclusiveStartKey=response['LastEvaluatedKey']
+        requested = parse_fields(fields, STUDENT_ESSAY_FIELDS)
+        query_kwargs = {}
+        if requested:
+            query_kwargs = projection(
+                attributes_for(requested, {'metrics': 'vocabulary_analysis'})
             )
-            essays.extend(response.get('Items', []))
-        
-        # Sort essays by created_at (ascending)
-        essays.sort(key=lambda x: x.get('created_at', ''))
+
+        # Ordered query on the teacher_student index; the key scopes it to this teacher
+        essays, next_cursor = query_student_essays(
+            essays_table,
+            teacher_ctx.teacher_id,
+            student_id,
+            limit=limit,
+            cursor=cursor,
+            **query_kwargs,
+        )
+        set_next_cursor(response, next_cursor)
         
         # Format response
         result = []
         for essay in essays:
             # Convert vocabulary_analysis to metrics format for backward compatibility
             vocab_analysis = essay.get('vocabulary_analysis', {})
-            result.append(StudentEssayResponse(
-                essay_id=essay.get('essay_id'),
-                assignment_id=essay.get('assignment_id'),
-                created_at=essay.get('created_at', ''),
-                metrics=vocab_analysis  # Use vocabulary_analysis as metrics
-            ))
+            result.append(StudentEssayResponse(**select({
+                'essay_id': essay.get('essay_id'),
+                'assignment_id': essay.get('assignment_id'),
+                'created_at': essay.get('created_at', ''),
+                'metrics': vocab_analysis,  # Use vocabulary_analysis as metrics
+            }, requested)))
         
         logger.info("Student essays retrieved", extra={
             "teacher_id": teacher_ctx.teacher_id,
             "student_id": student_id,
             "essay_count": len(result),
+            "has_more": next_cursor is not None,
         })
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Failed to list student essays", extra={
             "teacher_id": teacher_ctx.teacher_id,
@@ -525,9 +1089,75 @@ async def list_student_essays(
         raise HTTPException(status_code=500, detail=f"Failed to retrieve student essays: {str(e)}")
 
 
+@router.post("/status", response_model=EssayStatusResponse, response_model_exclude_none=True)
+async def get_essay_statuses(
+    request: EssayStatusRequest,
+    teacher_ctx: TeacherContext = Depends(get_teacher_context)
+):
+    """
+    Look up the status of many essays at once.
+    
+    Takes up to MAX_STATUS_LOOKUP (assignment_id, essay_id) pairs, e.g. from a
+    batch upload response, and reads them with parallel BatchGetItem calls
+    that project only status and timestamps. Returns a map by essay_id.
+    """
+    if not essays_table:
+        raise HTTPException(status_code=500, detail="Essays table not configured")
+    
+    try:
+        # BatchGetItem rejects duplicate keys within a request
+        keys = list({
+            (key.assignment_id, key.essay_id): {'assignment_id': key.assignment_id, 'essay_id': key.essay_id}
+            for key in request.essays
+        }.values())
+        items, unread = await run_in_threadpool(
+            batch_get,
+            dynamodb,
+            essays_table.name,
+            keys,
+            **projection(['essay_id', 'teacher_id', 'status', 'created_at', 'processed_at']),
+        )
+        
+        essays = {
+            item['essay_id']: EssayStatus(
+                status=item.get('status', 'pending'),
+                created_at=item.get('created_at'),
+                processed_at=item.get('processed_at'),
+            )
+            for item in items
+            if item.get('teacher_id') == teacher_ctx.teacher_id
+        }
+        unresolved = [key['essay_id'] for key in unread]
+        not_found = [
+            key['essay_id'] for key in keys
+            if key['essay_id'] not in essays and key['essay_id'] not in unresolved
+        ]
+        
+        logger.info("Essay statuses retrieved", extra={
+            "teacher_id": teacher_ctx.teacher_id,
+            "requested": len(keys),
+            "found": len(essays),
+            "unresolved": len(unresolved),
+        })
+        
+        return EssayStatusResponse(essays=essays, not_found=not_found, unresolved=unresolved)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to look up essay statuses", extra={
+            "teacher_id": teacher_ctx.teacher_id,
+            "error": str(e),
+        }, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to look up essay statuses: {str(e)}")
+
+
 @router.get("/{essay_id}")
 async def get_essay(
     essay_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
     teacher_ctx: Optional[TeacherContext] = Depends(get_optional_teacher_context)
 ):
     """
@@ -535,36 +1165,33 @@ async def get_essay(
     
     Queries the Essays table using assignment_id and essay_id.
     Works for both authenticated users (their essays) and public demo essays.
+    With `fields` (e.g. `fields=status` for polling), only those attributes
+    are read and returned. Responses carry an ETag; a matching If-None-Match
+    gets 304.
     """
     if not essays_table:
         raise HTTPException(status_code=500, detail="Essays table not configured")
     
     try:
-        # First, we need to find the essay by scanning (since we only have essay_id)
-        # In production, consider adding a GSI on essay_id
-        filter_expr = Attr('essay_id').eq(essay_id)
-        
-        # If authenticated, filter by teacher_id; if not, allow public essays (demo-teacher)
-        if teacher_ctx:
-            filter_expr = filter_expr & Attr('teacher_id').eq(teacher_ctx.teacher_id)
-        else:
-            # Allow public demo essays
-            filter_expr = filter_expr & Attr('teacher_id').eq('demo-teacher')
-        
-        response = essays_table.scan(FilterExpression=filter_expr)
-        
-        items = response.get('Items', [])
-        if not items:
-            raise HTTPException(status_code=404, detail="Essay not found")
-        
-        essay = items[0]
-        
-        # Verify authorization: authenticated users can only see their own essays
-        # Unauthenticated users can only see public demo essays
-        if teacher_ctx and essay.get('teacher_id') != teacher_ctx.teacher_id:
-            raise HTTPException(status_code=403, detail="Not authorized to view this essay")
-        elif not teacher_ctx and essay.get('teacher_id') != 'demo-teacher':
-            raise HTTPException(status_code=403, detail="Not authorized to view this essay")
+        requested = parse_fields(fields, ESSAY_FIELDS)
+        attributes = None
+        if requested:
+            # The version attributes feed the ETag; status also gates vocabulary_analysis
+            attributes = requested + list(ESSAY_VERSION_ATTRIBUTES)
+
+        # Authenticated users can only see their own essays,
+        # unauthenticated users only public demo essays
+        owner_id = teacher_ctx.teacher_id if teacher_ctx else 'demo-teacher'
+        essay = _find_essay(essay_id, owner_id, full=True, attributes=attributes)
+
+        not_modified = conditional_response(
+            request,
+            response,
+            essays_etag([essay], requested),
+            PROCESSED_CACHE_CONTROL if essay.get('status') == 'processed' else REVALIDATE_CACHE_CONTROL,
+        )
+        if not_modified:
+            return not_modified
         
         # Format response
         result = {
@@ -583,6 +1210,15 @@ async def get_essay(
         # Include vocabulary_analysis if processed
         if essay.get('status') == 'processed' and 'vocabulary_analysis' in essay:
             result['vocabulary_analysis'] = essay['vocabulary_analysis']
+
+        # Include near-duplicate flag if the analysis was reused
+        if 'duplicate_of' in essay:
+            result['duplicate_of'] = essay['duplicate_of']
+
+        # Include revision number for essays that have been revised
+        if 'revision' in essay:
+            result['revision'] = essay['revision']
+        result = select(result, requested)
         
         logger.info("Essay retrieved", extra={
             "teacher_id": teacher_ctx.teacher_id if teacher_ctx else "public",
@@ -603,6 +1239,287 @@ async def get_essay(
         raise HTTPException(status_code=500, detail=f"Failed to retrieve essay: {str(e)}")
 
 
+def _find_essay(
+    essay_id: str,
+    teacher_id: str,
+    full: bool = False,
+    attributes: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Look up an essay by essay_id through the essay_id GSI.
+    
+    The index item carries the table key plus teacher_id and student_id, which
+    is all that updates and deletes need; with full=True the item is then
+    read from the table (only `attributes`, if given). The index is eventually
+    consistent, so an essay created a moment ago may briefly be reported as
+    not found.
+    
+    Another teacher's essay is reported as not found, so essay ids cannot
+    be probed for existence.
+    
+    Raises:
+        HTTPException: 404 if the essay does not exist or belongs to another
+            teacher
+    """
+    response = essays_table.query(
+        IndexName=ESSAY_ID_INDEX,
+        KeyConditionExpression=Key('essay_id').eq(essay_id),
+    )
+    items = response.get('Items', [])
+    if not items:
+        raise HTTPException(status_code=404, detail="Essay not found")
+    
+    essay = items[0]
+    if essay.get('teacher_id') != teacher_id:
+        raise HTTPException(status_code=404, detail="Essay not found")
+    
+    if full:
+        essay = essays_table.get_item(
+            Key={'assignment_id': essay['assignment_id'], 'essay_id': essay_id},
+            ConsistentRead=True,
+            **(projection(attributes) if attributes else {}),
+        ).get('Item')
+        # A projected read of an existing item returns at least an empty Item
+        if essay is None:
+            raise HTTPException(status_code=404, detail="Essay not found")
+    return essay
+
+
+def _remove_signatures(essay: Dict[str, Any]):
+    """
+    Remove an essay's entries from the near-duplicate signature index, so
+    later essays cannot reuse an analysis of text that no longer exists.
+    
+    The worker records the band keys on the essay (signature_keys). Best
+    effort: the worker also skips entries whose essay is gone or revised.
+    """
+    keys = essay.get('signature_keys')
+    if not ESSAY_SIGNATURES_TABLE or not keys:
+        return
+    failures = batch_write(dynamodb, ESSAY_SIGNATURES_TABLE, [
+        {'DeleteRequest': {'Key': {'band_key': band_key, 'essay_id': essay['essay_id']}}}
+        for band_key in keys
+    ])
+    if failures:
+        logger.warning("Failed to remove essay signatures", extra={
+            "essay_id": essay['essay_id'],
+            "failed": len(failures),
+            "error": failures[0][1],
+        })
+
+
+def _is_conditional_check_failure(error: Exception) -> bool:
+    if not isinstance(error, ClientError):
+        return False
+    code = error.response.get('Error', {}).get('Code')
+    if code == 'TransactionCanceledException':
+        reasons = error.response.get('CancellationReasons', [])
+        return any(reason.get('Code') == 'ConditionalCheckFailed' for reason in reasons)
+    return code == 'ConditionalCheckFailedException'
+
+
+_serializer = TypeSerializer()
+
+
+def _serialize(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Low-level attribute values for the client-only TransactWriteItems."""
+    return {name: _serializer.serialize(value) for name, value in values.items()}
+
+
+@router.put("/{essay_id}/text", response_model=EssayRevisionResponse)
+async def revise_essay_text(
+    essay_id: str,
+    request: EssayRevisionRequest,
+    teacher_ctx: TeacherContext = Depends(get_teacher_context)
+):
+    """
+    Replace an essay's text with a revised draft.
+    
+    The previous text (and its analysis) is archived in the EssayRevisions
+    table and the essay goes back to "pending" in one transaction, then it is
+    re-queued. The worker only
+    re-analyzes paragraphs that changed and merges the result with its cached
+    per-paragraph analysis.
+    """
+    if not essays_table:
+        raise HTTPException(status_code=500, detail="Essays table not configured")
+    
+    if not revisions_table:
+        raise HTTPException(status_code=500, detail="Essay revisions table not configured")
+    
+    if not ESSAY_PROCESSING_QUEUE_URL:
+        raise HTTPException(status_code=500, detail="Processing queue not configured")
+    
+    if not request.essay_text.strip():
+        raise HTTPException(status_code=400, detail="Essay text is required")
+    
+    try:
+        essay = _find_essay(essay_id, teacher_ctx.teacher_id, full=True)
+        assignment_id = essay.get('assignment_id')
+        current_revision = int(essay.get('revision', 1))
+        
+        # Nothing to do if the text did not change
+        if request.essay_text == essay.get('essay_text'):
+            return EssayRevisionResponse(
+                essay_id=essay_id,
+                revision=current_revision,
+                status=essay.get('status', 'pending'),
+            )
+        
+        now = datetime.utcnow().isoformat()
+        
+        # Archive the current version and update the essay together; the
+        # conditions make concurrent revisions of the same essay fail instead
+        # of overwriting history, and a failed update leaves no archive row
+        # behind that would block every later attempt
+        archived = {
+            'essay_id': essay_id,
+            'revision': current_revision,
+            'teacher_id': teacher_ctx.teacher_id,
+            'assignment_id': assignment_id,
+            'essay_text': essay.get('essay_text', ''),
+            'created_at': essay.get('revised_at') or essay.get('created_at'),
+            'superseded_at': now,
+        }
+        if 'vocabulary_analysis' in essay:
+            archived['vocabulary_analysis'] = essay['vocabulary_analysis']
+        await run_in_threadpool(
+            dynamodb.meta.client.transact_write_items,
+            TransactItems=[
+                {'Put': {
+                    'TableName': revisions_table.name,
+                    'Item': _serialize(archived),
+                    'ConditionExpression': 'attribute_not_exists(essay_id)',
+                }},
+                {'Update': {
+                    'TableName': essays_table.name,
+                    'Key': _serialize({'assignment_id': assignment_id, 'essay_id': essay_id}),
+                    'UpdateExpression': (
+                        "SET essay_text = :text, revision = :revision, "
+                        "#status = :status, revised_at = :now REMOVE signature_keys"
+                    ),
+                    'ConditionExpression': 'attribute_not_exists(revision) OR revision = :current',
+                    'ExpressionAttributeNames': {'#status': 'status'},
+                    'ExpressionAttributeValues': _serialize({
+                        ':text': request.essay_text,
+                        ':revision': current_revision + 1,
+                        ':status': 'pending',
+                        ':now': now,
+                        ':current': current_revision,
+                    }),
+                }},
+            ],
+        )
+        
+        # The old text's signatures go; the worker indexes the new text
+        await run_in_threadpool(_remove_signatures, essay)
+        
+        # Enqueue SQS message (ONLY IDs, no essay_text)
+        sqs.send_message(
+            QueueUrl=ESSAY_PROCESSING_QUEUE_URL,
+            MessageBody=json.dumps({
+                'teacher_id': teacher_ctx.teacher_id,
+                'assignment_id': assignment_id,
+                'student_id': essay.get('student_id') or '',
+                'essay_id': essay_id,
+            })
+        )
+        
+        logger.info("Essay revised", extra={
+            "teacher_id": teacher_ctx.teacher_id,
+            "essay_id": essay_id,
+            "assignment_id": assignment_id,
+            "revision": current_revision + 1,
+        })
+        
+        return EssayRevisionResponse(
+            essay_id=essay_id,
+            revision=current_revision + 1,
+            status='pending',
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        if _is_conditional_check_failure(e):
+            raise HTTPException(status_code=409, detail="Essay was revised concurrently; reload and retry")
+        logger.error("Failed to revise essay", extra={
+            "teacher_id": teacher_ctx.teacher_id,
+            "essay_id": essay_id,
+            "error": str(e),
+        }, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to revise essay: {str(e)}")
+
+
+@router.get(
+    "/{essay_id}/revisions",
+    response_model=List[EssayRevisionItem],
+    response_model_exclude_unset=True,
+)
+async def list_essay_revisions(
+    essay_id: str,
+    fields: Optional[str] = None,
+    teacher_ctx: TeacherContext = Depends(get_teacher_context)
+):
+    """
+    List previous versions of an essay, oldest first.
+    
+    The current text is returned by GET /essays/{essay_id}. With `fields`,
+    only those attributes are read and returned. An unknown essay or another
+    teacher's is 404, like the other essay routes; an essay that was never
+    revised has no revisions.
+    """
+    if not essays_table:
+        raise HTTPException(status_code=500, detail="Essays table not configured")
+    
+    if not revisions_table:
+        raise HTTPException(status_code=500, detail="Essay revisions table not configured")
+    
+    try:
+        requested = parse_fields(fields, REVISION_FIELDS)
+        query_kwargs = projection(requested) if requested else {}
+        
+        # Raises 404 for unknown essays and other teachers' essays
+        _find_essay(essay_id, teacher_ctx.teacher_id)
+
+        revisions = []
+        response = revisions_table.query(
+            KeyConditionExpression=Key('essay_id').eq(essay_id),
+            **query_kwargs
+        )
+        revisions.extend(response.get('Items', []))
+        
+        # Handle pagination
+        while 'LastEvaluatedKey' in response:
+            response = revisions_table.query(
+                KeyConditionExpression=Key('essay_id').eq(essay_id),
+                ExclusiveStartKey=response['LastEvaluatedKey'],
+                **query_kwargs
+            )
+            revisions.extend(response.get('Items', []))
+        
+        return [
+            EssayRevisionItem(**select({
+                'revision': int(item['revision']) if 'revision' in item else None,
+                'essay_text': item.get('essay_text', ''),
+                'created_at': item.get('created_at'),
+                'superseded_at': item.get('superseded_at', ''),
+                'vocabulary_analysis': item.get('vocabulary_analysis'),
+            }, requested))
+            for item in revisions
+        ]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to list essay revisions", extra={
+            "teacher_id": teacher_ctx.teacher_id,
+            "essay_id": essay_id,
+            "error": str(e),
+        }, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve essay revisions: {str(e)}")
+
+
 @router.patch("/{essay_id}/override", response_model=EssayOverrideResponse)
 async def override_essay_feedback(
     essay_id: str,
@@ -620,18 +1537,7 @@ async def override_essay_feedback(
         raise HTTPException(status_code=500, detail="Essays table not configured")
     
     try:
-        # First, find the essay by scanning (since we only have essay_id)
-        # In production, consider adding a GSI on essay_id
-        response = essays_table.scan(
-            FilterExpression=Attr('essay_id').eq(essay_id) &
-                            Attr('teacher_id').eq(teacher_ctx.teacher_id)
-        )
-        
-        items = response.get('Items', [])
-        if not items:
-            raise HTTPException(status_code=404, detail="Essay not found")
-        
-        essay = items[0]
+        essay = _find_essay(essay_id, teacher_ctx.teacher_id)
         assignment_id = essay.get('assignment_id')
         
         # Convert feedback to dict format (DynamoDB compatible)
@@ -693,30 +1599,23 @@ async def delete_essay(
     """
     Delete an essay.
     
-    Deletes the essay from the Essays table. Only the essay owner can delete it.
+    Deletes the essay from the Essays table and its near-duplicate signatures.
+    Only the essay owner can delete it.
     """
     if not essays_table:
         raise HTTPException(status_code=500, detail="Essays table not configured")
     
     try:
-        # First, find the essay by scanning (since we only have essay_id)
-        # In production, consider adding a GSI on essay_id
-        response = essays_table.scan(
-            FilterExpression=Attr('essay_id').eq(essay_id) &
-                            Attr('teacher_id').eq(teacher_ctx.teacher_id)
-        )
-        
-        items = response.get('Items', [])
-        if not items:
-            raise HTTPException(status_code=404, detail="Essay not found")
-        
-        essay = items[0]
+        essay = _find_essay(essay_id, teacher_ctx.teacher_id)
         assignment_id = essay.get('assignment_id')
         
-        # Delete the essay
-        essays_table.delete_item(
-            Key={'assignment_id': assignment_id, 'essay_id': essay_id}
-        )
+        # Delete the essay; the old item carries its signature band keys
+        deleted = essays_table.delete_item(
+            Key={'assignment_id': assignment_id, 'essay_id': essay_id},
+            ReturnValues='ALL_OLD',
+        ).get('Attributes')
+        if deleted:
+            await run_in_threadpool(_remove_signatures, deleted)
         
         logger.info("Essay deleted", extra={
             "teacher_id": teacher_ctx.teacher_id,
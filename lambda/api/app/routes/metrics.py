@@ -9,13 +9,15 @@ import os
 import boto3
 import logging
 import re
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from typing import Dict, Any, Optional, List
 from pydantic import BaseModel
 from boto3.dynamodb.conditions import Key, Attr
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from app.deps import get_teacher_context, TeacherContext
+from app.etag import conditional_response, essays_etag
+from app.routes.essays import query_student_essays
 
 logger = logging.getLogger(__name__)
 
@@ -94,8 +96,12 @@ router = APIRouter(prefix="/metrics", tags=["metrics"])
 # Initialize DynamoDB
 dynamodb = boto3.resource('dynamodb')
 ESSAYS_TABLE = os.environ.get('ESSAYS_TABLE')
+USAGE_LEDGER_TABLE = os.environ.get('USAGE_LEDGER_TABLE')
+CLASS_REPORTS_TABLE = os.environ.get('CLASS_REPORTS_TABLE')
 
 essays_table = dynamodb.Table(ESSAYS_TABLE) if ESSAYS_TABLE else None
+usage_table = dynamodb.Table(USAGE_LEDGER_TABLE) if USAGE_LEDGER_TABLE else None
+class_reports_table = dynamodb.Table(CLASS_REPORTS_TABLE) if CLASS_REPORTS_TABLE else None
 # Legacy CLASS_METRICS_TABLE and STUDENT_METRICS_TABLE removed - compute on-demand from Essays table
 
 
@@ -113,16 +119,115 @@ class StudentMetricsResponse(BaseModel):
     updated_at: str
 
 
+class ClassReportResponse(BaseModel):
+    """Response model for an assignment's class vocabulary report."""
+    assignment_id: str
+    report: Dict[str, Any]
+    word_frequencies: Dict[str, Any]
+    essay_count: int
+    # Essays summarized for the report; fewer than essay_count for large classes
+    essays_analyzed: Optional[int] = None
+    generated_at: str
+    model: Optional[str] = None
+
+
+class UsageDay(BaseModel):
+    """Token usage and cost for a single UTC day."""
+    usage_date: str
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    essay_count: int = 0
+
+
+class UsageLedgerResponse(BaseModel):
+    """Response model for a teacher or assignment usage ledger."""
+    scope: str
+    scope_id: str
+    start_date: str
+    end_date: str
+    days: List[UsageDay]
+    totals: UsageDay
+
+
+USAGE_DEFAULT_DAYS = 30
+
+
+def _usage_date_range(start_date: Optional[str], end_date: Optional[str]) -> tuple:
+    """Resolve an inclusive YYYY-MM-DD range, defaulting to the last 30 days."""
+    try:
+        end = datetime.strptime(end_date, '%Y-%m-%d') if end_date else datetime.utcnow()
+        start = (
+            datetime.strptime(start_date, '%Y-%m-%d') if start_date
+            else end - timedelta(days=USAGE_DEFAULT_DAYS - 1)
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    return start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+
+
+def _query_usage_ledger(scope_key: str, start: str, end: str) -> List[Dict[str, Any]]:
+    """Query daily ledger items for one scope within an inclusive date range."""
+    key_condition = Key('scope_id').eq(scope_key) & Key('usage_date').between(start, end)
+    response = usage_table.query(KeyConditionExpression=key_condition)
+    items = response.get('Items', [])
+    while 'LastEvaluatedKey' in response:
+        response = usage_table.query(
+            KeyConditionExpression=key_condition,
+            ExclusiveStartKey=response['LastEvaluatedKey']
+        )
+        items.extend(response.get('Items', []))
+    return items
+
+
+def _build_usage_response(scope: str, scope_id: str, start: str, end: str,
+                          items: List[Dict[str, Any]]) -> UsageLedgerResponse:
+    """Convert ledger items into per-day rows plus range totals."""
+    days = [
+        UsageDay(
+            usage_date=item['usage_date'],
+            prompt_tokens=int(item.get('prompt_tokens', 0)),
+            cached_tokens=int(item.get('cached_tokens', 0)),
+            completion_tokens=int(item.get('completion_tokens', 0)),
+            cost_usd=float(item.get('cost_usd', 0)),
+            essay_count=int(item.get('essay_count', 0)),
+        )
+        for item in sorted(items, key=lambda x: x['usage_date'])
+    ]
+    totals = UsageDay(
+        usage_date=f"{start}..{end}",
+        prompt_tokens=sum(d.prompt_tokens for d in days),
+        cached_tokens=sum(d.cached_tokens for d in days),
+        completion_tokens=sum(d.completion_tokens for d in days),
+        cost_usd=round(sum(d.cost_usd for d in days), 8),
+        essay_count=sum(d.essay_count for d in days),
+    )
+    return UsageLedgerResponse(
+        scope=scope,
+        scope_id=scope_id,
+        start_date=start,
+        end_date=end,
+        days=days,
+        totals=totals,
+    )
+
+
 @router.get("/class/{assignment_id}", response_model=ClassMetricsResponse)
 async def get_class_metrics(
     assignment_id: str,
+    request: Request,
+    response: Response,
     teacher_ctx: TeacherContext = Depends(get_teacher_context)
 ):
     """
     Get class-level metrics for a specific assignment.
     
     Computes metrics on-demand from the Essays table by querying all essays
-    for the given assignment_id.
+    for the given assignment_id. The ETag covers the processed essays'
+    versions, so a matching If-None-Match gets 304 without recomputing.
     """
     if not essays_table:
         raise HTTPException(status_code=500, detail="Essays table not configured")
@@ -130,23 +235,27 @@ async def get_class_metrics(
     try:
         # Query essays by assignment_id (partition key)
         # Filter by teacher_id and status='processed'
-        response = essays_table.query(
+        query_response = essays_table.query(
             KeyConditionExpression=Key('assignment_id').eq(assignment_id),
             FilterExpression=Attr('teacher_id').eq(teacher_ctx.teacher_id) &
                             Attr('status').eq('processed')
         )
         
-        essays = response.get('Items', [])
+        essays = query_response.get('Items', [])
         
         # Handle pagination
-        while 'LastEvaluatedKey' in response:
-            response = essays_table.query(
+        while 'LastEvaluatedKey' in query_response:
+            query_response = essays_table.query(
                 KeyConditionExpression=Key('assignment_id').eq(assignment_id),
                 FilterExpression=Attr('teacher_id').eq(teacher_ctx.teacher_id) &
                                 Attr('status').eq('processed'),
-                ExclusiveStartKey=response['LastEvaluatedKey']
+                ExclusiveStartKey=query_response['LastEvaluatedKey']
             )
-            essays.extend(response.get('Items', []))
+            essays.extend(query_response.get('Items', []))
+
+        not_modified = conditional_response(request, response, essays_etag(essays))
+        if not_modified:
+            return not_modified
         
         essay_count = len(essays)
         
@@ -211,6 +320,55 @@ async def get_class_metrics(
         raise HTTPException(status_code=500, detail=f"Failed to retrieve class metrics: {str(e)}")
 
 
+@router.get("/class/{assignment_id}/report", response_model=ClassReportResponse)
+async def get_class_report(
+    assignment_id: str,
+    teacher_ctx: TeacherContext = Depends(get_teacher_context)
+):
+    """
+    Get the class vocabulary report for an assignment.
+    
+    The Worker Lambda generates the report with a single summarization call
+    once every essay of the assignment has been processed, and regenerates it
+    when results change. Returns 404 until the first report exists.
+    """
+    if not class_reports_table:
+        raise HTTPException(status_code=500, detail="Class reports table not configured")
+    
+    try:
+        item = class_reports_table.get_item(Key={'assignment_id': assignment_id}).get('Item')
+        
+        # A claim without a report means the first report is still being generated
+        if not item or item.get('teacher_id') != teacher_ctx.teacher_id or 'report' not in item:
+            raise HTTPException(status_code=404, detail="Class report not available")
+        
+        logger.info("Class report retrieved", extra={
+            "teacher_id": teacher_ctx.teacher_id,
+            "assignment_id": assignment_id,
+            "essay_count": int(item.get('essay_count', 0)),
+        })
+        
+        return ClassReportResponse(
+            assignment_id=assignment_id,
+            report=item['report'],
+            word_frequencies=item.get('word_frequencies', {}),
+            essay_count=int(item.get('essay_count', 0)),
+            essays_analyzed=int(item['essays_analyzed']) if 'essays_analyzed' in item else None,
+            generated_at=item.get('generated_at', ''),
+            model=item.get('model'),
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to get class report", extra={
+            "teacher_id": teacher_ctx.teacher_id,
+            "assignment_id": assignment_id,
+            "error": str(e),
+        }, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve class report: {str(e)}")
+
+
 @router.get("/student/{student_id}", response_model=StudentMetricsResponse)
 async def get_student_metrics(
     student_id: str,
@@ -219,38 +377,17 @@ async def get_student_metrics(
     """
     Get student-level metrics for a specific student.
     
-    Computes metrics on-demand from the Essays table by scanning for all essays
-    with the given student_id.
+    Computes metrics on-demand from the student's processed essays, read in
+    created_at order from the teacher_student index.
     """
     if not essays_table:
         raise HTTPException(status_code=500, detail="Essays table not configured")
     
     try:
-        # Scan for essays by student_id (not a partition key, so we need to scan)
-        # Filter by teacher_id and status='processed'
-        response = essays_table.scan(
-            FilterExpression=Attr('teacher_id').eq(teacher_ctx.teacher_id) &
-                            Attr('student_id').eq(student_id) &
-                            Attr('status').eq('processed')
-        )
-        
-        essays = response.get('Items', [])
-        
-        # Handle pagination
-        while 'LastEvaluatedKey' in response:
-            response = essays_table.scan(
-                FilterExpression=Attr('teacher_id').eq(teacher_ctx.teacher_id) &
-                                Attr('student_id').eq(student_id) &
-                                Attr('status').eq('processed'),
-                ExclusiveStartKey=response['LastEvaluatedKey']
-            )
-            essays.extend(response.get('Items', []))
+        essays, _ = query_student_essays(essays_table, teacher_ctx.teacher_id, student_id)
         
         total_essays = len(essays)
         
-        # Sort essays by created_at to find most recent
-        essays.sort(key=lambda x: x.get('created_at', ''))
-        
         # Compute metrics from essay texts
         total_ttr = 0.0
         total_word_count = 0.0
@@ -421,3 +558,77 @@ async def get_student_metrics_for_assignment(
         }, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to retrieve student assignment metrics: {str(e)}")
 
+
+@router.get("/usage", response_model=UsageLedgerResponse)
+async def get_teacher_usage(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    teacher_ctx: TeacherContext = Depends(get_teacher_context)
+):
+    """
+    Get daily OpenAI token usage and cost for the authenticated teacher.
+    
+    Reads the per-teacher daily ledger maintained by the Worker Lambda.
+    Dates are inclusive YYYY-MM-DD (UTC); defaults to the last 30 days.
+    """
+    if not usage_table:
+        raise HTTPException(status_code=500, detail="Usage ledger table not configured")
+    
+    start, end = _usage_date_range(start_date, end_date)
+    
+    try:
+        items = _query_usage_ledger(f"teacher#{teacher_ctx.teacher_id}", start, end)
+        
+        logger.info("Teacher usage retrieved", extra={
+            "teacher_id": teacher_ctx.teacher_id,
+            "day_count": len(items),
+        })
+        
+        return _build_usage_response('teacher', teacher_ctx.teacher_id, start, end, items)
+        
+    except Exception as e:
+        logger.error("Failed to get teacher usage", extra={
+            "teacher_id": teacher_ctx.teacher_id,
+            "error": str(e),
+        }, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve usage: {str(e)}")
+
+
+@router.get("/usage/assignment/{assignment_id}", response_model=UsageLedgerResponse)
+async def get_assignment_usage(
+    assignment_id: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    teacher_ctx: TeacherContext = Depends(get_teacher_context)
+):
+    """
+    Get daily OpenAI token usage and cost for one assignment.
+    
+    Only ledger days recorded for the authenticated teacher are returned.
+    """
+    if not usage_table:
+        raise HTTPException(status_code=500, detail="Usage ledger table not configured")
+    
+    start, end = _usage_date_range(start_date, end_date)
+    
+    try:
+        items = [
+            item for item in _query_usage_ledger(f"assignment#{assignment_id}", start, end)
+            if item.get('teacher_id') == teacher_ctx.teacher_id
+        ]
+        
+        logger.info("Assignment usage retrieved", extra={
+            "teacher_id": teacher_ctx.teacher_id,
+            "assignment_id": assignment_id,
+            "day_count": len(items),
+        })
+        
+        return _build_usage_response('assignment', assignment_id, start, end, items)
+        
+    except Exception as e:
+        logger.error("Failed to get assignment usage", extra={
+            "teacher_id": teacher_ctx.teacher_id,
+            "assignment_id": assignment_id,
+            "error": str(e),
+        }, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve usage: {str(e)}")
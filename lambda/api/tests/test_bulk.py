@@ -0,0 +1,133 @@
+"""
+Unit tests for chunked batch reads, batch writes and message batches.
+"""
+import os
+import sys
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from app.bulk import batch_get, batch_write, send_message_batches
+
+
+def put(n):
+    return {'PutRequest': {'Item': {'essay_id': f'e{n}'}}}
+
+
+def key(n):
+    return {'assignment_id': 'a1', 'essay_id': f'e{n}'}
+
+
+class TestBatchGet:
+    def test_chunks_keys_and_applies_read_kwargs(self):
+        dynamodb = MagicMock()
+        dynamodb.batch_get_item.side_effect = lambda RequestItems: {
+            'Responses': {'essays': RequestItems['essays']['Keys']}
+        }
+
+        items, unread = batch_get(
+            dynamodb, 'essays', [key(n) for n in range(150)], ProjectionExpression='essay_id'
+        )
+
+        assert sorted(item['essay_id'] for item in items) == sorted(f'e{n}' for n in range(150))
+        assert unread == []
+        requests = [c[1]['RequestItems']['essays'] for c in dynamodb.batch_get_item.call_args_list]
+        assert sorted(len(request['Keys']) for request in requests) == [50, 100]
+        assert all(request['ProjectionExpression'] == 'essay_id' for request in requests)
+
+    def test_retries_unprocessed_keys(self):
+        dynamodb = MagicMock()
+        dynamodb.batch_get_item.side_effect = [
+            {'Responses': {'essays': [key(0)]},
+             'UnprocessedKeys': {'essays': {'Keys': [key(1)], 'ProjectionExpression': 'essay_id'}}},
+            {'Responses': {'essays': [key(1)]}},
+        ]
+
+        items, unread = batch_get(
+            dynamodb, 'essays', [key(0), key(1)], backoff_seconds=0, ProjectionExpression='essay_id'
+        )
+
+        assert items == [key(0), key(1)]
+        assert unread == []
+        retry = dynamodb.batch_get_item.call_args_list[1][1]['RequestItems']
+        assert retry == {'essays': {'Keys': [key(1)], 'ProjectionExpression': 'essay_id'}}
+
+    def test_returns_keys_still_unread(self):
+        dynamodb = MagicMock()
+        dynamodb.batch_get_item.return_value = {
+            'Responses': {'essays': []},
+            'UnprocessedKeys': {'essays': {'Keys': [key(1)]}},
+        }
+
+        items, unread = batch_get(dynamodb, 'essays', [key(0), key(1)], backoff_seconds=0)
+
+        assert items == []
+        assert unread == [key(1)]
+        assert dynamodb.batch_get_item.call_count == 4
+
+
+class TestBatchWrite:
+    def test_retries_unprocessed_items(self):
+        dynamodb = MagicMock()
+        dynamodb.batch_write_item.side_effect = [
+            {'UnprocessedItems': {'essays': [put(1)]}},
+            {'UnprocessedItems': {}},
+        ]
+
+        failures = batch_write(dynamodb, 'essays', [put(0), put(1)], backoff_seconds=0)
+
+        assert failures == []
+        retry = dynamodb.batch_write_item.call_args_list[1][1]['RequestItems']
+        assert retry == {'essays': [put(1)]}
+
+    def test_gives_up_after_max_attempts(self):
+        dynamodb = MagicMock()
+        dynamodb.batch_write_item.return_value = {'UnprocessedItems': {'essays': [put(1)]}}
+
+        failures = batch_write(dynamodb, 'essays', [put(0), put(1)], backoff_seconds=0)
+
+        assert [request for request, _ in failures] == [put(1)]
+        assert dynamodb.batch_write_item.call_count == 4
+
+    def test_failed_chunk_does_not_fail_others(self):
+        dynamodb = MagicMock()
+
+        def write(RequestItems):
+            if RequestItems['essays'][0] == put(0):
+                raise Exception("throttled")
+            return {}
+
+        dynamodb.batch_write_item.side_effect = write
+
+        failures = batch_write(dynamodb, 'essays', [put(n) for n in range(30)], backoff_seconds=0)
+
+        assert [request for request, _ in failures] == [put(n) for n in range(25)]
+        assert all(error == 'throttled' for _, error in failures)
+
+
+class TestSendMessageBatches:
+    def test_retries_only_server_side_failures(self):
+        sqs = MagicMock()
+        sqs.send_message_batch.side_effect = [
+            {'Failed': [
+                {'Id': '0', 'SenderFault': False, 'Code': 'InternalError'},
+                {'Id': '1', 'SenderFault': True, 'Code': 'InvalidMessageContents', 'Message': 'bad'},
+            ]},
+            {'Failed': []},
+        ]
+
+        failures = send_message_batches(sqs, 'https://queue', ['a', 'b', 'c'], backoff_seconds=0)
+
+        assert failures == {1: 'bad'}
+        retry = sqs.send_message_batch.call_args_list[1][1]['Entries']
+        assert retry == [{'Id': '0', 'MessageBody': 'a'}]
+
+    def test_chunks_of_ten(self):
+        sqs = MagicMock()
+        sqs.send_message_batch.return_value = {}
+
+        failures = send_message_batches(sqs, 'https://queue', [str(n) for n in range(23)])
+
+        assert failures == {}
+        sizes = sorted(len(c[1]['Entries']) for c in sqs.send_message_batch.call_args_list)
+        assert sizes == [3, 10, 10]
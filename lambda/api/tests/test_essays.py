@@ -1,5 +1,5 @@
 """
-Unit tests for essay override API endpoint (Epic 8).
+Unit tests for the essays API endpoints.
 """
 import pytest
 import os
@@ -45,6 +45,589 @@ def client():
     app.dependency_overrides.clear()
 
 
+def index_item(teacher_id='test-teacher-123', **extra):
+    """essay_id-index projection of essay-123."""
+    return {
+        'essay_id': 'essay-123',
+        'assignment_id': 'assignment-456',
+        'teacher_id': teacher_id,
+        'student_id': 'student-789',
+        **extra,
+    }
+
+
+class TestEssayLookup:
+    """Tests for the essay_id GSI lookup behind GET/PUT/PATCH/DELETE /essays/{essay_id}."""
+    
+    @pytest.fixture(autouse=True)
+    def authenticated(self):
+        """GET /essays/{essay_id} uses the optional auth dependency."""
+        from app.deps import get_optional_teacher_context
+        app.dependency_overrides[get_optional_teacher_context] = lambda: mock_teacher_context
+        yield
+    
+    def test_get_essay_queries_index_then_table(self, client):
+        """The essay is located through the index and read by its key; no scans."""
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [index_item()]}
+            mock_table.get_item.return_value = {'Item': index_item(
+                essay_text='Essay.',
+                status='processed',
+                vocabulary_analysis={'vocabulary_used': ['essay']},
+            )}
+            
+            response = client.get('/essays/essay-123')
+            
+            assert response.status_code == 200
+            data = response.json()
+            assert data['assignment_id'] == 'assignment-456'
+            assert data['vocabulary_analysis'] == {'vocabulary_used': ['essay']}
+            
+            query = mock_table.query.call_args[1]
+            assert query['IndexName'] == 'essay_id-index'
+            assert mock_table.get_item.call_args[1]['Key'] == {
+                'assignment_id': 'assignment-456',
+                'essay_id': 'essay-123',
+            }
+            mock_table.scan.assert_not_called()
+    
+    def test_get_essay_other_teacher(self, client):
+        """Another teacher's essay is not found and never read in full."""
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [index_item('other-teacher')]}
+            
+            response = client.get('/essays/essay-123')
+            
+            assert response.status_code == 404
+            mock_table.get_item.assert_not_called()
+    
+    def test_get_essay_deleted_after_index_read(self, client):
+        """A stale index entry whose item is gone is a 404."""
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [index_item()]}
+            mock_table.get_item.return_value = {}
+            
+            response = client.get('/essays/essay-123')
+            
+            assert response.status_code == 404
+    
+    def test_get_public_essay_without_auth(self, client):
+        """Unauthenticated callers can read demo essays only."""
+        from app.deps import get_optional_teacher_context
+        app.dependency_overrides[get_optional_teacher_context] = lambda: None
+        
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [index_item('demo-teacher')]}
+            mock_table.get_item.return_value = {'Item': index_item('demo-teacher', status='pending')}
+            
+            assert client.get('/essays/essay-123').status_code == 200
+            
+            mock_table.query.return_value = {'Items': [index_item()]}
+            assert client.get('/essays/essay-123').status_code == 404
+    
+    def test_delete_essay(self, client):
+        """Delete uses the key from the index."""
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [index_item()]}
+            
+            response = client.delete('/essays/essay-123')
+            
+            assert response.status_code == 200
+            mock_table.delete_item.assert_called_once_with(
+                Key={'assignment_id': 'assignment-456', 'essay_id': 'essay-123'},
+                ReturnValues='ALL_OLD',
+            )
+            mock_table.scan.assert_not_called()
+    
+    def test_delete_essay_removes_signatures(self, client):
+        """The deleted essay's near-duplicate index entries are removed."""
+        mock_dynamodb = MagicMock()
+        mock_dynamodb.batch_write_item.return_value = {}
+        with patch('app.routes.essays.essays_table') as mock_table, \
+             patch('app.routes.essays.dynamodb', mock_dynamodb), \
+             patch('app.routes.essays.ESSAY_SIGNATURES_TABLE', 'signatures'):
+            mock_table.query.return_value = {'Items': [index_item()]}
+            mock_table.delete_item.return_value = {'Attributes': index_item(
+                signature_keys=['test-teacher-123#0#aa', 'test-teacher-123#1#bb'],
+            )}
+            
+            response = client.delete('/essays/essay-123')
+            
+            assert response.status_code == 200
+            requests = mock_dynamodb.batch_write_item.call_args[1]['RequestItems']['signatures']
+            assert requests == [
+                {'DeleteRequest': {'Key': {'band_key': 'test-teacher-123#0#aa', 'essay_id': 'essay-123'}}},
+                {'DeleteRequest': {'Key': {'band_key': 'test-teacher-123#1#bb', 'essay_id': 'essay-123'}}},
+            ]
+    
+    def test_delete_essay_not_found(self, client):
+        """Deleting an unknown essay is a 404."""
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': []}
+            
+            response = client.delete('/essays/essay-999')
+            
+            assert response.status_code == 404
+            mock_table.delete_item.assert_not_called()
+
+
+class TestStudentEssays:
+    """Tests for GET /essays/student/{student_id}."""
+    
+    def _essay(self, n):
+        return {
+            'essay_id': f'essay-{n}',
+            'assignment_id': 'assignment-456',
+            'created_at': f'2025-01-0{n}T00:00:00',
+            'status': 'processed',
+            'vocabulary_analysis': {'vocabulary_used': ['word']},
+        }
+    
+    def test_list_student_essays_queries_index_in_order(self, client):
+        """Essays come from an ordered teacher_student index query, not a scan."""
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [self._essay(1), self._essay(2)]}
+            
+            response = client.get('/essays/student/student-789')
+            
+            assert response.status_code == 200
+            assert [e['essay_id'] for e in response.json()] == ['essay-1', 'essay-2']
+            assert 'X-Next-Cursor' not in response.headers
+            
+            query = mock_table.query.call_args[1]
+            assert query['IndexName'] == 'teacher_student-index'
+            assert query['ScanIndexForward'] is True
+            assert 'Limit' not in query
+            mock_table.scan.assert_not_called()
+    
+    def test_list_student_essays_page_and_cursor(self, client):
+        """A limited page returns a cursor that resumes after the last essay."""
+        last_key = {
+            'assignment_id': 'assignment-456',
+            'essay_id': 'essay-2',
+            'teacher_student': 'test-teacher-123#student-789',
+            'created_at': '2025-01-02T00:00:00',
+        }
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {
+                'Items': [self._essay(1), self._essay(2)],
+                'LastEvaluatedKey': last_key,
+            }
+            
+            response = client.get('/essays/student/student-789?limit=2')
+            
+            assert response.status_code == 200
+            assert len(response.json()) == 2
+            assert mock_table.query.call_args[1]['Limit'] == 2
+            cursor = response.headers['X-Next-Cursor']
+            
+            mock_table.query.return_value = {'Items': [self._essay(3)]}
+            response = client.get(f'/essays/student/student-789?limit=2&cursor={cursor}')
+            
+            assert response.status_code == 200
+            assert [e['essay_id'] for e in response.json()] == ['essay-3']
+            assert mock_table.query.call_args[1]['ExclusiveStartKey'] == last_key
+            assert 'X-Next-Cursor' not in response.headers
+    
+    def test_list_student_essays_rejects_foreign_cursor(self, client):
+        """A cursor from another teacher's or student's partition is rejected."""
+        from app.pagination import encode_cursor
+        cursor = encode_cursor({'teacher_student': 'other-teacher#student-789', 'essay_id': 'x'})
+        
+        with patch('app.routes.essays.essays_table') as mock_table:
+            response = client.get(f'/essays/student/student-789?cursor={cursor}')
+            
+            assert response.status_code == 400
+            mock_table.query.assert_not_called()
+    
+    def test_list_student_essays_scans_before_index_exists(self, client):
+        """Between the two GSI deploys the essays are scanned and sorted, unpaged."""
+        with patch('app.routes.essays.essays_table') as mock_table, \
+             patch('app.routes.essays.TEACHER_STUDENT_INDEX_ENABLED', False):
+            mock_table.scan.side_effect = [
+                {'Items': [self._essay(2)], 'LastEvaluatedKey': {'essay_id': 'essay-2'}},
+                {'Items': [self._essay(1)]},
+            ]
+            
+            response = client.get('/essays/student/student-789?limit=1')
+            
+            assert response.status_code == 200
+            assert [e['essay_id'] for e in response.json()] == ['essay-1', 'essay-2']
+            assert 'X-Next-Cursor' not in response.headers
+            assert mock_table.scan.call_args[1]['ExclusiveStartKey'] == {'essay_id': 'essay-2'}
+            mock_table.query.assert_not_called()
+
+
+class TestAssignmentEssays:
+    """Tests for GET /essays/assignment/{assignment_id}."""
+    
+    def _essay(self, n, status='processed'):
+        return {
+            'essay_id': f'essay-{n}',
+            'assignment_id': 'assignment-456',
+            'student_id': 'student-789',
+            'status': status,
+            'created_at': f'2025-01-0{n}T00:00:00',
+        }
+    
+    def test_list_omits_essay_text_by_default(self, client):
+        """Only the listed attributes are read; essay_text needs include_text."""
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [self._essay(1), self._essay(2, 'pending')]}
+            
+            response = client.get('/essays/assignment/assignment-456')
+            
+            assert response.status_code == 200
+            assert [e['essay_id'] for e in response.json()] == ['essay-1', 'essay-2']
+            assert 'X-Next-Cursor' not in response.headers
+            query = mock_table.query.call_args[1]
+            projected = set(query['ExpressionAttributeNames'].values())
+            assert 'essay_text' not in projected
+            assert {'essay_id', 'status', 'vocabulary_analysis'} <= projected
+            assert 'Limit' not in query
+    
+    def test_list_include_text(self, client):
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {
+                'Items': [dict(self._essay(1), essay_text='My essay.')]
+            }
+            
+            response = client.get('/essays/assignment/assignment-456?include_text=true')
+            
+            assert response.json()[0]['essay_text'] == 'My essay.'
+            query = mock_table.query.call_args[1]
+            assert 'essay_text' in query['ExpressionAttributeNames'].values()
+    
+    def test_list_filters_status_server_side(self, client):
+        """The status filter goes into the query, together with the teacher filter."""
+        from boto3.dynamodb.conditions import Attr
+        
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [self._essay(1)]}
+            
+            response = client.get('/essays/assignment/assignment-456?status=processed')
+            
+            assert response.status_code == 200
+            assert mock_table.query.call_args[1]['FilterExpression'] == (
+                Attr('teacher_id').eq('test-teacher-123') & Attr('status').eq('processed')
+            )
+    
+    def test_list_page_and_cursor(self, client):
+        last_key = {'assignment_id': 'assignment-456', 'essay_id': 'essay-2'}
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {
+                'Items': [self._essay(1), self._essay(2)],
+                'LastEvaluatedKey': last_key,
+            }
+            
+            response = client.get('/essays/assignment/assignment-456?limit=2')
+            
+            assert mock_table.query.call_args[1]['Limit'] == 2
+            cursor = response.headers['X-Next-Cursor']
+            
+            mock_table.query.return_value = {'Items': [self._essay(3)]}
+            response = client.get(f'/essays/assignment/assignment-456?limit=2&cursor={cursor}')
+            
+            assert [e['essay_id'] for e in response.json()] == ['essay-3']
+            assert mock_table.query.call_args[1]['ExclusiveStartKey'] == last_key
+            assert 'X-Next-Cursor' not in response.headers
+    
+    def test_list_rejects_cursor_of_other_assignment(self, client):
+        from app.pagination import encode_cursor
+        cursor = encode_cursor({'assignment_id': 'other-assignment', 'essay_id': 'x'})
+        
+        with patch('app.routes.essays.essays_table') as mock_table:
+            response = client.get(f'/essays/assignment/assignment-456?cursor={cursor}')
+            
+            assert response.status_code == 400
+            mock_table.query.assert_not_called()
+
+
+class TestSparseFieldsets:
+    """Tests for `fields=` on the essay read routes."""
+    
+    @pytest.fixture(autouse=True)
+    def authenticated(self):
+        from app.deps import get_optional_teacher_context
+        app.dependency_overrides[get_optional_teacher_context] = lambda: mock_teacher_context
+        yield
+    
+    def test_get_essay_status_only(self, client):
+        """A polling client reads and receives only the status."""
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [index_item()]}
+            mock_table.get_item.return_value = {'Item': {'status': 'processed'}}
+            
+            response = client.get('/essays/essay-123?fields=status')
+            
+            assert response.status_code == 200
+            assert response.json() == {'status': 'processed'}
+            projected = mock_table.get_item.call_args[1]['ExpressionAttributeNames'].values()
+            assert 'status' in projected
+            assert not {'essay_text', 'vocabulary_analysis'} & set(projected)
+    
+    def test_get_essay_analysis_reads_status(self, client):
+        """vocabulary_analysis is gated on status, so status is read but not returned."""
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [index_item()]}
+            mock_table.get_item.return_value = {'Item': {
+                'essay_id': 'essay-123',
+                'status': 'processed',
+                'vocabulary_analysis': {'vocabulary_used': ['essay']},
+            }}
+            
+            response = client.get('/essays/essay-123?fields=essay_id,vocabulary_analysis')
+            
+            assert response.json() == {
+                'essay_id': 'essay-123',
+                'vocabulary_analysis': {'vocabulary_used': ['essay']},
+            }
+            projected = mock_table.get_item.call_args[1]['ExpressionAttributeNames'].values()
+            assert {'essay_id', 'vocabulary_analysis', 'status'} <= set(projected)
+            assert 'essay_text' not in projected
+    
+    def test_unknown_field_is_rejected(self, client):
+        with patch('app.routes.essays.essays_table') as mock_table:
+            response = client.get('/essays/essay-123?fields=status,password')
+            
+            assert response.status_code == 400
+            assert 'password' in response.json()['detail']
+            mock_table.query.assert_not_called()
+    
+    def test_assignment_listing_fields(self, client):
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [
+                {'essay_id': 'essay-1', 'status': 'pending'},
+            ]}
+            
+            response = client.get('/essays/assignment/assignment-456?fields=essay_id,status')
+            
+            assert response.json() == [{'essay_id': 'essay-1', 'status': 'pending'}]
+            projected = mock_table.query.call_args[1]['ExpressionAttributeNames'].values()
+            assert {'essay_id', 'status'} <= set(projected)
+            assert 'vocabulary_analysis' not in projected
+    
+    def test_student_listing_metrics_field(self, client):
+        """metrics maps to the vocabulary_analysis attribute."""
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [
+                {'vocabulary_analysis': {'vocabulary_used': ['word']}},
+            ]}
+            
+            response = client.get('/essays/student/student-789?fields=metrics')
+            
+            assert response.json() == [{'metrics': {'vocabulary_used': ['word']}}]
+            projected = mock_table.query.call_args[1]['ExpressionAttributeNames'].values()
+            assert list(projected) == ['vocabulary_analysis']
+    
+    def test_student_listing_without_fields_is_unchanged(self, client):
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [
+                {'essay_id': 'essay-1', 'created_at': '2025-01-01T00:00:00'},
+            ]}
+            
+            response = client.get('/essays/student/student-789')
+            
+            assert response.json() == [{
+                'essay_id': 'essay-1',
+                'assignment_id': None,
+                'created_at': '2025-01-01T00:00:00',
+                'metrics': {},
+            }]
+            assert 'ProjectionExpression' not in mock_table.query.call_args[1]
+    
+    def test_revisions_fields_still_check_owner(self, client):
+        with patch('app.routes.essays.essays_table') as mock_table, \
+             patch('app.routes.essays.revisions_table') as mock_revisions:
+            mock_table.query.return_value = {'Items': [index_item()]}
+            mock_revisions.query.return_value = {'Items': [
+                {'revision': 1, 'superseded_at': '2025-01-02T00:00:00'},
+            ]}
+            
+            response = client.get('/essays/essay-123/revisions?fields=revision,superseded_at')
+            
+            assert response.json() == [{'revision': 1, 'superseded_at': '2025-01-02T00:00:00'}]
+            projected = mock_revisions.query.call_args[1]['ExpressionAttributeNames'].values()
+            assert set(projected) == {'revision', 'superseded_at'}
+            
+            mock_table.query.return_value = {'Items': [index_item('other-teacher')]}
+            response = client.get('/essays/essay-123/revisions?fields=revision')
+            
+            assert response.status_code == 404
+
+
+class TestConditionalGet:
+    """Tests for ETag / If-None-Match on the polled essay reads."""
+    
+    @pytest.fixture(autouse=True)
+    def authenticated(self):
+        from app.deps import get_optional_teacher_context
+        app.dependency_overrides[get_optional_teacher_context] = lambda: mock_teacher_context
+        yield
+    
+    def _item(self, **extra):
+        return index_item(**{
+            'essay_text': 'Essay.',
+            'status': 'processed',
+            'processed_at': '2025-01-01T00:00:00',
+            'vocabulary_analysis': {'vocabulary_used': ['essay']},
+            **extra,
+        })
+    
+    def test_get_essay_not_modified(self, client):
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [index_item()]}
+            mock_table.get_item.return_value = {'Item': self._item()}
+            
+            response = client.get('/essays/essay-123')
+            
+            assert response.status_code == 200
+            etag = response.headers['ETag']
+            assert etag.startswith('"')
+            assert response.headers['Cache-Control'] == 'private, max-age=60'
+            
+            response = client.get('/essays/essay-123', headers={'If-None-Match': etag})
+            
+            assert response.status_code == 304
+            assert response.content == b''
+            assert response.headers['ETag'] == etag
+    
+    def test_get_essay_new_version_changes_etag(self, client):
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [index_item()]}
+            mock_table.get_item.return_value = {'Item': self._item()}
+            etag = client.get('/essays/essay-123').headers['ETag']
+            
+            mock_table.get_item.return_value = {'Item': self._item(revision=2, status='pending')}
+            response = client.get('/essays/essay-123', headers={'If-None-Match': etag})
+            
+            assert response.status_code == 200
+            assert response.headers['ETag'] != etag
+            assert response.headers['Cache-Control'] == 'private, no-cache'
+    
+    def test_get_essay_etag_depends_on_fields(self, client):
+        """Different fieldsets are different representations."""
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [index_item()]}
+            mock_table.get_item.return_value = {'Item': self._item()}
+            etag = client.get('/essays/essay-123').headers['ETag']
+            
+            response = client.get('/essays/essay-123?fields=status', headers={'If-None-Match': etag})
+            
+            assert response.status_code == 200
+            assert response.json() == {'status': 'processed'}
+            # Version attributes are read for the ETag even when not returned
+            projected = mock_table.get_item.call_args[1]['ExpressionAttributeNames'].values()
+            assert {'status', 'processed_at', 'revision'} <= set(projected)
+    
+    def test_assignment_listing_not_modified(self, client):
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [self._item()]}
+            response = client.get('/essays/assignment/assignment-456')
+            etag = response.headers['ETag']
+            
+            response = client.get(
+                '/essays/assignment/assignment-456', headers={'If-None-Match': f'"other", W/{etag}'}
+            )
+            assert response.status_code == 304
+            
+            # A newly uploaded essay changes the listing
+            mock_table.query.return_value = {'Items': [
+                self._item(), dict(index_item(essay_id='essay-124'), status='pending'),
+            ]}
+            response = client.get('/essays/assignment/assignment-456', headers={'If-None-Match': etag})
+            assert response.status_code == 200
+            assert len(response.json()) == 2
+
+
+class TestProgressStream:
+    """Tests for GET /essays/assignment/{assignment_id}/events."""
+    
+    @pytest.fixture(autouse=True)
+    def fast_polling(self):
+        with patch('app.routes.essays.PROGRESS_POLL_SECONDS', 0), \
+             patch('app.routes.essays.progress_table', None):
+            yield
+    
+    def _events(self, response):
+        events = []
+        for block in response.text.split('\n\n'):
+            lines = dict(
+                line.split(': ', 1) for line in block.splitlines() if not line.startswith(':')
+            )
+            if 'event' in lines:
+                events.append((lines['event'], json.loads(lines['data'])))
+        return events
+    
+    def _page(self, **statuses):
+        return {'Items': [
+            {'essay_id': essay_id, 'status': status} for essay_id, status in statuses.items()
+        ]}
+    
+    def test_polling_fallback_streams_transitions(self, client):
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.side_effect = [
+                self._page(e1='pending', e2='pending'),  # snapshot
+                self._page(e1='pending', e2='pending'),
+                self._page(e1='processed', e2='pending'),
+            ]
+            
+            response = client.get('/essays/assignment/assignment-456/events')
+            
+            assert response.status_code == 200
+            assert response.headers['content-type'].startswith('text/event-stream')
+            assert response.text.startswith('retry: 1000')
+            assert self._events(response) == [
+                ('snapshot', {'total': 2, 'pending': 2, 'processed': 0, 'failed': 0}),
+                ('essay', {'essay_id': 'e1', 'status': 'processed', 'previous': 'pending'}),
+                ('progress', {'total': 2, 'pending': 1, 'processed': 1, 'failed': 0}),
+            ]
+            # The long poll ends at the first change
+            assert mock_table.query.call_count == 3
+    
+    def test_last_change_sends_done(self, client):
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.side_effect = [
+                self._page(e1='processed', e2='pending'),  # snapshot
+                self._page(e1='processed', e2='failed'),
+            ]
+            
+            response = client.get('/essays/assignment/assignment-456/events')
+            
+            assert [name for name, _ in self._events(response)] == [
+                'snapshot', 'essay', 'progress', 'done'
+            ]
+    
+    def test_completion_events_feed(self, client):
+        """With a progress table only new completion events are read after the snapshot."""
+        with patch('app.routes.essays.essays_table') as mock_table, \
+             patch('app.routes.essays.progress_table') as mock_progress:
+            mock_table.query.return_value = self._page(e1='pending')
+            mock_progress.query.return_value = {'Items': [{
+                'assignment_id': 'assignment-456',
+                'event_key': '2025-01-01T00:00:01#e1',
+                'essay_id': 'e1',
+                'teacher_id': 'test-teacher-123',
+                'status': 'processed',
+            }]}
+            
+            response = client.get('/essays/assignment/assignment-456/events')
+            
+            assert [name for name, _ in self._events(response)] == [
+                'snapshot', 'essay', 'progress', 'done'
+            ]
+            assert mock_table.query.call_count == 1
+    
+    def test_stream_ends_at_deadline(self, client):
+        with patch('app.routes.essays.essays_table') as mock_table, \
+             patch('app.routes.essays.PROGRESS_STREAM_SECONDS', 0):
+            mock_table.query.return_value = self._page(e1='pending')
+            
+            response = client.get('/essays/assignment/assignment-456/events')
+            
+            assert [name for name, _ in self._events(response)] == ['snapshot']
+
+
 class TestEssayOverride:
     """Tests for PATCH /essays/{essay_id}/override endpoint."""
     
@@ -56,27 +639,10 @@ class TestEssayOverride:
             {'word': 'rapidly', 'correct': True, 'comment': 'Good usage'},
         ]
         
-        with patch('app.routes.essays.metrics_table') as mock_table, \
-             patch('app.routes.essays.sqs') as mock_sqs, \
-             patch('app.routes.essays.ESSAY_UPDATE_QUEUE_URL', 'https://queue-url'):
-            
-            # Mock existing essay
-            mock_table.get_item.return_value = {
-                'Item': {
-                    'essay_id': essay_id,
-                    'teacher_id': 'test-teacher-123',
-                    'assignment_id': 'assignment-456',
-                    'student_id': 'student-789',
-                    'status': 'processed',
-                }
-            }
-            
-            # Mock update_item
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [index_item()]}
             mock_table.update_item.return_value = {}
             
-            # Mock SQS send_message
-            mock_sqs.send_message.return_value = {'MessageId': 'msg-123'}
-            
             response = client.patch(
                 f'/essays/{essay_id}/override',
                 json={'feedback': feedback_data}
@@ -87,28 +653,23 @@ class TestEssayOverride:
             assert data['essay_id'] == essay_id
             assert 'successful' in data['message'].lower()
             
-            # Verify update_item was called
+            # Verify update_item was called with the key from the index
             mock_table.update_item.assert_called_once()
             call_args = mock_table.update_item.call_args
-            assert call_args[1]['Key']['essay_id'] == essay_id
+            assert call_args[1]['Key'] == {'assignment_id': 'assignment-456', 'essay_id': essay_id}
             assert '#feedback' in call_args[1]['UpdateExpression']
+            assert call_args[1]['ExpressionAttributeValues'][':feedback'] == feedback_data
             
-            # Verify SQS message was sent
-            mock_sqs.send_message.assert_called_once()
-            sqs_call_args = mock_sqs.send_message.call_args
-            message_body = json.loads(sqs_call_args[1]['MessageBody'])
-            assert message_body['teacher_id'] == 'test-teacher-123'
-            assert message_body['assignment_id'] == 'assignment-456'
-            assert message_body['student_id'] == 'student-789'
-            assert message_body['essay_id'] == essay_id
-            assert message_body['override'] is True
+            # The index projection is enough; no full read or scan
+            mock_table.get_item.assert_not_called()
+            mock_table.scan.assert_not_called()
     
     def test_override_essay_not_found(self, client):
         """Test error when essay not found."""
         essay_id = 'essay-999'
         
-        with patch('app.routes.essays.metrics_table') as mock_table:
-            mock_table.get_item.return_value = {}
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': []}
             
             response = client.patch(
                 f'/essays/{essay_id}/override',
@@ -122,26 +683,21 @@ class TestEssayOverride:
         """Test error when teacher doesn't own the essay."""
         essay_id = 'essay-123'
         
-        with patch('app.routes.essays.metrics_table') as mock_table:
-            mock_table.get_item.return_value = {
-                'Item': {
-                    'essay_id': essay_id,
-                    'teacher_id': 'different-teacher-456',  # Different teacher
-                    'status': 'processed',
-                }
-            }
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [index_item('different-teacher-456')]}
             
             response = client.patch(
                 f'/essays/{essay_id}/override',
                 json={'feedback': [{'word': 'test', 'correct': True, 'comment': ''}]}
             )
             
-            assert response.status_code == 403
-            assert 'not authorized' in response.json()['detail'].lower()
+            assert response.status_code == 404
+            assert response.json()['detail'] == 'Essay not found'
+            mock_table.update_item.assert_not_called()
     
     def test_override_essay_table_not_configured(self, client):
         """Test error when table is not configured."""
-        with patch('app.routes.essays.metrics_table', None):
+        with patch('app.routes.essays.essays_table', None):
             response = client.patch(
                 '/essays/essay-123/override',
                 json={'feedback': [{'word': 'test', 'correct': True, 'comment': ''}]}
@@ -154,8 +710,8 @@ class TestEssayOverride:
         """Test error handling for DynamoDB failures."""
         essay_id = 'essay-123'
         
-        with patch('app.routes.essays.metrics_table') as mock_table:
-            mock_table.get_item.side_effect = Exception("DynamoDB error")
+        with patch('app.routes.essays.essays_table') as mock_table:
+            mock_table.query.side_effect = Exception("DynamoDB error")
             
             response = client.patch(
                 f'/essays/{essay_id}/override',
@@ -165,58 +721,636 @@ class TestEssayOverride:
             assert response.status_code == 500
             assert 'Failed to override' in response.json()['detail']
     
-    def test_override_essay_sqs_failure_doesnt_fail_request(self, client):
-        """Test that SQS failure doesn't fail the override request."""
+    def test_override_essay_does_not_enqueue(self, client):
+        """Overrides no longer go through a metrics update queue."""
         essay_id = 'essay-123'
         
-        with patch('app.routes.essays.metrics_table') as mock_table, \
-             patch('app.routes.essays.sqs') as mock_sqs, \
-             patch('app.routes.essays.ESSAY_UPDATE_QUEUE_URL', 'https://queue-url'):
-            
-            mock_table.get_item.return_value = {
-                'Item': {
-                    'essay_id': essay_id,
-                    'teacher_id': 'test-teacher-123',
-                    'assignment_id': 'assignment-456',
-                    'student_id': 'student-789',
-                    'status': 'processed',
-                }
-            }
+        with patch('app.routes.essays.essays_table') as mock_table, \
+             patch('app.routes.essays.sqs') as mock_sqs:
+            mock_table.query.return_value = {'Items': [index_item()]}
             mock_table.update_item.return_value = {}
             
-            # SQS fails
-            mock_sqs.send_message.side_effect = Exception("SQS error")
-            
             response = client.patch(
                 f'/essays/{essay_id}/override',
                 json={'feedback': [{'word': 'test', 'correct': True, 'comment': ''}]}
             )
             
-            # Request should still succeed
             assert response.status_code == 200
-            assert 'successful' in response.json()['message'].lower()
+            mock_sqs.send_message.assert_not_called()
+
+
+class TestEssayRevision:
+    """Tests for PUT /essays/{essay_id}/text and GET /essays/{essay_id}/revisions."""
     
-    def test_override_essay_no_queue_url(self, client):
-        """Test override works even when queue URL is not configured."""
-        essay_id = 'essay-123'
+    def _essay(self, **extra):
+        return {
+            'essay_id': 'essay-123',
+            'teacher_id': 'test-teacher-123',
+            'assignment_id': 'assignment-456',
+            'student_id': 'student-789',
+            'essay_text': 'First draft.',
+            'status': 'processed',
+            'created_at': '2025-01-01T00:00:00',
+            'vocabulary_analysis': {'vocabulary_used': ['draft']},
+            **extra,
+        }
+    
+    def _patches(self, mock_dynamodb, essay):
+        """Essays/revisions tables plus the client behind TransactWriteItems."""
+        mock_essays, mock_revisions = MagicMock(), MagicMock()
+        mock_essays.name, mock_revisions.name = 'essays', 'revisions'
+        mock_essays.query.return_value = {'Items': [index_item()]}
+        mock_essays.get_item.return_value = {'Item': essay}
+        return (
+            patch('app.routes.essays.essays_table', mock_essays),
+            patch('app.routes.essays.revisions_table', mock_revisions),
+            patch('app.routes.essays.dynamodb', mock_dynamodb),
+            patch('app.routes.essays.ESSAY_PROCESSING_QUEUE_URL', 'https://queue-url'),
+        )
+    
+    def _transaction(self, mock_dynamodb):
+        """(archived revision item, essay update) of the TransactWriteItems call, deserialized."""
+        from boto3.dynamodb.types import TypeDeserializer
+        deserializer = TypeDeserializer()
+        put, update = mock_dynamodb.meta.client.transact_write_items.call_args[1]['TransactItems']
+        archived = {k: deserializer.deserialize(v) for k, v in put['Put']['Item'].items()}
+        values = {
+            k: deserializer.deserialize(v)
+            for k, v in update['Update']['ExpressionAttributeValues'].items()
+        }
+        return put['Put'], archived, update['Update'], values
+    
+    def test_revise_essay_archives_previous_text_and_requeues(self, client):
+        """Revision archives the old version and bumps revision in one transaction, then re-queues."""
+        mock_dynamodb = MagicMock()
+        a, b, c, d = self._patches(mock_dynamodb, self._essay())
+        with a, b, c, d, patch('app.routes.essays.sqs') as mock_sqs:
+            response = client.put(
+                '/essays/essay-123/text',
+                json={'essay_text': 'Second draft.'}
+            )
+            
+            assert response.status_code == 200
+            assert response.json() == {'essay_id': 'essay-123', 'revision': 2, 'status': 'pending'}
+            
+            put, archived, update, values = self._transaction(mock_dynamodb)
+            assert put['TableName'] == 'revisions'
+            assert put['ConditionExpression'] == 'attribute_not_exists(essay_id)'
+            assert archived['revision'] == 1
+            assert archived['essay_text'] == 'First draft.'
+            assert archived['vocabulary_analysis'] == {'vocabulary_used': ['draft']}
+            
+            assert update['TableName'] == 'essays'
+            assert values[':text'] == 'Second draft.'
+            assert values[':revision'] == 2
+            assert values[':status'] == 'pending'
+            assert values[':current'] == 1
+            
+            message = json.loads(mock_sqs.send_message.call_args[1]['MessageBody'])
+            assert message['essay_id'] == 'essay-123'
+    
+    def test_revise_essay_removes_old_signatures(self, client):
+        """The old text's near-duplicate index entries are removed on revision."""
+        mock_dynamodb = MagicMock()
+        mock_dynamodb.batch_write_item.return_value = {}
+        a, b, c, d = self._patches(mock_dynamodb, self._essay(signature_keys=['test-teacher-123#0#aa']))
+        with a, b, c, d, patch('app.routes.essays.sqs'), \
+             patch('app.routes.essays.ESSAY_SIGNATURES_TABLE', 'signatures'):
+            response = client.put('/essays/essay-123/text', json={'essay_text': 'Second draft.'})
+            
+            assert response.status_code == 200
+            _, _, update, _ = self._transaction(mock_dynamodb)
+            assert 'REMOVE signature_keys' in update['UpdateExpression']
+            requests = mock_dynamodb.batch_write_item.call_args[1]['RequestItems']['signatures']
+            assert requests == [
+                {'DeleteRequest': {'Key': {'band_key': 'test-teacher-123#0#aa', 'essay_id': 'essay-123'}}},
+            ]
+    
+    def test_revise_essay_unchanged_text_is_noop(self, client):
+        """Submitting the current text does not create a revision."""
+        mock_dynamodb = MagicMock()
+        a, b, c, d = self._patches(mock_dynamodb, self._essay(revision=3))
+        with a, b, c, d, patch('app.routes.essays.sqs') as mock_sqs:
+            response = client.put('/essays/essay-123/text', json={'essay_text': 'First draft.'})
+            
+            assert response.status_code == 200
+            assert response.json()['revision'] == 3
+            mock_dynamodb.meta.client.transact_write_items.assert_not_called()
+            mock_sqs.send_message.assert_not_called()
+    
+    def test_revise_essay_concurrent_revision_conflict(self, client):
+        """A transaction cancelled by either condition returns 409 and queues nothing."""
+        from botocore.exceptions import ClientError
+        
+        mock_dynamodb = MagicMock()
+        mock_dynamodb.meta.client.transact_write_items.side_effect = ClientError(
+            {
+                'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'},
+                'CancellationReasons': [{'Code': 'ConditionalCheckFailed'}, {'Code': 'None'}],
+            },
+            'TransactWriteItems',
+        )
+        a, b, c, d = self._patches(mock_dynamodb, self._essay())
+        with a, b, c, d, patch('app.routes.essays.sqs') as mock_sqs:
+            response = client.put('/essays/essay-123/text', json={'essay_text': 'Second draft.'})
+            
+            assert response.status_code == 409
+            mock_sqs.send_message.assert_not_called()
+    
+    def test_revise_essay_failed_transaction_is_not_a_conflict(self, client):
+        """Other failures are 500s and, being one transaction, leave no archive row behind."""
+        from botocore.exceptions import ClientError
+        
+        mock_dynamodb = MagicMock()
+        mock_dynamodb.meta.client.transact_write_items.side_effect = ClientError(
+            {
+                'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'},
+                'CancellationReasons': [{'Code': 'None'}, {'Code': 'ThrottlingError'}],
+            },
+            'TransactWriteItems',
+        )
+        a, b, c, d = self._patches(mock_dynamodb, self._essay())
+        with a, b, c, d, patch('app.routes.essays.sqs') as mock_sqs:
+            response = client.put('/essays/essay-123/text', json={'essay_text': 'Second draft.'})
+            
+            assert response.status_code == 500
+            mock_sqs.send_message.assert_not_called()
+    
+    def test_revise_essay_not_found(self, client):
+        """Test revision of an essay the teacher does not own."""
+        with patch('app.routes.essays.essays_table') as mock_essays, \
+             patch('app.routes.essays.revisions_table'), \
+             patch('app.routes.essays.ESSAY_PROCESSING_QUEUE_URL', 'https://queue-url'):
+            mock_essays.query.return_value = {'Items': []}
+            
+            response = client.put('/essays/essay-123/text', json={'essay_text': 'Text.'})
+            
+            assert response.status_code == 404
+    
+    def test_revise_essay_empty_text(self, client):
+        """Blank revisions are rejected."""
+        with patch('app.routes.essays.essays_table'), \
+             patch('app.routes.essays.revisions_table'), \
+             patch('app.routes.essays.ESSAY_PROCESSING_QUEUE_URL', 'https://queue-url'):
+            response = client.put('/essays/essay-123/text', json={'essay_text': '   '})
+            
+            assert response.status_code == 400
+    
+    def test_list_revisions(self, client):
+        """Test listing previous versions."""
+        with patch('app.routes.essays.essays_table') as mock_table, \
+             patch('app.routes.essays.revisions_table') as mock_revisions:
+            mock_table.query.return_value = {'Items': [index_item()]}
+            mock_revisions.query.return_value = {'Items': [{
+                'essay_id': 'essay-123',
+                'revision': 1,
+                'teacher_id': 'test-teacher-123',
+                'essay_text': 'First draft.',
+                'created_at': '2025-01-01T00:00:00',
+                'superseded_at': '2025-01-02T00:00:00',
+            }]}
+            
+            response = client.get('/essays/essay-123/revisions')
+            
+            assert response.status_code == 200
+            data = response.json()
+            assert len(data) == 1
+            assert data[0]['revision'] == 1
+            assert data[0]['essay_text'] == 'First draft.'
+    
+    def test_list_revisions_other_teacher(self, client):
+        """Revisions of another teacher's essay are not found, even when there are none."""
+        with patch('app.routes.essays.essays_table') as mock_table, \
+             patch('app.routes.essays.revisions_table') as mock_revisions:
+            mock_table.query.return_value = {'Items': [index_item('other-teacher')]}
+            mock_revisions.query.return_value = {'Items': []}
+            
+            response = client.get('/essays/essay-123/revisions')
+            
+            assert response.status_code == 404
+            mock_revisions.query.assert_not_called()
+    
+    def test_list_revisions_unknown_essay(self, client):
+        """An unknown essay is 404 rather than an empty revision history."""
+        with patch('app.routes.essays.essays_table') as mock_table, \
+             patch('app.routes.essays.revisions_table') as mock_revisions:
+            mock_table.query.return_value = {'Items': []}
+            
+            response = client.get('/essays/essay-123/revisions')
+            
+            assert response.status_code == 404
+            mock_revisions.query.assert_not_called()
+    
+    def test_list_revisions_never_revised(self, client):
+        with patch('app.routes.essays.essays_table') as mock_table, \
+             patch('app.routes.essays.revisions_table') as mock_revisions:
+            mock_table.query.return_value = {'Items': [index_item()]}
+            mock_revisions.query.return_value = {'Items': []}
+            
+            response = client.get('/essays/essay-123/revisions')
+            
+            assert response.status_code == 200
+            assert response.json() == []
+
+
+class TestPublicEssayDirect:
+    """Tests for the direct (synchronous) mode of POST /essays/public."""
+    
+    def _post(self, client, direct=True):
+        return client.post('/essays/public', json={
+            'essay_text': 'A demo essay.',
+            'student_name': 'Jordan Smith',
+            'direct': direct,
+        })
+    
+    def _patches(self):
+        return (
+            patch('app.routes.essays.essays_table'),
+            patch('app.routes.essays.sqs'),
+            patch('app.routes.essays.lambda_client'),
+            patch('app.routes.essays.list_students', return_value=[{'student_id': 'student-1', 'name': 'Jordan Smith'}]),
+            patch('app.routes.essays.ESSAY_PROCESSING_QUEUE_URL', 'https://queue-url'),
+            patch('app.routes.essays.WORKER_FUNCTION_NAME', 'worker-fn'),
+        )
+    
+    def test_direct_returns_analysis_without_queueing(self, client):
+        """A worker result within the budget is returned inline."""
+        p_table, p_sqs, p_lambda, p_students, p_queue, p_fn = self._patches()
+        with p_table, p_sqs as mock_sqs, p_lambda as mock_lambda, p_students, p_queue, p_fn:
+            payload = Mock()
+            payload.read.return_value = json.dumps({
+                'essay_id': 'ignored',
+                'status': 'processed',
+                'vocabulary_analysis': {'vocabulary_used': ['vivid']},
+            }).encode()
+            mock_lambda.invoke.return_value = {'StatusCode': 200, 'Payload': payload}
+            
+            response = self._post(client)
+            
+            assert response.status_code == 200
+            data = response.json()
+            assert data['status'] == 'processed'
+            assert data['vocabulary_analysis'] == {'vocabulary_used': ['vivid']}
+            invoke = mock_lambda.invoke.call_args[1]
+            assert invoke['FunctionName'] == 'worker-fn'
+            assert json.loads(invoke['Payload'])['direct']['student_id'] == 'student-1'
+            mock_sqs.send_message.assert_not_called()
+    
+    def test_direct_timeout_falls_back_to_delayed_queue(self, client):
+        """An exceeded budget queues the essay with a delay and returns pending."""
+        from botocore.exceptions import ReadTimeoutError
         
-        with patch('app.routes.essays.metrics_table') as mock_table, \
-             patch('app.routes.essays.ESSAY_UPDATE_QUEUE_URL', None):
-            
-            mock_table.get_item.return_value = {
-                'Item': {
-                    'essay_id': essay_id,
-                    'teacher_id': 'test-teacher-123',
-                    'assignment_id': 'assignment-456',
-                    'student_id': 'student-789',
-                    'status': 'processed',
-                }
+        p_table, p_sqs, p_lambda, p_students, p_queue, p_fn = self._patches()
+        with p_table, p_sqs as mock_sqs, p_lambda as mock_lambda, p_students, p_queue, p_fn:
+            mock_lambda.invoke.side_effect = ReadTimeoutError(endpoint_url='https://lambda')
+            
+            response = self._post(client)
+            
+            assert response.status_code == 200
+            assert response.json()['status'] == 'pending'
+            send = mock_sqs.send_message.call_args[1]
+            assert send['DelaySeconds'] > 0
+            assert json.loads(send['MessageBody'])['student_id'] == 'student-1'
+    
+    def test_direct_worker_failure_falls_back_to_queue(self, client):
+        """A failed direct analysis is retried through the queue."""
+        p_table, p_sqs, p_lambda, p_students, p_queue, p_fn = self._patches()
+        with p_table, p_sqs as mock_sqs, p_lambda as mock_lambda, p_students, p_queue, p_fn:
+            payload = Mock()
+            payload.read.return_value = json.dumps({'status': 'failed', 'error_class': 'throttled'}).encode()
+            mock_lambda.invoke.return_value = {'StatusCode': 200, 'Payload': payload}
+            
+            response = self._post(client)
+            
+            assert response.json()['status'] == 'pending'
+            mock_sqs.send_message.assert_called_once()
+    
+    def test_default_mode_queues_without_invoking(self, client):
+        """Without direct the essay goes straight to the queue."""
+        p_table, p_sqs, p_lambda, p_students, p_queue, p_fn = self._patches()
+        with p_table, p_sqs as mock_sqs, p_lambda as mock_lambda, p_students, p_queue, p_fn:
+            response = self._post(client, direct=False)
+            
+            assert response.json()['status'] == 'pending'
+            mock_lambda.invoke.assert_not_called()
+            assert 'DelaySeconds' not in mock_sqs.send_message.call_args[1]
+
+
+class TestBatchUpload:
+    """Tests for POST /essays/batch bulk writes and multi-essay messages."""
+    
+    def _post(self, client, count):
+        return client.post('/essays/batch', json={
+            'assignment_id': 'assignment-456',
+            'student_id': 'student-789',
+            'essays': [{'filename': f'essay{i}.txt', 'text': f'Essay {i}'} for i in range(count)],
+        })
+    
+    def _patches(self, mock_dynamodb, mock_sqs, per_message=2):
+        mock_dynamodb.batch_write_item.return_value = {'UnprocessedItems': {}}
+        mock_sqs.send_message_batch.return_value = {'Successful': [], 'Failed': []}
+        return (
+            patch('app.routes.essays.essays_table', MagicMock(name='essays')),
+            patch('app.routes.essays.dynamodb', mock_dynamodb),
+            patch('app.routes.essays.sqs', mock_sqs),
+            patch('app.routes.essays.ESSAY_PROCESSING_QUEUE_URL', 'https://queue-url'),
+            patch('app.routes.essays.ESSAYS_PER_MESSAGE', per_message),
+        )
+    
+    def _sent_bodies(self, mock_sqs):
+        return [
+            json.loads(entry['MessageBody'])
+            for c in mock_sqs.send_message_batch.call_args_list
+            for entry in c[1]['Entries']
+        ]
+    
+    def test_batch_upload_chunks_essay_ids_into_messages(self, client):
+        """Essays are enqueued ESSAYS_PER_MESSAGE at a time via SendMessageBatch."""
+        mock_dynamodb, mock_sqs = MagicMock(), MagicMock()
+        a, b, c, d, e = self._patches(mock_dynamodb, mock_sqs)
+        with a, b, c, d, e:
+            response = self._post(client, 5)
+            
+            assert response.status_code == 200
+            essay_ids = [item['essay_id'] for item in response.json()]
+            assert len(essay_ids) == 5
+            assert all(item['status'] == 'pending' for item in response.json())
+            
+            # One BatchWriteItem for 5 items, one SendMessageBatch for 3 messages
+            assert mock_dynamodb.batch_write_item.call_count == 1
+            assert mock_sqs.send_message_batch.call_count == 1
+            
+            bodies = self._sent_bodies(mock_sqs)
+            assert [b['essay_ids'] for b in bodies] == [essay_ids[0:2], essay_ids[2:4], essay_ids[4:]]
+            assert all(b['assignment_id'] == 'assignment-456' and b['attempt'] == 1 for b in bodies)
+    
+    def test_batch_upload_writes_25_items_and_10_messages_per_call(self, client):
+        """A large upload is split into BatchWriteItem and SendMessageBatch chunks."""
+        mock_dynamodb, mock_sqs = MagicMock(), MagicMock()
+        a, b, c, d, e = self._patches(mock_dynamodb, mock_sqs, per_message=1)
+        with a, b, c, d, e:
+            response = self._post(client, 60)
+            
+            assert response.status_code == 200
+            writes = [
+                len(next(iter(c[1]['RequestItems'].values())))
+                for c in mock_dynamodb.batch_write_item.call_args_list
+            ]
+            assert sorted(writes) == [10, 25, 25]
+            sends = [len(c[1]['Entries']) for c in mock_sqs.send_message_batch.call_args_list]
+            assert sorted(sends) == [10] * 6
+            
+            item = next(iter(mock_dynamodb.batch_write_item.call_args_list[0][1]['RequestItems'].values()))[0]
+            assert item['PutRequest']['Item']['teacher_student'] == 'test-teacher-123#student-789'
+    
+    def test_batch_upload_reports_unwritten_essays(self, client):
+        """Items still unprocessed after retries are reported and not enqueued."""
+        mock_dynamodb, mock_sqs = MagicMock(), MagicMock()
+        a, b, c, d, e = self._patches(mock_dynamodb, mock_sqs)
+        
+        def write(RequestItems):
+            (table_name, requests), = RequestItems.items()
+            # The last essay is never processed
+            return {'UnprocessedItems': {table_name: requests[-1:]}}
+        
+        with a, b, c, d, e, patch('app.bulk.time.sleep'):
+            mock_dynamodb.batch_write_item.side_effect = write
+            response = self._post(client, 3)
+            
+            assert response.status_code == 200
+            data = response.json()
+            assert [item['status'] for item in data] == ['pending', 'pending', 'failed']
+            assert data[2]['error']
+            
+            enqueued = [i for body in self._sent_bodies(mock_sqs) for i in body['essay_ids']]
+            assert enqueued == [data[0]['essay_id'], data[1]['essay_id']]
+    
+    def test_batch_upload_unqueued_essays_are_failed_and_deleted(self, client):
+        """Essays whose message cannot be sent are reported and removed again."""
+        mock_dynamodb, mock_sqs = MagicMock(), MagicMock()
+        a, b, c, d, e = self._patches(mock_dynamodb, mock_sqs)
+        with a, b, c, d, e:
+            mock_sqs.send_message_batch.return_value = {'Failed': [
+                {'Id': '1', 'SenderFault': True, 'Code': 'InvalidMessageContents', 'Message': 'bad'},
+            ]}
+            response = self._post(client, 4)
+            
+            assert response.status_code == 200
+            data = response.json()
+            assert [item['status'] for item in data] == ['pending', 'pending', 'failed', 'failed']
+            assert 'enqueue' in data[2]['error']
+            
+            deletes = [
+                request['DeleteRequest']['Key']['essay_id']
+                for c in mock_dynamodb.batch_write_item.call_args_list
+                for request in next(iter(c[1]['RequestItems'].values()))
+                if 'DeleteRequest' in request
+            ]
+            assert deletes == [data[2]['essay_id'], data[3]['essay_id']]
+    
+    def test_batch_upload_all_failed_is_500(self, client):
+        """When no essay could be stored the request fails."""
+        mock_dynamodb, mock_sqs = MagicMock(), MagicMock()
+        a, b, c, d, e = self._patches(mock_dynamodb, mock_sqs)
+        with a, b, c, d, e:
+            mock_dynamodb.batch_write_item.side_effect = Exception("DynamoDB error")
+            response = self._post(client, 2)
+            
+            assert response.status_code == 500
+            assert 'DynamoDB error' in response.json()['detail']
+            mock_sqs.send_message_batch.assert_not_called()
+
+
+class TestStreamUpload:
+    """Tests for POST /essays/batch/stream (NDJSON)."""
+    
+    def _patches(self, mock_dynamodb, mock_sqs):
+        mock_dynamodb.batch_write_item.return_value = {'UnprocessedItems': {}}
+        mock_sqs.send_message_batch.return_value = {'Failed': []}
+        return (
+            patch('app.routes.essays.essays_table', MagicMock(name='essays')),
+            patch('app.routes.essays.dynamodb', mock_dynamodb),
+            patch('app.routes.essays.sqs', mock_sqs),
+            patch('app.routes.essays.ESSAY_PROCESSING_QUEUE_URL', 'https://queue-url'),
+        )
+    
+    def _post(self, client, body, content_type='application/x-ndjson'):
+        return client.post(
+            '/essays/batch/stream?assignment_id=assignment-456&student_id=student-789',
+            content=body,
+            headers={'Content-Type': content_type},
+        )
+    
+    def _lines(self, response):
+        return [json.loads(line) for line in response.text.splitlines()]
+    
+    def test_stream_writes_in_chunks_and_reports_per_line(self, client):
+        """Lines are flushed STREAM_FLUSH_SIZE at a time; invalid lines fail alone."""
+        mock_dynamodb, mock_sqs = MagicMock(), MagicMock()
+        a, b, c, d = self._patches(mock_dynamodb, mock_sqs)
+        body = '\n'.join(
+            ['{"filename": "e%d.txt", "text": "Essay %d"}' % (i, i) for i in range(5)]
+            + ['not json', '', '{"filename": "empty.txt", "text": "  "}', '{"text": "Last"}']
+        ) + '\n'
+        with a, b, c, d, patch('app.routes.essays.STREAM_FLUSH_SIZE', 2):
+            response = self._post(client, body)
+            
+            assert response.status_code == 200
+            assert response.headers['content-type'].startswith('application/x-ndjson')
+            results = self._lines(response)
+            summary = results.pop()
+            
+            assert summary == {'done': True, 'pending': 6, 'failed': 2}
+            assert [r['line'] for r in results] == [1, 2, 3, 4, 5, 6, 8, 9]
+            assert results[5] == {'line': 6, 'status': 'failed', 'error': 'Invalid JSON'}
+            assert results[6]['error'] == 'Essay text is required'
+            
+            # 6 essays in chunks of 2 -> 3 BatchWriteItem calls
+            assert mock_dynamodb.batch_write_item.call_count == 3
+            items = [
+                request['PutRequest']['Item']
+                for call in mock_dynamodb.batch_write_item.call_args_list
+                for request in next(iter(call[1]['RequestItems'].values()))
+            ]
+            assert {item['essay_id'] for item in items} == {
+                r['essay_id'] for r in results if r['status'] == 'pending'
             }
-            mock_table.update_item.return_value = {}
+            assert all(item['teacher_student'] == 'test-teacher-123#student-789' for item in items)
+    
+    def test_stream_reports_write_failures_per_line(self, client):
+        """A failed chunk fails only its own lines."""
+        mock_dynamodb, mock_sqs = MagicMock(), MagicMock()
+        a, b, c, d = self._patches(mock_dynamodb, mock_sqs)
+        
+        def write(RequestItems):
+            (table_name, requests), = RequestItems.items()
+            if requests[0]['PutRequest']['Item']['essay_text'] == 'Essay 0':
+                raise Exception("DynamoDB error")
+            return {}
+        
+        body = ''.join('{"text": "Essay %d"}\n' % i for i in range(4))
+        with a, b, c, d, patch('app.routes.essays.STREAM_FLUSH_SIZE', 2):
+            mock_dynamodb.batch_write_item.side_effect = write
+            response = self._post(client, body)
             
-            response = client.patch(
-                f'/essays/{essay_id}/override',
-                json={'feedback': [{'word': 'test', 'correct': True, 'comment': ''}]}
-            )
+            results = self._lines(response)
+            assert [r['status'] for r in results[:-1]] == ['failed', 'failed', 'pending', 'pending']
+            assert results[0]['error'] == 'DynamoDB error'
+    
+    def test_stream_rejects_oversized_lines(self, client):
+        """A line over the size limit fails without affecting the next line."""
+        mock_dynamodb, mock_sqs = MagicMock(), MagicMock()
+        a, b, c, d = self._patches(mock_dynamodb, mock_sqs)
+        body = '{"text": "%s"}\n{"text": "Short"}' % ('x' * 200)
+        with a, b, c, d, patch('app.routes.essays.MAX_NDJSON_LINE_BYTES', 64):
+            response = self._post(client, body)
+            
+            results = self._lines(response)
+            assert results[0]['status'] == 'failed'
+            assert 'exceeds' in results[0]['error']
+            assert results[1]['line'] == 2 and results[1]['status'] == 'pending'
+    
+    def test_line_splitter_across_chunk_boundaries(self):
+        """Lines split across chunks are joined; oversized ones are skipped to the next newline."""
+        import asyncio
+        from app.routes.essays import _ndjson_lines
+        
+        async def chunks():
+            for chunk in [b'{"a"', b': 1}\n', b'x' * 20, b'x' * 20, b'x\n{"b": 2}', b'\n']:
+                yield chunk
+        
+        async def collect():
+            return [line async for line in _ndjson_lines(chunks(), 30)]
+        
+        assert asyncio.run(collect()) == [b'{"a": 1}', None, b'{"b": 2}']
+    
+    def test_stream_requires_ndjson(self, client):
+        """Other content types are rejected."""
+        mock_dynamodb, mock_sqs = MagicMock(), MagicMock()
+        a, b, c, d = self._patches(mock_dynamodb, mock_sqs)
+        with a, b, c, d:
+            response = self._post(client, '{"essays": []}', content_type='application/json')
+            
+            assert response.status_code == 415
+            mock_dynamodb.batch_write_item.assert_not_called()
+
+
+class TestBulkStatus:
+    """Tests for POST /essays/status."""
+    
+    def _patches(self, mock_dynamodb):
+        essays_table = MagicMock()
+        essays_table.name = 'essays'
+        return (
+            patch('app.routes.essays.essays_table', essays_table),
+            patch('app.routes.essays.dynamodb', mock_dynamodb),
+        )
+    
+    def _keys(self, *essay_ids):
+        return [{'assignment_id': 'assignment-456', 'essay_id': essay_id} for essay_id in essay_ids]
+    
+    def test_returns_status_map(self, client):
+        """Statuses come back by essay_id from one projected BatchGetItem."""
+        mock_dynamodb = MagicMock()
+        mock_dynamodb.batch_get_item.return_value = {'Responses': {'essays': [
+            {'essay_id': 'e1', 'teacher_id': 'test-teacher-123', 'status': 'processed',
+             'created_at': '2024-01-01T00:00:00', 'processed_at': '2024-01-01T00:01:00'},
+            {'essay_id': 'e2', 'teacher_id': 'test-teacher-123', 'created_at': '2024-01-01T00:00:00'},
+        ]}}
+        a, b = self._patches(mock_dynamodb)
+        with a, b:
+            response = client.post('/essays/status', json={'essays': self._keys('e1', 'e2', 'e1')})
             
             assert response.status_code == 200
+            assert response.json() == {
+                'essays': {
+                    'e1': {'status': 'processed', 'created_at': '2024-01-01T00:00:00',
+                           'processed_at': '2024-01-01T00:01:00'},
+                    'e2': {'status': 'pending', 'created_at': '2024-01-01T00:00:00'},
+                },
+                'not_found': [],
+                'unresolved': [],
+            }
+            request = mock_dynamodb.batch_get_item.call_args[1]['RequestItems']['essays']
+            assert request['Keys'] == self._keys('e1', 'e2')
+            assert 'essay_text' not in request['ExpressionAttributeNames'].values()
+            assert 'status' in request['ExpressionAttributeNames'].values()
+    
+    def test_other_teachers_essays_are_not_found(self, client):
+        """Missing essays and essays of another teacher are reported the same way."""
+        mock_dynamodb = MagicMock()
+        mock_dynamodb.batch_get_item.return_value = {'Responses': {'essays': [
+            {'essay_id': 'e1', 'teacher_id': 'other-teacher', 'status': 'processed'},
+        ]}}
+        a, b = self._patches(mock_dynamodb)
+        with a, b:
+            response = client.post('/essays/status', json={'essays': self._keys('e1', 'e2')})
+            
+            assert response.status_code == 200
+            assert response.json() == {'essays': {}, 'not_found': ['e1', 'e2'], 'unresolved': []}
+    
+    def test_unread_keys_are_unresolved(self, client):
+        """Keys still unprocessed after retries are reported as unresolved, not missing."""
+        mock_dynamodb = MagicMock()
+        mock_dynamodb.batch_get_item.return_value = {
+            'Responses': {'essays': []},
+            'UnprocessedKeys': {'essays': {'Keys': self._keys('e2')}},
+        }
+        a, b = self._patches(mock_dynamodb)
+        with a, b, patch('app.bulk.time.sleep'):
+            response = client.post('/essays/status', json={'essays': self._keys('e1', 'e2')})
+            
+            assert response.status_code == 200
+            assert response.json() == {'essays': {}, 'not_found': ['e1'], 'unresolved': ['e2']}
+    
+    def test_rejects_too_many_keys(self, client):
+        """More than MAX_STATUS_LOOKUP keys is a validation error."""
+        from app.routes.essays import MAX_STATUS_LOOKUP
+        mock_dynamodb = MagicMock()
+        a, b = self._patches(mock_dynamodb)
+        with a, b:
+            keys = self._keys(*[f'e{n}' for n in range(MAX_STATUS_LOOKUP + 1)])
+            response = client.post('/essays/status', json={'essays': keys})
+            
+            assert response.status_code == 422
+            mock_dynamodb.batch_get_item.assert_not_called()
@@ -0,0 +1,31 @@
+"""
+Unit tests for ETag helpers.
+"""
+import os
+import sys
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from app.etag import _matches, essays_etag, make_etag
+
+
+class TestEtag:
+    def test_stable_and_strong(self):
+        etag = make_etag([{'revision': Decimal('2')}], 'status')
+        assert etag == make_etag([{'revision': Decimal('2')}], 'status')
+        assert etag.startswith('"') and not etag.startswith('W/')
+
+    def test_only_version_attributes_count(self):
+        item = {'essay_id': 'e-1', 'status': 'processed', 'processed_at': '2025-01-01'}
+        assert essays_etag([item]) == essays_etag([dict(item, essay_text='Ignored.')])
+        assert essays_etag([item]) != essays_etag([dict(item, revision=2)])
+        assert essays_etag([item]) != essays_etag([item], ['status'])
+
+    def test_if_none_match(self):
+        etag = '"abc"'
+        assert _matches('"abc"', etag)
+        assert _matches('"x", W/"abc"', etag)
+        assert _matches('*', etag)
+        assert not _matches('"abcd"', etag)
+        assert not _matches(None, etag)
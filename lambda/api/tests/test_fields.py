@@ -0,0 +1,39 @@
+"""
+Unit tests for sparse fieldset helpers.
+"""
+import os
+import sys
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from app.fields import attributes_for, parse_fields, select
+
+
+class TestParseFields:
+    def test_absent_or_blank(self):
+        assert parse_fields(None, ['status']) is None
+        assert parse_fields(' , ', ['status']) is None
+
+    def test_ordered_and_deduplicated(self):
+        assert parse_fields('status, essay_id,status', ['essay_id', 'status']) == ['status', 'essay_id']
+
+    def test_unknown_field(self):
+        with pytest.raises(HTTPException) as exc:
+            parse_fields('status,teacher_id', ['status'])
+        assert exc.value.status_code == 400
+        assert 'teacher_id' in exc.value.detail
+
+
+class TestSelect:
+    def test_trims_to_fields(self):
+        record = {'essay_id': 'e-1', 'status': 'pending', 'essay_text': 'Essay.'}
+        assert select(record, ['status']) == {'status': 'pending'}
+        assert select(record, None) is record
+
+    def test_attributes_for_renamed_fields(self):
+        assert attributes_for(['metrics', 'essay_id'], {'metrics': 'vocabulary_analysis'}) == [
+            'vocabulary_analysis', 'essay_id'
+        ]
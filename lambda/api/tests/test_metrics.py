@@ -106,43 +106,120 @@ class TestClassMetrics:
             assert 'Failed to retrieve' in response.json()['detail']
 
 
+class TestClassMetricsConditionalGet:
+    """Tests for ETag / If-None-Match on GET /metrics/class/{assignment_id}."""
+    
+    def _essay(self, n, processed_at='2025-01-01T00:00:00'):
+        return {
+            'assignment_id': 'assignment-456',
+            'essay_id': f'essay-{n}',
+            'teacher_id': 'test-teacher-123',
+            'status': 'processed',
+            'processed_at': processed_at,
+            'essay_text': 'The quick brown fox jumps over the lazy dog.',
+        }
+    
+    def test_not_modified_skips_computation(self, client):
+        with patch('app.routes.metrics.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [self._essay(1), self._essay(2)]}
+            response = client.get('/metrics/class/assignment-456')
+            assert response.status_code == 200
+            etag = response.headers['ETag']
+            
+            with patch('app.routes.metrics.compute_essay_metrics') as mock_compute:
+                response = client.get('/metrics/class/assignment-456', headers={'If-None-Match': etag})
+                
+                assert response.status_code == 304
+                mock_compute.assert_not_called()
+    
+    def test_newly_processed_essay_changes_etag(self, client):
+        with patch('app.routes.metrics.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [self._essay(1)]}
+            etag = client.get('/metrics/class/assignment-456').headers['ETag']
+            
+            mock_table.query.return_value = {'Items': [self._essay(1), self._essay(2)]}
+            response = client.get('/metrics/class/assignment-456', headers={'If-None-Match': etag})
+            
+            assert response.status_code == 200
+            assert response.json()['stats']['essay_count'] == 2
+
+
 class TestStudentMetrics:
     """Tests for GET /metrics/student/{student_id} endpoint."""
     
+    def _essay(self, created_at, processed_at, text='The cat sat on the mat today.'):
+        return {
+            'essay_id': f'essay-{created_at}',
+            'assignment_id': 'assignment-456',
+            'teacher_id': 'test-teacher-123',
+            'student_id': 'student-789',
+            'essay_text': text,
+            'status': 'processed',
+            'created_at': created_at,
+            'processed_at': processed_at,
+            'vocabulary_analysis': {'vocabulary_used': ['mat'], 'correctness_review': 'Good.'},
+        }
+    
     def test_get_student_metrics_success(self, client):
-        """Test successful retrieval of student metrics."""
-        with patch('app.routes.metrics.student_metrics_table') as mock_table:
-            mock_table.get_item.return_value = {
-                'Item': {
-                    'teacher_id': 'test-teacher-123',
-                    'student_id': 'student-789',
-                    'stats': {
-                        'avg_ttr': 0.82,
-                        'avg_word_count': 450.0,
-                        'avg_unique_words': 380.0,
-                        'avg_freq_rank': 1800.0,
-                        'total_essays': 5,
-                        'trend': 'improving',
-                        'last_essay_date': '2025-11-11T10:00:00Z',
-                    },
-                    'updated_at': '2025-11-11T12:00:00Z',
-                }
-            }
+        """Metrics are computed from the teacher_student index query."""
+        with patch('app.routes.metrics.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': [
+                self._essay('2025-11-01T10:00:00', '2025-11-01T10:01:00'),
+                self._essay('2025-11-11T10:00:00', '2025-11-11T10:01:00'),
+            ]}
             
             response = client.get('/metrics/student/student-789')
             
             assert response.status_code == 200
             data = response.json()
             assert data['student_id'] == 'student-789'
-            assert data['stats']['avg_ttr'] == 0.82
-            assert data['stats']['total_essays'] == 5
-            assert data['stats']['trend'] == 'improving'
-            assert data['updated_at'] == '2025-11-11T12:00:00Z'
+            assert data['stats']['total_essays'] == 2
+            assert data['stats']['avg_word_count'] == 7.0
+            assert data['stats']['last_essay_date'] == '2025-11-11T10:00:00'
+            assert data['updated_at'] == '2025-11-11T10:01:00'
+            
+            query = mock_table.query.call_args[1]
+            assert query['IndexName'] == 'teacher_student-index'
+            assert query['ScanIndexForward'] is True
+            mock_table.scan.assert_not_called()
+    
+    def test_get_student_metrics_reads_every_page(self, client):
+        """Metrics cover the whole index partition, not just the first page."""
+        with patch('app.routes.metrics.essays_table') as mock_table:
+            mock_table.query.side_effect = [
+                {
+                    'Items': [self._essay('2025-11-01T10:00:00', '2025-11-01T10:01:00')],
+                    'LastEvaluatedKey': {'essay_id': 'essay-1'},
+                },
+                {'Items': [self._essay('2025-11-11T10:00:00', '2025-11-11T10:01:00')]},
+            ]
+            
+            response = client.get('/metrics/student/student-789')
+            
+            assert response.status_code == 200
+            assert response.json()['stats']['total_essays'] == 2
+            assert mock_table.query.call_args[1]['ExclusiveStartKey'] == {'essay_id': 'essay-1'}
+    
+    def test_get_student_metrics_scans_before_index_exists(self, client):
+        """Between the two GSI deploys the student's essays are scanned."""
+        with patch('app.routes.metrics.essays_table') as mock_table, \
+             patch('app.routes.essays.TEACHER_STUDENT_INDEX_ENABLED', False):
+            mock_table.scan.return_value = {'Items': [
+                self._essay('2025-11-11T10:00:00', '2025-11-11T10:01:00'),
+                self._essay('2025-11-01T10:00:00', '2025-11-01T10:01:00'),
+            ]}
+            
+            response = client.get('/metrics/student/student-789')
+            
+            assert response.status_code == 200
+            assert response.json()['stats']['total_essays'] == 2
+            assert response.json()['stats']['last_essay_date'] == '2025-11-11T10:00:00'
+            mock_table.query.assert_not_called()
     
     def test_get_student_metrics_not_found(self, client):
-        """Test student metrics not found returns empty metrics."""
-        with patch('app.routes.metrics.student_metrics_table') as mock_table:
-            mock_table.get_item.return_value = {}
+        """Test student without essays returns empty metrics."""
+        with patch('app.routes.metrics.essays_table') as mock_table:
+            mock_table.query.return_value = {'Items': []}
             
             response = client.get('/metrics/student/student-789')
             
@@ -151,11 +228,11 @@ class TestStudentMetrics:
             assert data['student_id'] == 'student-789'
             assert data['stats']['avg_ttr'] == 0.0
             assert data['stats']['total_essays'] == 0
-            assert data['stats']['trend'] == 'stable'
+            assert data['stats']['last_essay_date'] is None
     
     def test_get_student_metrics_table_not_configured(self, client):
         """Test error when table is not configured."""
-        with patch('app.routes.metrics.student_metrics_table', None):
+        with patch('app.routes.metrics.essays_table', None):
             response = client.get('/metrics/student/student-789')
             
             assert response.status_code == 500
@@ -163,11 +240,153 @@ class TestStudentMetrics:
     
     def test_get_student_metrics_dynamodb_error(self, client):
         """Test error handling for DynamoDB failures."""
-        with patch('app.routes.metrics.student_metrics_table') as mock_table:
-            mock_table.get_item.side_effect = Exception("DynamoDB error")
+        with patch('app.routes.metrics.essays_table') as mock_table:
+            mock_table.query.side_effect = Exception("DynamoDB error")
             
             response = client.get('/metrics/student/student-789')
             
             assert response.status_code == 500
             assert 'Failed to retrieve' in response.json()['detail']
 
+
+class TestUsageLedger:
+    """Tests for GET /metrics/usage endpoints."""
+    
+    def test_get_teacher_usage_success(self, client):
+        """Test daily ledger rows and totals for the teacher."""
+        with patch('app.routes.metrics.usage_table') as mock_table:
+            mock_table.query.return_value = {
+                'Items': [
+                    {
+                        'scope_id': 'teacher#test-teacher-123',
+                        'usage_date': '2025-11-12',
+                        'prompt_tokens': 2000,
+                        'cached_tokens': 500,
+                        'completion_tokens': 400,
+                        'cost_usd': '0.00129',
+                        'essay_count': 2,
+                    },
+                    {
+                        'scope_id': 'teacher#test-teacher-123',
+                        'usage_date': '2025-11-11',
+                        'prompt_tokens': 1000,
+                        'cached_tokens': 0,
+                        'completion_tokens': 200,
+                        'cost_usd': '0.00072',
+                        'essay_count': 1,
+                    },
+                ]
+            }
+            
+            response = client.get('/metrics/usage?start_date=2025-11-01&end_date=2025-11-30')
+            
+            assert response.status_code == 200
+            data = response.json()
+            assert data['scope'] == 'teacher'
+            assert [d['usage_date'] for d in data['days']] == ['2025-11-11', '2025-11-12']
+            assert data['totals']['prompt_tokens'] == 3000
+            assert data['totals']['essay_count'] == 3
+            assert abs(data['totals']['cost_usd'] - 0.00201) < 1e-9
+    
+    def test_get_teacher_usage_invalid_date(self, client):
+        """Test malformed dates are rejected."""
+        with patch('app.routes.metrics.usage_table'):
+            response = client.get('/metrics/usage?start_date=11/01/2025')
+            
+            assert response.status_code == 400
+    
+    def test_get_assignment_usage_filters_other_teachers(self, client):
+        """Test assignment ledger days owned by another teacher are excluded."""
+        with patch('app.routes.metrics.usage_table') as mock_table:
+            mock_table.query.return_value = {
+                'Items': [
+                    {
+                        'scope_id': 'assignment#assignment-456',
+                        'usage_date': '2025-11-11',
+                        'teacher_id': 'different-teacher-456',
+                        'prompt_tokens': 1000,
+                        'completion_tokens': 200,
+                        'cost_usd': '0.00072',
+                        'essay_count': 1,
+                    },
+                ]
+            }
+            
+            response = client.get('/metrics/usage/assignment/assignment-456')
+            
+            assert response.status_code == 200
+            data = response.json()
+            assert data['days'] == []
+            assert data['totals']['essay_count'] == 0
+    
+    def test_get_usage_table_not_configured(self, client):
+        """Test error when ledger table is not configured."""
+        with patch('app.routes.metrics.usage_table', None):
+            response = client.get('/metrics/usage')
+            
+            assert response.status_code == 500
+            assert 'not configured' in response.json()['detail'].lower()
+
+
+class TestClassReport:
+    """Tests for GET /metrics/class/{assignment_id}/report endpoint."""
+    
+    REPORT_ITEM = {
+        'assignment_id': 'assignment-456',
+        'teacher_id': 'test-teacher-123',
+        'report': {
+            'class_summary': 'The class uses descriptive vocabulary well.',
+            'common_strengths': ['descriptive adjectives'],
+            'struggling_words': [{'word': 'affect', 'issue': 'confused with effect', 'student_count': 2}],
+            'recommended_focus_vocabulary': ['consequently'],
+        },
+        'word_frequencies': {'vocabulary_used': [{'word': 'vivid', 'essay_count': 3}]},
+        'essay_count': 3,
+        'essays_analyzed': 3,
+        'fingerprint': '3#2025-11-12T10:00:00',
+        'generated_at': '2025-11-12T10:00:05',
+        'model': 'gpt-4.1-mini',
+    }
+    
+    def test_get_class_report_success(self, client):
+        """Test the stored report is returned."""
+        with patch('app.routes.metrics.class_reports_table') as mock_table:
+            mock_table.get_item.return_value = {'Item': self.REPORT_ITEM}
+            
+            response = client.get('/metrics/class/assignment-456/report')
+            
+            assert response.status_code == 200
+            data = response.json()
+            assert data['essay_count'] == 3
+            assert data['essays_analyzed'] == 3
+            assert data['report']['struggling_words'][0]['word'] == 'affect'
+            assert data['word_frequencies']['vocabulary_used'][0]['essay_count'] == 3
+    
+    def test_get_class_report_not_generated(self, client):
+        """Test 404 while only the generation claim exists."""
+        with patch('app.routes.metrics.class_reports_table') as mock_table:
+            mock_table.get_item.return_value = {
+                'Item': {'assignment_id': 'assignment-456', 'teacher_id': 'test-teacher-123', 'fingerprint': '3#x'}
+            }
+            
+            response = client.get('/metrics/class/assignment-456/report')
+            
+            assert response.status_code == 404
+    
+    def test_get_class_report_other_teacher(self, client):
+        """Test reports of another teacher's assignment are not returned."""
+        with patch('app.routes.metrics.class_reports_table') as mock_table:
+            mock_table.get_item.return_value = {
+                'Item': {**self.REPORT_ITEM, 'teacher_id': 'different-teacher-456'}
+            }
+            
+            response = client.get('/metrics/class/assignment-456/report')
+            
+            assert response.status_code == 404
+    
+    def test_get_class_report_table_not_configured(self, client):
+        """Test error when class reports table is not configured."""
+        with patch('app.routes.metrics.class_reports_table', None):
+            response = client.get('/metrics/class/assignment-456/report')
+            
+            assert response.status_code == 500
@@ -0,0 +1,72 @@
+"""
+Unit tests for cursor pagination helpers.
+"""
+import os
+import sys
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from app.pagination import decode_cursor, encode_cursor, projection, query_page
+
+
+class TestCursor:
+    def test_round_trip(self):
+        key = {'assignment_id': 'a-1', 'essay_id': 'e-1', 'revision': Decimal('2')}
+        assert decode_cursor(encode_cursor(key)) == key
+
+    @pytest.mark.parametrize('cursor', ['not-base64!', 'W10', 'bnVsbA'])
+    def test_malformed_cursor(self, cursor):
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor(cursor)
+        assert exc.value.status_code == 400
+
+
+class TestQueryPage:
+    def test_fills_limit_across_filtered_pages(self):
+        """Short (filtered) pages are followed until the limit is reached."""
+        table = MagicMock()
+        table.query.side_effect = [
+            {'Items': [{'n': 1}], 'LastEvaluatedKey': {'pk': 'p', 'n': 2}},
+            {'Items': [{'n': 3}, {'n': 4}], 'LastEvaluatedKey': {'pk': 'p', 'n': 4}},
+        ]
+
+        items, cursor = query_page(table, 'pk', 'p', limit=3)
+
+        assert items == [{'n': 1}, {'n': 3}, {'n': 4}]
+        assert [c[1]['Limit'] for c in table.query.call_args_list] == [3, 2]
+        assert decode_cursor(cursor) == {'pk': 'p', 'n': 4}
+
+    def test_without_limit_reads_whole_partition(self):
+        table = MagicMock()
+        table.query.side_effect = [
+            {'Items': [{'n': 1}], 'LastEvaluatedKey': {'pk': 'p', 'n': 1}},
+            {'Items': [{'n': 2}]},
+        ]
+
+        items, cursor = query_page(table, 'pk', 'p')
+
+        assert items == [{'n': 1}, {'n': 2}]
+        assert cursor is None
+        assert 'Limit' not in table.query.call_args[1]
+
+    def test_cursor_for_other_partition_is_rejected(self):
+        table = MagicMock()
+        with pytest.raises(HTTPException) as exc:
+            query_page(table, 'pk', 'p', cursor=encode_cursor({'pk': 'q'}))
+        assert exc.value.status_code == 400
+        table.query.assert_not_called()
+
+
+class TestProjection:
+    def test_placeholders_for_every_attribute(self):
+        kwargs = projection(['essay_id', 'status', 'essay_id'])
+
+        assert kwargs == {
+            'ProjectionExpression': '#p0, #p1',
+            'ExpressionAttributeNames': {'#p0': 'essay_id', '#p1': 'status'},
+        }
@@ -0,0 +1,66 @@
+"""
+Unit tests for assignment progress feeds.
+"""
+import os
+import sys
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from boto3.dynamodb.conditions import Key
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from app.progress import EventTableFeed, ProgressTracker, sse_event
+
+
+class TestProgressTracker:
+    def test_transitions_and_counts(self):
+        tracker = ProgressTracker({'e1': 'pending', 'e2': 'pending'})
+
+        transitions = tracker.apply([('e1', 'processed'), ('e2', 'pending'), ('e3', 'pending')])
+
+        assert transitions == [
+            {'essay_id': 'e1', 'status': 'processed', 'previous': 'pending'},
+            {'essay_id': 'e3', 'status': 'pending', 'previous': None},
+        ]
+        assert tracker.counts() == {'total': 3, 'pending': 2, 'processed': 1, 'failed': 0}
+        assert not tracker.done()
+
+        tracker.apply([('e2', 'failed'), ('e3', 'processed')])
+        assert tracker.done()
+
+    def test_empty_assignment_is_not_done(self):
+        assert not ProgressTracker({}).done()
+
+
+class TestEventTableFeed:
+    def _event(self, key, essay_id, status, teacher_id='teacher-1'):
+        return {'event_key': key, 'essay_id': essay_id, 'status': status, 'teacher_id': teacher_id}
+
+    def test_reads_only_new_events(self):
+        table = MagicMock()
+        table.query.side_effect = [
+            {
+                'Items': [self._event('t1#e1', 'e1', 'skipped')],
+                'LastEvaluatedKey': {'event_key': 't1#e1'},
+            },
+            {'Items': [
+                self._event('t2#e2', 'e2', 'failed'),
+                self._event('t3#e9', 'e9', 'processed', teacher_id='teacher-2'),
+            ]},
+            {'Items': []},
+        ]
+        feed = EventTableFeed(table, 'assignment-1', 'teacher-1', since=datetime(2025, 1, 1))
+
+        assert feed.poll() == [('e1', 'processed'), ('e2', 'failed')]
+        assert feed.poll() == []
+        # The next poll starts after the last event seen
+        assert table.query.call_args[1]['KeyConditionExpression'] == (
+            Key('assignment_id').eq('assignment-1') & Key('event_key').gt('t3#e9')
+        )
+
+
+def test_sse_event_format():
+    assert sse_event('done', {'total': 1}, retry_ms=500) == (
+        'retry: 500\nevent: done\ndata: {"total": 1}\n\n'
+    )
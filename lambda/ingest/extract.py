@@ -0,0 +1,165 @@
+"""
+Essay text extraction from uploaded .txt, .docx and .zip files.
+
+Objects are read from the S3 body stream in chunks. Archives (and .docx,
+which is a zip) are spooled to a temporary file, in memory up to
+SPOOL_MEMORY_BYTES and on /tmp beyond, because zipfile needs to seek; archive
+members are then read one at a time, so memory holds one essay, never the
+archive. Sizes are enforced on the bytes actually read, not the sizes
+claimed by the zip headers.
+"""
+
+import os
+import zipfile
+import tempfile
+import xml.etree.ElementTree as ET
+from typing import IO, Iterator, Optional, Tuple
+
+ESSAY_EXTENSIONS = (".txt", ".docx")
+ARCHIVE_EXTENSIONS = (".zip",)
+
+# Essays are stored in one DynamoDB item (400KB limit)
+MAX_ESSAY_BYTES = 350 * 1024
+# Upper bounds on a .docx (images included) and its document.xml
+MAX_DOCX_BYTES = 20 * 1024 * 1024
+MAX_DOCX_XML_BYTES = 10 * 1024 * 1024
+# Archives are spooled to /tmp; keep within the function's ephemeral storage
+MAX_ARCHIVE_BYTES = 400 * 1024 * 1024
+MAX_ARCHIVE_MEMBERS = 1000
+SPOOL_MEMORY_BYTES = 8 * 1024 * 1024
+READ_CHUNK_BYTES = 64 * 1024
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+class ExtractionError(ValueError):
+    """A file (or archive member) could not be turned into essay text."""
+
+
+def _read_capped(stream: IO[bytes], limit: int) -> bytes:
+    data = bytearray()
+    while True:
+        chunk = stream.read(READ_CHUNK_BYTES)
+        if not chunk:
+            return bytes(data)
+        data.extend(chunk)
+        if len(data) > limit:
+            raise ExtractionError(f"File exceeds {limit} bytes")
+
+
+def decode_text(data: bytes) -> str:
+    return data.decode("utf-8-sig", errors="replace")
+
+
+def docx_text(fileobj: IO[bytes]) -> str:
+    """Paragraph text of a .docx document, one paragraph per line."""
+    try:
+        with zipfile.ZipFile(fileobj) as docx:
+            with docx.open("word/document.xml") as xml_stream:
+                xml = _read_capped(xml_stream, MAX_DOCX_XML_BYTES)
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise ExtractionError(f"Not a valid .docx file: {e}")
+
+    paragraphs = []
+    try:
+        root = ET.fromstring(xml)
+    except ET.ParseError as e:
+        raise ExtractionError(f"Not a valid .docx file: {e}")
+    for paragraph in root.iter(f"{_W_NS}p"):
+        parts = []
+        for node in paragraph.iter():
+            if node.tag == f"{_W_NS}t" and node.text:
+                parts.append(node.text)
+            elif node.tag == f"{_W_NS}tab":
+                parts.append("\t")
+            elif node.tag in (f"{_W_NS}br", f"{_W_NS}cr"):
+                parts.append("\n")
+        paragraphs.append("".join(parts))
+    return "\n".join(paragraphs).strip()
+
+
+def _spool(stream: IO[bytes], limit: int) -> IO[bytes]:
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    size = 0
+    while True:
+        chunk = stream.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > limit:
+            spooled.close()
+            raise ExtractionError(f"File exceeds {limit} bytes")
+        spooled.write(chunk)
+    spooled.seek(0)
+    return spooled
+
+
+def _extension(name: str) -> str:
+    return os.path.splitext(name.lower())[1]
+
+
+def is_supported(name: str) -> bool:
+    return _extension(name) in ESSAY_EXTENSIONS + ARCHIVE_EXTENSIONS
+
+
+def _essay_text(name: str, stream: IO[bytes]) -> str:
+    if _extension(name) == ".txt":
+        text = decode_text(_read_capped(stream, MAX_ESSAY_BYTES)).strip()
+    else:
+        with _spool(stream, MAX_DOCX_BYTES) as spooled:
+            text = docx_text(spooled)
+        if len(text.encode("utf-8")) > MAX_ESSAY_BYTES:
+            raise ExtractionError(f"Essay text exceeds {MAX_ESSAY_BYTES} bytes")
+    if not text:
+        raise ExtractionError("File contains no text")
+    return text
+
+
+def _is_essay_member(info: zipfile.ZipInfo) -> bool:
+    base = os.path.basename(info.filename)
+    return (
+        not info.is_dir()
+        and not info.filename.startswith("__MACOSX/")
+        and not base.startswith(".")
+        and _extension(base) in ESSAY_EXTENSIONS
+    )
+
+
+def iter_essays(
+    name: str, stream: IO[bytes]
+) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Essays in an uploaded file.
+
+    Yields (member name, text, error): the member name is "" for a single
+    .txt/.docx file and the path inside the archive for zip members. Exactly
+    one of text and error is set; a bad member does not stop the archive.
+
+    Raises:
+        ExtractionError: If the file itself is unsupported or unreadable
+    """
+    extension = _extension(name)
+    if extension in ESSAY_EXTENSIONS:
+        yield "", _essay_text(name, stream), None
+        return
+    if extension not in ARCHIVE_EXTENSIONS:
+        raise ExtractionError(f"Unsupported file type: {extension or name}")
+
+    with _spool(stream, MAX_ARCHIVE_BYTES) as spooled:
+        try:
+            archive = zipfile.ZipFile(spooled)
+        except zipfile.BadZipFile as e:
+            raise ExtractionError(f"Not a valid .zip file: {e}")
+        with archive:
+            members = [info for info in archive.infolist() if _is_essay_member(info)]
+            if len(members) > MAX_ARCHIVE_MEMBERS:
+                raise ExtractionError(f"Archive has more than {MAX_ARCHIVE_MEMBERS} essays")
+            for info in members:
+                try:
+                    with archive.open(info) as member:
+                        text = _essay_text(info.filename, member)
+                except (ExtractionError, zipfile.BadZipFile, RuntimeError) as e:
+                    # RuntimeError: encrypted member
+                    yield info.filename, None, str(e)
+                    continue
+                yield info.filename, text, None
@@ -0,0 +1,316 @@
+"""
+Ingest Lambda for essay files uploaded through presigned URLs.
+
+Triggered by S3 ObjectCreated events on keys of the form
+{teacher_id}/assignments/{assignment_id}/{file_name}. Each .txt/.docx file
+becomes one essay and each .zip one essay per .txt/.docx member (see
+extract.py). Essays are created "pending" with BatchWriteItem and queued for
+the worker with SendMessageBatch, in chunks as the file is read.
+
+Essay IDs are uuid5 of the object's bucket, key, version (or ETag when the
+bucket is unversioned) and archive member, so a redelivered or retried event
+maps to the same essays. Existing essays are found with BatchGetItem and
+not rewritten; ones still pending are queued again (the worker skips
+essays that are already processed). Any essay that could not be created
+fails the invocation so that S3's async retry picks it up.
+"""
+
+import os
+import json
+import time
+import uuid
+import boto3
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote_plus
+
+from botocore.exceptions import ClientError
+
+from extract import ExtractionError, is_supported, iter_essays
+
+# Configure structured logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Initialize AWS clients
+dynamodb = boto3.resource("dynamodb")
+s3 = boto3.client("s3")
+sqs = boto3.client("sqs")
+
+# Environment variables
+ESSAYS_TABLE = os.environ.get("ESSAYS_TABLE")
+ESSAY_PROCESSING_QUEUE_URL = os.environ.get("ESSAY_PROCESSING_QUEUE_URL")
+# Essays per SQS message (matches the API's batch upload messages)
+ESSAYS_PER_MESSAGE = max(1, int(os.environ.get("ESSAYS_PER_MESSAGE", "10")))
+# Essays held before a bulk write
+FLUSH_SIZE = 100
+
+BATCH_GET_SIZE = 100  # BatchGetItem limit
+BATCH_WRITE_SIZE = 25  # BatchWriteItem limit
+MESSAGE_BATCH_SIZE = 10  # SendMessageBatch limit
+MAX_ATTEMPTS = 4
+BACKOFF_SECONDS = 0.05
+
+# Namespace for deterministic essay IDs of ingested files
+ESSAY_ID_NAMESPACE = uuid.UUID("6f1d2a4e-3c1b-5b8e-9a57-2f0d7c4e8b31")
+
+essays_table = dynamodb.Table(ESSAYS_TABLE) if ESSAYS_TABLE else None
+
+
+class IngestError(Exception):
+    """Some essays of an uploaded object could not be created."""
+
+
+def parse_key(key: str) -> Optional[Tuple[str, str, str]]:
+    """(teacher_id, assignment_id, file_name) of an upload key, or None."""
+    parts = key.split("/", 3)
+    if len(parts) != 4 or parts[1] != "assignments" or not all(parts) or parts[3].endswith("/"):
+        return None
+    return parts[0], parts[2], parts[3]
+
+
+def object_version(record: Dict[str, Any]) -> Tuple[Optional[str], str]:
+    """(versionId or None, ETag) of the object in an S3 event record."""
+    s3_object = record["s3"]["object"]
+    return s3_object.get("versionId") or None, s3_object.get("eTag", "")
+
+
+def essay_id_for(bucket: str, key: str, version: str, member: str) -> str:
+    return str(uuid.uuid5(ESSAY_ID_NAMESPACE, f"{bucket}/{key}@{version}!{member}"))
+
+
+def _chunks(values: List[Any], size: int) -> List[List[Any]]:
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def existing_statuses(essay_keys: List[Dict[str, str]]) -> Dict[str, str]:
+    """{essay_id: status} of the essays that already exist."""
+    statuses = {}
+    for chunk in _chunks(essay_keys, BATCH_GET_SIZE):
+        request = {
+            essays_table.name: {
+                "Keys": chunk,
+                "ProjectionExpression": "essay_id, #status",
+                "ExpressionAttributeNames": {"#status": "status"},
+            }
+        }
+        for attempt in range(MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(BACKOFF_SECONDS * 2 ** (attempt - 1))
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response.get("Responses", {}).get(essays_table.name, []):
+                statuses[item["essay_id"]] = item.get("status", "pending")
+            request = response.get("UnprocessedKeys") or {}
+            if not request:
+                break
+        else:
+            raise IngestError("Could not check existing essays")
+    return statuses
+
+
+def write_items(items: List[Dict[str, Any]]) -> List[str]:
+    """BatchWriteItem with retries; returns the essay_ids that were not written."""
+    failed = []
+    for chunk in _chunks(items, BATCH_WRITE_SIZE):
+        pending = [{"PutRequest": {"Item": item}} for item in chunk]
+        for attempt in range(MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(BACKOFF_SECONDS * 2 ** (attempt - 1))
+            try:
+                response = dynamodb.batch_write_item(RequestItems={essays_table.name: pending})
+            except Exception as e:
+                logger.error("Batch write failed", extra={"error": str(e)})
+                break
+            pending = response.get("UnprocessedItems", {}).get(essays_table.name, [])
+            if not pending:
+                break
+        failed.extend(request["PutRequest"]["Item"]["essay_id"] for request in pending)
+    return failed
+
+
+def send_messages(bodies: List[str]) -> List[int]:
+    """
+    SendMessageBatch with retries; returns the indexes of messages not sent.
+
+    Sender faults (malformed entries) would fail the same way again and are
+    not retried, as in the API's bulk sender (lambda/api/app/bulk.py).
+    """
+    unsent = []
+    for offset in range(0, len(bodies), MESSAGE_BATCH_SIZE):
+        chunk = bodies[offset:offset + MESSAGE_BATCH_SIZE]
+        pending = [{"Id": str(offset + i), "MessageBody": body} for i, body in enumerate(chunk)]
+        for attempt in range(MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(BACKOFF_SECONDS * 2 ** (attempt - 1))
+            try:
+                response = sqs.send_message_batch(
+                    QueueUrl=ESSAY_PROCESSING_QUEUE_URL, Entries=pending
+                )
+            except Exception as e:
+                logger.error("Message batch failed", extra={"error": str(e)})
+                break
+            failed = {f["Id"]: f for f in response.get("Failed", [])}
+            retry = []
+            for entry in pending:
+                failure = failed.get(entry["Id"])
+                if failure is None:
+                    continue
+                if failure.get("SenderFault"):
+                    logger.error("Message rejected", extra={"error": failure.get("Message")})
+                    unsent.append(int(entry["Id"]))
+                else:
+                    retry.append(entry)
+            pending = retry
+            if not pending:
+                break
+        unsent.extend(int(entry["Id"]) for entry in pending)
+    return unsent
+
+
+def flush(items: List[Dict[str, Any]], teacher_id: str, assignment_id: str) -> Dict[str, int]:
+    """
+    Create new essays and queue every essay that is not processed yet.
+
+    Returns:
+        Essay counters: new (created now), existing (already there), queued, failed
+        (not written or not queued)
+    """
+    statuses = existing_statuses(
+        [{"assignment_id": item["assignment_id"], "essay_id": item["essay_id"]} for item in items]
+    )
+    new_items = [item for item in items if item["essay_id"] not in statuses]
+    failed = set(write_items(new_items))
+
+    to_queue = [
+        item["essay_id"]
+        for item in items
+        if item["essay_id"] not in failed and statuses.get(item["essay_id"], "pending") == "pending"
+    ]
+    messages = _chunks(to_queue, ESSAYS_PER_MESSAGE)
+    bodies = [
+        json.dumps({
+            "teacher_id": teacher_id,
+            "assignment_id": assignment_id,
+            "student_id": "",
+            "essay_ids": essay_ids,
+            "attempt": 1,
+        })
+        for essay_ids in messages
+    ]
+    unqueued = sum(len(messages[index]) for index in send_messages(bodies))
+    return {
+        "new": len(new_items) - len(failed),
+        "existing": len(statuses),
+        "queued": len(to_queue) - unqueued,
+        "failed": len(failed) + unqueued,
+    }
+
+
+def ingest_object(
+    bucket: str, key: str, version_id: Optional[str], etag: str
+) -> Dict[str, int]:
+    """
+    Create essays for one uploaded object version.
+
+    In an unversioned bucket the read is pinned to the event's ETag; if the
+    object has been overwritten since, it is left to the newer event.
+
+    Raises:
+        IngestError: If any essay could not be created or queued
+    """
+    totals = {"new": 0, "existing": 0, "queued": 0, "failed": 0, "rejected": 0}
+    parsed = parse_key(key)
+    if not parsed:
+        logger.warning("Ignoring object outside assignment uploads", extra={"key": key})
+        return totals
+    teacher_id, assignment_id, file_name = parsed
+    if not is_supported(file_name):
+        logger.warning("Ignoring unsupported upload", extra={"key": key})
+        return totals
+
+    version = version_id or etag
+    get_kwargs = {"Bucket": bucket, "Key": key}
+    if version_id:
+        get_kwargs["VersionId"] = version_id
+    elif etag:
+        get_kwargs["IfMatch"] = etag
+    try:
+        body = s3.get_object(**get_kwargs)["Body"]
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code")
+        if code in ("PreconditionFailed", "NoSuchKey", "412", "404"):
+            logger.info("Upload replaced or deleted before ingestion", extra={"key": key, "code": code})
+            return totals
+        raise
+
+    now = datetime.utcnow().isoformat()
+    batch: List[Dict[str, Any]] = []
+
+    def flush_batch():
+        for name, count in flush(batch, teacher_id, assignment_id).items():
+            totals[name] += count
+        batch.clear()
+
+    try:
+        for member, text, error in iter_essays(file_name, body):
+            source = f"{key}!{member}" if member else key
+            if error:
+                totals["rejected"] += 1
+                logger.warning("Essay rejected", extra={"source_key": source, "error": error})
+                continue
+            batch.append({
+                "assignment_id": assignment_id,
+                "essay_id": essay_id_for(bucket, key, version, member),
+                "teacher_id": teacher_id,
+                "student_id": "",
+                "essay_text": text,
+                "status": "pending",
+                "created_at": now,
+                "source_key": source,
+            })
+            if len(batch) >= FLUSH_SIZE:
+                flush_batch()
+        if batch:
+            flush_batch()
+    except ExtractionError as e:
+        totals["rejected"] += 1
+        logger.warning("Upload rejected", extra={"key": key, "error": str(e)})
+    finally:
+        body.close()
+
+    logger.info("Upload ingested", extra={
+        "teacher_id": teacher_id,
+        "assignment_id": assignment_id,
+        "key": key,
+        **totals,
+    })
+    if totals["failed"]:
+        raise IngestError(f"{totals['failed']} essays from {key} could not be created or queued")
+    return totals
+
+
+def handler(event, context):
+    """
+    S3 ObjectCreated handler.
+
+    Raises on failed essays so the event is retried; retries only create
+    what is still missing.
+    """
+    if not essays_table or not ESSAY_PROCESSING_QUEUE_URL:
+        raise RuntimeError("ESSAYS_TABLE and ESSAY_PROCESSING_QUEUE_URL must be set")
+
+    errors = []
+    records = event.get("Records", [])
+    for record in records:
+        bucket = record["s3"]["bucket"]["name"]
+        key = unquote_plus(record["s3"]["object"]["key"])
+        try:
+            ingest_object(bucket, key, *object_version(record))
+        except Exception as e:
+            # Keep going; the retry redoes only what is missing
+            logger.error("Failed to ingest upload", extra={"key": key, "error": str(e)}, exc_info=True)
+            errors.append(e)
+    if errors:
+        raise errors[0]
+    return {"objects": len(records)}
@@ -0,0 +1,138 @@
+"""
+Unit tests for essay extraction from .txt, .docx and .zip uploads.
+"""
+import io
+import os
+import sys
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import extract
+from extract import ExtractionError, docx_text, is_supported, iter_essays
+
+
+def make_docx(*paragraphs):
+    runs = "".join(
+        f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>' for text in paragraphs
+    )
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f'<w:body>{runs}</w:body></w:document>'
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as docx:
+        docx.writestr('[Content_Types].xml', '<Types/>')
+        docx.writestr('word/document.xml', document)
+    return buffer.getvalue()
+
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+class TestSingleFiles:
+    def test_txt(self):
+        essays = list(iter_essays('essay.txt', io.BytesIO('\ufeffMy essay.\n'.encode('utf-8'))))
+
+        assert essays == [('', 'My essay.', None)]
+
+    def test_docx_paragraphs(self):
+        data = make_docx('First paragraph.', 'Second paragraph.')
+
+        assert docx_text(io.BytesIO(data)) == 'First paragraph.\nSecond paragraph.'
+        assert list(iter_essays('Essay.DOCX', io.BytesIO(data))) == [
+            ('', 'First paragraph.\nSecond paragraph.', None)
+        ]
+
+    def test_invalid_docx_is_rejected(self):
+        with pytest.raises(ExtractionError):
+            list(iter_essays('essay.docx', io.BytesIO(b'not a zip')))
+
+    def test_empty_txt_is_rejected(self):
+        with pytest.raises(ExtractionError, match='no text'):
+            list(iter_essays('essay.txt', io.BytesIO(b'  \n')))
+
+    def test_oversized_txt_is_rejected(self, monkeypatch):
+        monkeypatch.setattr(extract, 'MAX_ESSAY_BYTES', 10)
+
+        with pytest.raises(ExtractionError, match='exceeds'):
+            list(iter_essays('essay.txt', io.BytesIO(b'x' * 11)))
+
+    def test_unsupported_type(self):
+        assert not is_supported('notes.pdf')
+        with pytest.raises(ExtractionError, match='Unsupported'):
+            list(iter_essays('notes.pdf', io.BytesIO(b'%PDF')))
+
+
+class TestArchives:
+    def test_members_become_essays(self):
+        data = make_zip({
+            'class/alice.txt': 'Alice essay.',
+            'class/bob.docx': make_docx('Bob essay.'),
+            'class/readme.md': 'ignored',
+            '__MACOSX/class/._alice.txt': 'ignored',
+            'class/.hidden.txt': 'ignored',
+        })
+
+        essays = list(iter_essays('upload.zip', io.BytesIO(data)))
+
+        assert essays == [
+            ('class/alice.txt', 'Alice essay.', None),
+            ('class/bob.docx', 'Bob essay.', None),
+        ]
+
+    def test_bad_member_does_not_stop_archive(self):
+        data = make_zip({
+            'a.txt': '',
+            'b.docx': b'broken',
+            'c.txt': 'Fine essay.',
+        })
+
+        essays = list(iter_essays('upload.zip', io.BytesIO(data)))
+
+        assert [(name, text) for name, text, _ in essays] == [
+            ('a.txt', None), ('b.docx', None), ('c.txt', 'Fine essay.')
+        ]
+        assert all(error for _, text, error in essays if text is None)
+
+    def test_member_size_is_checked_on_bytes_read(self, monkeypatch):
+        monkeypatch.setattr(extract, 'MAX_ESSAY_BYTES', 100)
+        data = make_zip({'big.txt': 'x' * 1000})
+
+        [(name, text, error)] = iter_essays('upload.zip', io.BytesIO(data))
+
+        assert text is None
+        assert 'exceeds' in error
+
+    def test_archive_size_cap(self, monkeypatch):
+        monkeypatch.setattr(extract, 'MAX_ARCHIVE_BYTES', 10)
+
+        with pytest.raises(ExtractionError, match='exceeds'):
+            list(iter_essays('upload.zip', io.BytesIO(make_zip({'a.txt': 'Essay.'}))))
+
+    def test_too_many_members(self, monkeypatch):
+        monkeypatch.setattr(extract, 'MAX_ARCHIVE_MEMBERS', 1)
+        data = make_zip({'a.txt': 'One.', 'b.txt': 'Two.'})
+
+        with pytest.raises(ExtractionError, match='more than'):
+            list(iter_essays('upload.zip', io.BytesIO(data)))
+
+    def test_invalid_zip(self):
+        with pytest.raises(ExtractionError, match='valid .zip'):
+            list(iter_essays('upload.zip', io.BytesIO(b'not a zip')))
+
+    def test_large_archive_spools_to_disk(self, monkeypatch):
+        monkeypatch.setattr(extract, 'SPOOL_MEMORY_BYTES', 16)
+        data = make_zip({f'{i}.txt': f'Essay number {i}.' for i in range(5)})
+
+        essays = list(iter_essays('upload.zip', io.BytesIO(data)))
+
+        assert [text for _, text, _ in essays] == [f'Essay number {i}.' for i in range(5)]
@@ -0,0 +1,235 @@
+"""
+Tests for the ingest Lambda against moto's S3, DynamoDB and SQS.
+"""
+import io
+import os
+import sys
+import json
+import zipfile
+from unittest.mock import MagicMock
+
+import boto3
+import pytest
+from moto import mock_aws
+
+# Set environment variables before importing modules
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+os.environ['ESSAYS_TABLE'] = 'test-essays-table'
+os.environ['ESSAYS_PER_MESSAGE'] = '2'
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import lambda_function
+
+BUCKET = 'test-essays-bucket'
+KEY = 'teacher-1/assignments/assignment-1/essays.zip'
+
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    with mock_aws():
+        s3 = boto3.client('s3')
+        s3.create_bucket(Bucket=BUCKET)
+        dynamodb = boto3.resource('dynamodb')
+        table = dynamodb.create_table(
+            TableName='test-essays-table',
+            KeySchema=[
+                {'AttributeName': 'assignment_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'essay_id', 'KeyType': 'RANGE'},
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'assignment_id', 'AttributeType': 'S'},
+                {'AttributeName': 'essay_id', 'AttributeType': 'S'},
+            ],
+            BillingMode='PAY_PER_REQUEST',
+        )
+        sqs = boto3.client('sqs')
+        queue_url = sqs.create_queue(QueueName='test-processing-queue')['QueueUrl']
+
+        monkeypatch.setattr(lambda_function, 's3', s3)
+        monkeypatch.setattr(lambda_function, 'dynamodb', dynamodb)
+        monkeypatch.setattr(lambda_function, 'essays_table', table)
+        monkeypatch.setattr(lambda_function, 'sqs', sqs)
+        monkeypatch.setattr(lambda_function, 'ESSAY_PROCESSING_QUEUE_URL', queue_url)
+        yield {'s3': s3, 'table': table, 'sqs': sqs, 'queue_url': queue_url}
+
+
+def upload(aws, key, data):
+    etag = aws['s3'].put_object(Bucket=BUCKET, Key=key, Body=data)['ETag']
+    return {
+        'Records': [{
+            's3': {
+                'bucket': {'name': BUCKET},
+                'object': {'key': key.replace(' ', '+'), 'eTag': etag.strip('"')},
+            }
+        }]
+    }
+
+
+def essays(aws):
+    return sorted(aws['table'].scan()['Items'], key=lambda item: item['source_key'])
+
+
+def queued_essay_ids(aws):
+    ids = []
+    while True:
+        messages = aws['sqs'].receive_message(
+            QueueUrl=aws['queue_url'], MaxNumberOfMessages=10
+        ).get('Messages', [])
+        if not messages:
+            return ids
+        for message in messages:
+            body = json.loads(message['Body'])
+            assert body['teacher_id'] == 'teacher-1'
+            assert body['assignment_id'] == 'assignment-1'
+            ids.extend(body['essay_ids'])
+            aws['sqs'].delete_message(
+                QueueUrl=aws['queue_url'], ReceiptHandle=message['ReceiptHandle']
+            )
+
+
+class TestParseKey:
+    def test_assignment_upload(self):
+        assert lambda_function.parse_key('t/assignments/a/dir/essay.txt') == ('t', 'a', 'dir/essay.txt')
+
+    def test_other_keys(self):
+        assert lambda_function.parse_key('t/reports/a/essay.txt') is None
+        assert lambda_function.parse_key('t/assignments/a/') is None
+        assert lambda_function.parse_key('essay.txt') is None
+
+
+class TestHandler:
+    def test_archive_creates_and_queues_essays(self, aws):
+        event = upload(aws, KEY, make_zip({
+            'alice.txt': 'Alice essay.',
+            'bob.txt': 'Bob essay.',
+            'carol.txt': 'Carol essay.',
+            'empty.txt': '',
+        }))
+
+        lambda_function.handler(event, None)
+
+        items = essays(aws)
+        assert [item['essay_text'] for item in items] == ['Alice essay.', 'Bob essay.', 'Carol essay.']
+        assert [item['source_key'] for item in items] == [f'{KEY}!alice.txt', f'{KEY}!bob.txt', f'{KEY}!carol.txt']
+        assert all(item['status'] == 'pending' for item in items)
+        assert all(item['teacher_id'] == 'teacher-1' for item in items)
+        assert sorted(queued_essay_ids(aws)) == sorted(item['essay_id'] for item in items)
+
+    def test_single_txt_file(self, aws):
+        event = upload(aws, 'teacher-1/assignments/assignment-1/my essay.txt', b'My essay.')
+
+        lambda_function.handler(event, None)
+
+        [item] = essays(aws)
+        assert item['source_key'] == 'teacher-1/assignments/assignment-1/my essay.txt'
+        assert queued_essay_ids(aws) == [item['essay_id']]
+
+    def test_redelivery_is_idempotent(self, aws):
+        event = upload(aws, KEY, make_zip({'alice.txt': 'Alice essay.', 'bob.txt': 'Bob essay.'}))
+        lambda_function.handler(event, None)
+        first = essays(aws)
+        queued_essay_ids(aws)
+        # One essay finished before the event was delivered again
+        aws['table'].update_item(
+            Key={'assignment_id': 'assignment-1', 'essay_id': first[0]['essay_id']},
+            UpdateExpression='SET #status = :processed',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={':processed': 'processed'},
+        )
+
+        totals = lambda_function.ingest_object(BUCKET, KEY, None, event['Records'][0]['s3']['object']['eTag'])
+
+        assert essays(aws)[0]['status'] == 'processed'
+        assert [item['essay_id'] for item in essays(aws)] == [item['essay_id'] for item in first]
+        # Only the essay still pending is queued again
+        assert queued_essay_ids(aws) == [first[1]['essay_id']]
+        assert totals['new'] == 0
+        assert totals['existing'] == 2
+
+    def test_new_object_version_gets_new_essays(self, aws):
+        lambda_function.handler(upload(aws, KEY, make_zip({'alice.txt': 'Draft.'})), None)
+        lambda_function.handler(upload(aws, KEY, make_zip({'alice.txt': 'Final.'})), None)
+
+        assert sorted(item['essay_text'] for item in essays(aws)) == ['Draft.', 'Final.']
+
+    def test_overwritten_object_is_skipped(self, aws):
+        stale = upload(aws, KEY, make_zip({'alice.txt': 'Draft.'}))
+        upload(aws, KEY, make_zip({'alice.txt': 'Final.'}))
+
+        lambda_function.handler(stale, None)
+
+        assert essays(aws) == []
+
+    def test_ignores_keys_outside_assignments(self, aws):
+        event = upload(aws, 'teacher-1/exports/report.txt', b'Not an essay.')
+
+        lambda_function.handler(event, None)
+
+        assert essays(aws) == []
+        assert queued_essay_ids(aws) == []
+
+    def test_invalid_upload_is_rejected_without_retry(self, aws):
+        event = upload(aws, KEY, b'not a zip')
+
+        lambda_function.handler(event, None)
+
+        assert essays(aws) == []
+
+    def test_flushes_in_chunks(self, aws, monkeypatch):
+        monkeypatch.setattr(lambda_function, 'FLUSH_SIZE', 2)
+        event = upload(aws, KEY, make_zip({f'{i}.txt': f'Essay {i}.' for i in range(5)}))
+
+        lambda_function.handler(event, None)
+
+        assert len(essays(aws)) == 5
+        assert len(queued_essay_ids(aws)) == 5
+
+    def test_failed_writes_raise_for_retry(self, aws, monkeypatch):
+        monkeypatch.setattr(lambda_function, 'write_items', lambda items: [items[0]['essay_id']])
+        event = upload(aws, KEY, make_zip({'alice.txt': 'Alice essay.', 'bob.txt': 'Bob essay.'}))
+
+        with pytest.raises(lambda_function.IngestError):
+            lambda_function.handler(event, None)
+
+        # The essay that was not written is not queued
+        assert len(queued_essay_ids(aws)) == 1
+
+    def test_sender_faults_are_not_retried(self, monkeypatch):
+        sqs = MagicMock()
+        sqs.send_message_batch.return_value = {
+            'Successful': [{'Id': '0'}],
+            'Failed': [{'Id': '1', 'SenderFault': True, 'Code': 'InvalidMessageContents'}],
+        }
+        monkeypatch.setattr(lambda_function, 'sqs', sqs)
+
+        assert lambda_function.send_messages(['{}', '{}']) == [1]
+        assert sqs.send_message_batch.call_count == 1
+
+    def test_server_faults_are_retried(self, monkeypatch):
+        sqs = MagicMock()
+        sqs.send_message_batch.side_effect = [
+            {'Failed': [{'Id': '1', 'SenderFault': False, 'Code': 'InternalError'}]},
+            {'Successful': [{'Id': '1'}]},
+        ]
+        monkeypatch.setattr(lambda_function, 'sqs', sqs)
+        monkeypatch.setattr(lambda_function, 'BACKOFF_SECONDS', 0)
+
+        assert lambda_function.send_messages(['{}', '{}']) == []
+        assert sqs.send_message_batch.call_args[1]['Entries'] == [{'Id': '1', 'MessageBody': '{}'}]
+
+    def test_requires_configuration(self, monkeypatch):
+        monkeypatch.setattr(lambda_function, 'essays_table', None)
+
+        with pytest.raises(RuntimeError):
+            lambda_function.handler({'Records': []}, None)
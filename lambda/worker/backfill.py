@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Re-analysis backfill for essays processed with an older prompt or model.
+
+Runs a parallel segmented Scan of the Essays table, selects processed essays
+whose stored prompt_version/analysis_model is older than the worker's current
+PROMPT_VERSION/OPENAI_MODEL, and re-enqueues them on the processing queue at
+a throttled rate. Progress is checkpointed per segment to a local JSON file,
+so an interrupted run resumes where each segment left off.
+
+Re-enqueued messages carry "reanalyze": true. The worker re-checks staleness
+before calling OpenAI, so a page that is re-sent after a resume is harmless.
+
+With --index-keys the same scan instead sets the teacher_student attribute
+("{teacher_id}#{student_id}") on essays written before the teacher_student
+GSI existed, so they show up in student history and metrics. Nothing is
+enqueued; the enqueued counter counts updated essays.
+
+Usage:
+    python backfill.py --table VincentVocabEssays \\
+        --queue-url https://sqs.us-east-1.amazonaws.com/.../vincent-vocab-essay-processing-queue \\
+        --segments 8 --rate 5 --checkpoint backfill_checkpoint.json
+
+    python backfill.py --table VincentVocabEssays --index-keys --rate 50
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import boto3
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+from lambda_function import OPENAI_MODEL, PROMPT_VERSION, is_analysis_stale
+
+logger = logging.getLogger(__name__)
+
+# Attributes needed to decide staleness and build the SQS message
+SCAN_PROJECTION = (
+    "assignment_id, essay_id, teacher_id, student_id, #status, "
+    "prompt_version, analysis_model"
+)
+
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls to at most `rate` per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_allowed = time.monotonic()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_allowed - now
+            self._next_allowed = max(now, self._next_allowed) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class Checkpoint:
+    """
+    Per-segment scan position persisted to a JSON file.
+
+    Each segment records its LastEvaluatedKey, whether it has finished, and
+    running counters. The file is rewritten atomically after every page.
+    """
+
+    def __init__(self, path: Optional[str], total_segments: int):
+        self.path = path
+        self.total_segments = total_segments
+        self._lock = threading.Lock()
+        self.segments: Dict[str, Dict[str, Any]] = {}
+
+        if path and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("total_segments") != total_segments:
+                raise ValueError(
+                    f"Checkpoint {path} was written with "
+                    f"{data.get('total_segments')} segments, not {total_segments}"
+                )
+            self.segments = data.get("segments", {})
+
+        for segment in range(total_segments):
+            self.segments.setdefault(
+                str(segment),
+                {"last_key": None, "done": False, "scanned": 0, "enqueued": 0},
+            )
+
+    def get(self, segment: int) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.segments[str(segment)])
+
+    def update(self, segment: int, last_key, scanned: int, enqueued: int):
+        with self._lock:
+            state = self.segments[str(segment)]
+            state["last_key"] = last_key
+            state["done"] = last_key is None
+            state["scanned"] += scanned
+            state["enqueued"] += enqueued
+            self._save()
+
+    def totals(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "scanned": sum(s["scanned"] for s in self.segments.values()),
+                "enqueued": sum(s["enqueued"] for s in self.segments.values()),
+                "segments_done": sum(1 for s in self.segments.values() if s["done"]),
+            }
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {"total_segments": self.total_segments, "segments": self.segments},
+                f,
+                default=str,
+            )
+        os.replace(tmp_path, self.path)
+
+
+def teacher_student_key(item: Dict[str, Any]) -> str:
+    """Partition key of the teacher_student GSI (matches the API's teacher_student_key)."""
+    return f"{item.get('teacher_id', '')}#{item['student_id']}"
+
+
+def set_index_key(table, item: Dict[str, Any]) -> bool:
+    """Set teacher_student on an essay; False if it was deleted meanwhile."""
+    try:
+        table.update_item(
+            Key={"assignment_id": item["assignment_id"], "essay_id": item["essay_id"]},
+            UpdateExpression="SET teacher_student = :key",
+            ConditionExpression="attribute_exists(essay_id)",
+            ExpressionAttributeValues={":key": teacher_student_key(item)},
+        )
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            return False
+        raise
+    return True
+
+
+def build_reanalysis_message(item: Dict[str, Any]) -> str:
+    """Build the SQS message body for re-analyzing an essay (IDs only)."""
+    return json.dumps(
+        {
+            "teacher_id": item.get("teacher_id", ""),
+            "assignment_id": item["assignment_id"],
+            "student_id": item.get("student_id") or "",
+            "essay_id": item["essay_id"],
+            "reanalyze": True,
+        }
+    )
+
+
+def scan_segment(
+    table,
+    sqs_client,
+    queue_url: str,
+    segment: int,
+    checkpoint: Checkpoint,
+    limiter: RateLimiter,
+    prompt_version: int = PROMPT_VERSION,
+    model: str = OPENAI_MODEL,
+    page_size: int = 500,
+    dry_run: bool = False,
+    index_keys: bool = False,
+):
+    """
+    Scan one segment of the Essays table and enqueue stale essays (or, with
+    index_keys, set teacher_student on essays that have a student but no key).
+    """
+    state = checkpoint.get(segment)
+    if state["done"]:
+        return
+
+    last_key = state["last_key"]
+    while True:
+        scan_kwargs = {
+            "Segment": segment,
+            "TotalSegments": checkpoint.total_segments,
+            "ProjectionExpression": SCAN_PROJECTION,
+            "ExpressionAttributeNames": {"#status": "status"},
+            "FilterExpression": Attr("status").eq("processed"),
+            "Limit": page_size,
+        }
+        if index_keys:
+            scan_kwargs["FilterExpression"] = (
+                Attr("student_id").gt("") & Attr("teacher_student").not_exists()
+            )
+        if last_key:
+            scan_kwargs["ExclusiveStartKey"] = last_key
+
+        response = table.scan(**scan_kwargs)
+        items = response.get("Items", [])
+
+        enqueued = 0
+        for item in items:
+            if index_keys:
+                if not dry_run:
+                    limiter.acquire()
+                    if not set_index_key(table, item):
+                        continue
+                enqueued += 1
+                continue
+            if not is_analysis_stale(item, prompt_version, model):
+                continue
+            if not dry_run:
+                limiter.acquire()
+                sqs_client.send_message(
+                    QueueUrl=queue_url, MessageBody=build_reanalysis_message(item)
+                )
+            enqueued += 1
+
+        last_key = response.get("LastEvaluatedKey")
+        checkpoint.update(
+            segment,
+            last_key,
+            scanned=response.get("ScannedCount", len(items)),
+            enqueued=enqueued,
+        )
+        if not last_key:
+            return
+
+
+def format_progress(
+    totals: Dict[str, int],
+    total_segments: int,
+    item_count: Optional[int],
+    elapsed: float,
+    scanned_at_start: int,
+) -> str:
+    """Render a one-line progress report with an ETA based on scan throughput."""
+    line = (
+        f"scanned={totals['scanned']} enqueued={totals['enqueued']} "
+        f"segments={totals['segments_done']}/{total_segments}"
+    )
+    if item_count:
+        percent = min(100.0, 100.0 * totals["scanned"] / item_count)
+        line += f" progress={percent:.1f}%"
+        scanned_this_run = totals["scanned"] - scanned_at_start
+        if scanned_this_run > 0 and elapsed > 0:
+            remaining = max(0, item_count - totals["scanned"])
+            eta_seconds = remaining / (scanned_this_run / elapsed)
+            line += f" eta={int(eta_seconds)}s"
+    return line
+
+
+def run_backfill(
+    table,
+    sqs_client,
+    queue_url: str,
+    total_segments: int = 4,
+    rate: float = 5.0,
+    checkpoint_path: Optional[str] = None,
+    prompt_version: int = PROMPT_VERSION,
+    model: str = OPENAI_MODEL,
+    dry_run: bool = False,
+    progress_interval: float = 10.0,
+    index_keys: bool = False,
+) -> Dict[str, int]:
+    """
+    Run the backfill across all segments in parallel.
+
+    Returns the final scanned/enqueued totals (including earlier resumed runs).
+    """
+    checkpoint = Checkpoint(checkpoint_path, total_segments)
+    limiter = RateLimiter(rate)
+
+    # ItemCount is refreshed roughly every six hours; good enough for an ETA
+    item_count = None
+    try:
+        item_count = table.item_count
+    except Exception as e:
+        logger.warning("Could not read table item count", extra={"error": str(e)})
+
+    scanned_at_start = checkpoint.totals()["scanned"]
+    started = time.monotonic()
+    finished = threading.Event()
+
+    def report_progress():
+        while not finished.wait(progress_interval):
+            logger.info(
+                format_progress(
+                    checkpoint.totals(),
+                    total_segments,
+                    item_count,
+                    time.monotonic() - started,
+                    scanned_at_start,
+                )
+            )
+
+    reporter = threading.Thread(target=report_progress, daemon=True)
+    reporter.start()
+
+    try:
+        with ThreadPoolExecutor(max_workers=total_segments) as executor:
+            futures = [
+                executor.submit(
+                    scan_segment,
+                    table,
+                    sqs_client,
+                    queue_url,
+                    segment,
+                    checkpoint,
+                    limiter,
+                    prompt_version,
+                    model,
+                    dry_run=dry_run,
+                    index_keys=index_keys,
+                )
+                for segment in range(total_segments)
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        finished.set()
+
+    totals = checkpoint.totals()
+    logger.info(
+        "Backfill complete: "
+        + format_progress(
+            totals,
+            total_segments,
+            item_count,
+            time.monotonic() - started,
+            scanned_at_start,
+        )
+    )
+    return totals
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Re-enqueue essays analyzed with an older prompt or model."
+    )
+    parser.add_argument(
+        "--table",
+        default=os.environ.get("ESSAYS_TABLE"),
+        help="Essays table name (default: $ESSAYS_TABLE)",
+    )
+    parser.add_argument(
+        "--queue-url",
+        default=os.environ.get("ESSAY_PROCESSING_QUEUE_URL"),
+        help="Processing queue URL (default: $ESSAY_PROCESSING_QUEUE_URL)",
+    )
+    parser.add_argument(
+        "--segments", type=int, default=4, help="Parallel scan segments"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=5.0, help="Max messages enqueued per second"
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="Checkpoint file used to resume an interrupted run "
+        "(default: backfill_checkpoint.json, or index_keys_checkpoint.json with --index-keys)",
+    )
+    parser.add_argument(
+        "--prompt-version",
+        type=int,
+        default=PROMPT_VERSION,
+        help="Target prompt version (default: worker PROMPT_VERSION)",
+    )
+    parser.add_argument(
+        "--model", default=OPENAI_MODEL, help="Target model (default: OPENAI_MODEL)"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Count stale essays without enqueueing",
+    )
+    parser.add_argument(
+        "--index-keys",
+        action="store_true",
+        help="Set the teacher_student GSI key on existing essays instead of re-analyzing",
+    )
+    args = parser.parse_args(argv)
+    if args.checkpoint is None:
+        args.checkpoint = (
+            "index_keys_checkpoint.json" if args.index_keys else "backfill_checkpoint.json"
+        )
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    if not args.table:
+        logger.error("--table or ESSAYS_TABLE is required")
+        return 1
+    if not args.queue_url and not args.dry_run and not args.index_keys:
+        logger.error("--queue-url or ESSAY_PROCESSING_QUEUE_URL is required")
+        return 1
+
+    table = boto3.resource("dynamodb").Table(args.table)
+    sqs_client = boto3.client("sqs")
+
+    run_backfill(
+        table,
+        sqs_client,
+        args.queue_url,
+        total_segments=args.segments,
+        rate=args.rate,
+        checkpoint_path=args.checkpoint,
+        prompt_version=args.prompt_version,
+        model=args.model,
+        dry_run=args.dry_run,
+        index_keys=args.index_keys,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Token and latency benchmark for the analysis wire contracts.
+
+Runs each essay through preprocessing and analyze_essay_with_openai once per
+variant and reports prompt/completion tokens per essay, latency percentiles
+and cost, plus the reduction of the candidate variant against the baseline.
+Variants are the wire schemas (see wire_schema) and "split", the compact
+schema requested as parallel per-part completions; split runs also report
+each part's latency. Essays are read from .txt files, e.g. the sample set
+under essays/essays/.
+
+Runs go through the worker's configured LLM backends (LLM_BACKENDS), so a
+local OpenAI-compatible server can be benchmarked the same way.
+
+Usage:
+    OPENAI_API_KEY=... python benchmark.py ../../essays/essays/prompt_1_2025-11-13 \\
+        --variants verbose compact split --limit 10 --output benchmark.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from preprocess import preprocess_essay
+from wire_schema import PARTS, SCHEMAS
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = SCHEMAS + ("split",)
+
+Analyze = Callable[[str, str], Tuple[Dict[str, Any], Dict[str, Any]]]
+
+
+def load_essays(paths: List[str], limit: Optional[int] = None) -> List[Tuple[str, str]]:
+    """(name, text) of the .txt files in `paths` (files or directories), sorted by name."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in os.listdir(path) if name.endswith(".txt")
+            )
+        else:
+            files.append(path)
+    essays = []
+    for file_path in sorted(files)[:limit]:
+        with open(file_path, encoding="utf-8") as f:
+            essays.append((os.path.basename(file_path), f.read()))
+    return essays
+
+
+def _run_one(analyze: Analyze, name: str, text: str, variant: str) -> Dict[str, Any]:
+    started = time.monotonic()
+    run = {"essay": name, "variant": variant}
+    try:
+        _, usage = analyze(text, variant)
+    except Exception as e:
+        run.update(error=str(e), latency_ms=int((time.monotonic() - started) * 1000))
+        return run
+    run.update(
+        latency_ms=int((time.monotonic() - started) * 1000),
+        prompt_tokens=usage["prompt_tokens"],
+        completion_tokens=usage["completion_tokens"],
+        cost_usd=float(usage["cost_usd"]),
+    )
+    if "parts" in usage:
+        run["part_latency_ms"] = {
+            part: part_usage["latency_ms"] for part, part_usage in usage["parts"].items()
+        }
+    return run
+
+
+def run_benchmark(
+    essays: List[Tuple[str, str]],
+    variants: List[str],
+    analyze: Analyze,
+    concurrency: int = 1,
+) -> List[Dict[str, Any]]:
+    """Analyze every essay under every variant; one run record per pair."""
+    jobs = [
+        (name, preprocess_essay(text).text, variant)
+        for variant in variants
+        for name, text in essays
+    ]
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        return list(executor.map(lambda job: _run_one(analyze, *job), jobs))
+
+
+def _percentile(values: List[int], pct: float) -> int:
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Per-variant means and latency percentiles over successful runs."""
+    summary = {}
+    for variant in dict.fromkeys(run["variant"] for run in runs):
+        ok = [r for r in runs if r["variant"] == variant and "error" not in r]
+        count = len(ok) or 1
+        latencies = [r["latency_ms"] for r in ok]
+        summary[variant] = {
+            "essays": len(ok),
+            "errors": sum(1 for r in runs if r["variant"] == variant and "error" in r),
+            "prompt_tokens_per_essay": sum(r["prompt_tokens"] for r in ok) / count,
+            "completion_tokens_per_essay": sum(r["completion_tokens"] for r in ok) / count,
+            "cost_usd_per_essay": sum(r["cost_usd"] for r in ok) / count,
+            "p50_latency_ms": _percentile(latencies, 50),
+            "p95_latency_ms": _percentile(latencies, 95),
+        }
+        parts = [r["part_latency_ms"] for r in ok if "part_latency_ms" in r]
+        if parts:
+            summary[variant]["p50_part_latency_ms"] = {
+                part: _percentile([p[part] for p in parts], 50) for part in PARTS
+            }
+    return summary
+
+
+def _reduction(baseline: float, candidate: float) -> float:
+    return round(100 * (baseline - candidate) / baseline, 1) if baseline else 0.0
+
+
+def compare(summary: Dict[str, Dict[str, Any]], baseline: str, candidate: str) -> Dict[str, float]:
+    """Percent reduction of the candidate variant against the baseline (negative = increase)."""
+    base, cand = summary[baseline], summary[candidate]
+    return {
+        "completion_tokens_pct": _reduction(
+            base["completion_tokens_per_essay"], cand["completion_tokens_per_essay"]
+        ),
+        "prompt_tokens_pct": _reduction(
+            base["prompt_tokens_per_essay"], cand["prompt_tokens_per_essay"]
+        ),
+        "cost_pct": _reduction(base["cost_usd_per_essay"], cand["cost_usd_per_essay"]),
+        "p50_latency_pct": _reduction(base["p50_latency_ms"], cand["p50_latency_ms"]),
+        "p95_latency_pct": _reduction(base["p95_latency_ms"], cand["p95_latency_ms"]),
+    }
+
+
+def format_report(summary: Dict[str, Dict[str, Any]], comparison: Optional[Dict[str, float]]) -> str:
+    lines = [
+        f"{'variant':<10} {'essays':>6} {'errors':>6} {'prompt/essay':>13} "
+        f"{'completion/essay':>17} {'p50 ms':>8} {'p95 ms':>8} {'$/essay':>10}"
+    ]
+    for variant, s in summary.items():
+        lines.append(
+            f"{variant:<10} {s['essays']:>6} {s['errors']:>6} {s['prompt_tokens_per_essay']:>13.1f} "
+            f"{s['completion_tokens_per_essay']:>17.1f} {s['p50_latency_ms']:>8} "
+            f"{s['p95_latency_ms']:>8} {s['cost_usd_per_essay']:>10.6f}"
+        )
+        if "p50_part_latency_ms" in s:
+            lines.append(
+                f"{'':<10} p50 part latency: "
+                + ", ".join(f"{part} {ms} ms" for part, ms in s["p50_part_latency_ms"].items())
+            )
+    if comparison:
+        lines.append(
+            "reduction: "
+            + ", ".join(f"{key} {value:+.1f}%" for key, value in comparison.items())
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Measure tokens and latency per essay for each analysis variant."
+    )
+    parser.add_argument("paths", nargs="+", help="Essay .txt files or directories")
+    parser.add_argument(
+        "--variants",
+        nargs="+",
+        choices=VARIANTS,
+        default=["verbose", "compact"],
+        help="Variants to run; the first is the baseline for the reduction",
+    )
+    parser.add_argument("--limit", type=int, help="Max essays to run")
+    parser.add_argument(
+        "--concurrency", type=int, default=1, help="Parallel requests (1 keeps latencies comparable)"
+    )
+    parser.add_argument("--output", help="Write runs and summary as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    from lambda_function import analyze_essay_with_openai, llm_backend
+
+    if not llm_backend:
+        logger.error("OPENAI_API_KEY or LOCAL_LLM_BASE_URL (with LLM_BACKENDS=local) is required")
+        return 1
+
+    essays = load_essays(args.paths, args.limit)
+    if not essays:
+        logger.error("No essays found")
+        return 1
+
+    def analyze(text: str, variant: str):
+        if variant == "split":
+            return analyze_essay_with_openai(text, schema="compact", mode="split")
+        return analyze_essay_with_openai(text, schema=variant, mode="single")
+
+    runs = run_benchmark(essays, args.variants, analyze, args.concurrency)
+    summary = summarize(runs)
+    comparison = (
+        compare(summary, args.variants[0], args.variants[-1]) if len(args.variants) > 1 else None
+    )
+    print(format_report(summary, comparison))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"runs": runs, "summary": summary, "reduction": comparison}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""
+Assignment-level class reports.
+
+Once every essay of an assignment has been processed, the worker makes one
+summarization call for the whole class. The prompt carries a compact summary
+of each essay (the words it used, the words recommended to the student and a
+shortened review) plus locally computed word frequencies, never the essay
+texts, so its size grows with the class rather than with essay length.
+Word frequencies cover every essay; classes larger than
+CLASS_REPORT_MAX_ESSAYS send summaries of an evenly spaced sample, and the
+report records how many (essays_analyzed) next to the class size
+(essay_count).
+
+The result is stored in the ClassReports table:
+    assignment_id (PK)
+    teacher_id, report, word_frequencies, essay_count, essays_analyzed,
+    fingerprint, generated_at, model, prompt_version, token_usage
+
+`fingerprint` ("{essay count}#{latest processed_at}") identifies the set of
+results a report was built from. A conditional claim on it ensures that only
+one invocation generates a report for a given state of the assignment, and a
+later re-analysis or added essay produces a new fingerprint and a new report.
+"""
+
+import os
+import json
+import logging
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+CLASS_REPORT_MIN_ESSAYS = int(os.environ.get("CLASS_REPORT_MIN_ESSAYS", "3"))
+CLASS_REPORT_MAX_ESSAYS = int(os.environ.get("CLASS_REPORT_MAX_ESSAYS", "60"))
+CLASS_REPORT_PROMPT_VERSION = 1
+
+# Public demo essays share one teacher and are not a class
+EXCLUDED_TEACHER_IDS = {"demo-teacher"}
+
+MAX_WORDS_PER_ESSAY = 8
+MAX_REVIEW_CHARS = 200
+TOP_WORDS = 15
+
+SYSTEM_PROMPT = (
+    "You are an expert English teacher summarizing vocabulary development "
+    "across a class. Always respond with valid JSON only."
+)
+
+# (essay_id, status, processed_at) is all the readiness check needs
+_STATUS_PROJECTION = {
+    "ProjectionExpression": "essay_id, #status, processed_at",
+    "ExpressionAttributeNames": {"#status": "status"},
+}
+_SUMMARY_PROJECTION = {
+    "ProjectionExpression": "essay_id, student_id, #status, vocabulary_analysis",
+    "ExpressionAttributeNames": {"#status": "status"},
+}
+
+CompleteJson = Callable[[str, str], Tuple[Dict[str, Any], Dict[str, Any]]]
+
+
+def _query_assignment(essays_table, assignment_id: str, projection: Dict[str, Any]) -> List[Dict[str, Any]]:
+    items = []
+    kwargs = {"KeyConditionExpression": Key("assignment_id").eq(assignment_id), **projection}
+    while True:
+        response = essays_table.query(**kwargs)
+        items.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            return items
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def report_fingerprint(items: List[Dict[str, Any]]) -> str:
+    latest = max((item.get("processed_at") or "" for item in items), default="")
+    return f"{len(items)}#{latest}"
+
+
+def summarize_essay(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact per-essay summary sent to the LLM instead of the essay text."""
+    analysis = item.get("vocabulary_analysis") or {}
+    review = analysis.get("correctness_review", "")
+    if len(review) > MAX_REVIEW_CHARS:
+        review = review[:MAX_REVIEW_CHARS].rsplit(" ", 1)[0] + "..."
+    return {
+        "student_id": item.get("student_id"),
+        "used": list(analysis.get("vocabulary_used", []))[:MAX_WORDS_PER_ESSAY],
+        "recommended": list(analysis.get("recommended_vocabulary", []))[:MAX_WORDS_PER_ESSAY],
+        "review": review,
+    }
+
+
+def sample_essays(items: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """At most `limit` items, evenly spaced across the list rather than its head."""
+    if len(items) <= limit:
+        return items
+    return [items[i * len(items) // limit] for i in range(limit)]
+
+
+def word_frequencies(items: List[Dict[str, Any]], top: int = TOP_WORDS) -> Dict[str, List[Dict[str, Any]]]:
+    """Most common used and recommended words, counted once per essay."""
+    used = Counter()
+    recommended = Counter()
+    for item in items:
+        analysis = item.get("vocabulary_analysis") or {}
+        used.update({w.lower() for w in analysis.get("vocabulary_used", [])})
+        recommended.update({w.lower() for w in analysis.get("recommended_vocabulary", [])})
+    return {
+        "vocabulary_used": [
+            {"word": word, "essay_count": count} for word, count in used.most_common(top)
+        ],
+        "recommended_vocabulary": [
+            {"word": word, "essay_count": count} for word, count in recommended.most_common(top)
+        ],
+    }
+
+
+def build_report_prompt(summaries: List[Dict[str, Any]], frequencies: Dict[str, Any]) -> str:
+    lines = [
+        f"- {s['student_id']}: used [{', '.join(s['used'])}]; "
+        f"recommended [{', '.join(s['recommended'])}]; review: {s['review']}"
+        for s in summaries
+    ]
+    common_used = ", ".join(
+        f"{f['word']} ({f['essay_count']})" for f in frequencies["vocabulary_used"]
+    )
+    common_recommended = ", ".join(
+        f"{f['word']} ({f['essay_count']})" for f in frequencies["recommended_vocabulary"]
+    )
+    essays = "\n".join(lines)
+    return f"""Summarize the vocabulary development of a class from the per-essay results below.
+
+Per-essay results ({len(summaries)} essays):
+{essays}
+
+Most used words (essay count): {common_used}
+Most recommended words (essay count): {common_recommended}
+
+Please provide a JSON response with the following structure:
+{{
+  "class_summary": "3-4 sentences on the class's overall vocabulary level and use.",
+  "common_strengths": ["vocabulary", "skills", "the", "class", "shows"],
+  "struggling_words": [{{"word": "...", "issue": "how it is misused", "student_count": 0}}],
+  "recommended_focus_vocabulary": ["5-10", "words", "to", "teach", "the", "whole", "class"]
+}}
+
+Return ONLY valid JSON, no additional text."""
+
+
+def _claim(reports_table, teacher_id: str, assignment_id: str, fingerprint: str) -> bool:
+    try:
+        reports_table.update_item(
+            Key={"assignment_id": assignment_id},
+            UpdateExpression="SET fingerprint = :fp, teacher_id = :teacher_id, generation_started_at = :now",
+            ConditionExpression="attribute_not_exists(fingerprint) OR fingerprint <> :fp",
+            ExpressionAttributeValues={
+                ":fp": fingerprint,
+                ":teacher_id": teacher_id,
+                ":now": datetime.utcnow().isoformat(),
+            },
+        )
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            return False
+        raise
+
+
+def _release(reports_table, assignment_id: str, fingerprint: str):
+    """Drop a claim whose generation failed so a later batch can retry."""
+    try:
+        reports_table.update_item(
+            Key={"assignment_id": assignment_id},
+            UpdateExpression="REMOVE fingerprint, generation_started_at",
+            ConditionExpression="fingerprint = :fp",
+            ExpressionAttributeValues={":fp": fingerprint},
+        )
+    except Exception as e:
+        logger.warning(
+            "Failed to release class report claim",
+            extra={"assignment_id": assignment_id, "error": str(e)},
+        )
+
+
+def maybe_generate_class_report(
+    teacher_id: str,
+    assignment_id: str,
+    essays_table,
+    reports_table,
+    complete_json: CompleteJson,
+    model: str,
+) -> Optional[Dict[str, Any]]:
+    """
+    Generate and store the class report if the assignment is complete.
+
+    Returns:
+        The stored report item, or None if the assignment is not ready, too
+        small, or already reported for its current results
+    """
+    if teacher_id in EXCLUDED_TEACHER_IDS:
+        return None
+
+    statuses = _query_assignment(essays_table, assignment_id, _STATUS_PROJECTION)
+    if len(statuses) < CLASS_REPORT_MIN_ESSAYS:
+        return None
+    if any(item.get("status") != "processed" for item in statuses):
+        return None
+
+    fingerprint = report_fingerprint(statuses)
+    if not _claim(reports_table, teacher_id, assignment_id, fingerprint):
+        return None
+
+    try:
+        items = [
+            item for item in _query_assignment(essays_table, assignment_id, _SUMMARY_PROJECTION)
+            if item.get("status") == "processed"
+        ]
+        frequencies = word_frequencies(items)
+        summaries = [
+            summarize_essay(item) for item in sample_essays(items, CLASS_REPORT_MAX_ESSAYS)
+        ]
+
+        report, usage = complete_json(SYSTEM_PROMPT, build_report_prompt(summaries, frequencies))
+
+        item = {
+            "assignment_id": assignment_id,
+            "teacher_id": teacher_id,
+            # DynamoDB rejects floats
+            "report": json.loads(json.dumps(report), parse_float=Decimal),
+            "word_frequencies": frequencies,
+            "essay_count": len(statuses),
+            "essays_analyzed": len(summaries),
+            "fingerprint": fingerprint,
+            "generated_at": datetime.utcnow().isoformat(),
+            "model": model,
+            "prompt_version": CLASS_REPORT_PROMPT_VERSION,
+            "token_usage": usage,
+        }
+        # A newer claim supersedes this one; don't overwrite its report
+        reports_table.put_item(
+            Item=item,
+            ConditionExpression="fingerprint = :fp",
+            ExpressionAttributeValues={":fp": fingerprint},
+        )
+    except Exception:
+        _release(reports_table, assignment_id, fingerprint)
+        raise
+
+    logger.info(
+        "Class report generated",
+        extra={
+            "assignment_id": assignment_id,
+            "essay_count": len(statuses),
+            "summarized_essays": len(summaries),
+            "prompt_tokens": usage.get("prompt_tokens"),
+        },
+    )
+    return item
@@ -0,0 +1,320 @@
+"""
+Adaptive (AIMD) concurrency control for LLM calls.
+
+The limiter caps in-flight OpenAI requests. The limit grows additively while
+calls succeed quickly and shrinks multiplicatively on congestion signals:
+429 responses, latency inflation relative to the recent baseline, or a low
+x-ratelimit-remaining-* budget.
+
+Completion latency grows with the output length, and essay analyses, split
+parts and class reports produce very different amounts of it. When the
+caller passes the completion token count, latency is compared per output
+token (plus a fixed allowance for the prompt and connection overhead); the
+baseline is an EWMA of recent samples rather than the fastest call ever
+seen.
+
+The current limit is shared across concurrent worker invocations through a
+single DynamoDB coordination item.
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Any, Mapping, Optional
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+COORDINATION_STATE_ID = "llm-concurrency"
+
+
+def _remaining_fraction(headers: Mapping[str, Any], kind: str) -> Optional[float]:
+    """Return remaining/limit for `requests` or `tokens`, if both headers exist."""
+    try:
+        remaining = float(headers.get(f"x-ratelimit-remaining-{kind}"))
+        limit = float(headers.get(f"x-ratelimit-limit-{kind}"))
+    except (TypeError, ValueError):
+        return None
+    if limit <= 0:
+        return None
+    return remaining / limit
+
+
+class DynamoDBLimitCoordinator:
+    """
+    Shares the concurrency limit through one item in the worker state table.
+
+    Decreases are published immediately and only ever lower the shared value.
+    Increases are published at most every `sync_interval` seconds with an
+    optimistic check against the last value this worker saw, so a concurrent
+    decrease from another invocation always wins.
+    """
+
+    def __init__(self, table, state_id: str = COORDINATION_STATE_ID, sync_interval: float = 5.0):
+        self.table = table
+        self.state_id = state_id
+        self.sync_interval = sync_interval
+        self._last_seen: Optional[float] = None
+        self._last_sync = float("-inf")
+        self._lock = threading.Lock()
+
+    def _read(self) -> Optional[float]:
+        response = self.table.get_item(
+            Key={"state_id": self.state_id}, ConsistentRead=True
+        )
+        item = response.get("Item")
+        if not item or "concurrency_limit" not in item:
+            return None
+        return float(item["concurrency_limit"])
+
+    def _write(self, limit: float, condition: str, values: dict) -> bool:
+        try:
+            self.table.update_item(
+                Key={"state_id": self.state_id},
+                UpdateExpression="SET concurrency_limit = :limit, updated_at = :now",
+                ConditionExpression=condition,
+                ExpressionAttributeValues={
+                    ":limit": Decimal(str(round(limit, 2))),
+                    ":now": int(time.time()),
+                    **values,
+                },
+            )
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return False
+            raise
+
+    def sync(self, local_limit: float) -> float:
+        """
+        Reconcile the local limit with the shared one.
+
+        Returns the limit this worker should use from now on.
+        """
+        with self._lock:
+            return self._sync(local_limit)
+
+    def _sync(self, local_limit: float) -> float:
+        now = time.monotonic()
+        if now - self._last_sync < self.sync_interval:
+            return local_limit
+        self._last_sync = now
+
+        shared = self._read()
+        if shared is not None and shared != self._last_seen:
+            # Another invocation changed the limit since we last looked; adopt it
+            self._last_seen = shared
+            return shared
+
+        if shared is None:
+            condition = "attribute_not_exists(concurrency_limit)"
+            values = {}
+        else:
+            condition = "concurrency_limit = :seen"
+            values = {":seen": Decimal(str(round(shared, 2)))}
+
+        if self._write(local_limit, condition, values):
+            self._last_seen = round(local_limit, 2)
+            return local_limit
+
+        # Lost the race; take whatever is there now
+        shared = self._read()
+        self._last_seen = shared
+        return shared if shared is not None else local_limit
+
+    def publish_decrease(self, limit: float):
+        """Lower the shared limit unless another invocation already went lower."""
+        with self._lock:
+            if self._write(
+                limit,
+                "attribute_not_exists(concurrency_limit) OR concurrency_limit > :limit",
+                {},
+            ):
+                self._last_seen = round(limit, 2)
+
+
+class LatencyBaseline:
+    """EWMA of latency samples; not trusted until `min_samples` were seen."""
+
+    def __init__(self, alpha: float, min_samples: int):
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.value: Optional[float] = None
+        self.samples = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.samples >= self.min_samples
+
+    def update(self, sample: float):
+        self.samples += 1
+        if self.value is None:
+            self.value = sample
+        else:
+            self.value = self.value * (1 - self.alpha) + sample * self.alpha
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Thread-safe AIMD limiter for in-flight LLM requests.
+
+    Usage:
+        with limiter.slot():
+            started = time.monotonic()
+            response = make_request()
+            limiter.on_success(time.monotonic() - started, response_headers, completion_tokens)
+    Call limiter.on_throttle() when the request is rate limited (429).
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 32,
+        increase_step: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_inflation: float = 2.0,
+        baseline_alpha: float = 0.1,
+        baseline_min_samples: int = 3,
+        overhead_tokens: int = 100,
+        low_remaining_fraction: float = 0.1,
+        decrease_cooldown: float = 2.0,
+        coordinator: Optional[DynamoDBLimitCoordinator] = None,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.latency_inflation = latency_inflation
+        self.overhead_tokens = overhead_tokens
+        self.low_remaining_fraction = low_remaining_fraction
+        self.decrease_cooldown = decrease_cooldown
+        self.coordinator = coordinator
+
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        # Per-token samples and raw latencies (calls without token counts) apart
+        self._baselines = {
+            kind: LatencyBaseline(baseline_alpha, baseline_min_samples)
+            for kind in ("per_token", "per_call")
+        }
+        self._last_decrease = float("-inf")
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> float:
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _clamp(self, limit: float) -> float:
+        return min(max(limit, self.min_limit), self.max_limit)
+
+    def sync(self):
+        """Pull/push the shared limit via the coordinator (rate-limited)."""
+        if not self.coordinator:
+            return
+        try:
+            with self._cond:
+                local = self._limit
+            shared = self.coordinator.sync(local)
+            with self._cond:
+                self._limit = self._clamp(shared)
+                self._cond.notify_all()
+        except Exception as e:
+            logger.warning("Failed to sync concurrency limit", extra={"error": str(e)})
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= max(1, int(self._limit)):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now."""
+        with self._cond:
+            if self._in_flight >= max(1, int(self._limit)):
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _decrease(self, reason: str):
+        publish = None
+        with self._cond:
+            now = time.monotonic()
+            # One decrease per cooldown so a burst of 429s from the same window
+            # does not collapse the limit to the floor
+            if now - self._last_decrease < self.decrease_cooldown:
+                return
+            self._last_decrease = now
+            self._limit = self._clamp(self._limit * self.decrease_factor)
+            publish = self._limit
+        logger.warning(
+            "LLM concurrency limit decreased",
+            extra={"reason": reason, "concurrency_limit": publish},
+        )
+        if self.coordinator:
+            try:
+                self.coordinator.publish_decrease(publish)
+            except Exception as e:
+                logger.warning(
+                    "Failed to publish concurrency decrease", extra={"error": str(e)}
+                )
+
+    def on_throttle(self):
+        """Record a 429 / rate-limit error."""
+        self._decrease("rate_limited")
+
+    def on_success(
+        self,
+        latency: float,
+        headers: Optional[Mapping[str, Any]] = None,
+        completion_tokens: Optional[int] = None,
+    ):
+        """Record a successful call and adjust the limit."""
+        headers = headers or {}
+        for kind in ("requests", "tokens"):
+            fraction = _remaining_fraction(headers, kind)
+            if fraction is not None and fraction < self.low_remaining_fraction:
+                self._decrease(f"low_remaining_{kind}")
+                return
+
+        if completion_tokens:
+            kind, sample = "per_token", latency / (completion_tokens + self.overhead_tokens)
+        else:
+            kind, sample = "per_call", latency
+        with self._cond:
+            baseline = self._baselines[kind]
+            inflated = baseline.ready and sample > baseline.value * self.latency_inflation
+            baseline.update(sample)
+
+        if inflated:
+            self._decrease("latency_inflation")
+            return
+
+        with self._cond:
+            # Roughly +increase_step per full window of successful calls
+            self._limit = self._clamp(
+                self._limit + self.increase_step / max(self._limit, 1.0)
+            )
+            self._cond.notify_all()
+
+        self.sync()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield self
+        finally:
+            self.release()
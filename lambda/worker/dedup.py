@@ -0,0 +1,190 @@
+"""
+Near-duplicate essay detection with MinHash signatures and an LSH band index.
+
+Each essay is reduced to a set of word shingles and a fixed-length MinHash
+signature whose agreement rate estimates Jaccard similarity. Signatures are
+split into bands; essays sharing any band hash for the same teacher become
+candidates, and candidates are confirmed by comparing full signatures.
+
+The index lives in the EssaySignatures table:
+    band_key (PK)  "{teacher_id}#{band}#{band_hash}"
+    essay_id (SK)
+    assignment_id, signature (hex string)
+
+The band keys of an indexed essay are also stored on the essay item
+(signature_keys), so the API can remove its entries when the essay is
+deleted or revised.
+
+With the defaults (64 permutations, 16 bands of 4 rows) a pair at Jaccard 0.8
+becomes a candidate with probability ~0.9998 and a pair at 0.3 with ~0.12.
+"""
+
+import re
+import random
+import hashlib
+import logging
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+from boto3.dynamodb.conditions import Key
+
+logger = logging.getLogger()
+
+NUM_PERM = 64
+NUM_BANDS = 16
+SHINGLE_SIZE = 5
+
+# Universal hashing (a * x + b) mod p over the Mersenne prime 2^61 - 1
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(1)
+_PERMUTATIONS = [
+    (_rng.randint(1, _MERSENNE_PRIME - 1), _rng.randint(0, _MERSENNE_PRIME - 1))
+    for _ in range(NUM_PERM)
+]
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """
+    Lower-cased word n-grams of the essay text.
+
+    Punctuation and whitespace differences are ignored; texts shorter than
+    `size` words produce a single shingle of all their words.
+    """
+    normalized = unicodedata.normalize("NFKC", text).lower()
+    words = _WORD_RE.findall(normalized)
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _shingle_hash(shingle: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "big"
+    )
+
+
+def minhash_signature(shingle_set: Set[str]) -> List[int]:
+    """Compute the NUM_PERM-value MinHash signature of a shingle set."""
+    if not shingle_set:
+        return [_MAX_HASH] * NUM_PERM
+    hashes = [_shingle_hash(s) for s in shingle_set]
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def estimate_similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    """Estimated Jaccard similarity: the fraction of matching signature values."""
+    if len(sig_a) != len(sig_b) or not sig_a:
+        return 0.0
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+def encode_signature(signature: List[int]) -> str:
+    return "".join(f"{value:08x}" for value in signature)
+
+
+def decode_signature(encoded: str) -> List[int]:
+    return [int(encoded[i:i + 8], 16) for i in range(0, len(encoded), 8)]
+
+
+def band_keys(teacher_id: str, signature: List[int], bands: int = NUM_BANDS) -> List[str]:
+    """LSH partition keys, one per band, scoped to the teacher."""
+    rows = len(signature) // bands
+    keys = []
+    for band in range(bands):
+        chunk = signature[band * rows:(band + 1) * rows]
+        digest = hashlib.blake2b(
+            ",".join(map(str, chunk)).encode("ascii"), digest_size=8
+        ).hexdigest()
+        keys.append(f"{teacher_id}#{band}#{digest}")
+    return keys
+
+
+class SignatureIndex:
+    """LSH index of essay signatures backed by the EssaySignatures table."""
+
+    def __init__(self, table, bands: int = NUM_BANDS):
+        self.table = table
+        self.bands = bands
+
+    def _query_band(self, band_key: str) -> List[Dict[str, Any]]:
+        items = []
+        kwargs = {"KeyConditionExpression": Key("band_key").eq(band_key)}
+        while True:
+            response = self.table.query(**kwargs)
+            items.extend(response.get("Items", []))
+            if "LastEvaluatedKey" not in response:
+                return items
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def find_candidates(
+        self,
+        teacher_id: str,
+        signature: List[int],
+        threshold: float,
+        exclude_essay_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Indexed essays at or above `threshold`, most similar first.
+
+        Returns:
+            [{"essay_id", "assignment_id", "similarity", "band_key"}], where
+            band_key is the band the essay was found under
+        """
+        keys = band_keys(teacher_id, signature, self.bands)
+        with ThreadPoolExecutor(max_workers=min(len(keys), 8)) as executor:
+            results = list(executor.map(self._query_band, keys))
+
+        candidates = []
+        seen = set()
+        for band_key, items in zip(keys, results):
+            for item in items:
+                essay_id = item["essay_id"]
+                if essay_id == exclude_essay_id or essay_id in seen:
+                    continue
+                seen.add(essay_id)
+                similarity = estimate_similarity(
+                    signature, decode_signature(item["signature"])
+                )
+                if similarity >= threshold:
+                    candidates.append({
+                        "essay_id": essay_id,
+                        "assignment_id": item["assignment_id"],
+                        "similarity": similarity,
+                        "band_key": band_key,
+                    })
+        candidates.sort(key=lambda candidate: candidate["similarity"], reverse=True)
+        return candidates
+
+    def find_similar(
+        self,
+        teacher_id: str,
+        signature: List[int],
+        threshold: float,
+        exclude_essay_id: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """The most similar indexed essay at or above `threshold`, or None."""
+        candidates = self.find_candidates(teacher_id, signature, threshold, exclude_essay_id)
+        return candidates[0] if candidates else None
+
+    def add(
+        self, teacher_id: str, assignment_id: str, essay_id: str, signature: List[int]
+    ) -> List[str]:
+        """Index an essay under each of its band keys; returns the band keys."""
+        encoded = encode_signature(signature)
+        keys = band_keys(teacher_id, signature, self.bands)
+        with self.table.batch_writer() as batch:
+            for band_key in keys:
+                batch.put_item(Item={
+                    "band_key": band_key,
+                    "essay_id": essay_id,
+                    "assignment_id": assignment_id,
+                    "signature": encoded,
+                })
+        return keys
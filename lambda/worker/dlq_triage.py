@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+DLQ triage and bulk redrive tool for ProcessingDLQ.
+
+Drains the dead-letter queue with parallel receivers and classifies every
+message by joining it with its essay item and the worker's last_error:
+
+    malformed          - body is not a valid essay message
+    missing_essay      - essay item no longer exists
+    empty_text         - essay has no text to analyze
+    already_processed  - essay was processed after the message dead-lettered
+    llm_parse_failure  - last worker error was an unparseable LLM response
+    throttled          - last worker error was an OpenAI rate limit
+    error              - any other recorded worker error
+    unknown            - no worker error recorded on the essay
+
+Multi-essay messages (batch uploads, "essay_ids") dead-letter whole once
+SQS gives up on them. Triage replaces each one in the DLQ with one
+single-essay message per essay, which are then received, classified and
+redriven on their own like any other.
+
+Selected classes can be redriven to the processing queue with SendMessageBatch
+at a controlled rate, or purged. Everything else is left in the DLQ and becomes
+visible again once the visibility timeout expires.
+
+Usage:
+    python dlq_triage.py --dlq-url https://sqs.../vincent-vocab-essay-processing-dlq \\
+        --queue-url https://sqs.../vincent-vocab-essay-processing-queue \\
+        --redrive throttled,llm_parse_failure --purge already_processed --rate 10
+
+Pass --endpoint-url to point at a local SQS (ElasticMQ/LocalStack); tests use
+local_sqs.InMemorySQS.
+"""
+
+import os
+import sys
+import json
+import argparse
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import boto3
+
+from backfill import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+TRIAGE_CLASSES = (
+    "malformed",
+    "missing_essay",
+    "empty_text",
+    "already_processed",
+    "llm_parse_failure",
+    "throttled",
+    "error",
+    "unknown",
+)
+
+SAMPLES_PER_CLASS = 5
+
+
+def classify_message(message: Dict[str, Any], essays_table) -> Tuple[str, Dict[str, Any]]:
+    """
+    Classify one DLQ message.
+
+    Returns:
+        Tuple of (triage class, details for the report)
+    """
+    try:
+        body = json.loads(message["Body"])
+        assignment_id = body["assignment_id"]
+        essay_id = body["essay_id"]
+    except (ValueError, KeyError, TypeError):
+        return "malformed", {"message_id": message.get("MessageId")}
+
+    details = {"essay_id": essay_id, "assignment_id": assignment_id}
+
+    response = essays_table.get_item(
+        Key={"assignment_id": assignment_id, "essay_id": essay_id},
+        ProjectionExpression="essay_id, #status, essay_text, last_error",
+        ExpressionAttributeNames={"#status": "status"},
+    )
+    item = response.get("Item")
+    if not item:
+        return "missing_essay", details
+    if not (item.get("essay_text") or "").strip():
+        return "empty_text", details
+    if item.get("status") == "processed":
+        return "already_processed", details
+
+    last_error = item.get("last_error") or {}
+    error_class = last_error.get("error_class")
+    if last_error.get("message"):
+        details["last_error"] = last_error["message"]
+    if error_class in ("llm_parse_failure", "throttled"):
+        return error_class, details
+    if error_class:
+        return "error", details
+    return "unknown", details
+
+
+class TriageReport:
+    """Thread-safe per-class counters with a few sample essays per class."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {cls: 0 for cls in TRIAGE_CLASSES}
+        self.samples: Dict[str, List[Dict[str, Any]]] = {cls: [] for cls in TRIAGE_CLASSES}
+        self.redriven = 0
+        self.purged = 0
+        self.expanded = 0
+
+    def add(self, triage_class: str, details: Dict[str, Any]):
+        with self._lock:
+            self.counts[triage_class] += 1
+            if len(self.samples[triage_class]) < SAMPLES_PER_CLASS:
+                self.samples[triage_class].append(details)
+
+    def add_actions(self, redriven: int = 0, purged: int = 0, expanded: int = 0):
+        with self._lock:
+            self.redriven += redriven
+            self.purged += purged
+            self.expanded += expanded
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total": sum(self.counts.values()),
+                "counts": {k: v for k, v in self.counts.items() if v},
+                "samples": {k: v for k, v in self.samples.items() if v},
+                "redriven": self.redriven,
+                "purged": self.purged,
+                "expanded": self.expanded,
+            }
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def split_message(message: Dict[str, Any]) -> Optional[List[str]]:
+    """Single-essay bodies of a multi-essay message, or None for any other message."""
+    try:
+        body = json.loads(message["Body"])
+        essay_ids = body["essay_ids"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    if not isinstance(essay_ids, list) or not essay_ids:
+        return None
+    single = {k: v for k, v in body.items() if k not in ("essay_ids", "attempt")}
+    return [json.dumps({**single, "essay_id": essay_id}) for essay_id in essay_ids]
+
+
+def expand_message(
+    sqs_client, dlq_url: str, message: Dict[str, Any], bodies: List[str]
+) -> bool:
+    """
+    Replace a multi-essay message in the DLQ with its single-essay messages.
+
+    The original is only deleted once every replacement was sent. Returns
+    True if the message was replaced.
+    """
+    for chunk in _chunks(bodies, 10):
+        response = sqs_client.send_message_batch(
+            QueueUrl=dlq_url,
+            Entries=[{"Id": str(i), "MessageBody": body} for i, body in enumerate(chunk)],
+        )
+        if response.get("Failed"):
+            logger.warning(
+                "Failed to expand multi-essay message",
+                extra={"message_id": message.get("MessageId"),
+                       "error": response["Failed"][0].get("Message")},
+            )
+            return False
+    return delete_messages(sqs_client, dlq_url, [message]) == 1
+
+
+def delete_messages(sqs_client, dlq_url: str, messages: List[Dict[str, Any]]) -> int:
+    """Delete messages from the DLQ in batches of 10. Returns the number deleted."""
+    deleted = 0
+    for chunk in _chunks(messages, 10):
+        response = sqs_client.delete_message_batch(
+            QueueUrl=dlq_url,
+            Entries=[
+                {"Id": str(i), "ReceiptHandle": message["ReceiptHandle"]}
+                for i, message in enumerate(chunk)
+            ],
+        )
+        deleted += len(response.get("Successful", []))
+    return deleted
+
+
+def redrive_messages(
+    sqs_client,
+    dlq_url: str,
+    queue_url: str,
+    messages: List[Dict[str, Any]],
+    limiter: RateLimiter,
+) -> int:
+    """
+    Send messages back to the processing queue with SendMessageBatch and delete
+    the ones that were accepted from the DLQ. Returns the number redriven.
+    """
+    redriven = 0
+    for chunk in _chunks(messages, 10):
+        for _ in chunk:
+            limiter.acquire()
+        response = sqs_client.send_message_batch(
+            QueueUrl=queue_url,
+            Entries=[
+                {"Id": str(i), "MessageBody": message["Body"]}
+                for i, message in enumerate(chunk)
+            ],
+        )
+        sent = [chunk[int(entry["Id"])] for entry in response.get("Successful", [])]
+        for failure in response.get("Failed", []):
+            logger.warning(
+                "Redrive send failed",
+                extra={"message_id": chunk[int(failure["Id"])].get("MessageId"),
+                       "error": failure.get("Message")},
+            )
+        redriven += delete_messages(sqs_client, dlq_url, sent)
+    return redriven
+
+
+class MessageBudget:
+    """Shared cap on the number of messages received across all receivers."""
+
+    def __init__(self, max_messages: Optional[int]):
+        self._remaining = max_messages if max_messages else sys.maxsize
+        self._lock = threading.Lock()
+
+    def remaining(self) -> int:
+        with self._lock:
+            return self._remaining
+
+    def consume(self, count: int):
+        with self._lock:
+            self._remaining = max(0, self._remaining - count)
+
+
+def triage_receiver(
+    sqs_client,
+    essays_table,
+    dlq_url: str,
+    queue_url: Optional[str],
+    redrive_classes: Set[str],
+    purge_classes: Set[str],
+    report: TriageReport,
+    limiter: RateLimiter,
+    budget: MessageBudget,
+    visibility_timeout: int,
+):
+    """Receive, classify and act on DLQ messages until the queue looks empty."""
+    while budget.remaining() > 0:
+        response = sqs_client.receive_message(
+            QueueUrl=dlq_url,
+            MaxNumberOfMessages=min(10, budget.remaining()),
+            VisibilityTimeout=visibility_timeout,
+            WaitTimeSeconds=1,
+            AttributeNames=["ApproximateReceiveCount"],
+        )
+        messages = response.get("Messages", [])
+        if not messages:
+            return
+        budget.consume(len(messages))
+
+        to_redrive, to_purge = [], []
+        expanded = 0
+        for message in messages:
+            bodies = split_message(message)
+            if bodies is not None:
+                # Its essays come back as separate messages and are triaged then
+                expanded += expand_message(sqs_client, dlq_url, message, bodies)
+                continue
+            try:
+                triage_class, details = classify_message(message, essays_table)
+            except Exception as e:
+                logger.warning(
+                    "Failed to classify message",
+                    extra={"message_id": message.get("MessageId"), "error": str(e)},
+                )
+                triage_class, details = "unknown", {"message_id": message.get("MessageId")}
+            report.add(triage_class, details)
+            if triage_class in redrive_classes:
+                to_redrive.append(message)
+            elif triage_class in purge_classes:
+                to_purge.append(message)
+
+        redriven = (
+            redrive_messages(sqs_client, dlq_url, queue_url, to_redrive, limiter)
+            if to_redrive else 0
+        )
+        purged = delete_messages(sqs_client, dlq_url, to_purge) if to_purge else 0
+        report.add_actions(redriven=redriven, purged=purged, expanded=expanded)
+
+
+def run_triage(
+    sqs_client,
+    essays_table,
+    dlq_url: str,
+    queue_url: Optional[str] = None,
+    redrive_classes: Iterable[str] = (),
+    purge_classes: Iterable[str] = (),
+    workers: int = 4,
+    rate: float = 10.0,
+    visibility_timeout: int = 600,
+    max_messages: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Drain the DLQ in parallel and return the triage report."""
+    redrive_classes = set(redrive_classes)
+    purge_classes = set(purge_classes)
+    unknown = (redrive_classes | purge_classes) - set(TRIAGE_CLASSES)
+    if unknown:
+        raise ValueError(f"Unknown triage classes: {', '.join(sorted(unknown))}")
+    if redrive_classes & purge_classes:
+        raise ValueError("A class cannot be both redriven and purged")
+    if redrive_classes and not queue_url:
+        raise ValueError("queue_url is required to redrive messages")
+
+    report = TriageReport()
+    limiter = RateLimiter(rate)
+    budget = MessageBudget(max_messages)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                triage_receiver,
+                sqs_client,
+                essays_table,
+                dlq_url,
+                queue_url,
+                redrive_classes,
+                purge_classes,
+                report,
+                limiter,
+                budget,
+                visibility_timeout,
+            )
+            for _ in range(workers)
+        ]
+        for future in futures:
+            future.result()
+
+    return report.as_dict()
+
+
+def _parse_classes(value: str) -> List[str]:
+    return [c.strip() for c in value.split(",") if c.strip()] if value else []
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Classify ProcessingDLQ messages and redrive selected classes."
+    )
+    parser.add_argument("--dlq-url", default=os.environ.get("ESSAY_PROCESSING_DLQ_URL"),
+                        help="DLQ URL (default: $ESSAY_PROCESSING_DLQ_URL)")
+    parser.add_argument("--queue-url", default=os.environ.get("ESSAY_PROCESSING_QUEUE_URL"),
+                        help="Processing queue URL (default: $ESSAY_PROCESSING_QUEUE_URL)")
+    parser.add_argument("--table", default=os.environ.get("ESSAYS_TABLE"),
+                        help="Essays table name (default: $ESSAYS_TABLE)")
+    parser.add_argument("--redrive", default="",
+                        help=f"Comma-separated classes to redrive ({', '.join(TRIAGE_CLASSES)})")
+    parser.add_argument("--purge", default="",
+                        help="Comma-separated classes to delete from the DLQ")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel receivers")
+    parser.add_argument("--rate", type=float, default=10.0,
+                        help="Max messages redriven per second")
+    parser.add_argument("--visibility-timeout", type=int, default=600,
+                        help="Seconds received messages stay hidden during triage")
+    parser.add_argument("--max-messages", type=int, default=None,
+                        help="Stop after receiving this many messages")
+    parser.add_argument("--endpoint-url", default=None,
+                        help="SQS endpoint override for a local SQS")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    if not args.dlq_url or not args.table:
+        logger.error("--dlq-url and --table are required")
+        return 1
+
+    sqs_client = boto3.client("sqs", endpoint_url=args.endpoint_url)
+    essays_table = boto3.resource("dynamodb").Table(args.table)
+
+    report = run_triage(
+        sqs_client,
+        essays_table,
+        args.dlq_url,
+        queue_url=args.queue_url,
+        redrive_classes=_parse_classes(args.redrive),
+        purge_classes=_parse_classes(args.purge),
+        workers=args.workers,
+        rate=args.rate,
+        visibility_timeout=args.visibility_timeout,
+        max_messages=args.max_messages,
+    )
+    print(json.dumps(report, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Essay completion events published by the worker.
+
+When process_essay finishes (or fails) the worker publishes a compact event
+so downstream consumers (push notifications, aggregates, caches) can react
+without polling the API:
+
+    {
+        "event_type": "essay.processed" | "essay.skipped" | "essay.failed",
+        "essay_id": "...",
+        "assignment_id": "...",
+        "teacher_id": "...",
+        "status": "processed" | "skipped" | "failed",
+        "analysis_source": "llm" | "incremental" | "duplicate" | "local",
+        "error_class": "...",            # failures only
+        "timings": {"load_ms": 12, "analysis_ms": 2400, "store_ms": 18, "total_ms": 2430},
+        "occurred_at": "2025-01-18T12:00:15.123456"
+    }
+
+In AWS the channel is an SNS topic (ESSAY_EVENTS_TOPIC_ARN). Event type,
+status and teacher_id are also sent as message attributes so subscriptions
+can use filter policies. Without a topic the in-process publisher is used;
+it keeps recent events and calls local subscribers, which is what tests and
+local runs use.
+
+With ESSAY_PROGRESS_TABLE set, events are also recorded per assignment
+(sort key "{occurred_at}#{essay_id}", expiring after a day) for the API's
+progress stream (GET /essays/assignment/{assignment_id}/events), which reads
+only what is new since its last poll.
+"""
+
+import json
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger()
+
+EVENT_TYPES = ("essay.processed", "essay.skipped", "essay.failed")
+
+# Progress events only need to outlive the uploads they report on
+PROGRESS_RETENTION_HOURS = 24
+
+
+def build_completion_event(
+    essay_id: str,
+    assignment_id: str,
+    teacher_id: str,
+    status: str,
+    timings: Dict[str, int],
+    analysis_source: Optional[str] = None,
+    error_class: Optional[str] = None,
+) -> Dict[str, Any]:
+    event = {
+        "event_type": f"essay.{status}",
+        "essay_id": essay_id,
+        "assignment_id": assignment_id,
+        "teacher_id": teacher_id,
+        "status": status,
+        "timings": timings,
+        "occurred_at": datetime.utcnow().isoformat(),
+    }
+    if analysis_source:
+        event["analysis_source"] = analysis_source
+    if error_class:
+        event["error_class"] = error_class
+    return event
+
+
+class SNSEventPublisher:
+    """Publishes events to an SNS topic."""
+
+    def __init__(self, topic_arn: str, sns_client):
+        self.topic_arn = topic_arn
+        self.sns_client = sns_client
+
+    def publish(self, event: Dict[str, Any]):
+        self.sns_client.publish(
+            TopicArn=self.topic_arn,
+            Message=json.dumps(event, default=str),
+            MessageAttributes={
+                "event_type": {"DataType": "String", "StringValue": event["event_type"]},
+                "status": {"DataType": "String", "StringValue": event["status"]},
+                "teacher_id": {"DataType": "String", "StringValue": event["teacher_id"]},
+            },
+        )
+
+
+class InMemoryEventPublisher:
+    """In-process stand-in for the topic: records events and fans out to subscribers."""
+
+    def __init__(self, max_events: int = 1000):
+        self.events = deque(maxlen=max_events)
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def publish(self, event: Dict[str, Any]):
+        with self._lock:
+            self.events.append(event)
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.warning(
+                    "Event subscriber failed",
+                    extra={"event_type": event.get("event_type"), "error": str(e)},
+                )
+
+
+class ProgressTablePublisher:
+    """Records events per assignment in the progress table."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def publish(self, event: Dict[str, Any]):
+        occurred_at = datetime.fromisoformat(event["occurred_at"])
+        self.table.put_item(Item={
+            "assignment_id": event["assignment_id"],
+            "event_key": f"{event['occurred_at']}#{event['essay_id']}",
+            "essay_id": event["essay_id"],
+            "teacher_id": event["teacher_id"],
+            "status": event["status"],
+            "occurred_at": event["occurred_at"],
+            "expires_at": int((occurred_at + timedelta(hours=PROGRESS_RETENTION_HOURS)).timestamp()),
+        })
+
+
+class FanOutPublisher:
+    """Publishes each event to several publishers; one failing does not stop the others."""
+
+    def __init__(self, publishers: List[Any]):
+        self.publishers = publishers
+
+    def publish(self, event: Dict[str, Any]):
+        errors = []
+        for publisher in self.publishers:
+            try:
+                publisher.publish(event)
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+
+def create_publisher(
+    topic_arn: Optional[str],
+    sns_client_factory: Callable[[], Any],
+    progress_table=None,
+):
+    """
+    SNS publisher when a topic is configured, otherwise the in-process one;
+    plus the progress table publisher when a table is given.
+    """
+    if topic_arn:
+        publisher = SNSEventPublisher(topic_arn, sns_client_factory())
+    else:
+        publisher = InMemoryEventPublisher()
+    if progress_table is None:
+        return publisher
+    return FanOutPublisher([publisher, ProgressTablePublisher(progress_table)])
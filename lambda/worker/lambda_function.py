@@ -5,20 +5,44 @@ Loads essay from DynamoDB, calls OpenAI for analysis, updates DynamoDB.
 
 import os
 import json
+import time
 import boto3
 import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from decimal import Decimal
 
-# Optional OpenAI import
-try:
-    from openai import OpenAI
+from botocore.exceptions import ClientError
 
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    OpenAI = None
+from class_report import maybe_generate_class_report
+from concurrency import AdaptiveConcurrencyLimiter, DynamoDBLimitCoordinator
+from dedup import SignatureIndex, band_keys, minhash_signature, shingles
+from events import build_completion_event, create_publisher
+from llm_backends import create_backend, is_rate_limit_error
+from paragraphs import (
+    build_paragraph_cache,
+    merge_analyses,
+    plan_incremental_analysis,
+    split_paragraphs,
+)
+from preprocess import local_analysis, preprocess_essay
+from shadow import build_evaluation, candidate_id, in_sample, usage_stats
+from usage import merge_usage, record_usage
+from wire_schema import (
+    MODES,
+    PARTS,
+    PROMPT_VERSIONS,
+    SCHEMAS,
+    SYSTEM_PROMPT,
+    SchemaError,
+    build_part_prompt,
+    build_prompt,
+    expand_analysis,
+    expand_review,
+    merge_parts,
+)
 
 # Configure structured logging
 logger = logging.getLogger()
@@ -26,28 +50,141 @@ logger.setLevel(logging.INFO)
 
 # Initialize AWS clients
 dynamodb = boto3.resource("dynamodb")
+sqs = boto3.client("sqs")
 
 # Environment variables
 ESSAYS_TABLE = os.environ.get("ESSAYS_TABLE")
+USAGE_LEDGER_TABLE = os.environ.get("USAGE_LEDGER_TABLE")
+WORKER_STATE_TABLE = os.environ.get("WORKER_STATE_TABLE")
+ESSAY_SIGNATURES_TABLE = os.environ.get("ESSAY_SIGNATURES_TABLE")
+CLASS_REPORTS_TABLE = os.environ.get("CLASS_REPORTS_TABLE")
+SHADOW_EVALUATIONS_TABLE = os.environ.get("SHADOW_EVALUATIONS_TABLE")
+ESSAY_PROCESSING_QUEUE_URL = os.environ.get("ESSAY_PROCESSING_QUEUE_URL")
+ESSAY_PROCESSING_DLQ_URL = os.environ.get("ESSAY_PROCESSING_DLQ_URL")
+ESSAY_EVENTS_TOPIC_ARN = os.environ.get("ESSAY_EVENTS_TOPIC_ARN")
+ESSAY_PROGRESS_TABLE = os.environ.get("ESSAY_PROGRESS_TABLE")
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "gpt-4.1-mini")
 
-# Initialize OpenAI client
-openai_client = None
-if OPENAI_AVAILABLE and OPENAI_API_KEY:
-    try:
-        openai_client = OpenAI(api_key=OPENAI_API_KEY)
-        logger.info("OpenAI client initialized successfully")
-    except Exception as e:
-        logger.error(
-            "Failed to initialize OpenAI client", extra={"error": str(e)}, exc_info=True
-        )
-        openai_client = None
-elif not OPENAI_AVAILABLE:
-    logger.error("OpenAI package not available")
-elif not OPENAI_API_KEY:
-    logger.error("OPENAI_API_KEY not set")
+# Wire contract of the analysis response: "compact" (short keys, bounded
+# review) or the original "verbose" one; see wire_schema
+ANALYSIS_SCHEMA = os.environ.get("ANALYSIS_SCHEMA", "compact")
+if ANALYSIS_SCHEMA not in SCHEMAS:
+    ANALYSIS_SCHEMA = "compact"
+
+# "split" requests the compact fields as parallel per-part completions
+# (lower latency, more prompt tokens); only applies to the compact schema
+ANALYSIS_MODE = os.environ.get("ANALYSIS_MODE", "single")
+if ANALYSIS_MODE not in MODES:
+    ANALYSIS_MODE = "single"
+
+# Bump (in wire_schema.PROMPT_VERSIONS) whenever the analysis prompt changes
+# so stale essays can be backfilled
+PROMPT_VERSION = PROMPT_VERSIONS[ANALYSIS_SCHEMA]
+
+# Shadow evaluation: this fraction of full LLM analyses is also run with the
+# candidate model/schema/mode and compared in SHADOW_EVALUATIONS_TABLE
+SHADOW_SAMPLE_RATE = float(os.environ.get("SHADOW_SAMPLE_RATE", "0"))
+SHADOW_MODEL = os.environ.get("SHADOW_MODEL") or OPENAI_MODEL
+SHADOW_SCHEMA = os.environ.get("SHADOW_SCHEMA") or ANALYSIS_SCHEMA
+SHADOW_MODE = os.environ.get("SHADOW_MODE") or ANALYSIS_MODE
+
+# Estimated Jaccard similarity at which a prior analysis is reused
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+
+# Multi-essay messages: failed subsets are re-enqueued this many times
+# (with a growing delay) before they are sent to the DLQ
+MAX_ESSAY_ATTEMPTS = int(os.environ.get("MAX_ESSAY_ATTEMPTS", "3"))
+REQUEUE_BASE_DELAY_SECONDS = int(os.environ.get("REQUEUE_BASE_DELAY_SECONDS", "30"))
+
+# Per-invocation budget: at most this many essays are started, and none once
+# less than INVOCATION_RESERVE_SECONDS of the Lambda timeout remain (room for
+# in-flight analyses and the class report). The rest are re-enqueued
+# untouched, so a timeout never retries essays that already finished.
+MAX_ESSAYS_PER_INVOCATION = int(os.environ.get("MAX_ESSAYS_PER_INVOCATION", "30"))
+INVOCATION_RESERVE_SECONDS = int(os.environ.get("INVOCATION_RESERVE_SECONDS", "60"))
+
+# Adaptive in-flight limit for OpenAI calls (AIMD, shared via WORKER_STATE_TABLE)
+LLM_INITIAL_CONCURRENCY = float(os.environ.get("LLM_INITIAL_CONCURRENCY", "4"))
+LLM_MIN_CONCURRENCY = float(os.environ.get("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "16"))
+
+# LLM backends in failover order ("openai", "local"); see llm_backends
+LLM_BACKENDS = [
+    name.strip() for name in os.environ.get("LLM_BACKENDS", "openai").split(",") if name.strip()
+]
+LLM_SPILLOVER = os.environ.get("LLM_SPILLOVER", "false").lower() == "true"
+LLM_FAILURE_THRESHOLD = int(os.environ.get("LLM_FAILURE_THRESHOLD", "3"))
+LLM_COOLDOWN_SECONDS = float(os.environ.get("LLM_COOLDOWN_SECONDS", "30"))
+LOCAL_LLM_BASE_URL = os.environ.get("LOCAL_LLM_BASE_URL")
+LOCAL_LLM_MODEL = os.environ.get("LOCAL_LLM_MODEL", "local-model")
+LOCAL_LLM_API_KEY = os.environ.get("LOCAL_LLM_API_KEY", "not-needed")
+LOCAL_LLM_MAX_CONCURRENCY = int(os.environ.get("LOCAL_LLM_MAX_CONCURRENCY", "2"))
+LOCAL_LLM_TIMEOUT_SECONDS = float(os.environ.get("LOCAL_LLM_TIMEOUT_SECONDS", "120"))
 
 essays_table = dynamodb.Table(ESSAYS_TABLE) if ESSAYS_TABLE else None
+usage_ledger_table = dynamodb.Table(USAGE_LEDGER_TABLE) if USAGE_LEDGER_TABLE else None
+worker_state_table = dynamodb.Table(WORKER_STATE_TABLE) if WORKER_STATE_TABLE else None
+signature_index = (
+    SignatureIndex(dynamodb.Table(ESSAY_SIGNATURES_TABLE)) if ESSAY_SIGNATURES_TABLE else None
+)
+class_reports_table = dynamodb.Table(CLASS_REPORTS_TABLE) if CLASS_REPORTS_TABLE else None
+shadow_table = dynamodb.Table(SHADOW_EVALUATIONS_TABLE) if SHADOW_EVALUATIONS_TABLE else None
+progress_table = dynamodb.Table(ESSAY_PROGRESS_TABLE) if ESSAY_PROGRESS_TABLE else None
+# Completion events go to SNS when configured, otherwise to an in-process
+# publisher, and to the progress table read by the API's progress stream
+event_publisher = create_publisher(
+    ESSAY_EVENTS_TOPIC_ARN, lambda: boto3.client("sns"), progress_table
+)
+
+llm_limiter = AdaptiveConcurrencyLimiter(
+    initial_limit=LLM_INITIAL_CONCURRENCY,
+    min_limit=LLM_MIN_CONCURRENCY,
+    max_limit=LLM_MAX_CONCURRENCY,
+    coordinator=(
+        DynamoDBLimitCoordinator(worker_state_table) if worker_state_table else None
+    ),
+)
+
+llm_backend = create_backend(
+    LLM_BACKENDS,
+    openai_api_key=OPENAI_API_KEY,
+    openai_model=OPENAI_MODEL,
+    openai_limiter=llm_limiter,
+    local_base_url=LOCAL_LLM_BASE_URL,
+    local_model=LOCAL_LLM_MODEL,
+    local_api_key=LOCAL_LLM_API_KEY,
+    local_max_concurrency=LOCAL_LLM_MAX_CONCURRENCY,
+    local_timeout_seconds=LOCAL_LLM_TIMEOUT_SECONDS,
+    spillover=LLM_SPILLOVER,
+    failure_threshold=LLM_FAILURE_THRESHOLD,
+    cooldown_seconds=LLM_COOLDOWN_SECONDS,
+)
+
+
+class EssayNotFoundError(ValueError):
+    """The essay referenced by a queue message does not exist."""
+
+
+class EmptyEssayError(ValueError):
+    """The essay exists but has no text to analyze."""
+
+
+class AnalysisParseError(ValueError):
+    """The LLM response was not valid JSON or lacked required fields."""
+
+
+def classify_error(error: Exception) -> str:
+    """Map a processing failure to a coarse class used for DLQ triage."""
+    if isinstance(error, EssayNotFoundError):
+        return "missing_essay"
+    if isinstance(error, EmptyEssayError):
+        return "empty_text"
+    if isinstance(error, AnalysisParseError):
+        return "llm_parse_failure"
+    if is_rate_limit_error(error):
+        return "throttled"
+    return "error"
 
 
 def convert_floats_to_decimal(obj):
@@ -64,86 +201,383 @@ def convert_floats_to_decimal(obj):
         return obj
 
 
-def analyze_essay_with_openai(essay_text: str) -> Dict[str, Any]:
+def is_analysis_stale(
+    essay_item: Dict[str, Any],
+    prompt_version: int = PROMPT_VERSION,
+    model: str = OPENAI_MODEL,
+) -> bool:
     """
-    Analyze essay using OpenAI GPT-4.1-mini and return vocabulary analysis.
+    Check whether a processed essay was analyzed with an older prompt or model.
+
+    Essays processed before versions were recorded have no prompt_version and
+    are treated as version 0.
     """
-    if not openai_client:
-        raise ValueError("OpenAI client not initialized")
+    stored_version = int(essay_item.get("prompt_version", 0))
+    stored_model = essay_item.get("analysis_model")
+    return stored_version < prompt_version or stored_model != model
 
-    prompt = f"""Analyze the following student essay and provide vocabulary feedback in JSON format.
 
-Essay:
-{essay_text}
+def find_near_duplicate(
+    teacher_id: str, essay_id: str, signature
+) -> Optional[Dict[str, Any]]:
+    """
+    Find a processed essay by the same teacher whose text is a near duplicate.
 
-Please provide a JSON response with the following structure:
-{{
-  "correctness_review": "A high-level review (2-3 sentences) of whether words and phrases were used correctly in context.",
-  "vocabulary_used": ["list", "of", "vocabulary", "words", "and", "phrases", "that", "indicate", "the", "writer's", "current", "level"],
-  "recommended_vocabulary": ["list", "of", "new", "vocabulary", "words", "that", "match", "or", "slightly", "exceed", "the", "writer's", "level"]
-}}
+    Candidates are tried from most to least similar. Only matches with a
+    current (non-stale) analysis of the text that was indexed are returned,
+    so a reused analysis is always as good as a fresh one. Index entries of
+    deleted or revised essays are skipped: the item is gone, or its
+    signature_keys no longer include the band the candidate was found under.
 
-Focus on:
-- Vocabulary words/phrases that demonstrate the student's current level (include 5-10 examples)
-- Recommended vocabulary that would help the student grow (5-10 words that are slightly more advanced but appropriate)
-- Be specific and educational in your recommendations
+    Returns:
+        {"essay_id", "assignment_id", "similarity", "vocabulary_analysis"} or None
+    """
+    candidates = signature_index.find_candidates(
+        teacher_id, signature, NEAR_DUPLICATE_THRESHOLD, exclude_essay_id=essay_id
+    )
+    for candidate in candidates:
+        response = essays_table.get_item(
+            Key={"assignment_id": candidate["assignment_id"], "essay_id": candidate["essay_id"]}
+        )
+        item = response.get("Item")
+        if (
+            not item
+            or item.get("status") != "processed"
+            or "vocabulary_analysis" not in item
+            or is_analysis_stale(item)
+            # Essays indexed before signature_keys was recorded have none
+            or candidate["band_key"] not in item.get("signature_keys", [candidate["band_key"]])
+        ):
+            continue
 
-Return ONLY valid JSON, no additional text."""
+        match = {key: value for key, value in candidate.items() if key != "band_key"}
+        return {**match, "vocabulary_analysis": item["vocabulary_analysis"]}
+    return None
 
-    try:
-        response = openai_client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert English teacher analyzing student essays for vocabulary development. Always respond with valid JSON only.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.7,
-            response_format={"type": "json_object"},
-        )
 
-        content = response.choices[0].message.content
-        logger.info("OpenAI response received", extra={"response_length": len(content)})
+def call_openai_json(
+    system_prompt: str,
+    prompt: str,
+    temperature: float = 0.7,
+    model: Optional[str] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Make one JSON-mode chat completion through the configured LLM backends
+    (model, default the backend's own; OPENAI_MODEL for OpenAI).
 
-        # Parse JSON response
-        analysis_data = json.loads(content)
+    Each backend gates in-flight calls with its own concurrency limiter;
+    outages fail over to the next backend (see llm_backends).
 
-        # Validate required fields
-        if not all(
-            key in analysis_data
-            for key in [
-                "correctness_review",
-                "vocabulary_used",
-                "recommended_vocabulary",
-            ]
-        ):
-            raise ValueError("Missing required fields in OpenAI response")
+    Returns:
+        Tuple of (parsed JSON response, token usage record)
+    """
+    if not llm_backend:
+        raise ValueError("LLM backend not initialized")
+
+    try:
+        content, usage = llm_backend.complete(system_prompt, prompt, temperature, model)
+        logger.info(
+            "LLM response received",
+            extra={
+                "backend": usage.get("backend"),
+                "response_length": len(content),
+                "prompt_tokens": usage["prompt_tokens"],
+                "cached_tokens": usage["cached_tokens"],
+                "completion_tokens": usage["completion_tokens"],
+            },
+        )
 
-        return analysis_data
+        return json.loads(content), usage
     except json.JSONDecodeError as e:
         content_preview = content[:200] if "content" in locals() else "N/A"
         logger.error(
-            "Failed to parse OpenAI JSON response",
+            "Failed to parse LLM JSON response",
             extra={"error": str(e), "content": content_preview},
         )
-        raise ValueError(f"Invalid JSON response from OpenAI: {str(e)}")
+        raise AnalysisParseError(f"Invalid JSON response from LLM: {str(e)}")
     except Exception as e:
-        logger.error("OpenAI API call failed", extra={"error": str(e)}, exc_info=True)
+        logger.error("LLM API call failed", extra={"error": str(e)}, exc_info=True)
         raise
 
 
-def process_essay(teacher_id: str, assignment_id: str, student_id: str, essay_id: str):
+def analyze_essay_with_openai(
+    essay_text: str,
+    schema: Optional[str] = None,
+    mode: Optional[str] = None,
+    model: Optional[str] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Analyze essay using OpenAI (model, default OPENAI_MODEL).
+
+    The model answers in the ANALYSIS_SCHEMA wire contract (see wire_schema),
+    which is expanded into the stored vocabulary_analysis shape. In split
+    ANALYSIS_MODE the parts are requested in parallel
+    (see analyze_essay_split).
+
+    Returns:
+        Tuple of (vocabulary analysis, token usage record)
+    """
+    schema = schema or ANALYSIS_SCHEMA
+    if (mode or ANALYSIS_MODE) == "split" and schema == "compact":
+        return analyze_essay_split(essay_text, model)
+
+    data, usage = call_openai_json(
+        SYSTEM_PROMPT, build_prompt(essay_text, schema), model=model
+    )
+
+    try:
+        return expand_analysis(data, schema), usage
+    except SchemaError as e:
+        raise AnalysisParseError(str(e))
+
+
+def review_essay_with_openai(
+    essay_text: str, model: Optional[str] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Review-only completion over the whole essay (the split-mode review part).
+
+    Returns:
+        Tuple of (correctness review, token usage record)
+    """
+    data, usage = call_openai_json(
+        SYSTEM_PROMPT, build_part_prompt(essay_text, "review"), model=model
+    )
+    try:
+        return expand_review(data), usage
+    except SchemaError as e:
+        raise AnalysisParseError(str(e))
+
+
+def analyze_essay_split(
+    essay_text: str, model: Optional[str] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Analyze essay as parallel per-part completions (review, used, recommended).
+
+    Each part holds its own backend limiter slot. The merged usage record sums the
+    parts and carries per-part latency and tokens under "parts".
+
+    Returns:
+        Tuple of (vocabulary analysis, token usage record)
+    """
+
+    def run_part(part: str):
+        started = time.monotonic()
+        data, usage = call_openai_json(
+            SYSTEM_PROMPT, build_part_prompt(essay_text, part), model=model
+        )
+        return part, data, usage, _elapsed_ms(started)
+
+    with ThreadPoolExecutor(max_workers=len(PARTS)) as executor:
+        results = list(executor.map(run_part, PARTS))
+
+    try:
+        analysis = merge_parts({part: data for part, data, _, _ in results})
+    except SchemaError as e:
+        raise AnalysisParseError(str(e))
+
+    usage = merge_usage([part_usage for _, _, part_usage, _ in results])
+    usage["parts"] = {
+        part: {
+            "latency_ms": latency_ms,
+            "prompt_tokens": part_usage["prompt_tokens"],
+            "completion_tokens": part_usage["completion_tokens"],
+        }
+        for part, _, part_usage, latency_ms in results
+    }
+    return analysis, usage
+
+
+def _elapsed_ms(started: float) -> int:
+    return int((time.monotonic() - started) * 1000)
+
+
+def publish_completion_event(event: Dict[str, Any]):
+    """Publish an essay completion event (best effort)."""
+    try:
+        event_publisher.publish(event)
+    except Exception as e:
+        logger.warning(
+            "Failed to publish completion event",
+            extra={"essay_id": event.get("essay_id"), "error": str(e)},
+        )
+
+
+def generate_class_reports(assignments: List[Tuple[str, str]]):
+    """
+    Generate class reports for assignments whose essays are now all processed.
+
+    Best effort: a failed report is logged and retried by the next batch that
+    touches the assignment.
+    """
+    if not class_reports_table or not essays_table:
+        return
+
+    for teacher_id, assignment_id in assignments:
+        try:
+            report = maybe_generate_class_report(
+                teacher_id,
+                assignment_id,
+                essays_table,
+                class_reports_table,
+                call_openai_json,
+                OPENAI_MODEL,
+            )
+            if report and usage_ledger_table:
+                record_usage(
+                    usage_ledger_table,
+                    teacher_id,
+                    assignment_id,
+                    report["token_usage"],
+                    usage_date=report["generated_at"][:10],
+                    essay_count=0,
+                )
+        except Exception as e:
+            logger.error(
+                "Failed to generate class report",
+                extra={"assignment_id": assignment_id, "error": str(e)},
+                exc_info=True,
+            )
+
+
+def run_shadow_evaluation(
+    teacher_id: str,
+    assignment_id: str,
+    essay_id: str,
+    essay_text: str,
+    production_analysis: Dict[str, Any],
+    production_usage: Optional[Dict[str, Any]],
+    production_latency_ms: int,
+):
     """
-    Process a single essay: Load → Process → Store
+    Run the shadow candidate on an essay and store the comparison (best effort).
+
+    Only writes to SHADOW_EVALUATIONS_TABLE; the essay is not touched.
+    """
+    candidate = candidate_id(SHADOW_MODEL, SHADOW_SCHEMA, SHADOW_MODE)
+    started = time.monotonic()
+    try:
+        analysis, usage = analyze_essay_with_openai(
+            essay_text, schema=SHADOW_SCHEMA, mode=SHADOW_MODE, model=SHADOW_MODEL
+        )
+        result = {"candidate_analysis": analysis, "candidate_usage": usage}
+    except Exception as e:
+        result = {"error": f"{classify_error(e)}: {e}"}
+
+    try:
+        item = build_evaluation(
+            candidate,
+            essay_id,
+            assignment_id,
+            teacher_id,
+            production_analysis,
+            usage_stats(production_usage, production_latency_ms, OPENAI_MODEL),
+            SHADOW_MODEL,
+            _elapsed_ms(started),
+            **result,
+        )
+        shadow_table.put_item(Item=convert_floats_to_decimal(item))
+    except Exception as e:
+        logger.warning(
+            "Failed to store shadow evaluation",
+            extra={"essay_id": essay_id, "candidate_id": candidate, "error": str(e)},
+        )
+
+
+def process_essay(
+    teacher_id: str,
+    assignment_id: str,
+    student_id: str,
+    essay_id: str,
+    reanalyze: bool = False,
+):
+    """
+    Process a single essay: Load → Preprocess → Deduplicate → Process → Store
+
+    Publishes an essay.processed / essay.skipped / essay.failed completion
+    event with step timings when done. Sampled full LLM analyses are then
+    re-run with the shadow candidate (see run_shadow_evaluation).
 
     Args:
         teacher_id: Teacher ID
         assignment_id: Assignment ID
         student_id: Student ID
         essay_id: Essay ID
+        reanalyze: Re-run analysis for a processed essay if its stored
+            prompt/model version is stale (used by the backfill command)
+
+    Returns:
+        The stored vocabulary_analysis, or None if the essay was skipped
+    """
+    trace: Dict[str, Any] = {"timings": {}}
+    started = time.monotonic()
+    try:
+        vocabulary_analysis = _run_pipeline(
+            teacher_id, assignment_id, student_id, essay_id, reanalyze, trace
+        )
+    except Exception as e:
+        trace["timings"]["total_ms"] = _elapsed_ms(started)
+        publish_completion_event(build_completion_event(
+            essay_id,
+            assignment_id,
+            teacher_id,
+            "failed",
+            trace["timings"],
+            error_class=classify_error(e),
+        ))
+        raise
+
+    if trace.get("discarded"):
+        # The essay was revised meanwhile; its new revision's message reports it
+        return None
+
+    trace["timings"]["total_ms"] = _elapsed_ms(started)
+    publish_completion_event(build_completion_event(
+        essay_id,
+        assignment_id,
+        teacher_id,
+        "processed" if vocabulary_analysis is not None else "skipped",
+        trace["timings"],
+        analysis_source=trace.get("source"),
+    ))
+
+    # Shadow runs happen after the result is stored and announced, so they
+    # never delay or alter what users see
+    if (
+        shadow_table
+        and trace.get("source") == "llm"
+        and in_sample(essay_id, SHADOW_SAMPLE_RATE)
+    ):
+        run_shadow_evaluation(
+            teacher_id,
+            assignment_id,
+            essay_id,
+            trace["analyzed_text"],
+            vocabulary_analysis,
+            trace.get("token_usage"),
+            trace["timings"]["analysis_ms"],
+        )
+    return vocabulary_analysis
+
+
+def _run_pipeline(
+    teacher_id: str,
+    assignment_id: str,
+    student_id: str,
+    essay_id: str,
+    reanalyze: bool,
+    trace: Dict[str, Any],
+) -> Optional[Dict[str, Any]]:
+    """
+    The processing steps behind process_essay.
+
+    Fills trace["timings"] (load_ms, analysis_ms, store_ms) and
+    trace["source"] (llm, incremental, duplicate or local) as it goes. Sets
+    trace["discarded"] when the essay was revised while its old text was
+    being analyzed; the stale result is dropped.
     """
+    started = time.monotonic()
     logger.info(
         "Processing essay",
         extra={
@@ -164,21 +598,35 @@ def process_essay(teacher_id: str, assignment_id: str, student_id: str, essay_id
         )
 
         if "Item" not in response:
-            raise ValueError(f"Essay not found: {essay_id}")
+            raise EssayNotFoundError(f"Essay not found: {essay_id}")
 
         essay_item = response["Item"]
         essay_text = essay_item.get("essay_text")
         status = essay_item.get("status", "pending")
+        # The result is only stored if the text is still this revision
+        loaded_revision = essay_item.get("revision")
 
         if not essay_text:
-            raise ValueError(f"Essay text not found for essay: {essay_id}")
+            raise EmptyEssayError(f"Essay text not found for essay: {essay_id}")
 
         if status != "pending":
-            logger.warning(
-                "Essay already processed",
-                extra={"essay_id": essay_id, "status": status},
+            if not (
+                reanalyze and status == "processed" and is_analysis_stale(essay_item)
+            ):
+                logger.warning(
+                    "Essay already processed",
+                    extra={"essay_id": essay_id, "status": status},
+                )
+                return
+
+            logger.info(
+                "Re-analyzing essay with stale analysis version",
+                extra={
+                    "essay_id": essay_id,
+                    "prompt_version": essay_item.get("prompt_version", 0),
+                    "analysis_model": essay_item.get("analysis_model"),
+                },
             )
-            return
 
         logger.info(
             "Essay loaded from DynamoDB",
@@ -198,24 +646,217 @@ def process_essay(teacher_id: str, assignment_id: str, student_id: str, essay_id
         )
         raise
 
-    # Step 2: Process with OpenAI
-    try:
-        vocabulary_analysis = analyze_essay_with_openai(essay_text)
+    trace["timings"]["load_ms"] = _elapsed_ms(started)
+    step_started = time.monotonic()
+
+    # Step 2: Normalize the text and strip headers/boilerplate; essays that
+    # are too short get a local result instead of an LLM call
+    prepared = preprocess_essay(essay_text)
+    logger.info(
+        "Essay preprocessed",
+        extra={
+            "essay_id": essay_id,
+            **prepared.summary(),
+        },
+    )
+
+    # Step 3: Reuse the analysis of a near-duplicate essay if there is one
+    signature = None
+    duplicate = None
+    if signature_index and not prepared.rejected:
+        try:
+            signature = minhash_signature(shingles(prepared.text))
+            duplicate = find_near_duplicate(teacher_id, essay_id, signature)
+        except Exception as e:
+            logger.warning(
+                "Near-duplicate lookup failed",
+                extra={
+                    "essay_id": essay_id,
+                    "error": str(e),
+                },
+            )
+
+    # Step 4: Process with OpenAI
+    if prepared.rejected:
+        vocabulary_analysis = local_analysis(prepared)
+        token_usage = None
+        trace["source"] = "local"
+        logger.info(
+            "Essay rejected before analysis",
+            extra={
+                "essay_id": essay_id,
+                "rejection_reason": prepared.rejection_reason,
+                "word_count": prepared.word_count,
+            },
+        )
+    elif duplicate:
+        vocabulary_analysis = duplicate["vocabulary_analysis"]
+        token_usage = None
+        trace["source"] = "duplicate"
         logger.info(
-            "OpenAI analysis complete",
+            "Reusing analysis of near-duplicate essay",
             extra={
                 "essay_id": essay_id,
-                "vocabulary_used_count": len(
-                    vocabulary_analysis.get("vocabulary_used", [])
-                ),
-                "recommended_count": len(
-                    vocabulary_analysis.get("recommended_vocabulary", [])
-                ),
+                "duplicate_of": duplicate["essay_id"],
+                "similarity": duplicate["similarity"],
             },
         )
+    else:
+        # A revised essay whose previous analysis is current only needs its
+        # changed paragraphs analyzed; the rest comes from paragraph_analyses
+        plan = None
+        previous_analysis = essay_item.get("vocabulary_analysis")
+        if previous_analysis and not is_analysis_stale(essay_item):
+            plan = plan_incremental_analysis(
+                split_paragraphs(prepared.text), essay_item.get("paragraph_analyses")
+            )
+        if plan:
+            logger.info(
+                "Incremental re-analysis of revised essay",
+                extra={
+                    "essay_id": essay_id,
+                    "paragraphs": plan.total_paragraphs,
+                    "changed_paragraphs": len(plan.changed),
+                },
+            )
+
+        trace["source"] = "incremental" if plan else "llm"
+        try:
+            if plan and not plan.changed:
+                vocabulary_analysis = merge_analyses(plan, previous_analysis, None)
+                token_usage = None
+            elif plan:
+                # Words come from the changed paragraphs; the review is redone
+                # over the whole text so unchanged paragraphs keep their feedback
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    partial_future = executor.submit(analyze_essay_with_openai, plan.changed_text)
+                    review_future = executor.submit(review_essay_with_openai, prepared.text)
+                    partial_analysis, partial_usage = partial_future.result()
+                    review, review_usage = review_future.result()
+                vocabulary_analysis = merge_analyses(
+                    plan, previous_analysis, partial_analysis, review
+                )
+                token_usage = merge_usage([partial_usage, review_usage])
+            else:
+                vocabulary_analysis, token_usage = analyze_essay_with_openai(prepared.text)
+                trace["analyzed_text"] = prepared.text
+                trace["token_usage"] = token_usage
+            logger.info(
+                "OpenAI analysis complete",
+                extra={
+                    "essay_id": essay_id,
+                    "cost_usd": str(token_usage["cost_usd"]) if token_usage else "0",
+                    "vocabulary_used_count": len(
+                        vocabulary_analysis.get("vocabulary_used", [])
+                    ),
+                    "recommended_count": len(
+                        vocabulary_analysis.get("recommended_vocabulary", [])
+                    ),
+                },
+            )
+        except Exception as e:
+            logger.error(
+                "Failed to analyze essay with OpenAI",
+                extra={
+                    "essay_id": essay_id,
+                    "error": str(e),
+                },
+                exc_info=True,
+            )
+            raise
+
+    trace["timings"]["analysis_ms"] = _elapsed_ms(step_started)
+    if token_usage and "parts" in token_usage:
+        for part, part_usage in token_usage["parts"].items():
+            trace["timings"][f"{part}_ms"] = part_usage["latency_ms"]
+    step_started = time.monotonic()
+
+    # Step 5: Store results in DynamoDB
+    try:
+        processed_at = datetime.utcnow().isoformat()
+
+        # Convert floats to Decimal for DynamoDB compatibility
+        vocabulary_analysis_decimal = convert_floats_to_decimal(vocabulary_analysis)
+
+        update_expression = (
+            "SET #status = :status, vocabulary_analysis = :analysis, "
+            "processed_at = :processed_at, prompt_version = :prompt_version, "
+            "analysis_model = :model, preprocessing = :preprocessing"
+        )
+        expression_values = {
+            ":status": "processed",
+            ":analysis": vocabulary_analysis_decimal,
+            ":processed_at": processed_at,
+            ":prompt_version": PROMPT_VERSION,
+            # The model that actually served the call (a failover may have used
+            # the local backend), so is_analysis_stale flags it for backfill
+            ":model": token_usage["model"] if token_usage else OPENAI_MODEL,
+            ":preprocessing": prepared.summary(),
+        }
+        if not prepared.rejected:
+            update_expression += ", paragraph_analyses = :paragraphs"
+            expression_values[":paragraphs"] = build_paragraph_cache(
+                split_paragraphs(prepared.text), vocabulary_analysis
+            )
+        if signature is not None and not duplicate:
+            # Lets the API remove the index entries when the essay is deleted or revised
+            update_expression += ", signature_keys = :signature_keys"
+            expression_values[":signature_keys"] = band_keys(teacher_id, signature)
+        if duplicate:
+            # Flag the potential copy for the teacher; no LLM tokens were spent
+            update_expression += ", duplicate_of = :duplicate_of REMOVE token_usage"
+            expression_values[":duplicate_of"] = {
+                "essay_id": duplicate["essay_id"],
+                "assignment_id": duplicate["assignment_id"],
+                "similarity": Decimal(str(round(duplicate["similarity"], 3))),
+            }
+        elif token_usage:
+            update_expression += ", token_usage = :usage REMOVE duplicate_of"
+            expression_values[":usage"] = token_usage
+        else:
+            update_expression += " REMOVE token_usage, duplicate_of"
+
+        # attribute_exists(essay_id) keeps an essay deleted mid-processing
+        # from being recreated as a result-only item
+        if loaded_revision is None:
+            condition = "attribute_exists(essay_id) AND attribute_not_exists(revision)"
+        else:
+            condition = "attribute_exists(essay_id) AND revision = :loaded_revision"
+            expression_values[":loaded_revision"] = loaded_revision
+
+        try:
+            essays_table.update_item(
+                Key={"assignment_id": assignment_id, "essay_id": essay_id},
+                UpdateExpression=update_expression,
+                ConditionExpression=condition,
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues=expression_values,
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                raise
+            # Revised (or deleted) while the old text was analyzed; the
+            # revision's own message analyzes the new text
+            trace["discarded"] = True
+            logger.warning(
+                "Essay changed during processing; discarding stale result",
+                extra={
+                    "essay_id": essay_id,
+                    "revision": loaded_revision,
+                },
+            )
+        else:
+            logger.info(
+                "Essay processing complete",
+                extra={
+                    "essay_id": essay_id,
+                    "status": "processed",
+                    "processed_at": processed_at,
+                },
+            )
     except Exception as e:
         logger.error(
-            "Failed to analyze essay with OpenAI",
+            "Failed to update essay in DynamoDB",
             extra={
                 "essay_id": essay_id,
                 "error": str(e),
@@ -224,48 +865,305 @@ def process_essay(teacher_id: str, assignment_id: str, student_id: str, essay_id
         )
         raise
 
-    # Step 3: Store results in DynamoDB
-    try:
-        processed_at = datetime.utcnow().isoformat()
+    trace["timings"]["store_ms"] = _elapsed_ms(step_started)
 
-        # Convert floats to Decimal for DynamoDB compatibility
-        vocabulary_analysis_decimal = convert_floats_to_decimal(vocabulary_analysis)
+    # Step 6: Roll token usage into the daily cost ledgers (best effort)
+    if token_usage:
+        try:
+            record_usage(
+                usage_ledger_table,
+                teacher_id,
+                assignment_id,
+                token_usage,
+                usage_date=processed_at[:10],
+            )
+        except Exception as e:
+            logger.error(
+                "Failed to record token usage",
+                extra={
+                    "essay_id": essay_id,
+                    "error": str(e),
+                },
+                exc_info=True,
+            )
+
+    # Tokens were spent either way, but a stale result is not the essay's
+    if trace.get("discarded"):
+        return None
+
+    # Step 7: Index the essay so later near-duplicates can reuse its analysis.
+    # Duplicates are not indexed; they resolve to the essay they matched.
+    if signature is not None and not duplicate:
+        try:
+            signature_index.add(teacher_id, assignment_id, essay_id, signature)
+        except Exception as e:
+            logger.warning(
+                "Failed to index essay signature",
+                extra={
+                    "essay_id": essay_id,
+                    "error": str(e),
+                },
+            )
 
+    return vocabulary_analysis
+
+
+def record_processing_error(
+    assignment_id: str, essay_id: str, error: Exception, message_id: str = None
+):
+    """
+    Store the last processing error on the essay item (best effort).
+
+    DLQ triage joins dead-lettered messages with this attribute. The update is
+    conditional so no item is created for essays that do not exist.
+    """
+    if not essays_table:
+        return
+    try:
         essays_table.update_item(
             Key={"assignment_id": assignment_id, "essay_id": essay_id},
-            UpdateExpression="SET #status = :status, vocabulary_analysis = :analysis, processed_at = :processed_at",
-            ExpressionAttributeNames={"#status": "status"},
+            UpdateExpression="SET last_error = :error",
+            ConditionExpression="attribute_exists(essay_id)",
             ExpressionAttributeValues={
-                ":status": "processed",
-                ":analysis": vocabulary_analysis_decimal,
-                ":processed_at": processed_at,
+                ":error": {
+                    "error_class": classify_error(error),
+                    "message": str(error)[:500],
+                    "message_id": message_id or "",
+                    "at": datetime.utcnow().isoformat(),
+                }
             },
         )
+    except Exception as e:
+        logger.warning(
+            "Failed to record processing error",
+            extra={"essay_id": essay_id, "error": str(e)},
+        )
+
+
+def expand_record(record: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Parse one SQS record into the essays it covers.
+
+    Single-essay messages carry "essay_id"; multi-essay messages carry
+    "essay_ids" (all for the same assignment) and an "attempt" counter.
+
+    Returns:
+        Tuple of (message body, list of essay work items)
+    """
+    message_body = json.loads(record["body"])
+    base = {
+        "teacher_id": message_body["teacher_id"],
+        "assignment_id": message_body["assignment_id"],
+        "student_id": message_body.get("student_id") or "",  # Handle empty string
+        "reanalyze": bool(message_body.get("reanalyze", False)),
+        "message_id": record.get("messageId"),
+    }
+    if "essay_ids" in message_body:
+        essay_ids = list(message_body["essay_ids"])
+    else:
+        essay_ids = [message_body["essay_id"]]
+    return message_body, [{**base, "essay_id": essay_id} for essay_id in essay_ids]
+
+
+def process_item(item: Dict[str, Any]) -> bool:
+    """
+    Process one essay from an SQS message.
 
+    Returns:
+        True if the essay was processed (or skipped as already processed),
+        False if processing failed
+    """
+    essay_id = item["essay_id"]
+    try:
         logger.info(
-            "Essay processing complete",
+            "Processing SQS message",
             extra={
                 "essay_id": essay_id,
-                "status": "processed",
-                "processed_at": processed_at,
+                "teacher_id": item["teacher_id"],
+                "assignment_id": item["assignment_id"],
+                "student_id": item["student_id"],
+                "message_id": item["message_id"],
+                "reanalyze": item["reanalyze"],
             },
         )
+
+        # Process essay: Load → Process → Store
+        process_essay(
+            item["teacher_id"],
+            item["assignment_id"],
+            item["student_id"],
+            essay_id,
+            reanalyze=item["reanalyze"],
+        )
+        return True
+
     except Exception as e:
         logger.error(
-            "Failed to update essay in DynamoDB",
+            "Failed to process essay",
             extra={
                 "essay_id": essay_id,
                 "error": str(e),
+                "error_class": classify_error(e),
+                "message_id": item["message_id"],
             },
             exc_info=True,
         )
-        raise
+        record_processing_error(item["assignment_id"], essay_id, e, item["message_id"])
+        # Don't raise - the handler either re-enqueues the failed essays or
+        # reports the message in batchItemFailures so SQS retries it
+        return False
+
+
+def requeue_failed_essays(message_body: Dict[str, Any], failed_essay_ids: List[str]) -> bool:
+    """
+    Re-enqueue only the failed essays of a multi-essay message.
+
+    Below MAX_ESSAY_ATTEMPTS the failed subset goes back to the processing
+    queue with a backoff delay. After that each failed essay is sent to the
+    DLQ as its own single-essay message so DLQ triage can classify it.
+
+    Returns:
+        True if the failed essays were re-enqueued
+    """
+    attempt = int(message_body.get("attempt", 1))
+    try:
+        if attempt < MAX_ESSAY_ATTEMPTS and ESSAY_PROCESSING_QUEUE_URL:
+            sqs.send_message(
+                QueueUrl=ESSAY_PROCESSING_QUEUE_URL,
+                MessageBody=json.dumps({
+                    **message_body,
+                    "essay_ids": failed_essay_ids,
+                    "attempt": attempt + 1,
+                }),
+                DelaySeconds=min(900, REQUEUE_BASE_DELAY_SECONDS * attempt),
+            )
+        elif ESSAY_PROCESSING_DLQ_URL:
+            single = {k: v for k, v in message_body.items() if k not in ("essay_ids", "attempt")}
+            for i in range(0, len(failed_essay_ids), 10):
+                chunk = failed_essay_ids[i:i + 10]
+                response = sqs.send_message_batch(
+                    QueueUrl=ESSAY_PROCESSING_DLQ_URL,
+                    Entries=[
+                        {"Id": str(j), "MessageBody": json.dumps({**single, "essay_id": essay_id})}
+                        for j, essay_id in enumerate(chunk)
+                    ],
+                )
+                if response.get("Failed"):
+                    return False
+        else:
+            return False
+    except Exception as e:
+        logger.error(
+            "Failed to re-enqueue failed essays",
+            extra={
+                "assignment_id": message_body.get("assignment_id"),
+                "essay_count": len(failed_essay_ids),
+                "error": str(e),
+            },
+            exc_info=True,
+        )
+        return False
+
+    logger.info(
+        "Re-enqueued failed essays",
+        extra={
+            "assignment_id": message_body.get("assignment_id"),
+            "essay_count": len(failed_essay_ids),
+            "attempt": attempt + 1,
+            "dead_lettered": attempt >= MAX_ESSAY_ATTEMPTS,
+        },
+    )
+    return True
+
+
+def requeue_deferred_essays(message_body: Dict[str, Any], essay_ids: List[str]) -> bool:
+    """
+    Re-enqueue essays this invocation had no budget left to start.
+
+    They go back as a multi-essay message at the same attempt and without a
+    delay; they did not fail.
+
+    Returns:
+        True if the essays were re-enqueued
+    """
+    if not ESSAY_PROCESSING_QUEUE_URL:
+        return False
+    body = {k: v for k, v in message_body.items() if k != "essay_id"}
+    try:
+        sqs.send_message(
+            QueueUrl=ESSAY_PROCESSING_QUEUE_URL,
+            MessageBody=json.dumps({
+                **body,
+                "essay_ids": essay_ids,
+                "attempt": int(message_body.get("attempt", 1)),
+            }),
+        )
+    except Exception as e:
+        logger.error(
+            "Failed to re-enqueue deferred essays",
+            extra={
+                "assignment_id": message_body.get("assignment_id"),
+                "essay_count": len(essay_ids),
+                "error": str(e),
+            },
+            exc_info=True,
+        )
+        return False
+    return True
+
+
+def handle_direct(message: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Process one essay for a synchronous invoke from the API (demo fast path).
+
+    The API enforces the time budget with its read timeout; if it gives up,
+    this invocation still finishes and the delayed queue message is skipped.
+    """
+    essay_id = message.get("essay_id")
+    try:
+        vocabulary_analysis = process_essay(
+            message["teacher_id"],
+            message["assignment_id"],
+            message.get("student_id") or "",
+            essay_id,
+        )
+        if vocabulary_analysis is None:
+            return {"essay_id": essay_id, "status": "skipped"}
+        return {
+            "essay_id": essay_id,
+            "status": "processed",
+            "vocabulary_analysis": json.loads(json.dumps(vocabulary_analysis, default=str)),
+        }
+    except Exception as e:
+        logger.error(
+            "Failed to process essay directly",
+            extra={
+                "essay_id": essay_id,
+                "error": str(e),
+                "error_class": classify_error(e),
+            },
+            exc_info=True,
+        )
+        if message.get("assignment_id") and essay_id:
+            record_processing_error(message["assignment_id"], essay_id, e)
+        return {"essay_id": essay_id, "status": "failed", "error_class": classify_error(e)}
 
 
 def handler(event, context):
     """
     SQS event handler for processing essay messages.
 
+    Essays from all records are processed concurrently; the number of
+    in-flight OpenAI calls is bounded by the adaptive llm_limiter rather than
+    the thread count. Failed single-essay messages are returned in
+    batchItemFailures (partial batch response) so only they are retried and,
+    eventually, dead-lettered. Multi-essay messages re-enqueue only their
+    failed essays (see requeue_failed_essays). Essays beyond the invocation
+    budget (MAX_ESSAYS_PER_INVOCATION, INVOCATION_RESERVE_SECONDS) are not
+    started and are re-enqueued (see requeue_deferred_essays). Assignments
+    the batch touched get a class report once all their essays are processed
+    (see generate_class_reports).
+
     Event structure:
     {
         "Records": [
@@ -274,64 +1172,121 @@ def handler(event, context):
             }
         ]
     }
+
+    Batch uploads send multi-essay messages instead, with "essay_ids": [...]
+    and "attempt" in place of "essay_id". Messages enqueued by the backfill
+    command also carry "reanalyze": true.
+
+    The API's direct demo mode invokes this function synchronously with
+    {"direct": {"teacher_id", "assignment_id", "student_id", "essay_id"}}.
     """
+    if "direct" in event:
+        return handle_direct(event["direct"])
+
+    records = event.get("Records", [])
     logger.info(
         "Worker Lambda invoked",
         extra={
-            "record_count": len(event.get("Records", [])),
+            "record_count": len(records),
             "request_id": context.aws_request_id if context else None,
         },
     )
 
-    processed_count = 0
-    error_count = 0
+    # Pick up the limit other invocations have converged on
+    llm_limiter.sync()
 
-    for record in event.get("Records", []):
-        essay_id = None
+    # Expand multi-essay messages so every essay shares one worker pool
+    bodies = {}
+    work = []
+    failed_records = set()
+    for index, record in enumerate(records):
         try:
-            # Parse SQS message body
-            message_body = json.loads(record["body"])
-            teacher_id = message_body["teacher_id"]
-            assignment_id = message_body["assignment_id"]
-            student_id = message_body.get("student_id") or ""  # Handle empty string
-            essay_id = message_body["essay_id"]
-
-            logger.info(
-                "Processing SQS message",
-                extra={
-                    "essay_id": essay_id,
-                    "teacher_id": teacher_id,
-                    "assignment_id": assignment_id,
-                    "student_id": student_id,
-                    "message_id": record.get("messageId"),
-                },
+            bodies[index], items = expand_record(record)
+        except Exception as e:
+            logger.error(
+                "Failed to parse SQS message",
+                extra={"message_id": record.get("messageId"), "error": str(e)},
             )
+            failed_records.add(index)
+            continue
+        work.extend((index, item) for item in items)
 
-            # Process essay: Load → Process → Store
-            process_essay(teacher_id, assignment_id, student_id, essay_id)
+    deadline = None
+    if context is not None:
+        deadline = (
+            time.monotonic()
+            + context.get_remaining_time_in_millis() / 1000
+            - INVOCATION_RESERVE_SECONDS
+        )
 
-            processed_count += 1
+    def run(position: int, item: Dict[str, Any]) -> Optional[bool]:
+        # None: deferred to a later invocation
+        if position >= MAX_ESSAYS_PER_INVOCATION:
+            return None
+        if deadline is not None and time.monotonic() > deadline:
+            return None
+        return process_item(item)
 
-        except Exception as e:
-            error_count += 1
-            logger.error(
-                "Failed to process essay",
-                extra={
-                    "essay_id": essay_id,
-                    "error": str(e),
-                    "message_id": record.get("messageId"),
-                },
-                exc_info=True,
-            )
-            # Don't raise - let SQS retry mechanism handle failures
-            # After maxReceiveCount, message will go to DLQ
+    results = []
+    if work:
+        max_workers = min(
+            len(work),
+            MAX_ESSAYS_PER_INVOCATION,
+            llm_backend.max_concurrency if llm_backend else LLM_MAX_CONCURRENCY,
+        )
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            results = list(executor.map(
+                lambda w: run(w[0], w[1][1]), enumerate(work)
+            ))
+
+    failed_by_record = defaultdict(list)
+    deferred_by_record = defaultdict(list)
+    completed_assignments = {}
+    for (index, item), ok in zip(work, results):
+        if ok is None:
+            deferred_by_record[index].append(item["essay_id"])
+        elif not ok:
+            failed_by_record[index].append(item["essay_id"])
+        else:
+            completed_assignments[(item["teacher_id"], item["assignment_id"])] = True
+
+    # The batch may have finished an assignment; summarize it for the class
+    generate_class_reports(list(completed_assignments))
+
+    for index, failed_essay_ids in failed_by_record.items():
+        body = bodies[index]
+        # Single-essay messages are retried by SQS itself; multi-essay
+        # messages re-enqueue only their failed subset
+        if "essay_ids" not in body or not requeue_failed_essays(body, failed_essay_ids):
+            failed_records.add(index)
+
+    for index, deferred_essay_ids in deferred_by_record.items():
+        # A record whose deferred essays cannot be re-enqueued is retried whole
+        if not requeue_deferred_essays(bodies[index], deferred_essay_ids):
+            failed_records.add(index)
+
+    batch_item_failures = [
+        {"itemIdentifier": records[index].get("messageId")}
+        for index in sorted(failed_records)
+    ]
+    error_count = sum(len(ids) for ids in failed_by_record.values())
+    deferred_count = sum(len(ids) for ids in deferred_by_record.values())
+    processed_count = len(results) - error_count - deferred_count
 
     logger.info(
         "Worker Lambda completed",
         extra={
             "processed_count": processed_count,
             "error_count": error_count,
+            "deferred_count": deferred_count,
+            "failed_message_count": len(batch_item_failures),
+            "llm_concurrency_limit": llm_limiter.limit,
         },
     )
 
-    return {"statusCode": 200, "processed": processed_count, "errors": error_count}
+    return {
+        "statusCode": 200,
+        "processed": processed_count,
+        "errors": error_count,
+        "batchItemFailures": batch_item_failures,
+    }
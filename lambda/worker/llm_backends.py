@@ -0,0 +1,335 @@
+"""
+LLM backends for the worker's JSON completions.
+
+A backend makes one chat completion and returns its raw content and a usage
+record. Each backend gates its in-flight requests with its own
+AdaptiveConcurrencyLimiter:
+
+    OpenAIBackend            OpenAI API (OPENAI_MODEL), adaptive limit shared
+                             across invocations via WORKER_STATE_TABLE
+    OpenAICompatibleBackend  a local OpenAI-compatible server (llama.cpp,
+                             vLLM, ...) at LOCAL_LLM_BASE_URL; adaptive limit
+                             starting at and capped by LOCAL_LLM_MAX_CONCURRENCY,
+                             lowered when latency inflates; costed at zero
+
+FailoverBackend chains backends in LLM_BACKENDS order. Availability errors
+(rate limits, connection errors, timeouts, 5xx) fall through to the next
+backend, and a backend with LLM_FAILURE_THRESHOLD consecutive availability
+errors is skipped for LLM_COOLDOWN_SECONDS. Other errors (bad requests,
+unparseable output) are raised as-is, since another backend would not fix
+them. With LLM_SPILLOVER enabled, a request goes to the first healthy backend
+with a free slot instead of waiting for the primary, so a local server soaks
+up bulk load beyond the OpenAI limit.
+
+A request for a model that is some backend's configured model (e.g. a shadow
+run with SHADOW_MODEL) is pinned to the backends configured for it: it does
+not spill over or fail over while one of them is healthy. Once all of them are
+cooling down it falls back to the other healthy backends with their own
+models, which the usage record then names.
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from concurrency import AdaptiveConcurrencyLimiter
+from usage import extract_usage
+
+try:
+    from openai import (
+        APIConnectionError,
+        APITimeoutError,
+        InternalServerError,
+        OpenAI,
+        RateLimitError,
+    )
+
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+    OpenAI = None
+    RateLimitError = None
+    APIConnectionError = APITimeoutError = InternalServerError = None
+
+logger = logging.getLogger()
+
+BACKEND_NAMES = ("openai", "local")
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    if RateLimitError is not None and isinstance(error, RateLimitError):
+        return True
+    return getattr(error, "status_code", None) == 429
+
+
+def is_availability_error(error: Exception) -> bool:
+    """Errors another backend (or the same one later) may not have."""
+    if is_rate_limit_error(error):
+        return True
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if OPENAI_AVAILABLE and isinstance(
+        error, (APIConnectionError, APITimeoutError, InternalServerError)
+    ):
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and status >= 500
+
+
+class BackendHealth:
+    """Consecutive-failure circuit breaker with a cooldown."""
+
+    def __init__(self, failure_threshold: int = 3, cooldown_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._failures = 0
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def healthy(self) -> bool:
+        with self._lock:
+            return time.monotonic() >= self._open_until
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._open_until = 0.0
+
+    def record_failure(self) -> bool:
+        """Count an availability failure; returns True if the circuit opened."""
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._failures = 0
+                self._open_until = time.monotonic() + self.cooldown_seconds
+                return True
+            return False
+
+
+class OpenAIBackend:
+    """Chat completions through an OpenAI SDK client."""
+
+    # Whether completions are billed (looked up in usage.MODEL_PRICING)
+    priced = True
+
+    def __init__(
+        self,
+        name: str,
+        client,
+        model: str,
+        limiter: AdaptiveConcurrencyLimiter,
+        health: Optional[BackendHealth] = None,
+    ):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.limiter = limiter
+        self.health = health or BackendHealth()
+
+    def supports(self, model: Optional[str]) -> bool:
+        """Whether this backend can serve `model` (None = its default)."""
+        return True
+
+    def call(
+        self, system_prompt: str, prompt: str, temperature: float, model: Optional[str] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Make the completion; the caller holds a limiter slot.
+
+        Returns:
+            Tuple of (response content, token usage record)
+        """
+        model = model or self.model
+        started = time.monotonic()
+        try:
+            raw_response = self.client.chat.completions.with_raw_response.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=temperature,
+                response_format={"type": "json_object"},
+            )
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self.limiter.on_throttle()
+            raise
+        latency = time.monotonic() - started
+
+        response = raw_response.parse()
+        usage = extract_usage(response, model, priced=self.priced)
+        # 429s, latency inflation and the x-ratelimit-remaining-* headers
+        # drive the limiter's AIMD adjustments
+        self.limiter.on_success(latency, raw_response.headers, usage["completion_tokens"])
+        usage["backend"] = self.name
+        return response.choices[0].message.content, usage
+
+    def complete(
+        self, system_prompt: str, prompt: str, temperature: float = 0.7, model: Optional[str] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        with self.limiter.slot():
+            return self.call(system_prompt, prompt, temperature, model)
+
+
+class OpenAICompatibleBackend(OpenAIBackend):
+    """A self-hosted server exposing the OpenAI chat completions API."""
+
+    priced = False
+
+    def supports(self, model: Optional[str]) -> bool:
+        return model is None or model == self.model
+
+
+class FailoverBackend:
+    """Tries backends in order, skipping unhealthy ones and failing over on outages."""
+
+    def __init__(self, backends: List[OpenAIBackend], spillover: bool = False):
+        self.backends = backends
+        self.spillover = spillover
+
+    @property
+    def name(self) -> str:
+        return self.backends[0].name
+
+    @property
+    def model(self) -> str:
+        return self.backends[0].model
+
+    @property
+    def max_concurrency(self) -> int:
+        return sum(int(b.limiter.max_limit) for b in self.backends)
+
+    def _candidates(
+        self, model: Optional[str]
+    ) -> List[Tuple[OpenAIBackend, Optional[str]]]:
+        """(backend, model to request from it) pairs in the order to try them."""
+        # A model a specific backend is configured for goes to that backend
+        pinned = [b for b in self.backends if model is not None and b.model == model]
+        if pinned:
+            healthy = [b for b in pinned if b.health.healthy]
+            if not healthy:
+                # Every pinned backend is cooling down: the others serve their own model
+                healthy = [b for b in self.backends if b not in pinned and b.health.healthy]
+                if healthy:
+                    return [(b, None) for b in healthy]
+            return [(b, model) for b in healthy or pinned]
+        serving = [b for b in self.backends if b.supports(model)]
+        healthy = [b for b in serving if b.health.healthy]
+        # With every backend cooling down, trying is better than failing outright
+        return [(b, model) for b in healthy or serving]
+
+    def complete(
+        self, system_prompt: str, prompt: str, temperature: float = 0.7, model: Optional[str] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        candidates = self._candidates(model)
+        if not candidates:
+            raise ValueError(f"No LLM backend serves model {model}")
+
+        held = None
+        if self.spillover:
+            for backend, backend_model in candidates:
+                if backend.limiter.try_acquire():
+                    held = backend
+                    candidates = [(backend, backend_model)] + [
+                        c for c in candidates if c[0] is not backend
+                    ]
+                    break
+
+        last_error = None
+        for backend, backend_model in candidates:
+            if backend is not held:
+                backend.limiter.acquire()
+            try:
+                result = backend.call(system_prompt, prompt, temperature, backend_model)
+            except Exception as e:
+                if not is_availability_error(e):
+                    raise
+                last_error = e
+                opened = backend.health.record_failure()
+                logger.warning(
+                    "LLM backend unavailable",
+                    extra={
+                        "backend": backend.name,
+                        "error": str(e),
+                        "circuit_opened": opened,
+                    },
+                )
+                continue
+            finally:
+                backend.limiter.release()
+            backend.health.record_success()
+            return result
+        raise last_error
+
+
+def create_backend(
+    names: List[str],
+    openai_api_key: Optional[str],
+    openai_model: str,
+    openai_limiter: AdaptiveConcurrencyLimiter,
+    local_base_url: Optional[str] = None,
+    local_model: str = "local-model",
+    local_api_key: str = "not-needed",
+    local_max_concurrency: int = 2,
+    local_timeout_seconds: float = 120.0,
+    spillover: bool = False,
+    failure_threshold: int = 3,
+    cooldown_seconds: float = 30.0,
+) -> Optional[FailoverBackend]:
+    """
+    Build the configured backends in order; ones that cannot be initialized
+    are logged and left out.
+
+    Returns:
+        A FailoverBackend, or None if no backend is available
+    """
+    if not OPENAI_AVAILABLE:
+        logger.error("OpenAI package not available")
+        return None
+
+    backends = []
+    for name in names:
+        health = BackendHealth(failure_threshold, cooldown_seconds)
+        try:
+            if name == "openai":
+                if not openai_api_key:
+                    logger.error("OPENAI_API_KEY not set")
+                    continue
+                backends.append(OpenAIBackend(
+                    name, OpenAI(api_key=openai_api_key), openai_model, openai_limiter, health
+                ))
+            elif name == "local":
+                if not local_base_url:
+                    logger.error("LOCAL_LLM_BASE_URL not set")
+                    continue
+                limiter = AdaptiveConcurrencyLimiter(
+                    initial_limit=local_max_concurrency,
+                    min_limit=1,
+                    max_limit=local_max_concurrency,
+                )
+                client = OpenAI(
+                    api_key=local_api_key,
+                    base_url=local_base_url,
+                    timeout=local_timeout_seconds,
+                    max_retries=0,
+                )
+                backends.append(OpenAICompatibleBackend(name, client, local_model, limiter, health))
+            else:
+                logger.error("Unknown LLM backend", extra={"backend": name})
+        except Exception as e:
+            logger.error(
+                "Failed to initialize LLM backend",
+                extra={"backend": name, "error": str(e)},
+                exc_info=True,
+            )
+
+    if not backends:
+        return None
+    logger.info(
+        "LLM backends initialized",
+        extra={"backends": [b.name for b in backends], "spillover": spillover},
+    )
+    return FailoverBackend(backends, spillover=spillover)
@@ -0,0 +1,97 @@
+"""
+In-memory stand-in for the subset of the boto3 SQS client used by the worker
+tools (DLQ triage, re-enqueueing). Lets those tools run in tests and local
+development without AWS or LocalStack.
+
+Queues are created on first use and keyed by QueueUrl. Visibility timeouts and
+ApproximateReceiveCount behave like SQS; long polling returns immediately.
+"""
+
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+
+class InMemorySQS:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # QueueUrl -> OrderedDict[message_id -> message state]
+        self._queues: Dict[str, "OrderedDict[str, Dict[str, Any]]"] = {}
+
+    def _queue(self, queue_url: str) -> "OrderedDict[str, Dict[str, Any]]":
+        return self._queues.setdefault(queue_url, OrderedDict())
+
+    def send_message(self, QueueUrl: str, MessageBody: str, **kwargs) -> Dict[str, Any]:
+        message_id = str(uuid.uuid4())
+        with self._lock:
+            self._queue(QueueUrl)[message_id] = {
+                "MessageId": message_id,
+                "Body": MessageBody,
+                "receive_count": 0,
+                "visible_at": 0.0,
+                "receipt_handle": None,
+            }
+        return {"MessageId": message_id}
+
+    def send_message_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if len(Entries) > 10:
+            raise ValueError("SendMessageBatch accepts at most 10 entries")
+        successful = []
+        for entry in Entries:
+            result = self.send_message(QueueUrl=QueueUrl, MessageBody=entry["MessageBody"])
+            successful.append({"Id": entry["Id"], "MessageId": result["MessageId"]})
+        return {"Successful": successful, "Failed": []}
+
+    def receive_message(
+        self,
+        QueueUrl: str,
+        MaxNumberOfMessages: int = 1,
+        VisibilityTimeout: int = 30,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        now = time.monotonic()
+        messages = []
+        with self._lock:
+            for message in self._queue(QueueUrl).values():
+                if len(messages) >= MaxNumberOfMessages:
+                    break
+                if message["visible_at"] > now:
+                    continue
+                message["receive_count"] += 1
+                message["visible_at"] = now + VisibilityTimeout
+                message["receipt_handle"] = str(uuid.uuid4())
+                messages.append({
+                    "MessageId": message["MessageId"],
+                    "ReceiptHandle": message["receipt_handle"],
+                    "Body": message["Body"],
+                    "Attributes": {
+                        "ApproximateReceiveCount": str(message["receive_count"]),
+                    },
+                })
+        return {"Messages": messages} if messages else {}
+
+    def delete_message(self, QueueUrl: str, ReceiptHandle: str) -> Dict[str, Any]:
+        with self._lock:
+            queue = self._queue(QueueUrl)
+            for message_id, message in list(queue.items()):
+                if message["receipt_handle"] == ReceiptHandle:
+                    del queue[message_id]
+                    break
+        return {}
+
+    def delete_message_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        for entry in Entries:
+            self.delete_message(QueueUrl=QueueUrl, ReceiptHandle=entry["ReceiptHandle"])
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries], "Failed": []}
+
+    def get_queue_attributes(self, QueueUrl: str, AttributeNames=None) -> Dict[str, Any]:
+        with self._lock:
+            count = len(self._queue(QueueUrl))
+        return {"Attributes": {"ApproximateNumberOfMessages": str(count)}}
+
+    def bodies(self, queue_url: str) -> List[str]:
+        """Test helper: bodies of all messages currently in a queue."""
+        with self._lock:
+            return [message["Body"] for message in self._queue(queue_url).values()]
@@ -0,0 +1,156 @@
+"""
+Paragraph-level caching for incremental re-analysis of revised essays.
+
+After every analysis the worker attributes the essay's `vocabulary_used`
+words to the paragraphs they appear in and stores the result on the essay as
+`paragraph_analyses` ({paragraph hash: {"vocabulary_used": [...]}}). When a
+revision comes in, unchanged paragraphs keep their cached words and only the
+changed paragraphs are sent to the LLM; the partial result is merged with
+the cache and the previous recommendations. The review is not per paragraph,
+so it comes from a review-only pass over the whole revised text.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+# Above this fraction of changed words a full analysis is cheaper to reason
+# about than a merge and gives a better review
+MAX_INCREMENTAL_CHANGE = 0.5
+
+MAX_RECOMMENDATIONS = 10
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Split preprocessed essay text into non-empty paragraphs (one per line)."""
+    return [line.strip() for line in text.split("\n") if line.strip()]
+
+
+def paragraph_hash(paragraph: str) -> str:
+    return hashlib.sha256(paragraph.encode("utf-8")).hexdigest()[:16]
+
+
+def _contains(paragraph_lower: str, phrase: str) -> bool:
+    return bool(phrase) and phrase.lower() in paragraph_lower
+
+
+def build_paragraph_cache(
+    paragraphs: List[str], analysis: Dict[str, Any]
+) -> Dict[str, Dict[str, Any]]:
+    """Attribute each vocabulary_used phrase to the paragraphs containing it."""
+    vocabulary_used = analysis.get("vocabulary_used", [])
+    cache = {}
+    for paragraph in paragraphs:
+        lower = paragraph.lower()
+        cache[paragraph_hash(paragraph)] = {
+            "vocabulary_used": [w for w in vocabulary_used if _contains(lower, w)]
+        }
+    return cache
+
+
+@dataclass
+class IncrementalPlan:
+    """Which paragraphs of a revision need a fresh analysis."""
+
+    changed: List[str]
+    cached_vocabulary: List[str]
+    total_paragraphs: int
+
+    @property
+    def changed_text(self) -> str:
+        return "\n\n".join(self.changed)
+
+
+def plan_incremental_analysis(
+    paragraphs: List[str], cache: Optional[Dict[str, Any]]
+) -> Optional[IncrementalPlan]:
+    """
+    Diff the paragraphs of a revision against the cached paragraph hashes.
+
+    Returns:
+        An IncrementalPlan, or None if a full analysis should be run instead
+        (no cache, or too much of the text changed)
+    """
+    if not cache or not paragraphs:
+        return None
+
+    changed = []
+    cached_vocabulary = []
+    changed_words = 0
+    total_words = 0
+    for paragraph in paragraphs:
+        words = len(paragraph.split())
+        total_words += words
+        entry = cache.get(paragraph_hash(paragraph))
+        if entry is None:
+            changed.append(paragraph)
+            changed_words += words
+        else:
+            cached_vocabulary.extend(entry.get("vocabulary_used", []))
+
+    if total_words == 0 or changed_words / total_words > MAX_INCREMENTAL_CHANGE:
+        return None
+
+    return IncrementalPlan(
+        changed=changed,
+        cached_vocabulary=_unique(cached_vocabulary),
+        total_paragraphs=len(paragraphs),
+    )
+
+
+def _unique(items: List[str]) -> List[str]:
+    seen = set()
+    result = []
+    for item in items:
+        key = item.lower()
+        if key not in seen:
+            seen.add(key)
+            result.append(item)
+    return result
+
+
+def merge_analyses(
+    plan: IncrementalPlan,
+    previous: Dict[str, Any],
+    partial: Optional[Dict[str, Any]],
+    review: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Combine cached paragraph results with the analysis of the changed paragraphs.
+
+    The partial analysis's own review only covers the changed paragraphs and
+    is never used.
+
+    Args:
+        plan: The incremental plan the partial analysis was run for
+        previous: The essay's previous vocabulary_analysis
+        partial: Analysis of plan.changed_text, or None if nothing changed
+        review: Review of the whole revised text; the previous review is
+            kept without one
+    """
+    if review is None:
+        review = previous.get("correctness_review", "")
+
+    if partial is None:
+        vocabulary_used = plan.cached_vocabulary
+        return {
+            "correctness_review": review,
+            "vocabulary_used": vocabulary_used,
+            "recommended_vocabulary": list(previous.get("recommended_vocabulary", [])),
+        }
+
+    vocabulary_used = _unique(plan.cached_vocabulary + list(partial.get("vocabulary_used", [])))
+    used = {w.lower() for w in vocabulary_used}
+    recommended = [
+        w for w in _unique(
+            list(partial.get("recommended_vocabulary", []))
+            + list(previous.get("recommended_vocabulary", []))
+        )
+        if w.lower() not in used
+    ][:MAX_RECOMMENDATIONS]
+
+    return {
+        "correctness_review": review,
+        "vocabulary_used": vocabulary_used,
+        "recommended_vocabulary": recommended,
+    }
@@ -0,0 +1,183 @@
+"""
+Pre-LLM essay preprocessing.
+
+Normalizes Unicode and whitespace, strips recognizable header lines (name,
+date, class, ...) and pasted boilerplate (word counts, works-cited sections),
+and estimates the prompt tokens of what is left. Essays that end up below
+the minimum length are rejected with a local result instead of being sent to
+the LLM.
+"""
+
+import os
+import re
+import math
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+MIN_ESSAY_WORDS = int(os.environ.get("MIN_ESSAY_WORDS", "25"))
+
+# Header lines are only looked for at the top of the essay
+MAX_HEADER_LINES = 8
+# ...and are short: longer lines, or lines that read like a sentence, are prose
+MAX_HEADER_WORDS = 6
+
+_INVISIBLE_RE = re.compile("[\u200b\u200c\u200d\u2060\ufeff\u00ad]")
+_INLINE_SPACE_RE = re.compile(r"[ \t\f\v\u00a0\u2000-\u200a\u202f\u205f\u3000]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_WORD_RE = re.compile(r"\w+(?:['’-]\w+)*")
+# Sentence punctuation; a trailing period ends a sentence, "Ms. Lee" does not
+_SENTENCE_PUNCTUATION_RE = re.compile(r"[!?;]|\.$")
+
+_MONTHS = (
+    r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|"
+    r"aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+)
+_HEADER_PATTERNS = [
+    # "Name: Jordan Smith", "Period - 3", "Teacher: Ms. Lee"; a dash needs
+    # spaces on both sides so "Name-calling is..." or "Class-based..." is prose
+    re.compile(
+        r"^(?:student(?:\s+name)?|name|date|class|course|period|block|hour|"
+        r"teacher|instructor|professor|grade|assignment|subject|section)"
+        r"(?:\s*:|\s+[\-–—]\s).*$",
+        re.IGNORECASE,
+    ),
+    # "Period 3", "Grade 8", "Block 2B"
+    re.compile(r"^(?:period|block|hour|grade|class)\s+\d+\w*$", re.IGNORECASE),
+    # "10/12/2025", "2025-10-12"
+    re.compile(r"^\d{1,4}[/.\-]\d{1,2}[/.\-]\d{1,4}$"),
+    # "October 12, 2025", "12 Oct 2025"
+    re.compile(rf"^(?:\d{{1,2}}\s+)?{_MONTHS}\.?\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s*\d{{4}}$", re.IGNORECASE),
+    re.compile(rf"^\d{{1,2}}\s+{_MONTHS}\.?,?\s+\d{{4}}$", re.IGNORECASE),
+    # "Mr. Smith", "Ms Lee"
+    re.compile(r"^(?:mr|mrs|ms|miss|dr)\.?\s+[a-z][\w'-]*$", re.IGNORECASE),
+]
+_BOILERPLATE_LINE_RE = re.compile(
+    r"^(?:word\s*count|words|page\s+\d+(?:\s+of\s+\d+)?)\s*[:\-]?\s*\d*$",
+    re.IGNORECASE,
+)
+_TRAILING_SECTION_RE = re.compile(
+    r"^(?:works\s+cited|references|bibliography|sources)\s*:?$", re.IGNORECASE
+)
+
+
+@dataclass
+class PreparedEssay:
+    """Result of preprocessing one essay."""
+
+    text: str
+    word_count: int
+    token_estimate: int
+    removed_lines: List[str] = field(default_factory=list)
+    rejection_reason: Optional[str] = None
+
+    @property
+    def rejected(self) -> bool:
+        return self.rejection_reason is not None
+
+    def summary(self) -> Dict[str, Any]:
+        """Compact record stored on the essay item."""
+        result = {
+            "word_count": self.word_count,
+            "token_estimate": self.token_estimate,
+            "removed_lines": len(self.removed_lines),
+        }
+        if self.rejection_reason:
+            result["rejection_reason"] = self.rejection_reason
+        return result
+
+
+def normalize_text(text: str) -> str:
+    """NFKC-normalize, drop invisible characters and collapse whitespace."""
+    text = unicodedata.normalize("NFKC", text)
+    text = _INVISIBLE_RE.sub("", text)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = [_INLINE_SPACE_RE.sub(" ", line).strip() for line in text.split("\n")]
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def _is_header(line: str) -> bool:
+    if len(_WORD_RE.findall(line)) > MAX_HEADER_WORDS or _SENTENCE_PUNCTUATION_RE.search(line):
+        return False
+    return any(pattern.match(line) for pattern in _HEADER_PATTERNS)
+
+
+def strip_headers_and_boilerplate(text: str) -> Tuple[str, List[str]]:
+    """
+    Remove leading header lines, word-count/page lines and a trailing
+    works-cited section.
+
+    Returns:
+        Tuple of (remaining text, removed lines)
+    """
+    lines = text.split("\n")
+    removed = []
+
+    # Leading header block: header lines and blank lines before the first
+    # line of prose
+    start = 0
+    while start < min(len(lines), MAX_HEADER_LINES):
+        line = lines[start]
+        if line and not _is_header(line):
+            break
+        if line:
+            removed.append(line)
+        start += 1
+    lines = lines[start:]
+
+    # Trailing works-cited section
+    for i, line in enumerate(lines):
+        if _TRAILING_SECTION_RE.match(line):
+            removed.extend(l for l in lines[i:] if l)
+            lines = lines[:i]
+            break
+
+    kept = []
+    for line in lines:
+        if line and _BOILERPLATE_LINE_RE.match(line):
+            removed.append(line)
+        else:
+            kept.append(line)
+
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(kept)).strip(), removed
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt-token estimate (~4 characters per token for English)."""
+    return math.ceil(len(text) / 4)
+
+
+def preprocess_essay(text: str, min_words: int = MIN_ESSAY_WORDS) -> PreparedEssay:
+    """Normalize and clean an essay, rejecting it if too little text remains."""
+    cleaned, removed = strip_headers_and_boilerplate(normalize_text(text or ""))
+    word_count = len(_WORD_RE.findall(cleaned))
+
+    rejection_reason = None
+    if word_count == 0:
+        rejection_reason = "empty"
+    elif word_count < min_words:
+        rejection_reason = "too_short"
+
+    return PreparedEssay(
+        text=cleaned,
+        word_count=word_count,
+        token_estimate=estimate_tokens(cleaned),
+        removed_lines=removed,
+        rejection_reason=rejection_reason,
+    )
+
+
+def local_analysis(prepared: PreparedEssay, min_words: int = MIN_ESSAY_WORDS) -> Dict[str, Any]:
+    """Analysis stored for rejected essays, in the same shape as the LLM's."""
+    if prepared.rejection_reason == "empty":
+        review = "No essay text was found after removing headers and formatting, so vocabulary could not be analyzed."
+    else:
+        review = (
+            f"The essay is too short to analyze ({prepared.word_count} words; "
+            f"at least {min_words} are needed). Submit a longer draft for vocabulary feedback."
+        )
+    return {
+        "correctness_review": review,
+        "vocabulary_used": [],
+        "recommended_vocabulary": [],
+    }
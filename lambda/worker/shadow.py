@@ -0,0 +1,104 @@
+"""
+Shadow evaluation of a candidate model/prompt against production analyses.
+
+For a sample of essays (SHADOW_SAMPLE_RATE) the worker runs the candidate
+configuration on the same preprocessed text after the production result has
+been stored and its completion event published. The candidate's output and
+latency/token stats go to the ShadowEvaluations table only; nothing the API
+serves is touched.
+
+    candidate_id (PK)  "{model}#{schema}#{mode}"
+    essay_id (SK)
+    assignment_id, teacher_id, evaluated_at, expires_at (TTL)
+    production:  {model, latency_ms, prompt_tokens, completion_tokens, cost_usd}
+    candidate:   {model, latency_ms, prompt_tokens, completion_tokens, cost_usd,
+                  vocabulary_analysis} or {error}
+    overlap:     {vocabulary_used, recommended_vocabulary}  (Jaccard, 0-1)
+
+shadow_report.py summarizes the items of one candidate.
+"""
+
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+RETENTION_DAYS = 30
+
+
+def candidate_id(model: str, schema: str, mode: str) -> str:
+    return f"{model}#{schema}#{mode}"
+
+
+def in_sample(essay_id: str, rate: float) -> bool:
+    """
+    Deterministic sampling by essay_id, so a retried or re-analyzed essay
+    gets the same decision.
+    """
+    if rate <= 0:
+        return False
+    if rate >= 1:
+        return True
+    bucket = int.from_bytes(hashlib.sha256(essay_id.encode("utf-8")).digest()[:4], "big")
+    return bucket / 2**32 < rate
+
+
+def list_overlap(a: List[str], b: List[str]) -> float:
+    """Jaccard similarity of two word lists, case-insensitive."""
+    set_a = {w.strip().lower() for w in a}
+    set_b = {w.strip().lower() for w in b}
+    if not set_a and not set_b:
+        return 1.0
+    return len(set_a & set_b) / len(set_a | set_b)
+
+
+def usage_stats(usage: Optional[Dict[str, Any]], latency_ms: int, model: str) -> Dict[str, Any]:
+    usage = usage or {}
+    return {
+        "model": usage.get("model", model),
+        "latency_ms": latency_ms,
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+        "cost_usd": usage.get("cost_usd", 0),
+    }
+
+
+def build_evaluation(
+    candidate: str,
+    essay_id: str,
+    assignment_id: str,
+    teacher_id: str,
+    production_analysis: Dict[str, Any],
+    production_stats: Dict[str, Any],
+    candidate_model: str,
+    candidate_latency_ms: int,
+    candidate_analysis: Optional[Dict[str, Any]] = None,
+    candidate_usage: Optional[Dict[str, Any]] = None,
+    error: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Side-table item comparing one candidate run with the production result."""
+    now = datetime.utcnow()
+    item = {
+        "candidate_id": candidate,
+        "essay_id": essay_id,
+        "assignment_id": assignment_id,
+        "teacher_id": teacher_id,
+        "evaluated_at": now.isoformat(),
+        "expires_at": int((now + timedelta(days=RETENTION_DAYS)).timestamp()),
+        "production": production_stats,
+    }
+    if error is not None:
+        item["candidate"] = {"model": candidate_model, "latency_ms": candidate_latency_ms, "error": error}
+        return item
+
+    item["candidate"] = {
+        **usage_stats(candidate_usage, candidate_latency_ms, candidate_model),
+        "vocabulary_analysis": candidate_analysis,
+    }
+    item["overlap"] = {
+        key: list_overlap(
+            production_analysis.get(key, []), candidate_analysis.get(key, [])
+        )
+        for key in ("vocabulary_used", "recommended_vocabulary")
+    }
+    return item
+
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Comparison report for a shadow evaluation candidate.
+
+Reads the ShadowEvaluations items of one candidate ("{model}#{schema}#{mode}")
+and reports production vs candidate latency percentiles, tokens and cost per
+essay (in benchmark.py's format), the candidate error count, and how much the
+candidate's word lists overlap with production's.
+
+Usage:
+    python shadow_report.py --table VincentVocabShadowEvaluations \\
+        --candidate "gpt-4.1-nano#compact#single" --output shadow.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import logging
+from typing import Any, Dict, List, Optional
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+from benchmark import compare, format_report, summarize
+
+logger = logging.getLogger(__name__)
+
+OVERLAP_KEYS = ("vocabulary_used", "recommended_vocabulary")
+
+
+def load_evaluations(table, candidate: str) -> List[Dict[str, Any]]:
+    items = []
+    kwargs = {"KeyConditionExpression": Key("candidate_id").eq(candidate)}
+    while True:
+        response = table.query(**kwargs)
+        items.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            return items
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def _run(item: Dict[str, Any], side: str) -> Dict[str, Any]:
+    stats = item[side]
+    run = {"essay": item["essay_id"], "variant": side, "latency_ms": int(stats["latency_ms"])}
+    if "error" in stats:
+        run["error"] = stats["error"]
+        return run
+    run.update(
+        prompt_tokens=int(stats["prompt_tokens"]),
+        completion_tokens=int(stats["completion_tokens"]),
+        cost_usd=float(stats["cost_usd"]),
+    )
+    return run
+
+
+def build_report(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Latency/token summary per side, reduction and mean list overlap."""
+    runs = [_run(item, side) for item in items for side in ("production", "candidate")]
+    summary = summarize(runs)
+    compared = [item["overlap"] for item in items if "overlap" in item]
+    overlap = {
+        key: round(sum(float(o[key]) for o in compared) / len(compared), 3) if compared else None
+        for key in OVERLAP_KEYS
+    }
+    reduction = compare(summary, "production", "candidate") if compared else None
+    return {
+        "evaluations": len(items),
+        "summary": summary,
+        "reduction": reduction,
+        "mean_overlap": overlap,
+    }
+
+
+def format_shadow_report(candidate: str, report: Dict[str, Any]) -> str:
+    lines = [f"candidate {candidate}: {report['evaluations']} evaluations"]
+    if report["summary"]:
+        lines.append(format_report(report["summary"], report["reduction"]))
+    lines.append(
+        "mean overlap with production: "
+        + ", ".join(f"{key} {value}" for key, value in report["mean_overlap"].items())
+    )
+    return "\n".join(lines)
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare a shadow candidate with production analyses."
+    )
+    parser.add_argument(
+        "--table",
+        default=os.environ.get("SHADOW_EVALUATIONS_TABLE"),
+        help="Shadow evaluations table name (default: $SHADOW_EVALUATIONS_TABLE)",
+    )
+    parser.add_argument(
+        "--candidate", required=True, help='Candidate id, e.g. "gpt-4.1-nano#compact#single"'
+    )
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    if not args.table:
+        logger.error("--table or SHADOW_EVALUATIONS_TABLE is required")
+        return 1
+
+    table = boto3.resource("dynamodb").Table(args.table)
+    report = build_report(load_evaluations(table, args.candidate))
+    print(format_shadow_report(args.candidate, report))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2 @@
+# Worker Lambda tests package
+
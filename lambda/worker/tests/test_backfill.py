@@ -0,0 +1,181 @@
+"""
+Unit tests for the prompt-version re-analysis backfill command.
+"""
+import os
+import json
+from unittest.mock import MagicMock
+
+from boto3.dynamodb.conditions import Attr
+
+# Set environment variables before importing modules
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ['ESSAYS_TABLE'] = 'test-essays-table'
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import backfill
+from backfill import Checkpoint, RateLimiter, run_backfill, scan_segment
+from lambda_function import OPENAI_MODEL, PROMPT_VERSION, is_analysis_stale
+
+
+def make_item(essay_id, prompt_version=None, model=OPENAI_MODEL):
+    item = {
+        'assignment_id': 'assignment-1',
+        'essay_id': essay_id,
+        'teacher_id': 'teacher-1',
+        'student_id': 'student-1',
+        'status': 'processed',
+    }
+    if prompt_version is not None:
+        item['prompt_version'] = prompt_version
+        item['analysis_model'] = model
+    return item
+
+
+class TestIsAnalysisStale:
+    def test_missing_version_is_stale(self):
+        assert is_analysis_stale(make_item('e1'))
+
+    def test_current_version_is_not_stale(self):
+        assert not is_analysis_stale(make_item('e1', PROMPT_VERSION))
+
+    def test_model_change_is_stale(self):
+        assert is_analysis_stale(make_item('e1', PROMPT_VERSION, model='old-model'))
+
+
+class TestScanSegment:
+    def test_enqueues_only_stale_essays_across_pages(self, tmp_path):
+        table = MagicMock()
+        table.scan.side_effect = [
+            {
+                'Items': [make_item('e1'), make_item('e2', PROMPT_VERSION)],
+                'ScannedCount': 2,
+                'LastEvaluatedKey': {'assignment_id': 'assignment-1', 'essay_id': 'e2'},
+            },
+            {'Items': [make_item('e3', PROMPT_VERSION - 1)], 'ScannedCount': 1},
+        ]
+        sqs_client = MagicMock()
+        checkpoint = Checkpoint(str(tmp_path / 'cp.json'), total_segments=1)
+
+        scan_segment(table, sqs_client, 'https://queue', 0, checkpoint, RateLimiter(0))
+
+        sent = [
+            json.loads(call[1]['MessageBody'])
+            for call in sqs_client.send_message.call_args_list
+        ]
+        assert [m['essay_id'] for m in sent] == ['e1', 'e3']
+        assert all(m['reanalyze'] is True for m in sent)
+
+        second_call = table.scan.call_args_list[1][1]
+        assert second_call['ExclusiveStartKey']['essay_id'] == 'e2'
+        assert second_call['Segment'] == 0
+        assert second_call['TotalSegments'] == 1
+        assert checkpoint.totals() == {'scanned': 3, 'enqueued': 2, 'segments_done': 1}
+
+    def test_dry_run_does_not_enqueue(self, tmp_path):
+        table = MagicMock()
+        table.scan.return_value = {'Items': [make_item('e1')], 'ScannedCount': 1}
+        sqs_client = MagicMock()
+        checkpoint = Checkpoint(None, total_segments=1)
+
+        scan_segment(
+            table, sqs_client, 'https://queue', 0, checkpoint, RateLimiter(0), dry_run=True
+        )
+
+        sqs_client.send_message.assert_not_called()
+        assert checkpoint.totals()['enqueued'] == 1
+
+
+    def test_index_keys_sets_teacher_student_without_enqueueing(self, tmp_path):
+        from botocore.exceptions import ClientError
+
+        table = MagicMock()
+        table.scan.return_value = {
+            'Items': [make_item('e1'), make_item('e2')],
+            'ScannedCount': 5,
+        }
+        # e2 was deleted between the scan and the update
+        table.update_item.side_effect = [
+            {},
+            ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'UpdateItem'),
+        ]
+        sqs_client = MagicMock()
+        checkpoint = Checkpoint(None, total_segments=1)
+
+        scan_segment(
+            table, sqs_client, 'https://queue', 0, checkpoint, RateLimiter(0), index_keys=True
+        )
+
+        sqs_client.send_message.assert_not_called()
+        update = table.update_item.call_args_list[0][1]
+        assert update['Key'] == {'assignment_id': 'assignment-1', 'essay_id': 'e1'}
+        assert update['ExpressionAttributeValues'] == {':key': 'teacher-1#student-1'}
+        assert checkpoint.totals()['enqueued'] == 1
+        assert table.scan.call_args[1]['FilterExpression'] == (
+            Attr('student_id').gt('') & Attr('teacher_student').not_exists()
+        )
+
+    def test_index_keys_needs_no_queue_and_uses_own_checkpoint(self):
+        args = backfill.parse_args(['--table', 't', '--index-keys'])
+        assert args.checkpoint == 'index_keys_checkpoint.json'
+        assert backfill.parse_args(['--table', 't']).checkpoint == 'backfill_checkpoint.json'
+
+
+class TestCheckpointResume:
+    def test_resume_skips_done_segments_and_continues_from_last_key(self, tmp_path):
+        path = str(tmp_path / 'cp.json')
+        with open(path, 'w') as f:
+            json.dump({
+                'total_segments': 2,
+                'segments': {
+                    '0': {'last_key': None, 'done': True, 'scanned': 10, 'enqueued': 4},
+                    '1': {
+                        'last_key': {'assignment_id': 'a', 'essay_id': 'e9'},
+                        'done': False,
+                        'scanned': 5,
+                        'enqueued': 1,
+                    },
+                },
+            }, f)
+
+        table = MagicMock()
+        table.item_count = 20
+        table.scan.return_value = {'Items': [make_item('e10')], 'ScannedCount': 5}
+        sqs_client = MagicMock()
+
+        totals = run_backfill(
+            table, sqs_client, 'https://queue', total_segments=2, rate=0,
+            checkpoint_path=path,
+        )
+
+        table.scan.assert_called_once()
+        assert table.scan.call_args[1]['Segment'] == 1
+        assert table.scan.call_args[1]['ExclusiveStartKey'] == {'assignment_id': 'a', 'essay_id': 'e9'}
+        assert totals == {'scanned': 20, 'enqueued': 6, 'segments_done': 2}
+
+        with open(path) as f:
+            assert json.load(f)['segments']['1']['done'] is True
+
+    def test_mismatched_segment_count_is_rejected(self, tmp_path):
+        path = str(tmp_path / 'cp.json')
+        Checkpoint(path, total_segments=2).update(0, None, 1, 0)
+
+        try:
+            Checkpoint(path, total_segments=4)
+            assert False, "Expected ValueError"
+        except ValueError as e:
+            assert '2 segments' in str(e)
+
+
+class TestFormatProgress:
+    def test_reports_percent_and_eta(self):
+        line = backfill.format_progress(
+            {'scanned': 50, 'enqueued': 5, 'segments_done': 1},
+            total_segments=4,
+            item_count=100,
+            elapsed=10.0,
+            scanned_at_start=0,
+        )
+        assert 'progress=50.0%' in line
+        assert 'eta=10s' in line
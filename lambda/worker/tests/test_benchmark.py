@@ -0,0 +1,63 @@
+"""
+Unit tests for the wire schema benchmark tool.
+"""
+import os
+from decimal import Decimal
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmark import compare, format_report, load_essays, run_benchmark, summarize
+
+ESSAY = ' '.join(['The journey across the country was long but memorable.'] * 5)
+
+
+def fake_analyze(text, variant):
+    if 'fail' in text:
+        raise ValueError('bad response')
+    completion = 60 if variant == 'compact' else 150
+    usage = {
+        'prompt_tokens': 500 if variant == 'compact' else 600,
+        'completion_tokens': completion,
+        'cost_usd': Decimal('0.0001') * completion,
+    }
+    if variant == 'split':
+        usage['parts'] = {
+            'review': {'latency_ms': 900},
+            'used': {'latency_ms': 400},
+            'recommended': {'latency_ms': 500},
+        }
+    return {}, usage
+
+
+class TestBenchmark:
+    def test_load_essays_reads_txt_files(self, tmp_path):
+        (tmp_path / 'b.txt').write_text(ESSAY)
+        (tmp_path / 'a.txt').write_text(ESSAY)
+        (tmp_path / 'notes.md').write_text('ignored')
+
+        essays = load_essays([str(tmp_path)], limit=1)
+
+        assert essays == [('a.txt', ESSAY)]
+
+    def test_reports_per_schema_tokens_and_reduction(self):
+        essays = [('a.txt', ESSAY), ('b.txt', ESSAY), ('c.txt', ESSAY + ' fail')]
+
+        runs = run_benchmark(essays, ['verbose', 'compact'], fake_analyze, concurrency=2)
+        summary = summarize(runs)
+        reduction = compare(summary, 'verbose', 'compact')
+
+        assert len(runs) == 6
+        assert summary['verbose']['essays'] == 2
+        assert summary['verbose']['errors'] == 1
+        assert summary['compact']['completion_tokens_per_essay'] == 60
+        assert reduction['completion_tokens_pct'] == 60.0
+        assert 'completion_tokens_pct +60.0%' in format_report(summary, reduction)
+
+    def test_split_runs_report_part_latency(self):
+        runs = run_benchmark([('a.txt', ESSAY)], ['compact', 'split'], fake_analyze)
+        summary = summarize(runs)
+
+        assert 'p50_part_latency_ms' not in summary['compact']
+        assert summary['split']['p50_part_latency_ms'] == {'review': 900, 'used': 400, 'recommended': 500}
+        assert 'review 900 ms' in format_report(summary, None)
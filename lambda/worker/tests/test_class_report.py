@@ -0,0 +1,166 @@
+"""
+Unit tests for assignment-level class reports.
+"""
+import os
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from class_report import (
+    build_report_prompt,
+    maybe_generate_class_report,
+    report_fingerprint,
+    sample_essays,
+    summarize_essay,
+    word_frequencies,
+)
+
+REPORT = {
+    'class_summary': 'The class uses descriptive vocabulary well.',
+    'common_strengths': ['descriptive adjectives'],
+    'struggling_words': [{'word': 'affect', 'issue': 'confused with effect', 'student_count': 2}],
+    'recommended_focus_vocabulary': ['consequently', 'nuance'],
+}
+USAGE = {'model': 'gpt-4.1-mini', 'prompt_tokens': 900, 'cached_tokens': 0, 'completion_tokens': 150}
+
+
+def essay(essay_id, status='processed', processed_at='2025-01-18T12:00:00', used=None):
+    return {
+        'essay_id': essay_id,
+        'student_id': f'student-{essay_id}',
+        'status': status,
+        'processed_at': processed_at,
+        'vocabulary_analysis': {
+            'correctness_review': 'Mostly correct word choice. ' * 20,
+            'vocabulary_used': used or ['vivid', 'Affect', 'thus'],
+            'recommended_vocabulary': ['consequently', 'nuance'],
+        },
+    }
+
+
+def conditional_failure():
+    return ClientError(
+        {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'failed'}}, 'UpdateItem'
+    )
+
+
+def make_tables(items):
+    essays = MagicMock()
+    essays.query.return_value = {'Items': items}
+    return essays, MagicMock()
+
+
+def generate(essays, reports, complete_json=None, teacher_id='teacher-1'):
+    complete_json = complete_json or MagicMock(return_value=(REPORT, USAGE))
+    return maybe_generate_class_report(
+        teacher_id, 'assignment-1', essays, reports, complete_json, 'gpt-4.1-mini'
+    )
+
+
+class TestSummaries:
+    def test_summary_is_compact(self):
+        summary = summarize_essay(essay('e1', used=[f'word{i}' for i in range(20)]))
+
+        assert summary['student_id'] == 'student-e1'
+        assert len(summary['used']) == 8
+        assert len(summary['review']) <= 203
+        assert summary['review'].endswith('...')
+
+    def test_word_frequencies_count_each_essay_once(self):
+        items = [essay('e1', used=['vivid', 'Vivid']), essay('e2', used=['vivid', 'thus'])]
+
+        frequencies = word_frequencies(items)
+
+        assert frequencies['vocabulary_used'][0] == {'word': 'vivid', 'essay_count': 2}
+        assert frequencies['recommended_vocabulary'][0]['essay_count'] == 2
+
+    def test_prompt_lists_every_essay_without_texts(self):
+        items = [essay('e1'), essay('e2')]
+        prompt = build_report_prompt([summarize_essay(i) for i in items], word_frequencies(items))
+
+        assert '(2 essays)' in prompt
+        assert 'student-e1' in prompt and 'student-e2' in prompt
+        assert 'struggling_words' in prompt
+
+    def test_fingerprint_tracks_count_and_latest_result(self):
+        items = [essay('e1'), essay('e2', processed_at='2025-01-19T08:00:00')]
+
+        assert report_fingerprint(items) == '2#2025-01-19T08:00:00'
+
+
+class TestMaybeGenerateClassReport:
+    def test_generates_and_stores_report_when_all_processed(self):
+        essays, reports = make_tables([essay('e1'), essay('e2'), essay('e3')])
+        complete_json = MagicMock(return_value=(REPORT, USAGE))
+
+        item = generate(essays, reports, complete_json)
+
+        assert complete_json.call_count == 1
+        assert item['essay_count'] == 3
+        assert item['essays_analyzed'] == 3
+        assert item['report']['class_summary'] == REPORT['class_summary']
+        assert item['token_usage'] == USAGE
+        claim = reports.update_item.call_args[1]
+        assert claim['ExpressionAttributeValues'][':fp'] == '3#2025-01-18T12:00:00'
+        stored = reports.put_item.call_args[1]
+        assert stored['Item']['assignment_id'] == 'assignment-1'
+        assert stored['ConditionExpression'] == 'fingerprint = :fp'
+
+    def test_large_class_summarizes_a_sample_but_counts_every_word(self, monkeypatch):
+        import class_report
+        monkeypatch.setattr(class_report, 'CLASS_REPORT_MAX_ESSAYS', 2)
+        items = [essay(f'e{i}', used=[f'word{i}']) for i in range(5)]
+        essays, reports = make_tables(items)
+        complete_json = MagicMock(return_value=(REPORT, USAGE))
+
+        item = generate(essays, reports, complete_json)
+
+        assert item['essay_count'] == 5
+        assert item['essays_analyzed'] == 2
+        assert len(item['word_frequencies']['vocabulary_used']) == 5
+        prompt = complete_json.call_args[0][1]
+        assert 'student-e0' in prompt and 'student-e2' in prompt
+        assert 'student-e1' not in prompt
+
+    def test_sample_is_spread_across_the_class(self):
+        items = list(range(10))
+
+        assert sample_essays(items, 3) == [0, 3, 6]
+        assert sample_essays(items, 20) == items
+
+    def test_waits_for_pending_essays(self):
+        essays, reports = make_tables([essay('e1'), essay('e2'), essay('e3', status='pending')])
+
+        assert generate(essays, reports) is None
+        reports.update_item.assert_not_called()
+
+    def test_skips_small_assignments_and_demo_teacher(self):
+        essays, reports = make_tables([essay('e1'), essay('e2')])
+        assert generate(essays, reports) is None
+
+        essays, reports = make_tables([essay('e1'), essay('e2'), essay('e3')])
+        assert generate(essays, reports, teacher_id='demo-teacher') is None
+        essays.query.assert_not_called()
+
+    def test_already_claimed_fingerprint_is_not_regenerated(self):
+        essays, reports = make_tables([essay('e1'), essay('e2'), essay('e3')])
+        reports.update_item.side_effect = conditional_failure()
+        complete_json = MagicMock()
+
+        assert generate(essays, reports, complete_json) is None
+        complete_json.assert_not_called()
+
+    def test_failed_generation_releases_claim(self):
+        essays, reports = make_tables([essay('e1'), essay('e2'), essay('e3')])
+        complete_json = MagicMock(side_effect=RuntimeError('llm down'))
+
+        with pytest.raises(RuntimeError):
+            generate(essays, reports, complete_json)
+
+        release = reports.update_item.call_args_list[-1][1]
+        assert release['UpdateExpression'].startswith('REMOVE fingerprint')
+        reports.put_item.assert_not_called()
@@ -0,0 +1,190 @@
+"""
+Unit tests for the adaptive (AIMD) LLM concurrency limiter.
+"""
+import os
+import threading
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from botocore.exceptions import ClientError
+
+from concurrency import AdaptiveConcurrencyLimiter, DynamoDBLimitCoordinator
+
+
+def conditional_check_failed():
+    return ClientError(
+        {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'failed'}},
+        'UpdateItem',
+    )
+
+
+class TestAdaptiveConcurrencyLimiter:
+    def test_additive_increase_on_fast_success(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=10)
+
+        for _ in range(4):
+            limiter.on_success(0.5)
+
+        # +1/limit per success: 2 -> 2.5 -> 2.9 -> 3.24 -> 3.55
+        assert 3.5 < limiter.limit < 3.6
+
+    def test_throttle_halves_limit_once_per_cooldown(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8, decrease_cooldown=60)
+
+        limiter.on_throttle()
+        limiter.on_throttle()
+
+        assert limiter.limit == 4
+
+    def test_limit_never_drops_below_minimum(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1.5, min_limit=1, decrease_cooldown=0)
+
+        limiter.on_throttle()
+        limiter.on_throttle()
+
+        assert limiter.limit == 1
+
+    def test_latency_inflation_decreases_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8, latency_inflation=2.0)
+
+        for _ in range(3):
+            limiter.on_success(1.0)
+        limiter.on_success(3.0)
+
+        assert limiter.limit < 8
+
+    def test_no_decrease_before_baseline_is_established(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8, baseline_min_samples=3)
+
+        limiter.on_success(1.0)
+        limiter.on_success(3.0)
+
+        assert limiter.limit > 8
+
+    def test_mixed_length_calls_do_not_decrease_limit(self):
+        """Slow calls are not congestion when they produced proportionally more tokens."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=32)
+        # (seconds, completion tokens): short reviews, full analyses, class reports
+        calls = [(1.0, 50), (6.0, 600), (1.5, 120), (15.0, 1500), (2.0, 150), (9.0, 900)] * 3
+
+        for latency, tokens in calls:
+            limiter.on_success(latency, completion_tokens=tokens)
+
+        assert limiter.limit > 4
+
+    def test_per_token_latency_inflation_decreases_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+
+        for _ in range(3):
+            limiter.on_success(5.0, completion_tokens=400)
+        # Same output length, three times slower
+        limiter.on_success(15.0, completion_tokens=400)
+
+        assert limiter.limit < 8
+
+    def test_baseline_follows_gradual_drift(self):
+        """A slowly rising latency moves the baseline instead of halving the limit."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=32)
+
+        for step in range(30):
+            limiter.on_success(1.0 + step * 0.1)
+
+        assert limiter.limit > 4
+
+    def test_low_remaining_header_decreases_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+
+        limiter.on_success(1.0, {
+            'x-ratelimit-limit-tokens': '200000',
+            'x-ratelimit-remaining-tokens': '5000',
+        })
+
+        assert limiter.limit == 4
+
+    def test_acquire_blocks_at_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def second():
+            limiter.acquire()
+            acquired.set()
+            limiter.release()
+
+        thread = threading.Thread(target=second)
+        thread.start()
+        assert not acquired.wait(0.1)
+
+        limiter.release()
+        assert acquired.wait(1.0)
+        thread.join()
+
+    def test_try_acquire_does_not_block(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+
+        assert limiter.try_acquire()
+        assert not limiter.try_acquire()
+        limiter.release()
+        assert limiter.try_acquire()
+
+
+class TestDynamoDBLimitCoordinator:
+    def test_adopts_limit_changed_by_another_invocation(self):
+        table = MagicMock()
+        table.get_item.return_value = {'Item': {'state_id': 'llm-concurrency', 'concurrency_limit': Decimal('3')}}
+        coordinator = DynamoDBLimitCoordinator(table, sync_interval=0)
+
+        assert coordinator.sync(10) == 3
+        table.update_item.assert_not_called()
+
+    def test_publishes_increase_when_unchanged(self):
+        table = MagicMock()
+        table.get_item.return_value = {'Item': {'concurrency_limit': Decimal('3')}}
+        coordinator = DynamoDBLimitCoordinator(table, sync_interval=0)
+        coordinator.sync(10)  # adopt 3
+
+        assert coordinator.sync(4) == 4
+        call = table.update_item.call_args[1]
+        assert call['ConditionExpression'] == 'concurrency_limit = :seen'
+        assert call['ExpressionAttributeValues'][':limit'] == Decimal('4')
+
+    def test_lost_race_rereads_shared_value(self):
+        table = MagicMock()
+        table.get_item.side_effect = [
+            {},
+            {'Item': {'concurrency_limit': Decimal('2')}},
+        ]
+        table.update_item.side_effect = conditional_check_failed()
+        coordinator = DynamoDBLimitCoordinator(table, sync_interval=0)
+
+        assert coordinator.sync(6) == 2
+
+    def test_sync_is_rate_limited(self):
+        table = MagicMock()
+        table.get_item.return_value = {}
+        coordinator = DynamoDBLimitCoordinator(table, sync_interval=60)
+
+        coordinator.sync(4)
+        coordinator.sync(5)
+
+        assert table.get_item.call_count == 1
+
+    def test_decrease_only_lowers_shared_limit(self):
+        table = MagicMock()
+        coordinator = DynamoDBLimitCoordinator(table)
+
+        coordinator.publish_decrease(2)
+
+        condition = table.update_item.call_args[1]['ConditionExpression']
+        assert 'concurrency_limit > :limit' in condition
+
+    def test_limiter_publishes_decrease(self):
+        coordinator = MagicMock()
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8, coordinator=coordinator)
+
+        limiter.on_throttle()
+
+        coordinator.publish_decrease.assert_called_once_with(4)
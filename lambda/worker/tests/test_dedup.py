@@ -0,0 +1,127 @@
+"""
+Unit tests for MinHash/LSH near-duplicate detection.
+"""
+import os
+from contextlib import contextmanager
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from dedup import (
+    NUM_PERM,
+    SignatureIndex,
+    band_keys,
+    decode_signature,
+    encode_signature,
+    estimate_similarity,
+    minhash_signature,
+    shingles,
+)
+
+ESSAY = (
+    "The industrial revolution transformed how people lived and worked. "
+    "Factories replaced small workshops, and cities grew rapidly as families "
+    "moved from farms in search of steady wages. Although new machines made "
+    "goods cheaper, working conditions were often dangerous, and children "
+    "frequently labored long hours. Over time, reformers pushed for laws that "
+    "limited work hours and improved safety, which shaped the modern workplace."
+)
+
+LIGHTLY_EDITED = (
+    "Name: Jordan Smith\n"
+    + ESSAY.replace("rapidly", "quickly").replace("dangerous", "dangrous")
+)
+
+UNRELATED = (
+    "My favorite season is autumn because the leaves change color and the air "
+    "feels crisp. Every weekend my family visits an orchard to pick apples, and "
+    "afterwards we bake pies together while listening to music in the kitchen."
+)
+
+
+class FakeSignaturesTable:
+    """Dict-backed stand-in for the EssaySignatures table."""
+
+    def __init__(self):
+        self.items = {}
+
+    def query(self, KeyConditionExpression, **kwargs):
+        band_key = KeyConditionExpression.get_expression()['values'][1]
+        return {'Items': [i for (pk, _), i in self.items.items() if pk == band_key]}
+
+    @contextmanager
+    def batch_writer(self):
+        yield self
+
+    def put_item(self, Item):
+        self.items[(Item['band_key'], Item['essay_id'])] = Item
+
+
+class TestSignatures:
+    def test_shingles_ignore_case_and_punctuation(self):
+        assert shingles("One, two THREE four five!") == shingles("one two three four five")
+
+    def test_short_text_is_one_shingle(self):
+        assert shingles("Too short") == {"too short"}
+        assert shingles("  ") == set()
+
+    def test_similarity_tracks_edits(self):
+        original = minhash_signature(shingles(ESSAY))
+
+        assert len(original) == NUM_PERM
+        assert estimate_similarity(original, minhash_signature(shingles(ESSAY))) == 1.0
+        assert estimate_similarity(original, minhash_signature(shingles(LIGHTLY_EDITED))) > 0.6
+        assert estimate_similarity(original, minhash_signature(shingles(UNRELATED))) < 0.2
+
+    def test_signature_round_trips_through_hex(self):
+        signature = minhash_signature(shingles(ESSAY))
+
+        assert decode_signature(encode_signature(signature)) == signature
+
+    def test_band_keys_are_scoped_to_teacher(self):
+        signature = minhash_signature(shingles(ESSAY))
+
+        keys = band_keys('teacher-1', signature)
+
+        assert len(keys) == 16
+        assert all(k.startswith('teacher-1#') for k in keys)
+        assert set(keys).isdisjoint(band_keys('teacher-2', signature))
+
+
+class TestSignatureIndex:
+    def test_finds_near_duplicate_for_same_teacher_only(self):
+        index = SignatureIndex(FakeSignaturesTable())
+        index.add('teacher-1', 'assignment-1', 'original', minhash_signature(shingles(ESSAY)))
+        index.add('teacher-1', 'assignment-1', 'other', minhash_signature(shingles(UNRELATED)))
+
+        copy = minhash_signature(shingles(ESSAY + " Thanks for reading."))
+        match = index.find_similar('teacher-1', copy, threshold=0.8)
+
+        assert match['essay_id'] == 'original'
+        assert match['assignment_id'] == 'assignment-1'
+        assert match['similarity'] >= 0.8
+        assert index.find_similar('teacher-2', copy, threshold=0.8) is None
+
+    def test_candidates_are_ordered_by_similarity(self):
+        index = SignatureIndex(FakeSignaturesTable())
+        index.add('teacher-1', 'assignment-1', 'original', minhash_signature(shingles(ESSAY)))
+        keys = index.add(
+            'teacher-1', 'assignment-1', 'edited', minhash_signature(shingles(LIGHTLY_EDITED))
+        )
+
+        signature = minhash_signature(shingles(ESSAY))
+        candidates = index.find_candidates('teacher-1', signature, threshold=0.5)
+
+        assert [c['essay_id'] for c in candidates] == ['original', 'edited']
+        assert candidates[0]['similarity'] >= candidates[1]['similarity']
+        assert candidates[1]['band_key'] in keys
+
+    def test_threshold_and_exclusion(self):
+        index = SignatureIndex(FakeSignaturesTable())
+        signature = minhash_signature(shingles(ESSAY))
+        index.add('teacher-1', 'assignment-1', 'original', signature)
+
+        assert index.find_similar('teacher-1', signature, 0.8, exclude_essay_id='original') is None
+        assert index.find_similar(
+            'teacher-1', minhash_signature(shingles(UNRELATED)), 0.8
+        ) is None
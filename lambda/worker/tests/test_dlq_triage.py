@@ -0,0 +1,143 @@
+"""
+Unit tests for the DLQ triage and redrive tool, run against the in-memory SQS.
+"""
+import os
+import json
+
+# Set environment variables before importing modules
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from dlq_triage import run_triage
+from local_sqs import InMemorySQS
+
+DLQ_URL = 'https://local/dlq'
+QUEUE_URL = 'https://local/processing'
+
+
+class FakeEssaysTable:
+    """Minimal dict-backed stand-in for the Essays table get_item."""
+
+    def __init__(self, items):
+        self.items = {(i['assignment_id'], i['essay_id']): i for i in items}
+
+    def get_item(self, Key, **kwargs):
+        item = self.items.get((Key['assignment_id'], Key['essay_id']))
+        return {'Item': item} if item else {}
+
+
+def essay(essay_id, status='pending', text='Some essay text.', error_class=None):
+    item = {
+        'assignment_id': 'assignment-1',
+        'essay_id': essay_id,
+        'status': status,
+        'essay_text': text,
+    }
+    if error_class:
+        item['last_error'] = {'error_class': error_class, 'message': f'{error_class} happened'}
+    return item
+
+
+def message_for(essay_id):
+    return json.dumps({
+        'teacher_id': 'teacher-1',
+        'assignment_id': 'assignment-1',
+        'student_id': '',
+        'essay_id': essay_id,
+    })
+
+
+@pytest.fixture
+def sqs():
+    client = InMemorySQS()
+    for essay_id in ['throttled-1', 'throttled-2', 'parse-1', 'gone', 'blank', 'done', 'mystery']:
+        client.send_message(QueueUrl=DLQ_URL, MessageBody=message_for(essay_id))
+    client.send_message(QueueUrl=DLQ_URL, MessageBody='not json')
+    return client
+
+
+@pytest.fixture
+def table():
+    return FakeEssaysTable([
+        essay('throttled-1', error_class='throttled'),
+        essay('throttled-2', error_class='throttled'),
+        essay('parse-1', error_class='llm_parse_failure'),
+        essay('blank', text='  '),
+        essay('done', status='processed'),
+        essay('mystery'),
+    ])
+
+
+class TestRunTriage:
+    def test_classifies_every_message(self, sqs, table):
+        report = run_triage(sqs, table, DLQ_URL, workers=3, rate=0, visibility_timeout=60)
+
+        assert report['total'] == 8
+        assert report['counts'] == {
+            'malformed': 1,
+            'missing_essay': 1,
+            'empty_text': 1,
+            'already_processed': 1,
+            'llm_parse_failure': 1,
+            'throttled': 2,
+            'unknown': 1,
+        }
+        assert report['samples']['llm_parse_failure'][0]['last_error'] == 'llm_parse_failure happened'
+        # Nothing selected: all messages stay in the DLQ
+        assert len(sqs.bodies(DLQ_URL)) == 8
+        assert sqs.bodies(QUEUE_URL) == []
+
+    def test_redrives_and_purges_selected_classes(self, sqs, table):
+        report = run_triage(
+            sqs, table, DLQ_URL, queue_url=QUEUE_URL,
+            redrive_classes=['throttled', 'llm_parse_failure'],
+            purge_classes=['already_processed'],
+            workers=2, rate=0, visibility_timeout=60,
+        )
+
+        assert report['redriven'] == 3
+        assert report['purged'] == 1
+        redriven_ids = sorted(json.loads(b)['essay_id'] for b in sqs.bodies(QUEUE_URL))
+        assert redriven_ids == ['parse-1', 'throttled-1', 'throttled-2']
+        assert len(sqs.bodies(DLQ_URL)) == 4
+
+    def test_multi_essay_messages_are_triaged_per_essay(self, table):
+        """A dead-lettered batch message is split so each essay is classified and redriven alone."""
+        sqs = InMemorySQS()
+        sqs.send_message(QueueUrl=DLQ_URL, MessageBody=json.dumps({
+            'teacher_id': 'teacher-1',
+            'assignment_id': 'assignment-1',
+            'student_id': '',
+            'essay_ids': ['throttled-1', 'done', 'throttled-2'],
+            'attempt': 3,
+        }))
+
+        report = run_triage(
+            sqs, table, DLQ_URL, queue_url=QUEUE_URL,
+            redrive_classes=['throttled'], purge_classes=['already_processed'],
+            workers=1, rate=0, visibility_timeout=60,
+        )
+
+        assert report['expanded'] == 1
+        assert report['counts'] == {'already_processed': 1, 'throttled': 2}
+        redriven = [json.loads(b) for b in sqs.bodies(QUEUE_URL)]
+        assert sorted(b['essay_id'] for b in redriven) == ['throttled-1', 'throttled-2']
+        assert all('essay_ids' not in b and 'attempt' not in b for b in redriven)
+        assert sqs.bodies(DLQ_URL) == []
+
+    def test_max_messages_caps_receives(self, sqs, table):
+        report = run_triage(sqs, table, DLQ_URL, workers=1, rate=0, max_messages=3)
+
+        assert report['total'] == 3
+
+    def test_rejects_unknown_class(self, sqs, table):
+        with pytest.raises(ValueError):
+            run_triage(sqs, table, DLQ_URL, queue_url=QUEUE_URL, redrive_classes=['bogus'])
+
+    def test_redrive_requires_queue_url(self, sqs, table):
+        with pytest.raises(ValueError):
+            run_triage(sqs, table, DLQ_URL, redrive_classes=['throttled'])
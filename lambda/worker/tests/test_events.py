@@ -0,0 +1,104 @@
+"""
+Unit tests for essay completion events.
+"""
+import os
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from events import (
+    FanOutPublisher,
+    InMemoryEventPublisher,
+    ProgressTablePublisher,
+    SNSEventPublisher,
+    build_completion_event,
+    create_publisher,
+)
+
+
+def event(status='processed', **extra):
+    return build_completion_event(
+        'essay-1', 'assignment-1', 'teacher-1', status, {'total_ms': 1200}, **extra
+    )
+
+
+class TestBuildCompletionEvent:
+    def test_processed_event(self):
+        result = event(analysis_source='llm')
+
+        assert result['event_type'] == 'essay.processed'
+        assert result['analysis_source'] == 'llm'
+        assert result['timings'] == {'total_ms': 1200}
+        assert 'error_class' not in result
+
+    def test_failed_event_carries_error_class(self):
+        result = event('failed', error_class='throttled')
+
+        assert result['event_type'] == 'essay.failed'
+        assert result['error_class'] == 'throttled'
+        assert 'analysis_source' not in result
+
+
+class TestPublishers:
+    def test_sns_publisher_sends_filterable_attributes(self):
+        sns = MagicMock()
+        SNSEventPublisher('arn:aws:sns:us-east-1:123:essay-events', sns).publish(event())
+
+        call = sns.publish.call_args[1]
+        assert json.loads(call['Message'])['essay_id'] == 'essay-1'
+        assert call['MessageAttributes']['event_type']['StringValue'] == 'essay.processed'
+        assert call['MessageAttributes']['teacher_id']['StringValue'] == 'teacher-1'
+
+    def test_in_memory_publisher_records_and_fans_out(self):
+        publisher = InMemoryEventPublisher(max_events=2)
+        received = []
+        publisher.subscribe(received.append)
+        publisher.subscribe(lambda e: 1 / 0)  # a failing subscriber does not break others
+
+        for status in ('processed', 'skipped', 'failed'):
+            publisher.publish(event(status))
+
+        assert [e['status'] for e in received] == ['processed', 'skipped', 'failed']
+        assert [e['status'] for e in publisher.events] == ['skipped', 'failed']
+
+    def test_create_publisher(self):
+        factory = MagicMock()
+
+        assert isinstance(create_publisher(None, factory), InMemoryEventPublisher)
+        factory.assert_not_called()
+        assert isinstance(create_publisher('arn:topic', factory), SNSEventPublisher)
+
+    def test_progress_table_publisher_keys_by_assignment(self):
+        table = MagicMock()
+        e = event()
+
+        ProgressTablePublisher(table).publish(e)
+
+        item = table.put_item.call_args[1]['Item']
+        assert item['assignment_id'] == 'assignment-1'
+        assert item['event_key'] == f"{e['occurred_at']}#essay-1"
+        assert item['status'] == 'processed'
+        assert item['expires_at'] > 0
+
+    def test_create_publisher_with_progress_table(self):
+        table = MagicMock()
+        publisher = create_publisher(None, MagicMock(), table)
+
+        assert isinstance(publisher, FanOutPublisher)
+        publisher.publish(event())
+
+        table.put_item.assert_called_once()
+        assert len(publisher.publishers[0].events) == 1
+
+    def test_fan_out_publishes_to_all_before_raising(self):
+        failing, table = MagicMock(), MagicMock()
+        failing.publish.side_effect = RuntimeError('sns down')
+
+        with pytest.raises(RuntimeError):
+            FanOutPublisher([failing, ProgressTablePublisher(table)]).publish(event())
+
+        table.put_item.assert_called_once()
@@ -0,0 +1,807 @@
+"""
+Unit tests for the worker Lambda handler and essay processing pipeline.
+"""
+import os
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import boto3
+from moto import mock_aws
+
+# Set environment variables before importing modules
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ['ESSAYS_TABLE'] = 'test-essays-table'
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import lambda_function
+from concurrency import AdaptiveConcurrencyLimiter
+from dedup import SignatureIndex, band_keys
+from events import InMemoryEventPublisher
+from llm_backends import FailoverBackend, OpenAIBackend, OpenAICompatibleBackend
+
+
+ANALYSIS = {
+    'correctness_review': 'Words are used correctly.',
+    'vocabulary_used': ['consequently', 'vivid'],
+    'recommended_vocabulary': ['meticulous', 'profound'],
+}
+
+# The same analysis in the compact wire contract the model answers in
+ANALYSIS_WIRE = {
+    'r': ANALYSIS['correctness_review'],
+    'u': ANALYSIS['vocabulary_used'],
+    'n': ANALYSIS['recommended_vocabulary'],
+}
+
+ESSAY_TEXT = (
+    "Name: Jordan Smith\n\n"
+    "Last summer my family drove across the country to visit my grandparents. "
+    "The journey was exhausting, but the landscapes we passed were vivid and "
+    "unforgettable, and consequently I began keeping a journal of every town "
+    "where we stopped along the way."
+)
+
+
+def make_openai_client(content=None, headers=None):
+    """Fake OpenAI client exposing chat.completions.with_raw_response.create."""
+    completion = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content or json.dumps(ANALYSIS_WIRE)))],
+        usage=SimpleNamespace(
+            prompt_tokens=800,
+            completion_tokens=120,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=0),
+        ),
+    )
+    raw = MagicMock()
+    raw.headers = headers or {}
+    raw.parse.return_value = completion
+    client = MagicMock()
+    client.chat.completions.with_raw_response.create.return_value = raw
+    return client
+
+
+def make_backend(client, limiter=None):
+    """Single OpenAI backend around a fake client."""
+    return FailoverBackend([
+        OpenAIBackend('openai', client, lambda_function.OPENAI_MODEL, limiter or AdaptiveConcurrencyLimiter())
+    ])
+
+
+def make_record(essay_id, **extra):
+    body = {
+        'teacher_id': 'teacher-1',
+        'assignment_id': 'assignment-1',
+        'student_id': 'student-1',
+        'essay_id': essay_id,
+        **extra,
+    }
+    return {'messageId': f'msg-{essay_id}', 'body': json.dumps(body)}
+
+
+class TestAnalyzeEssay:
+    def test_returns_analysis_and_usage(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2)
+        with patch.object(lambda_function, 'llm_backend', make_backend(make_openai_client(), limiter)):
+            analysis, usage = lambda_function.analyze_essay_with_openai('An essay.')
+
+        assert analysis == ANALYSIS
+        assert usage['prompt_tokens'] == 800
+        assert limiter.in_flight == 0
+        assert limiter.limit > 2
+
+    def test_missing_fields_raise(self):
+        client = make_openai_client(content=json.dumps({'vocabulary_used': []}))
+        with patch.object(lambda_function, 'llm_backend', make_backend(client)):
+            try:
+                lambda_function.analyze_essay_with_openai('An essay.')
+                assert False, "Expected ValueError"
+            except ValueError as e:
+                assert 'Missing required fields' in str(e)
+
+    def test_split_mode_runs_parts_in_parallel_and_merges(self):
+        responses = {
+            '{"r": review}': {'r': ANALYSIS['correctness_review']},
+            '{"u": used}': {'u': ANALYSIS['vocabulary_used']},
+            '{"n": new}': {'n': ANALYSIS['recommended_vocabulary']},
+        }
+        client = make_openai_client()
+
+        def create(**kwargs):
+            prompt = kwargs['messages'][1]['content']
+            content = next(v for k, v in responses.items() if k in prompt)
+            return make_openai_client(content=json.dumps(content)).chat.completions.with_raw_response.create()
+
+        client.chat.completions.with_raw_response.create.side_effect = create
+        with patch.object(lambda_function, 'llm_backend', make_backend(client)):
+            analysis, usage = lambda_function.analyze_essay_with_openai('An essay.', mode='split')
+
+        assert analysis == ANALYSIS
+        assert client.chat.completions.with_raw_response.create.call_count == 3
+        assert usage['prompt_tokens'] == 2400
+        assert set(usage['parts']) == {'review', 'used', 'recommended'}
+        assert 'latency_ms' in usage['parts']['review']
+
+    def test_verbose_schema_is_still_supported(self):
+        client = make_openai_client(content=json.dumps(ANALYSIS))
+        with patch.object(lambda_function, 'llm_backend', make_backend(client)):
+            analysis, _ = lambda_function.analyze_essay_with_openai('An essay.', schema='verbose')
+
+        assert analysis == ANALYSIS
+        prompt = client.chat.completions.with_raw_response.create.call_args[1]['messages'][1]['content']
+        assert '"correctness_review"' in prompt
+
+
+class TestProcessEssay:
+    def test_processes_pending_essay(self):
+        table = MagicMock()
+        table.get_item.return_value = {'Item': {
+            'assignment_id': 'assignment-1',
+            'essay_id': 'e1',
+            'essay_text': ESSAY_TEXT,
+            'status': 'pending',
+        }}
+        with patch.object(lambda_function, 'essays_table', table), \
+             patch.object(lambda_function, 'llm_backend', make_backend(make_openai_client())):
+            lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+
+        values = table.update_item.call_args[1]['ExpressionAttributeValues']
+        assert values[':status'] == 'processed'
+        assert values[':analysis'] == ANALYSIS
+        assert values[':prompt_version'] == lambda_function.PROMPT_VERSION
+        assert values[':model'] == lambda_function.OPENAI_MODEL
+
+    def test_records_model_that_served_the_call(self):
+        """An analysis served by the local backend is stale and gets backfilled."""
+        table = MagicMock()
+        table.get_item.return_value = {'Item': {
+            'assignment_id': 'assignment-1',
+            'essay_id': 'e1',
+            'essay_text': ESSAY_TEXT,
+            'status': 'pending',
+        }}
+        backend = FailoverBackend([OpenAICompatibleBackend(
+            'local', make_openai_client(), 'local-model', AdaptiveConcurrencyLimiter()
+        )])
+        with patch.object(lambda_function, 'essays_table', table), \
+             patch.object(lambda_function, 'llm_backend', backend):
+            lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+
+        values = table.update_item.call_args[1]['ExpressionAttributeValues']
+        assert values[':model'] == 'local-model'
+        assert values[':usage']['cost_usd'] == 0
+        assert lambda_function.is_analysis_stale({
+            'prompt_version': values[':prompt_version'],
+            'analysis_model': values[':model'],
+        })
+
+    def test_strips_header_before_llm_call(self):
+        table = MagicMock()
+        table.get_item.return_value = {'Item': {
+            'assignment_id': 'assignment-1',
+            'essay_id': 'e1',
+            'essay_text': ESSAY_TEXT,
+            'status': 'pending',
+        }}
+        client = make_openai_client()
+        with patch.object(lambda_function, 'essays_table', table), \
+             patch.object(lambda_function, 'llm_backend', make_backend(client)):
+            lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+
+        prompt = client.chat.completions.with_raw_response.create.call_args[1]['messages'][1]['content']
+        assert 'Jordan Smith' not in prompt
+        preprocessing = table.update_item.call_args[1]['ExpressionAttributeValues'][':preprocessing']
+        assert preprocessing['removed_lines'] == 1
+
+    def test_short_essay_gets_local_result_without_llm_call(self):
+        table = MagicMock()
+        table.get_item.return_value = {'Item': {
+            'assignment_id': 'assignment-1',
+            'essay_id': 'e1',
+            'essay_text': 'Name: Jordan\nI like dogs.',
+            'status': 'pending',
+        }}
+        client = make_openai_client()
+        with patch.object(lambda_function, 'essays_table', table), \
+             patch.object(lambda_function, 'llm_backend', make_backend(client)), \
+             patch.object(lambda_function, 'record_usage') as mock_record_usage:
+            lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+
+        client.chat.completions.with_raw_response.create.assert_not_called()
+        mock_record_usage.assert_not_called()
+        call = table.update_item.call_args[1]
+        assert call['UpdateExpression'].endswith('REMOVE token_usage, duplicate_of')
+        values = call['ExpressionAttributeValues']
+        assert values[':status'] == 'processed'
+        assert values[':analysis']['vocabulary_used'] == []
+        assert values[':preprocessing']['rejection_reason'] == 'too_short'
+
+    def test_revision_only_sends_changed_paragraphs(self):
+        from paragraphs import build_paragraph_cache, split_paragraphs
+        from preprocess import preprocess_essay
+
+        original = preprocess_essay(ESSAY_TEXT).text
+        added = "We returned home with stories we would retell for years."
+        table = MagicMock()
+        table.get_item.return_value = {'Item': {
+            'assignment_id': 'assignment-1',
+            'essay_id': 'e1',
+            'essay_text': f"{ESSAY_TEXT}\n\n{added}",
+            'status': 'pending',
+            'revision': 2,
+            'vocabulary_analysis': ANALYSIS,
+            'paragraph_analyses': build_paragraph_cache(split_paragraphs(original), ANALYSIS),
+            'prompt_version': lambda_function.PROMPT_VERSION,
+            'analysis_model': lambda_function.OPENAI_MODEL,
+        }}
+        client = make_openai_client(content=json.dumps({
+            'r': 'The new paragraph is clear.',
+            'u': ['retell'],
+            'n': ['reminisce'],
+        }))
+        with patch.object(lambda_function, 'essays_table', table), \
+             patch.object(lambda_function, 'llm_backend', make_backend(client)):
+            lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+
+        prompts = [
+            c[1]['messages'][1]['content']
+            for c in client.chat.completions.with_raw_response.create.call_args_list
+        ]
+        [analysis_prompt] = [p for p in prompts if '"u"' in p]
+        [review_prompt] = [p for p in prompts if '"u"' not in p]
+        # Words only for the changed paragraph, the review over the whole essay
+        assert added in analysis_prompt
+        assert 'grandparents' not in analysis_prompt
+        assert added in review_prompt and 'grandparents' in review_prompt
+        values = table.update_item.call_args[1]['ExpressionAttributeValues']
+        analysis = values[':analysis']
+        assert analysis['vocabulary_used'] == ['consequently', 'vivid', 'retell']
+        assert analysis['recommended_vocabulary'][0] == 'reminisce'
+        assert analysis['correctness_review'] == 'The new paragraph is clear.'
+        assert values[':usage']['prompt_tokens'] == 1600
+
+    def test_skips_processed_essay_unless_stale_reanalysis(self):
+        table = MagicMock()
+        table.get_item.return_value = {'Item': {
+            'assignment_id': 'assignment-1',
+            'essay_id': 'e1',
+            'essay_text': ESSAY_TEXT,
+            'status': 'processed',
+            'prompt_version': lambda_function.PROMPT_VERSION,
+            'analysis_model': lambda_function.OPENAI_MODEL,
+        }}
+        with patch.object(lambda_function, 'essays_table', table), \
+             patch.object(lambda_function, 'llm_backend', make_backend(make_openai_client())):
+            lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+            lambda_function.process_essay(
+                'teacher-1', 'assignment-1', 'student-1', 'e1', reanalyze=True
+            )
+
+        table.update_item.assert_not_called()
+
+    def test_reuses_analysis_of_near_duplicate(self):
+        table = MagicMock()
+        table.get_item.side_effect = [
+            {'Item': {
+                'assignment_id': 'assignment-1',
+                'essay_id': 'copy',
+                'essay_text': ESSAY_TEXT,
+                'status': 'pending',
+            }},
+            {'Item': {
+                'assignment_id': 'assignment-0',
+                'essay_id': 'original',
+                'status': 'processed',
+                'vocabulary_analysis': ANALYSIS,
+                'prompt_version': lambda_function.PROMPT_VERSION,
+                'analysis_model': lambda_function.OPENAI_MODEL,
+            }},
+        ]
+        index = MagicMock()
+        index.find_candidates.return_value = [{
+            'essay_id': 'original', 'assignment_id': 'assignment-0', 'similarity': 0.92,
+            'band_key': 'teacher-1#0#abc',
+        }]
+        client = make_openai_client()
+        with patch.object(lambda_function, 'essays_table', table), \
+             patch.object(lambda_function, 'signature_index', index), \
+             patch.object(lambda_function, 'llm_backend', make_backend(client)):
+            lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'copy')
+
+        client.chat.completions.with_raw_response.create.assert_not_called()
+        index.add.assert_not_called()
+        call = table.update_item.call_args[1]
+        assert 'REMOVE token_usage' in call['UpdateExpression']
+        values = call['ExpressionAttributeValues']
+        assert values[':analysis'] == ANALYSIS
+        assert values[':duplicate_of']['essay_id'] == 'original'
+
+    def test_indexes_essay_when_no_duplicate(self):
+        table = MagicMock()
+        table.get_item.return_value = {'Item': {
+            'assignment_id': 'assignment-1',
+            'essay_id': 'e1',
+            'essay_text': ESSAY_TEXT,
+            'status': 'pending',
+        }}
+        index = MagicMock()
+        index.find_candidates.return_value = []
+        with patch.object(lambda_function, 'essays_table', table), \
+             patch.object(lambda_function, 'signature_index', index), \
+             patch.object(lambda_function, 'llm_backend', make_backend(make_openai_client())):
+            lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+
+        assert index.add.call_args[0][:3] == ('teacher-1', 'assignment-1', 'e1')
+        update = table.update_item.call_args[1]
+        assert 'REMOVE duplicate_of' in update['UpdateExpression']
+        # The band keys are kept on the essay so delete/revise can unindex it
+        signature = index.add.call_args[0][3]
+        assert update['ExpressionAttributeValues'][':signature_keys'] == band_keys('teacher-1', signature)
+
+    def test_tries_next_candidate_when_best_match_is_unusable(self):
+        """Deleted, revised or stale matches are skipped in favor of the next candidate."""
+        current = {
+            'status': 'processed',
+            'vocabulary_analysis': ANALYSIS,
+            'prompt_version': lambda_function.PROMPT_VERSION,
+            'analysis_model': lambda_function.OPENAI_MODEL,
+        }
+        table = MagicMock()
+        table.get_item.side_effect = [
+            {'Item': {
+                'assignment_id': 'assignment-1',
+                'essay_id': 'copy',
+                'essay_text': ESSAY_TEXT,
+                'status': 'pending',
+            }},
+            {},  # deleted
+            {'Item': {**current, 'essay_id': 'revised', 'signature_keys': ['teacher-1#3#new']}},
+            {'Item': {**current, 'essay_id': 'original', 'signature_keys': ['teacher-1#0#abc']}},
+        ]
+        index = MagicMock()
+        index.find_candidates.return_value = [
+            {'essay_id': 'deleted', 'assignment_id': 'assignment-0', 'similarity': 0.97,
+             'band_key': 'teacher-1#0#abc'},
+            {'essay_id': 'revised', 'assignment_id': 'assignment-0', 'similarity': 0.95,
+             'band_key': 'teacher-1#0#abc'},
+            {'essay_id': 'original', 'assignment_id': 'assignment-0', 'similarity': 0.9,
+             'band_key': 'teacher-1#0#abc'},
+        ]
+        client = make_openai_client()
+        with patch.object(lambda_function, 'essays_table', table), \
+             patch.object(lambda_function, 'signature_index', index), \
+             patch.object(lambda_function, 'llm_backend', make_backend(client)):
+            lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'copy')
+
+        client.chat.completions.with_raw_response.create.assert_not_called()
+        values = table.update_item.call_args[1]['ExpressionAttributeValues']
+        assert values[':duplicate_of']['essay_id'] == 'original'
+        assert 'band_key' not in values[':duplicate_of']
+
+
+class TestRevisedDuringProcessing:
+    def _table(self, **extra):
+        table = MagicMock()
+        table.get_item.return_value = {'Item': {
+            'assignment_id': 'assignment-1',
+            'essay_id': 'e1',
+            'essay_text': ESSAY_TEXT,
+            'status': 'pending',
+            **extra,
+        }}
+        return table
+
+    def test_store_is_conditioned_on_loaded_revision(self):
+        table = self._table(revision=2)
+        with patch.object(lambda_function, 'essays_table', table), \
+             patch.object(lambda_function, 'llm_backend', make_backend(make_openai_client())):
+            lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+
+        call = table.update_item.call_args[1]
+        assert call['ConditionExpression'] == (
+            'attribute_exists(essay_id) AND revision = :loaded_revision'
+        )
+        assert call['ExpressionAttributeValues'][':loaded_revision'] == 2
+
+    def test_unrevised_essay_requires_no_revision(self):
+        table = self._table()
+        with patch.object(lambda_function, 'essays_table', table), \
+             patch.object(lambda_function, 'llm_backend', make_backend(make_openai_client())):
+            lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+
+        assert table.update_item.call_args[1]['ConditionExpression'] == (
+            'attribute_exists(essay_id) AND attribute_not_exists(revision)'
+        )
+
+    def test_stale_result_is_discarded(self):
+        """A revision landing mid-analysis wins; the old result is dropped without an event."""
+        from botocore.exceptions import ClientError
+
+        table = self._table(revision=1)
+        table.update_item.side_effect = ClientError(
+            {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'revised'}},
+            'UpdateItem',
+        )
+        index = MagicMock()
+        index.find_candidates.return_value = []
+        publisher = InMemoryEventPublisher()
+        with patch.object(lambda_function, 'essays_table', table), \
+             patch.object(lambda_function, 'signature_index', index), \
+             patch.object(lambda_function, 'event_publisher', publisher), \
+             patch.object(lambda_function, 'llm_backend', make_backend(make_openai_client())):
+            result = lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+
+        assert result is None
+        assert list(publisher.events) == []
+        index.add.assert_not_called()
+
+    def test_essay_deleted_mid_processing_leaves_nothing_behind(self):
+        """The result is not upserted as a ghost item and the essay is not indexed."""
+        with mock_aws():
+            dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+            essays = dynamodb.create_table(
+                TableName='essays',
+                KeySchema=[
+                    {'AttributeName': 'assignment_id', 'KeyType': 'HASH'},
+                    {'AttributeName': 'essay_id', 'KeyType': 'RANGE'},
+                ],
+                AttributeDefinitions=[
+                    {'AttributeName': 'assignment_id', 'AttributeType': 'S'},
+                    {'AttributeName': 'essay_id', 'AttributeType': 'S'},
+                ],
+                BillingMode='PAY_PER_REQUEST',
+            )
+            signatures = dynamodb.create_table(
+                TableName='signatures',
+                KeySchema=[
+                    {'AttributeName': 'band_key', 'KeyType': 'HASH'},
+                    {'AttributeName': 'essay_id', 'KeyType': 'RANGE'},
+                ],
+                AttributeDefinitions=[
+                    {'AttributeName': 'band_key', 'AttributeType': 'S'},
+                    {'AttributeName': 'essay_id', 'AttributeType': 'S'},
+                ],
+                BillingMode='PAY_PER_REQUEST',
+            )
+            essays.put_item(Item={
+                'assignment_id': 'assignment-1',
+                'essay_id': 'e1',
+                'teacher_id': 'teacher-1',
+                'essay_text': ESSAY_TEXT,
+                'status': 'pending',
+            })
+            client = make_openai_client()
+            raw = client.chat.completions.with_raw_response.create.return_value
+
+            def delete_then_answer(**kwargs):
+                essays.delete_item(Key={'assignment_id': 'assignment-1', 'essay_id': 'e1'})
+                return raw
+
+            client.chat.completions.with_raw_response.create.side_effect = delete_then_answer
+            with patch.object(lambda_function, 'essays_table', essays), \
+                 patch.object(lambda_function, 'signature_index', SignatureIndex(signatures)), \
+                 patch.object(lambda_function, 'llm_backend', make_backend(client)):
+                result = lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+
+            assert result is None
+            assert essays.scan()['Items'] == []
+            assert signatures.scan()['Items'] == []
+
+
+class TestCompletionEvents:
+    def _table(self, status='pending'):
+        table = MagicMock()
+        table.get_item.return_value = {'Item': {
+            'assignment_id': 'assignment-1',
+            'essay_id': 'e1',
+            'essay_text': ESSAY_TEXT,
+            'status': status,
+        }}
+        return table
+
+    def test_processed_essay_publishes_event_with_timings(self):
+        publisher = InMemoryEventPublisher()
+        with patch.object(lambda_function, 'essays_table', self._table()), \
+             patch.object(lambda_function, 'llm_backend', make_backend(make_openai_client())), \
+             patch.object(lambda_function, 'event_publisher', publisher):
+            lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+
+        [event] = publisher.events
+        assert event['event_type'] == 'essay.processed'
+        assert event['analysis_source'] == 'llm'
+        assert event['teacher_id'] == 'teacher-1'
+        assert set(event['timings']) == {'load_ms', 'analysis_ms', 'store_ms', 'total_ms'}
+
+    def test_split_mode_adds_part_timings(self):
+        usage = {
+            'model': 'gpt-4.1-mini', 'prompt_tokens': 2400, 'cached_tokens': 0,
+            'completion_tokens': 120, 'cost_usd': 0,
+            'parts': {part: {'latency_ms': 10} for part in ('review', 'used', 'recommended')},
+        }
+        publisher = InMemoryEventPublisher()
+        with patch.object(lambda_function, 'essays_table', self._table()), \
+             patch.object(lambda_function, 'analyze_essay_with_openai', return_value=(ANALYSIS, usage)), \
+             patch.object(lambda_function, 'event_publisher', publisher):
+            lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+
+        [event] = publisher.events
+        assert event['timings']['review_ms'] == 10
+        assert event['timings']['recommended_ms'] == 10
+
+    def test_skipped_and_failed_essays_publish_events(self):
+        publisher = InMemoryEventPublisher()
+        missing = MagicMock()
+        missing.get_item.return_value = {}
+        with patch.object(lambda_function, 'event_publisher', publisher):
+            with patch.object(lambda_function, 'essays_table', self._table('processed')):
+                lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+            with patch.object(lambda_function, 'essays_table', missing):
+                try:
+                    lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+                    assert False, "Expected EssayNotFoundError"
+                except lambda_function.EssayNotFoundError:
+                    pass
+
+        assert [e['event_type'] for e in publisher.events] == ['essay.skipped', 'essay.failed']
+        assert publisher.events[1]['error_class'] == 'missing_essay'
+
+    def test_publish_failure_does_not_fail_processing(self):
+        publisher = MagicMock()
+        publisher.publish.side_effect = Exception('sns down')
+        with patch.object(lambda_function, 'essays_table', self._table()), \
+             patch.object(lambda_function, 'llm_backend', make_backend(make_openai_client())), \
+             patch.object(lambda_function, 'event_publisher', publisher):
+            assert lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1') == ANALYSIS
+
+
+class TestShadowEvaluation:
+    def _table(self):
+        table = MagicMock()
+        table.get_item.return_value = {'Item': {
+            'assignment_id': 'assignment-1',
+            'essay_id': 'e1',
+            'essay_text': ESSAY_TEXT,
+            'status': 'pending',
+        }}
+        return table
+
+    def test_sampled_essay_runs_candidate_into_side_table(self):
+        essays = self._table()
+        shadow = MagicMock()
+        client = make_openai_client()
+        with patch.object(lambda_function, 'essays_table', essays), \
+             patch.object(lambda_function, 'shadow_table', shadow), \
+             patch.object(lambda_function, 'SHADOW_SAMPLE_RATE', 1.0), \
+             patch.object(lambda_function, 'SHADOW_MODEL', 'gpt-4.1-nano'), \
+             patch.object(lambda_function, 'llm_backend', make_backend(client)):
+            result = lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+
+        assert result == ANALYSIS
+        calls = client.chat.completions.with_raw_response.create.call_args_list
+        assert [c[1]['model'] for c in calls] == [lambda_function.OPENAI_MODEL, 'gpt-4.1-nano']
+        # Production result is stored once; the candidate only goes to the side table
+        assert essays.update_item.call_count == 1
+        item = shadow.put_item.call_args[1]['Item']
+        assert item['candidate_id'].startswith('gpt-4.1-nano#')
+        assert item['candidate']['model'] == 'gpt-4.1-nano'
+        assert item['overlap']['vocabulary_used'] == 1
+
+    def test_unsampled_essay_and_failed_candidate(self):
+        shadow = MagicMock()
+        with patch.object(lambda_function, 'essays_table', self._table()), \
+             patch.object(lambda_function, 'shadow_table', shadow), \
+             patch.object(lambda_function, 'llm_backend', make_backend(make_openai_client())):
+            with patch.object(lambda_function, 'SHADOW_SAMPLE_RATE', 0.0):
+                lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+            shadow.put_item.assert_not_called()
+
+            with patch.object(lambda_function, 'SHADOW_SAMPLE_RATE', 1.0), \
+                 patch.object(lambda_function, 'analyze_essay_with_openai',
+                              side_effect=[(ANALYSIS, None), ValueError('bad candidate')]):
+                result = lambda_function.process_essay('teacher-1', 'assignment-1', 'student-1', 'e1')
+
+        assert result == ANALYSIS
+        assert 'bad candidate' in shadow.put_item.call_args[1]['Item']['candidate']['error']
+
+
+class TestHandler:
+    def test_processes_records_concurrently_and_counts_errors(self):
+        def fake_process(teacher_id, assignment_id, student_id, essay_id, reanalyze=False):
+            if essay_id == 'bad':
+                raise ValueError('boom')
+
+        with patch.object(lambda_function, 'process_essay', side_effect=fake_process) as mock_process:
+            result = lambda_function.handler(
+                {'Records': [make_record('e1'), make_record('bad'), make_record('e2')]},
+                None,
+            )
+
+        assert result['processed'] == 2
+        assert result['errors'] == 1
+        assert result['batchItemFailures'] == [{'itemIdentifier': 'msg-bad'}]
+        assert mock_process.call_count == 3
+
+    def test_failure_records_last_error_on_essay(self):
+        table = MagicMock()
+        table.get_item.return_value = {}
+        with patch.object(lambda_function, 'essays_table', table):
+            result = lambda_function.handler({'Records': [make_record('gone')]}, None)
+
+        assert result['batchItemFailures'] == [{'itemIdentifier': 'msg-gone'}]
+        call = table.update_item.call_args[1]
+        assert call['ConditionExpression'] == 'attribute_exists(essay_id)'
+        assert call['ExpressionAttributeValues'][':error']['error_class'] == 'missing_essay'
+
+    def test_reanalyze_flag_is_forwarded(self):
+        with patch.object(lambda_function, 'process_essay') as mock_process:
+            lambda_function.handler({'Records': [make_record('e1', reanalyze=True)]}, None)
+
+        assert mock_process.call_args[1]['reanalyze'] is True
+
+    def test_class_reports_requested_for_assignments_with_successes(self):
+        def fake_process(teacher_id, assignment_id, student_id, essay_id, reanalyze=False):
+            if essay_id == 'bad':
+                raise ValueError('boom')
+
+        with patch.object(lambda_function, 'process_essay', side_effect=fake_process), \
+             patch.object(lambda_function, 'generate_class_reports') as mock_reports:
+            lambda_function.handler(
+                {'Records': [make_record('e1'), make_record('e2'), make_record('bad', assignment_id='assignment-2')]},
+                None,
+            )
+
+        mock_reports.assert_called_once_with([('teacher-1', 'assignment-1')])
+
+
+def make_multi_record(essay_ids, attempt=None, message_id='msg-multi'):
+    body = {
+        'teacher_id': 'teacher-1',
+        'assignment_id': 'assignment-1',
+        'student_id': '',
+        'essay_ids': essay_ids,
+    }
+    if attempt:
+        body['attempt'] = attempt
+    return {'messageId': message_id, 'body': json.dumps(body)}
+
+
+class TestMultiEssayMessages:
+    def _fake_process(self, teacher_id, assignment_id, student_id, essay_id, reanalyze=False):
+        if essay_id.startswith('bad'):
+            raise ValueError('boom')
+
+    def test_expands_essay_ids_and_requeues_failed_subset(self):
+        sqs = MagicMock()
+        with patch.object(lambda_function, 'process_essay', side_effect=self._fake_process) as mock_process, \
+             patch.object(lambda_function, 'record_processing_error'), \
+             patch.object(lambda_function, 'sqs', sqs), \
+             patch.object(lambda_function, 'ESSAY_PROCESSING_QUEUE_URL', 'https://queue'):
+            result = lambda_function.handler(
+                {'Records': [make_multi_record(['e1', 'bad1', 'e2', 'bad2']), make_record('e3')]},
+                None,
+            )
+
+        assert mock_process.call_count == 5
+        assert result['processed'] == 3
+        assert result['errors'] == 2
+        # The multi-essay message is not retried as a whole
+        assert result['batchItemFailures'] == []
+        send = sqs.send_message.call_args[1]
+        body = json.loads(send['MessageBody'])
+        assert send['QueueUrl'] == 'https://queue'
+        assert body['essay_ids'] == ['bad1', 'bad2']
+        assert body['attempt'] == 2
+        assert send['DelaySeconds'] > 0
+
+    def test_exhausted_attempts_dead_letter_single_essay_messages(self):
+        sqs = MagicMock()
+        sqs.send_message_batch.return_value = {'Successful': [{'Id': '0'}], 'Failed': []}
+        with patch.object(lambda_function, 'process_essay', side_effect=self._fake_process), \
+             patch.object(lambda_function, 'record_processing_error'), \
+             patch.object(lambda_function, 'sqs', sqs), \
+             patch.object(lambda_function, 'ESSAY_PROCESSING_QUEUE_URL', 'https://queue'), \
+             patch.object(lambda_function, 'ESSAY_PROCESSING_DLQ_URL', 'https://dlq'):
+            result = lambda_function.handler(
+                {'Records': [make_multi_record(['e1', 'bad1'], attempt=lambda_function.MAX_ESSAY_ATTEMPTS)]},
+                None,
+            )
+
+        assert result['batchItemFailures'] == []
+        sqs.send_message.assert_not_called()
+        batch = sqs.send_message_batch.call_args[1]
+        assert batch['QueueUrl'] == 'https://dlq'
+        dead = json.loads(batch['Entries'][0]['MessageBody'])
+        assert dead['essay_id'] == 'bad1'
+        assert 'essay_ids' not in dead and 'attempt' not in dead
+
+    def test_requeue_failure_reports_whole_message(self):
+        sqs = MagicMock()
+        sqs.send_message.side_effect = Exception('sqs down')
+        with patch.object(lambda_function, 'process_essay', side_effect=self._fake_process), \
+             patch.object(lambda_function, 'record_processing_error'), \
+             patch.object(lambda_function, 'sqs', sqs), \
+             patch.object(lambda_function, 'ESSAY_PROCESSING_QUEUE_URL', 'https://queue'):
+            result = lambda_function.handler({'Records': [make_multi_record(['bad1'])]}, None)
+
+        assert result['batchItemFailures'] == [{'itemIdentifier': 'msg-multi'}]
+
+    def test_essays_beyond_invocation_cap_are_deferred(self):
+        sqs = MagicMock()
+        with patch.object(lambda_function, 'process_essay', side_effect=self._fake_process) as mock_process, \
+             patch.object(lambda_function, 'record_processing_error'), \
+             patch.object(lambda_function, 'sqs', sqs), \
+             patch.object(lambda_function, 'ESSAY_PROCESSING_QUEUE_URL', 'https://queue'), \
+             patch.object(lambda_function, 'MAX_ESSAYS_PER_INVOCATION', 2):
+            result = lambda_function.handler(
+                {'Records': [make_multi_record(['e1', 'e2', 'e3', 'e4'])]}, None
+            )
+
+        assert mock_process.call_count == 2
+        assert result['processed'] == 2
+        assert result['errors'] == 0
+        assert result['batchItemFailures'] == []
+        send = sqs.send_message.call_args[1]
+        body = json.loads(send['MessageBody'])
+        assert body['essay_ids'] == ['e3', 'e4']
+        assert body['attempt'] == 1
+        assert 'DelaySeconds' not in send
+
+    def test_no_essays_started_near_timeout(self):
+        sqs = MagicMock()
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 1000
+        with patch.object(lambda_function, 'process_essay') as mock_process, \
+             patch.object(lambda_function, 'sqs', sqs), \
+             patch.object(lambda_function, 'ESSAY_PROCESSING_QUEUE_URL', 'https://queue'):
+            result = lambda_function.handler({'Records': [make_record('e1')]}, context)
+
+        mock_process.assert_not_called()
+        assert result['batchItemFailures'] == []
+        body = json.loads(sqs.send_message.call_args[1]['MessageBody'])
+        assert body['essay_ids'] == ['e1']
+        assert 'essay_id' not in body
+
+    def test_deferred_requeue_failure_reports_message(self):
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 1000
+        with patch.object(lambda_function, 'process_essay'), \
+             patch.object(lambda_function, 'ESSAY_PROCESSING_QUEUE_URL', None):
+            result = lambda_function.handler({'Records': [make_record('e1')]}, context)
+
+        assert result['batchItemFailures'] == [{'itemIdentifier': 'msg-e1'}]
+
+    def test_malformed_message_is_reported(self):
+        result = lambda_function.handler(
+            {'Records': [{'messageId': 'msg-junk', 'body': 'not json'}]}, None
+        )
+
+        assert result['batchItemFailures'] == [{'itemIdentifier': 'msg-junk'}]
+
+
+class TestDirectInvoke:
+    def test_direct_event_returns_analysis(self):
+        with patch.object(lambda_function, 'process_essay', return_value=ANALYSIS) as mock_process:
+            result = lambda_function.handler({'direct': {
+                'teacher_id': 'demo-teacher',
+                'assignment_id': 'demo-public-assignment',
+                'student_id': 'student-1',
+                'essay_id': 'e1',
+            }}, None)
+
+        assert result == {'essay_id': 'e1', 'status': 'processed', 'vocabulary_analysis': ANALYSIS}
+        assert mock_process.call_args[0] == ('demo-teacher', 'demo-public-assignment', 'student-1', 'e1')
+
+    def test_direct_event_reports_failure(self):
+        with patch.object(lambda_function, 'process_essay', side_effect=lambda_function.AnalysisParseError('bad')), \
+             patch.object(lambda_function, 'record_processing_error') as mock_record:
+            result = lambda_function.handler({'direct': {
+                'teacher_id': 'demo-teacher',
+                'assignment_id': 'demo-public-assignment',
+                'essay_id': 'e1',
+            }}, None)
+
+        assert result['status'] == 'failed'
+        assert result['error_class'] == 'llm_parse_failure'
+        mock_record.assert_called_once()
@@ -0,0 +1,202 @@
+"""
+Unit tests for LLM backends, failover and the local server backend.
+"""
+import os
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from concurrency import AdaptiveConcurrencyLimiter
+from llm_backends import (
+    BackendHealth,
+    FailoverBackend,
+    OpenAIBackend,
+    OpenAICompatibleBackend,
+    create_backend,
+    is_availability_error,
+)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f'HTTP {status_code}')
+        self.status_code = status_code
+
+
+def make_client(content='{"ok": true}', error=None):
+    completion = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=100, completion_tokens=20, prompt_tokens_details=None),
+    )
+    raw = MagicMock()
+    raw.headers = {}
+    raw.parse.return_value = completion
+    client = MagicMock()
+    create = client.chat.completions.with_raw_response.create
+    if error is not None:
+        create.side_effect = error
+    else:
+        create.return_value = raw
+    return client
+
+
+def backend(name, client, model='gpt-4.1-mini', limit=4, cls=OpenAIBackend, threshold=3):
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=limit, max_limit=limit)
+    return cls(name, client, model, limiter, BackendHealth(failure_threshold=threshold, cooldown_seconds=60))
+
+
+class TestFailover:
+    def test_availability_errors_fail_over_to_next_backend(self):
+        primary = backend('openai', make_client(error=StatusError(503)))
+        local = backend('local', make_client(), model='qwen2.5-7b', cls=OpenAICompatibleBackend)
+
+        content, usage = FailoverBackend([primary, local]).complete('system', 'prompt')
+
+        assert json.loads(content) == {'ok': True}
+        assert usage['backend'] == 'local'
+        assert usage['model'] == 'qwen2.5-7b'
+        assert primary.limiter.in_flight == 0 and local.limiter.in_flight == 0
+
+    def test_other_errors_are_raised_without_failover(self):
+        local_client = make_client()
+        primary = backend('openai', make_client(error=StatusError(400)))
+        chain = FailoverBackend([primary, backend('local', local_client, cls=OpenAICompatibleBackend)])
+
+        with pytest.raises(StatusError):
+            chain.complete('system', 'prompt')
+        local_client.chat.completions.with_raw_response.create.assert_not_called()
+
+    def test_repeated_failures_open_the_circuit(self):
+        primary_client = make_client(error=ConnectionError('refused'))
+        primary = backend('openai', primary_client, threshold=2)
+        chain = FailoverBackend([primary, backend('local', make_client(), cls=OpenAICompatibleBackend)])
+
+        for _ in range(3):
+            chain.complete('system', 'prompt')
+
+        assert not primary.health.healthy
+        assert primary_client.chat.completions.with_raw_response.create.call_count == 2
+
+    def test_all_backends_failing_raises_last_error(self):
+        chain = FailoverBackend([
+            backend('openai', make_client(error=StatusError(429))),
+            backend('local', make_client(error=StatusError(502)), cls=OpenAICompatibleBackend),
+        ])
+
+        with pytest.raises(StatusError, match='502'):
+            chain.complete('system', 'prompt')
+
+    def test_spillover_uses_backend_with_free_slot(self):
+        primary = backend('openai', make_client(), limit=1)
+        local = backend('local', make_client(), cls=OpenAICompatibleBackend)
+        assert primary.limiter.try_acquire()  # primary is saturated
+
+        _, usage = FailoverBackend([primary, local], spillover=True).complete('system', 'prompt')
+
+        assert usage['backend'] == 'local'
+        assert primary.limiter.in_flight == 1
+
+    def test_explicit_model_routes_to_its_backend(self):
+        openai_client, local_client = make_client(), make_client()
+        chain = FailoverBackend([
+            backend('openai', openai_client),
+            backend('local', local_client, model='qwen2.5-7b', cls=OpenAICompatibleBackend),
+        ])
+
+        assert chain.complete('s', 'p', model='qwen2.5-7b')[1]['backend'] == 'local'
+        assert chain.complete('s', 'p', model='gpt-4.1-nano')[1]['backend'] == 'openai'
+        assert chain.max_concurrency == 8
+
+    def test_pinned_model_does_not_spill_over_while_its_backend_is_healthy(self):
+        openai_client, local_client = make_client(), make_client()
+        primary = backend('openai', openai_client, limit=1)
+        local = backend('local', local_client, model='qwen2.5-7b', cls=OpenAICompatibleBackend)
+        chain = FailoverBackend([primary, local], spillover=True)
+
+        _, usage = chain.complete('s', 'p', model='gpt-4.1-mini')
+
+        assert usage['backend'] == 'openai'
+        local_client.chat.completions.with_raw_response.create.assert_not_called()
+
+    def test_pinned_model_falls_back_when_its_backend_is_cooling_down(self):
+        primary = backend('openai', make_client(error=StatusError(503)), threshold=1)
+        local_client = make_client()
+        local = backend('local', local_client, model='qwen2.5-7b', cls=OpenAICompatibleBackend)
+        chain = FailoverBackend([primary, local])
+
+        with pytest.raises(StatusError):
+            chain.complete('s', 'p', model='gpt-4.1-mini')
+        assert not primary.health.healthy
+
+        _, usage = chain.complete('s', 'p', model='gpt-4.1-mini')
+
+        assert usage['backend'] == 'local'
+        assert usage['model'] == 'qwen2.5-7b'
+        request = local_client.chat.completions.with_raw_response.create.call_args[1]
+        assert request['model'] == 'qwen2.5-7b'
+
+    def test_error_classification(self):
+        assert is_availability_error(StatusError(429))
+        assert is_availability_error(StatusError(500))
+        assert is_availability_error(TimeoutError())
+        assert not is_availability_error(StatusError(401))
+        assert not is_availability_error(ValueError('bad'))
+
+
+class FakeLocalServer(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible /v1/chat/completions endpoint."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        payload = json.dumps({
+            'id': 'local-1',
+            'object': 'chat.completion',
+            'created': 0,
+            'model': body['model'],
+            'choices': [{
+                'index': 0,
+                'finish_reason': 'stop',
+                'message': {'role': 'assistant', 'content': json.dumps({'echo': body['messages'][1]['content']})},
+            }],
+            'usage': {'prompt_tokens': 42, 'completion_tokens': 7, 'total_tokens': 49},
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestLocalServerBackend:
+    def test_local_backend_runs_offline_against_compatible_server(self):
+        server = HTTPServer(('127.0.0.1', 0), FakeLocalServer)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            chain = create_backend(
+                ['openai', 'local'],
+                openai_api_key=None,  # OpenAI not configured: local only
+                openai_model='gpt-4.1-mini',
+                openai_limiter=AdaptiveConcurrencyLimiter(),
+                local_base_url=f'http://127.0.0.1:{server.server_port}/v1',
+                local_model='llama-3.1-8b-instruct',
+            )
+            content, usage = chain.complete('system', 'hello')
+        finally:
+            server.shutdown()
+
+        assert [b.name for b in chain.backends] == ['local']
+        assert json.loads(content) == {'echo': 'hello'}
+        assert usage['model'] == 'llama-3.1-8b-instruct'
+        assert usage['prompt_tokens'] == 42
+        assert str(usage['cost_usd']) == '0'
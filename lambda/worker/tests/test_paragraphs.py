@@ -0,0 +1,99 @@
+"""
+Unit tests for paragraph-level caching and incremental re-analysis.
+"""
+import os
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from paragraphs import (
+    build_paragraph_cache,
+    merge_analyses,
+    paragraph_hash,
+    plan_incremental_analysis,
+    split_paragraphs,
+)
+
+P1 = "The storm was relentless and the town was eerily quiet afterwards."
+P2 = "Neighbors gathered to assess the damage and share what little they had."
+P3 = "By spring the community had rebuilt, and the park looked more vibrant than before."
+
+PREVIOUS = {
+    'correctness_review': 'Good use of descriptive words.',
+    'vocabulary_used': ['relentless', 'eerily', 'assess', 'vibrant'],
+    'recommended_vocabulary': ['resilient', 'desolate'],
+}
+
+
+def cache_for(*paragraphs):
+    return build_paragraph_cache(list(paragraphs), PREVIOUS)
+
+
+class TestParagraphCache:
+    def test_split_paragraphs_drops_blank_lines(self):
+        assert split_paragraphs(f"{P1}\n\n{P2}\n{P3}\n") == [P1, P2, P3]
+
+    def test_vocabulary_is_attributed_to_paragraphs(self):
+        cache = cache_for(P1, P2, P3)
+
+        assert cache[paragraph_hash(P1)] == {'vocabulary_used': ['relentless', 'eerily']}
+        assert cache[paragraph_hash(P2)] == {'vocabulary_used': ['assess']}
+        assert cache[paragraph_hash(P3)] == {'vocabulary_used': ['vibrant']}
+
+
+class TestIncrementalPlan:
+    def test_only_changed_paragraphs_are_planned(self):
+        revised_p3 = "By spring the community had rebuilt everything with remarkable tenacity."
+
+        plan = plan_incremental_analysis([P1, P2, revised_p3], cache_for(P1, P2, P3))
+
+        assert plan.changed == [revised_p3]
+        assert plan.cached_vocabulary == ['relentless', 'eerily', 'assess']
+        assert plan.total_paragraphs == 3
+
+    def test_full_analysis_without_cache_or_with_large_change(self):
+        assert plan_incremental_analysis([P1, P2], None) is None
+        assert plan_incremental_analysis(
+            ["Entirely new opening paragraph that is long enough to dominate the essay word count here.",
+             "Another completely rewritten paragraph with plenty of brand new words."],
+            cache_for(P1, P2),
+        ) is None
+
+
+class TestMergeAnalyses:
+    def test_merges_cached_and_new_vocabulary(self):
+        plan = plan_incremental_analysis([P1, P2, "A new ending."], cache_for(P1, P2, P3))
+        partial = {
+            'correctness_review': 'The new ending is concise.',
+            'vocabulary_used': ['concise', 'Eerily'],
+            'recommended_vocabulary': ['poignant', 'resilient', 'concise'],
+        }
+
+        merged = merge_analyses(plan, PREVIOUS, partial, 'Vivid throughout; the ending is concise.')
+
+        assert merged['correctness_review'] == 'Vivid throughout; the ending is concise.'
+        assert merged['vocabulary_used'] == ['relentless', 'eerily', 'assess', 'concise']
+        assert merged['recommended_vocabulary'] == ['poignant', 'resilient', 'desolate']
+
+    def test_no_changed_paragraphs_reuses_previous_analysis(self):
+        plan = plan_incremental_analysis([P1, P3], cache_for(P1, P2, P3))
+
+        merged = merge_analyses(plan, PREVIOUS, None)
+
+        assert plan.changed == []
+        assert merged['vocabulary_used'] == ['relentless', 'eerily', 'vibrant']
+        assert merged['recommended_vocabulary'] == PREVIOUS['recommended_vocabulary']
+        assert merged['correctness_review'] == PREVIOUS['correctness_review']
+
+    def test_partial_review_never_replaces_whole_essay_review(self):
+        """The changed paragraphs' review alone would drop feedback on the rest."""
+        plan = plan_incremental_analysis([P1, P2, "A new ending."], cache_for(P1, P2, P3))
+        partial = {
+            'correctness_review': 'The new ending is concise.',
+            'vocabulary_used': ['concise'],
+            'recommended_vocabulary': ['poignant'],
+        }
+
+        merged = merge_analyses(plan, PREVIOUS, partial)
+
+        assert merged['correctness_review'] == PREVIOUS['correctness_review']
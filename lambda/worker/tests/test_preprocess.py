@@ -0,0 +1,122 @@
+"""
+Unit tests for pre-LLM essay preprocessing.
+"""
+import os
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from preprocess import (
+    estimate_tokens,
+    local_analysis,
+    normalize_text,
+    preprocess_essay,
+    strip_headers_and_boilerplate,
+)
+
+BODY = (
+    "Technology has changed the way students learn. Online libraries give us "
+    "access to sources that were once difficult to find, and collaborative "
+    "tools let classmates edit the same document at the same time."
+)
+
+
+class TestNormalizeText:
+    def test_collapses_whitespace_and_blank_lines(self):
+        text = "  First   line\t here \r\n\r\n\r\n\r\nSecond line  "
+
+        assert normalize_text(text) == "First line here\n\nSecond line"
+
+    def test_unicode_compatibility_forms_and_invisible_characters(self):
+        assert normalize_text("ﬁnal​ draft　done") == "final draft done"
+
+
+class TestStripHeaders:
+    def test_removes_leading_header_block(self):
+        text = "Name: Jordan Smith\nMs. Lee\nPeriod 3\n10/12/2025\n\n" + BODY
+
+        cleaned, removed = strip_headers_and_boilerplate(text)
+
+        assert cleaned == BODY
+        assert removed == ["Name: Jordan Smith", "Ms. Lee", "Period 3", "10/12/2025"]
+
+    def test_dash_separator_needs_spaces(self):
+        text = "Period - 3\nClass – English 10\n\n" + BODY
+
+        cleaned, removed = strip_headers_and_boilerplate(text)
+
+        assert cleaned == BODY
+        assert removed == ["Period - 3", "Class – English 10"]
+
+    def test_keeps_first_paragraph_starting_with_hyphenated_word(self):
+        for first_word in ("Name-calling", "Class-based", "Grade-level", "Period-appropriate"):
+            text = f"{first_word} behavior hurts students in every school."
+            cleaned, removed = strip_headers_and_boilerplate(text)
+
+            assert cleaned == text
+            assert removed == []
+
+    def test_keeps_long_or_sentence_lines_that_start_like_labels(self):
+        text = (
+            "Class: a word that means more than a room full of desks\n"
+            "Grade: it matters.\n" + BODY
+        )
+
+        cleaned, removed = strip_headers_and_boilerplate(text)
+
+        assert cleaned == text
+        assert removed == []
+
+    def test_keeps_prose_that_looks_like_a_label_later_on(self):
+        text = BODY + "\nDate: the day everything changed."
+
+        cleaned, removed = strip_headers_and_boilerplate(text)
+
+        assert cleaned == text
+        assert removed == []
+
+    def test_removes_word_count_and_works_cited(self):
+        text = BODY + "\nWord count: 312\n\nWorks Cited\nSmith, J. (2020). A Book."
+
+        cleaned, removed = strip_headers_and_boilerplate(text)
+
+        assert cleaned == BODY
+        assert "Word count: 312" in removed
+        assert "Smith, J. (2020). A Book." in removed
+
+
+class TestPreprocessEssay:
+    def test_accepts_essay_with_enough_words(self):
+        prepared = preprocess_essay("Name: Jordan\n\n" + BODY, min_words=20)
+
+        assert not prepared.rejected
+        assert prepared.text == BODY
+        assert prepared.token_estimate == estimate_tokens(BODY)
+        assert prepared.summary() == {
+            'word_count': prepared.word_count,
+            'token_estimate': prepared.token_estimate,
+            'removed_lines': 1,
+        }
+
+    def test_one_paragraph_essay_with_hyphenated_first_word_is_not_rejected(self):
+        essay = "Name-calling " + BODY[0].lower() + BODY[1:]
+
+        prepared = preprocess_essay(essay)
+
+        assert not prepared.rejected
+        assert prepared.text == essay
+        assert prepared.removed_lines == []
+
+    def test_rejects_blank_and_short_essays(self):
+        blank = preprocess_essay("  \n Name: Jordan \n ")
+        short = preprocess_essay("I like dogs a lot.", min_words=20)
+
+        assert blank.rejection_reason == "empty"
+        assert short.rejection_reason == "too_short"
+        assert short.summary()['rejection_reason'] == "too_short"
+
+    def test_local_analysis_matches_llm_shape(self):
+        analysis = local_analysis(preprocess_essay("Too short.", min_words=20), min_words=20)
+
+        assert set(analysis) == {"correctness_review", "vocabulary_used", "recommended_vocabulary"}
+        assert "2 words" in analysis["correctness_review"]
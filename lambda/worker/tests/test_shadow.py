@@ -0,0 +1,84 @@
+"""
+Unit tests for shadow evaluation and its report.
+"""
+import os
+from decimal import Decimal
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from shadow import build_evaluation, in_sample, list_overlap, usage_stats
+from shadow_report import build_report, format_shadow_report
+
+PRODUCTION = {
+    'correctness_review': 'Good.',
+    'vocabulary_used': ['vivid', 'consequently'],
+    'recommended_vocabulary': ['meticulous', 'profound'],
+}
+CANDIDATE = {
+    'correctness_review': 'Fine.',
+    'vocabulary_used': ['Vivid', 'journey'],
+    'recommended_vocabulary': ['meticulous', 'profound'],
+}
+USAGE = {'model': 'gpt-4.1-mini', 'prompt_tokens': 800, 'completion_tokens': 120, 'cost_usd': Decimal('0.0005')}
+
+
+def evaluation(essay_id, **candidate):
+    return build_evaluation(
+        'gpt-4.1-nano#compact#single', essay_id, 'assignment-1', 'teacher-1',
+        PRODUCTION, usage_stats(USAGE, 2000, 'gpt-4.1-mini'), 'gpt-4.1-nano', 900,
+        **candidate,
+    )
+
+
+class TestSampling:
+    def test_sampling_is_deterministic_and_tracks_rate(self):
+        ids = [f'essay-{i}' for i in range(2000)]
+
+        sampled = [i for i in ids if in_sample(i, 0.1)]
+
+        assert sampled == [i for i in ids if in_sample(i, 0.1)]
+        assert 120 < len(sampled) < 280
+        assert not in_sample('essay-1', 0)
+        assert in_sample('essay-1', 1)
+
+
+class TestEvaluation:
+    def test_list_overlap_is_case_insensitive_jaccard(self):
+        assert list_overlap(['Vivid', 'journey'], ['vivid', 'consequently']) == 1 / 3
+        assert list_overlap([], []) == 1.0
+
+    def test_evaluation_compares_with_production(self):
+        item = evaluation('e1', candidate_analysis=CANDIDATE, candidate_usage={**USAGE, 'completion_tokens': 60})
+
+        assert item['candidate_id'] == 'gpt-4.1-nano#compact#single'
+        assert item['production']['latency_ms'] == 2000
+        assert item['candidate']['completion_tokens'] == 60
+        assert item['candidate']['vocabulary_analysis'] == CANDIDATE
+        assert item['overlap'] == {'vocabulary_used': 1 / 3, 'recommended_vocabulary': 1.0}
+        assert item['expires_at'] > 0
+
+    def test_candidate_error_is_recorded_without_overlap(self):
+        item = evaluation('e1', error='llm_parse_failure: bad json')
+
+        assert item['candidate']['error'] == 'llm_parse_failure: bad json'
+        assert 'overlap' not in item
+
+
+class TestShadowReport:
+    def test_report_summarizes_latency_tokens_and_overlap(self):
+        items = [
+            evaluation('e1', candidate_analysis=CANDIDATE, candidate_usage={**USAGE, 'completion_tokens': 60}),
+            evaluation('e2', candidate_analysis=PRODUCTION, candidate_usage={**USAGE, 'completion_tokens': 60}),
+            evaluation('e3', error='throttled: 429'),
+        ]
+
+        report = build_report(items)
+
+        assert report['evaluations'] == 3
+        assert report['summary']['candidate']['errors'] == 1
+        assert report['summary']['production']['p50_latency_ms'] == 2000
+        assert report['reduction']['completion_tokens_pct'] == 50.0
+        assert report['reduction']['p50_latency_pct'] == 55.0
+        assert report['mean_overlap'] == {'vocabulary_used': 0.667, 'recommended_vocabulary': 1.0}
+        assert 'vocabulary_used 0.667' in format_shadow_report('gpt-4.1-nano#compact#single', report)
@@ -0,0 +1,116 @@
+"""
+Unit tests for token usage accounting and ledger roll-ups.
+"""
+import os
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from usage import compute_cost, extract_usage, merge_usage, record_usage
+
+
+def make_response(prompt_tokens, completion_tokens, cached_tokens=0):
+    return SimpleNamespace(
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+        )
+    )
+
+
+class TestComputeCost:
+    def test_cached_tokens_billed_at_cached_rate(self):
+        # 500 uncached * 0.40 + 500 cached * 0.10 + 200 output * 1.60 per 1M
+        cost = compute_cost('gpt-4.1-mini', 1000, 500, 200)
+        assert cost == Decimal('0.00057')
+
+    def test_unknown_model_costs_zero(self):
+        assert compute_cost('local-model', 1000, 0, 200) == Decimal('0')
+
+
+class TestExtractUsage:
+    def test_reads_usage_fields(self):
+        usage = extract_usage(make_response(1200, 300, cached_tokens=1024), 'gpt-4.1-mini')
+        assert usage['prompt_tokens'] == 1200
+        assert usage['cached_tokens'] == 1024
+        assert usage['completion_tokens'] == 300
+        assert usage['model'] == 'gpt-4.1-mini'
+        assert isinstance(usage['cost_usd'], Decimal)
+
+    def test_missing_usage_defaults_to_zero(self):
+        usage = extract_usage(SimpleNamespace(usage=None), 'gpt-4.1-mini')
+        assert usage['prompt_tokens'] == 0
+        assert usage['cost_usd'] == Decimal('0')
+
+    def test_unpriced_completion_costs_zero_without_warning(self, caplog):
+        usage = extract_usage(make_response(1000, 200), 'local-model', priced=False)
+
+        assert usage['cost_usd'] == Decimal('0')
+        assert usage['prompt_tokens'] == 1000
+        assert 'No pricing configured' not in caplog.text
+
+
+class TestMergeUsage:
+    def test_sums_part_usages(self):
+        parts = [
+            extract_usage(make_response(1000, 50, cached_tokens=900), 'gpt-4.1-mini'),
+            extract_usage(make_response(1000, 120), 'gpt-4.1-mini'),
+        ]
+
+        usage = merge_usage(parts)
+
+        assert usage['prompt_tokens'] == 2000
+        assert usage['cached_tokens'] == 900
+        assert usage['completion_tokens'] == 170
+        assert usage['cost_usd'] == parts[0]['cost_usd'] + parts[1]['cost_usd']
+        assert 'backend' not in usage
+
+    def test_keeps_backend(self):
+        parts = [
+            {**extract_usage(make_response(1000, 50), 'gpt-4.1-mini'), 'backend': 'openai'},
+            {**extract_usage(make_response(1000, 50), 'gpt-4.1-mini'), 'backend': 'openai'},
+        ]
+
+        assert merge_usage(parts)['backend'] == 'openai'
+
+    def test_lists_each_backend_after_failover(self):
+        parts = [
+            {**extract_usage(make_response(1000, 50), 'gpt-4.1-mini'), 'backend': 'openai'},
+            {**extract_usage(make_response(1000, 50), 'gpt-4.1-mini'), 'backend': 'local'},
+            {**extract_usage(make_response(1000, 50), 'gpt-4.1-mini'), 'backend': 'openai'},
+        ]
+
+        assert merge_usage(parts)['backend'] == 'openai,local'
+
+    def test_lists_each_model(self):
+        parts = [
+            extract_usage(make_response(1000, 50), 'gpt-4.1-mini'),
+            extract_usage(make_response(1000, 50), 'local-model'),
+        ]
+
+        assert merge_usage(parts)['model'] == 'gpt-4.1-mini,local-model'
+
+
+class TestRecordUsage:
+    def test_adds_to_teacher_and_assignment_ledgers(self):
+        table = MagicMock()
+        usage = extract_usage(make_response(1000, 200), 'gpt-4.1-mini')
+
+        record_usage(table, 'teacher-1', 'assignment-1', usage, '2025-11-11')
+
+        keys = [call[1]['Key'] for call in table.update_item.call_args_list]
+        assert keys == [
+            {'scope_id': 'teacher#teacher-1', 'usage_date': '2025-11-11'},
+            {'scope_id': 'assignment#assignment-1', 'usage_date': '2025-11-11'},
+        ]
+        expression = table.update_item.call_args[1]['UpdateExpression']
+        assert expression.startswith('ADD prompt_tokens :prompt')
+        assert table.update_item.call_args[1]['ExpressionAttributeValues'][':teacher_id'] == 'teacher-1'
+
+    def test_no_table_is_noop(self):
+        usage = extract_usage(make_response(1000, 200), 'gpt-4.1-mini')
+        record_usage(None, 'teacher-1', 'assignment-1', usage, '2025-11-11')
@@ -0,0 +1,104 @@
+"""
+Unit tests for the analysis wire contracts.
+"""
+import os
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from wire_schema import (
+    MAX_REVIEW_CHARS,
+    MAX_WORDS,
+    SchemaError,
+    build_part_prompt,
+    build_prompt,
+    expand_analysis,
+    expand_review,
+    merge_parts,
+)
+
+
+class TestBuildPrompt:
+    def test_compact_prompt_uses_short_keys(self):
+        prompt = build_prompt('My essay text.', 'compact')
+
+        assert 'My essay text.' in prompt
+        assert '{"r": review, "u": used, "n": new}' in prompt
+        assert 'correctness_review' not in prompt
+
+    def test_verbose_prompt_is_the_original_contract(self):
+        assert '"recommended_vocabulary"' in build_prompt('My essay text.', 'verbose')
+
+
+class TestExpandAnalysis:
+    def test_compact_response_expands_to_stored_shape(self):
+        analysis = expand_analysis({'r': 'Good word choice.', 'u': ['vivid'], 'n': ['luminous']})
+
+        assert analysis == {
+            'correctness_review': 'Good word choice.',
+            'vocabulary_used': ['vivid'],
+            'recommended_vocabulary': ['luminous'],
+        }
+
+    def test_list_items_are_bare_and_capped(self):
+        words = ['ubiquitous - means everywhere', 'tenacious (persistent)', '"wry".', 42]
+        words += [f'word{i}' for i in range(20)]
+
+        analysis = expand_analysis({'r': 'Fine.', 'u': words, 'n': []})
+
+        assert analysis['vocabulary_used'][:3] == ['ubiquitous', 'tenacious', 'wry']
+        assert len(analysis['vocabulary_used']) == MAX_WORDS
+
+    def test_long_review_is_bounded_at_a_sentence(self):
+        review = 'The essay uses words well. ' * 40
+
+        bounded = expand_analysis({'r': review, 'u': [], 'n': []})['correctness_review']
+
+        assert len(bounded) <= MAX_REVIEW_CHARS
+        assert bounded.endswith('well.')
+
+    def test_missing_keys_raise(self):
+        with pytest.raises(SchemaError, match='Missing required fields'):
+            expand_analysis({'r': 'Fine.', 'u': []})
+
+    def test_verbose_response_is_stored_unchanged(self):
+        data = {
+            'correctness_review': 'Good.',
+            'vocabulary_used': ['vivid (strong imagery)'],
+            'recommended_vocabulary': ['luminous'],
+        }
+
+        assert expand_analysis(data, 'verbose') == data
+
+
+class TestSplitParts:
+    def test_part_prompts_share_the_essay_prefix(self):
+        prompts = [build_part_prompt('My essay text.', part) for part in ('review', 'used', 'recommended')]
+
+        assert all(p.startswith('Essay:\nMy essay text.\n') for p in prompts)
+        assert '{"u": used}' in prompts[1]
+
+    def test_parts_merge_into_stored_shape(self):
+        analysis = merge_parts({
+            'review': {'r': 'Good word choice.'},
+            'used': {'u': ['vivid (strong)']},
+            'recommended': {'n': ['luminous']},
+        })
+
+        assert analysis == {
+            'correctness_review': 'Good word choice.',
+            'vocabulary_used': ['vivid'],
+            'recommended_vocabulary': ['luminous'],
+        }
+
+    def test_missing_part_key_raises(self):
+        with pytest.raises(SchemaError, match='n \\(recommended\\)'):
+            merge_parts({'review': {'r': 'Fine.'}, 'used': {'u': []}, 'recommended': {}})
+
+    def test_review_part_expands_to_bounded_review(self):
+        assert expand_review({'r': '  Clear and precise.  '}) == 'Clear and precise.'
+        assert len(expand_review({'r': 'Long sentence. ' * 50})) <= MAX_REVIEW_CHARS
+        with pytest.raises(SchemaError, match='r \\(review\\)'):
+            expand_review({'u': []})
@@ -0,0 +1,134 @@
+"""
+Token usage and cost accounting for OpenAI calls.
+
+Each analysis records prompt, cached and completion token counts plus the
+computed cost on the essay, and rolls them up into per-teacher and
+per-assignment daily ledger items using atomic ADD updates.
+"""
+
+import logging
+from decimal import Decimal
+from typing import Any, Dict, List
+
+logger = logging.getLogger()
+
+# USD per 1M tokens: (input, cached input, output)
+MODEL_PRICING = {
+    "gpt-4.1": (Decimal("2.00"), Decimal("0.50"), Decimal("8.00")),
+    "gpt-4.1-mini": (Decimal("0.40"), Decimal("0.10"), Decimal("1.60")),
+    "gpt-4.1-nano": (Decimal("0.10"), Decimal("0.025"), Decimal("0.40")),
+    "gpt-4o": (Decimal("2.50"), Decimal("1.25"), Decimal("10.00")),
+    "gpt-4o-mini": (Decimal("0.15"), Decimal("0.075"), Decimal("0.60")),
+}
+
+TOKENS_PER_PRICE_UNIT = Decimal(1_000_000)
+
+
+def compute_cost(
+    model: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int
+) -> Decimal:
+    """
+    Compute the USD cost of a completion.
+
+    Cached tokens are a subset of prompt tokens and are billed at the cached
+    input rate. Unknown models are costed at zero (token counts are still kept).
+    """
+    pricing = MODEL_PRICING.get(model)
+    if not pricing:
+        logger.warning("No pricing configured for model", extra={"model": model})
+        return Decimal("0")
+
+    input_price, cached_price, output_price = pricing
+    uncached_tokens = max(0, prompt_tokens - cached_tokens)
+    cost = (
+        uncached_tokens * input_price
+        + cached_tokens * cached_price
+        + completion_tokens * output_price
+    ) / TOKENS_PER_PRICE_UNIT
+    return cost.quantize(Decimal("0.00000001"))
+
+
+def extract_usage(response: Any, model: str, priced: bool = True) -> Dict[str, Any]:
+    """
+    Build a usage record from an OpenAI chat completion response.
+
+    Unpriced completions (self-hosted models) cost zero without a pricing
+    lookup.
+    """
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", 0) or 0
+
+    return {
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "completion_tokens": completion_tokens,
+        "cost_usd": (
+            compute_cost(model, prompt_tokens, cached_tokens, completion_tokens)
+            if priced
+            else Decimal("0")
+        ),
+    }
+
+
+def merge_usage(usages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Sum the usage records of several completions made for one analysis.
+
+    The model and backend that served the parts are kept; parts served by
+    different ones (after a failover) list each once, comma-separated, so a
+    mixed analysis never matches the configured model.
+    """
+    models = dict.fromkeys(u["model"] for u in usages)
+    merged = {
+        "model": ",".join(models),
+        "prompt_tokens": sum(u["prompt_tokens"] for u in usages),
+        "cached_tokens": sum(u["cached_tokens"] for u in usages),
+        "completion_tokens": sum(u["completion_tokens"] for u in usages),
+        "cost_usd": sum((u["cost_usd"] for u in usages), Decimal("0")),
+    }
+    backends = list(dict.fromkeys(u["backend"] for u in usages if u.get("backend")))
+    if backends:
+        merged["backend"] = ",".join(backends)
+    return merged
+
+
+def record_usage(
+    ledger_table,
+    teacher_id: str,
+    assignment_id: str,
+    usage: Dict[str, Any],
+    usage_date: str,
+    essay_count: int = 1,
+):
+    """
+    Roll a usage record into the teacher and assignment daily ledgers.
+
+    Uses ADD so concurrent workers increment the same day item atomically.
+    Assignment ledger items also carry teacher_id for authorization.
+    Calls that are not essay analyses (class reports) pass essay_count=0.
+    """
+    if not ledger_table:
+        return
+
+    for scope_id in (f"teacher#{teacher_id}", f"assignment#{assignment_id}"):
+        ledger_table.update_item(
+            Key={"scope_id": scope_id, "usage_date": usage_date},
+            UpdateExpression=(
+                "ADD prompt_tokens :prompt, cached_tokens :cached, "
+                "completion_tokens :completion, cost_usd :cost, essay_count :essays "
+                "SET teacher_id = :teacher_id"
+            ),
+            ExpressionAttributeValues={
+                ":prompt": usage["prompt_tokens"],
+                ":cached": usage["cached_tokens"],
+                ":completion": usage["completion_tokens"],
+                ":cost": usage["cost_usd"],
+                ":essays": essay_count,
+                ":teacher_id": teacher_id,
+            },
+        )
+
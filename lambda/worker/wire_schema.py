@@ -0,0 +1,191 @@
+"""
+Output contracts for the essay analysis prompt.
+
+Completion tokens dominate analysis latency, so the default ("compact")
+contract asks the model for short keys, bare words in positional arrays and
+a length-bounded review:
+
+    {"r": "review, at most MAX_REVIEW_CHARS characters",
+     "u": ["word", ...],     # vocabulary used
+     "n": ["word", ...]}     # new (recommended) vocabulary
+
+The "verbose" contract is the original one with full key names. Either way
+the worker stores the same `vocabulary_analysis` shape
+({correctness_review, vocabulary_used, recommended_vocabulary}), so API
+consumers see no difference. benchmark.py measures the tokens per essay of
+both contracts.
+
+In "split" mode the three compact fields are requested as parallel
+completions, one per part (PARTS), each with its own one-key schema, so the
+essay's latency is that of the slowest part rather than the sum of all
+three. Every part repeats the essay, which costs extra prompt tokens; the
+essay comes first so the parts share a cacheable prefix.
+"""
+
+import re
+from typing import Any, Dict, List
+
+SCHEMAS = ("compact", "verbose")
+MODES = ("single", "split")
+
+# Split-mode parts and the compact key each one answers
+PARTS = {"review": "r", "used": "u", "recommended": "n"}
+
+# Analyses produced under each contract; stored as the essay's prompt_version
+PROMPT_VERSIONS = {"verbose": 1, "compact": 2}
+
+MAX_REVIEW_CHARS = 400
+MAX_WORDS = 10
+
+SYSTEM_PROMPT = (
+    "You are an expert English teacher analyzing student essays for vocabulary "
+    "development. Always respond with valid JSON only."
+)
+
+_COMPACT_KEYS = {"r": "correctness_review", "u": "vocabulary_used", "n": "recommended_vocabulary"}
+
+# Models sometimes annotate list items ("ubiquitous - means everywhere")
+_ANNOTATION_RE = re.compile(r"\s*(?:\(|\s[-–—:]\s).*$")
+
+
+class SchemaError(ValueError):
+    """The model's response does not match the requested contract."""
+
+
+def build_prompt(essay_text: str, schema: str = "compact") -> str:
+    if schema == "verbose":
+        return f"""Analyze the following student essay and provide vocabulary feedback in JSON format.
+
+Essay:
+{essay_text}
+
+Please provide a JSON response with the following structure:
+{{
+  "correctness_review": "A high-level review (2-3 sentences) of whether words and phrases were used correctly in context.",
+  "vocabulary_used": ["list", "of", "vocabulary", "words", "and", "phrases", "that", "indicate", "the", "writer's", "current", "level"],
+  "recommended_vocabulary": ["list", "of", "new", "vocabulary", "words", "that", "match", "or", "slightly", "exceed", "the", "writer's", "level"]
+}}
+
+Focus on:
+- Vocabulary words/phrases that demonstrate the student's current level (include 5-10 examples)
+- Recommended vocabulary that would help the student grow (5-10 words that are slightly more advanced but appropriate)
+- Be specific and educational in your recommendations
+
+Return ONLY valid JSON, no additional text."""
+
+    return f"""Analyze the student essay's vocabulary.
+
+Essay:
+{essay_text}
+
+Respond with JSON: {{"r": review, "u": used, "n": new}}
+- r: 2 sentences, at most {MAX_REVIEW_CHARS} characters, on whether words and phrases were used correctly in context
+- u: 5-{MAX_WORDS} words or short phrases from the essay that show the writer's current level
+- n: 5-{MAX_WORDS} new words slightly above that level that would help the writer grow
+List items are bare words or phrases, with no explanations."""
+
+
+_PART_INSTRUCTIONS = {
+    "review": (
+        f'Respond with JSON: {{"r": review}}\n'
+        f"- r: 2 sentences, at most {MAX_REVIEW_CHARS} characters, on whether words "
+        "and phrases were used correctly in context"
+    ),
+    "used": (
+        'Respond with JSON: {"u": used}\n'
+        f"- u: 5-{MAX_WORDS} words or short phrases from the essay that show the "
+        "writer's current level, with no explanations"
+    ),
+    "recommended": (
+        'Respond with JSON: {"n": new}\n'
+        f"- n: 5-{MAX_WORDS} new words slightly above the writer's level that would "
+        "help the writer grow, with no explanations"
+    ),
+}
+
+
+def build_part_prompt(essay_text: str, part: str) -> str:
+    """Prompt for one split-mode part; the shared essay prefix comes first."""
+    return f"""Essay:
+{essay_text}
+
+Analyze the student essay's vocabulary.
+{_PART_INSTRUCTIONS[part]}"""
+
+
+def merge_parts(results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine split-mode part responses into the stored vocabulary_analysis shape.
+
+    Raises:
+        SchemaError: If a part's response is missing its key
+    """
+    compact = {}
+    for part, key in PARTS.items():
+        data = results.get(part) or {}
+        if key not in data:
+            raise SchemaError(f"Missing required fields in OpenAI response: {key} ({part})")
+        compact[key] = data[key]
+    return expand_analysis(compact, "compact")
+
+
+def expand_review(data: Dict[str, Any]) -> str:
+    """
+    The review from a split-mode review part response.
+
+    Raises:
+        SchemaError: If the review key is missing or not a string
+    """
+    key = PARTS["review"]
+    if key not in data:
+        raise SchemaError(f"Missing required fields in OpenAI response: {key} (review)")
+    return _bound_review(data[key])
+
+
+def _clean_words(words: Any) -> List[str]:
+    if not isinstance(words, list):
+        raise SchemaError("Vocabulary lists must be arrays")
+    cleaned = []
+    for word in words:
+        if not isinstance(word, str):
+            continue
+        word = _ANNOTATION_RE.sub("", word).strip().strip("\"'.,;")
+        if word:
+            cleaned.append(word)
+    return cleaned[:MAX_WORDS]
+
+
+def _bound_review(review: Any) -> str:
+    if not isinstance(review, str):
+        raise SchemaError("Review must be a string")
+    review = review.strip()
+    if len(review) > MAX_REVIEW_CHARS:
+        cut = review[:MAX_REVIEW_CHARS]
+        sentence_end = cut.rfind(". ")
+        review = cut[:sentence_end + 1] if sentence_end > 0 else cut.rsplit(" ", 1)[0] + "..."
+    return review
+
+
+def expand_analysis(data: Dict[str, Any], schema: str = "compact") -> Dict[str, Any]:
+    """
+    Convert a model response into the stored vocabulary_analysis shape.
+
+    Raises:
+        SchemaError: If required keys are missing or have the wrong type
+    """
+    keys = _COMPACT_KEYS if schema == "compact" else {v: v for v in _COMPACT_KEYS.values()}
+    missing = [key for key in keys if key not in data]
+    if missing:
+        raise SchemaError(f"Missing required fields in OpenAI response: {', '.join(missing)}")
+
+    values = {name: data[key] for key, name in keys.items()}
+    if schema == "verbose":
+        # The original contract stores the model's output unchanged
+        if not isinstance(values["correctness_review"], str):
+            raise SchemaError("Review must be a string")
+        return values
+    return {
+        "correctness_review": _bound_review(values["correctness_review"]),
+        "vocabulary_used": _clean_words(values["vocabulary_used"]),
+        "recommended_vocabulary": _clean_words(values["recommended_vocabulary"]),
+    }
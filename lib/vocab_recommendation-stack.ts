@@ -7,6 +7,7 @@ import * as iam from 'aws-cdk-lib/aws-iam';
 import * as lambda from 'aws-cdk-lib/aws-lambda';
 import * as apigateway from 'aws-cdk-lib/aws-apigateway';
 import * as lambdaEventSources from 'aws-cdk-lib/aws-lambda-event-sources';
+import * as s3n from 'aws-cdk-lib/aws-s3-notifications';
 import * as cloudwatch from 'aws-cdk-lib/aws-cloudwatch';
 import * as cloudwatchActions from 'aws-cdk-lib/aws-cloudwatch-actions';
 import * as sns from 'aws-cdk-lib/aws-sns';
@@ -99,6 +100,100 @@ export class VocabRecommendationStack extends cdk.Stack {
       encryption: dynamodb.TableEncryption.AWS_MANAGED,
     });
 
+    // Keyed lookups for routes that only have the essay_id (GET/PUT/PATCH/DELETE /essays/{essay_id})
+    essaysTable.addGlobalSecondaryIndex({
+      indexName: 'essay_id-index',
+      partitionKey: { name: 'essay_id', type: dynamodb.AttributeType.STRING },
+      projectionType: dynamodb.ProjectionType.INCLUDE,
+      nonKeyAttributes: ['teacher_id', 'student_id'],
+    });
+
+    // Student history and metrics in created_at order (GET /essays/student/{id}, /metrics/student/{id});
+    // sparse: only essays with a student carry teacher_student ("{teacher_id}#{student_id}").
+    // DynamoDB creates one GSI per table update, so an existing stack gets it in a second
+    // deploy: `cdk deploy -c teacherStudentIndex=false` first (adds essay_id-index), then
+    // `cdk deploy`. Until then the API scans for student essays (TEACHER_STUDENT_INDEX_ENABLED).
+    const teacherStudentIndex = String(this.node.tryGetContext('teacherStudentIndex') ?? 'true') !== 'false';
+    if (teacherStudentIndex) {
+      essaysTable.addGlobalSecondaryIndex({
+        indexName: 'teacher_student-index',
+        partitionKey: { name: 'teacher_student', type: dynamodb.AttributeType.STRING },
+        sortKey: { name: 'created_at', type: dynamodb.AttributeType.STRING },
+        projectionType: dynamodb.ProjectionType.ALL,
+      });
+    }
+
+    // DynamoDB Table for OpenAI token usage ledger (daily roll-ups per teacher/assignment)
+    const usageLedgerTable = new dynamodb.Table(this, 'UsageLedger', {
+      tableName: 'VincentVocabUsageLedger',
+      partitionKey: { name: 'scope_id', type: dynamodb.AttributeType.STRING }, // teacher#{id} or assignment#{id}
+      sortKey: { name: 'usage_date', type: dynamodb.AttributeType.STRING }, // YYYY-MM-DD (UTC)
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+      encryption: dynamodb.TableEncryption.AWS_MANAGED,
+    });
+
+    // DynamoDB Table for worker coordination state (e.g. shared LLM concurrency limit)
+    const workerStateTable = new dynamodb.Table(this, 'WorkerState', {
+      tableName: 'VincentVocabWorkerState',
+      partitionKey: { name: 'state_id', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+      encryption: dynamodb.TableEncryption.AWS_MANAGED,
+    });
+
+    // DynamoDB Table for the MinHash/LSH near-duplicate index (one item per essay per band)
+    const essaySignaturesTable = new dynamodb.Table(this, 'EssaySignatures', {
+      tableName: 'VincentVocabEssaySignatures',
+      partitionKey: { name: 'band_key', type: dynamodb.AttributeType.STRING }, // {teacher_id}#{band}#{band_hash}
+      sortKey: { name: 'essay_id', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+      encryption: dynamodb.TableEncryption.AWS_MANAGED,
+    });
+
+    // DynamoDB Table for essay revision history (previous texts and analyses)
+    const essayRevisionsTable = new dynamodb.Table(this, 'EssayRevisions', {
+      tableName: 'VincentVocabEssayRevisions',
+      partitionKey: { name: 'essay_id', type: dynamodb.AttributeType.STRING },
+      sortKey: { name: 'revision', type: dynamodb.AttributeType.NUMBER },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+      encryption: dynamodb.TableEncryption.AWS_MANAGED,
+    });
+
+    // DynamoDB Table for assignment-level class reports (one LLM summary per assignment)
+    const classReportsTable = new dynamodb.Table(this, 'ClassReports', {
+      tableName: 'VincentVocabClassReports',
+      partitionKey: { name: 'assignment_id', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+      encryption: dynamodb.TableEncryption.AWS_MANAGED,
+    });
+
+    // DynamoDB Table for shadow evaluations of candidate models/prompts (worker-only side table)
+    const shadowEvaluationsTable = new dynamodb.Table(this, 'ShadowEvaluations', {
+      tableName: 'VincentVocabShadowEvaluations',
+      partitionKey: { name: 'candidate_id', type: dynamodb.AttributeType.STRING }, // {model}#{schema}#{mode}
+      sortKey: { name: 'essay_id', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+      encryption: dynamodb.TableEncryption.AWS_MANAGED,
+      timeToLiveAttribute: 'expires_at', // Evaluations expire after 30 days
+    });
+
+    // DynamoDB Table for essay completion events per assignment (written by the worker,
+    // read by the API's progress stream)
+    const essayProgressTable = new dynamodb.Table(this, 'EssayProgress', {
+      tableName: 'VincentVocabEssayProgress',
+      partitionKey: { name: 'assignment_id', type: dynamodb.AttributeType.STRING },
+      sortKey: { name: 'event_key', type: dynamodb.AttributeType.STRING }, // {occurred_at}#{essay_id}
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+      encryption: dynamodb.TableEncryption.AWS_MANAGED,
+      timeToLiveAttribute: 'expires_at', // Events expire after a day
+    });
+
     // IAM Role for API Lambda (will be used in Epic 2)
     const apiLambdaRole = new iam.Role(this, 'ApiLambdaRole', {
       roleName: 'vincent-vocab-api-lambda-role',
@@ -115,6 +210,11 @@ export class VocabRecommendationStack extends cdk.Stack {
     studentsTable.grantReadWriteData(apiLambdaRole);
     assignmentsTable.grantReadWriteData(apiLambdaRole);
     essaysTable.grantReadWriteData(apiLambdaRole);
+    usageLedgerTable.grantReadData(apiLambdaRole);
+    essayRevisionsTable.grantReadWriteData(apiLambdaRole);
+    classReportsTable.grantReadData(apiLambdaRole);
+    essayProgressTable.grantReadData(apiLambdaRole);
+    essaySignaturesTable.grantWriteData(apiLambdaRole); // Unindex deleted/revised essays
     processingQueue.grantSendMessages(apiLambdaRole);
     // Legacy metrics tables removed - no longer needed
 
@@ -191,9 +291,16 @@ export class VocabRecommendationStack extends cdk.Stack {
       environment: {
         ESSAYS_BUCKET: essaysBucket.bucketName,
         ESSAYS_TABLE: essaysTable.tableName,
+        TEACHER_STUDENT_INDEX_ENABLED: String(teacherStudentIndex),
+        ESSAY_REVISIONS_TABLE: essayRevisionsTable.tableName,
+        CLASS_REPORTS_TABLE: classReportsTable.tableName,
+        ESSAY_PROGRESS_TABLE: essayProgressTable.tableName,
+        ESSAY_SIGNATURES_TABLE: essaySignaturesTable.tableName,
+        USAGE_LEDGER_TABLE: usageLedgerTable.tableName,
         STUDENTS_TABLE: studentsTable.tableName,
         ASSIGNMENTS_TABLE: assignmentsTable.tableName,
         ESSAY_PROCESSING_QUEUE_URL: processingQueue.queueUrl,
+        ESSAYS_PER_MESSAGE: '10',
         COGNITO_USER_POOL_ID: userPool.userPoolId,
         COGNITO_USER_POOL_CLIENT_ID: userPoolClient.userPoolClientId,
         COGNITO_REGION: this.region,
@@ -269,6 +376,8 @@ export class VocabRecommendationStack extends cdk.Stack {
     const metricsClassResource = metricsResource.addResource('class');
     const metricsClassIdResource = metricsClassResource.addResource('{assignment_id}');
     metricsClassIdResource.addMethod('GET', apiIntegration, authorizerOptions); // Get class metrics
+    const metricsClassReportResource = metricsClassIdResource.addResource('report');
+    metricsClassReportResource.addMethod('GET', apiIntegration, authorizerOptions); // Get class vocabulary report
     const metricsStudentResource = metricsResource.addResource('student');
     const metricsStudentIdResource = metricsStudentResource.addResource('{student_id}');
     metricsStudentIdResource.addMethod('GET', apiIntegration, authorizerOptions); // Get student metrics
@@ -277,11 +386,20 @@ export class VocabRecommendationStack extends cdk.Stack {
     const metricsAssignmentStudentResource = metricsAssignmentIdResource.addResource('student');
     const metricsAssignmentStudentIdResource = metricsAssignmentStudentResource.addResource('{student_id}');
     metricsAssignmentStudentIdResource.addMethod('GET', apiIntegration, authorizerOptions); // Get student metrics for assignment
+    const metricsUsageResource = metricsResource.addResource('usage');
+    metricsUsageResource.addMethod('GET', apiIntegration, authorizerOptions); // Get teacher token usage ledger
+    const metricsUsageAssignmentResource = metricsUsageResource.addResource('assignment');
+    const metricsUsageAssignmentIdResource = metricsUsageAssignmentResource.addResource('{assignment_id}');
+    metricsUsageAssignmentIdResource.addMethod('GET', apiIntegration, authorizerOptions); // Get assignment token usage ledger
 
     // Essays endpoints
     const essaysResource = api.root.addResource('essays');
     const essaysBatchResource = essaysResource.addResource('batch');
     essaysBatchResource.addMethod('POST', apiIntegration, authorizerOptions); // POST /essays/batch - batch upload (protected)
+    const essaysBatchStreamResource = essaysBatchResource.addResource('stream');
+    essaysBatchStreamResource.addMethod('POST', apiIntegration, authorizerOptions); // POST /essays/batch/stream - NDJSON upload (protected)
+    const essaysStatusResource = essaysResource.addResource('status');
+    essaysStatusResource.addMethod('POST', apiIntegration, authorizerOptions); // POST /essays/status - bulk status lookup (protected)
     const essaysPublicResource = essaysResource.addResource('public');
     essaysPublicResource.addMethod('POST', apiIntegration); // POST /essays/public - public demo upload (no auth)
     const essaysPublicCheckStudentResource = essaysPublicResource.addResource('check-student');
@@ -290,6 +408,8 @@ export class VocabRecommendationStack extends cdk.Stack {
     const essaysAssignmentResource = essaysResource.addResource('assignment');
     const essaysAssignmentIdResource = essaysAssignmentResource.addResource('{assignment_id}');
     essaysAssignmentIdResource.addMethod('GET', apiIntegration, authorizerOptions); // GET /essays/assignment/{assignment_id} - list essays for assignment
+    const essaysAssignmentEventsResource = essaysAssignmentIdResource.addResource('events');
+    essaysAssignmentEventsResource.addMethod('GET', apiIntegration, authorizerOptions); // GET /essays/assignment/{assignment_id}/events - progress stream (SSE)
     const essaysStudentResource = essaysResource.addResource('student');
     const essaysStudentIdResource = essaysStudentResource.addResource('{student_id}');
     essaysStudentIdResource.addMethod('GET', apiIntegration, authorizerOptions); // List essays for student
@@ -298,6 +418,10 @@ export class VocabRecommendationStack extends cdk.Stack {
     essayIdResourceOverride.addMethod('DELETE', apiIntegration, authorizerOptions); // DELETE /essays/{essay_id} - delete essay (protected)
     const essayOverrideResource = essayIdResourceOverride.addResource('override');
     essayOverrideResource.addMethod('PATCH', apiIntegration, authorizerOptions); // Override essay feedback
+    const essayTextResource = essayIdResourceOverride.addResource('text');
+    essayTextResource.addMethod('PUT', apiIntegration, authorizerOptions); // PUT /essays/{essay_id}/text - submit revised draft
+    const essayRevisionsResource = essayIdResourceOverride.addResource('revisions');
+    essayRevisionsResource.addMethod('GET', apiIntegration, authorizerOptions); // GET /essays/{essay_id}/revisions - revision history
 
     // ECS, Aggregation Lambdas, and EssayUpdateQueue removed
     // All processing now handled by Worker Lambda via EssayProcessingQueue
@@ -316,9 +440,24 @@ export class VocabRecommendationStack extends cdk.Stack {
       ],
     });
 
+    // SNS Topic for essay completion events (essay.processed / essay.skipped / essay.failed)
+    const essayEventsTopic = new sns.Topic(this, 'EssayEventsTopic', {
+      topicName: 'vincent-vocab-essay-events',
+      displayName: 'Vincent Vocab essay completion events',
+    });
+
     // Grant permissions for Worker Lambda
     essaysTable.grantReadWriteData(workerLambdaRole);
+    usageLedgerTable.grantReadWriteData(workerLambdaRole);
+    workerStateTable.grantReadWriteData(workerLambdaRole);
+    essaySignaturesTable.grantReadWriteData(workerLambdaRole);
+    classReportsTable.grantReadWriteData(workerLambdaRole);
+    essayProgressTable.grantWriteData(workerLambdaRole);
+    shadowEvaluationsTable.grantWriteData(workerLambdaRole);
     processingQueue.grantConsumeMessages(workerLambdaRole);
+    processingQueue.grantSendMessages(workerLambdaRole); // Re-enqueue failed essays of multi-essay messages
+    dlq.grantSendMessages(workerLambdaRole);
+    essayEventsTopic.grantPublish(workerLambdaRole);
 
     // Worker Lambda Function
     const workerLambdaCode = process.env.CDK_SKIP_BUNDLING === 'true'
@@ -329,10 +468,10 @@ export class VocabRecommendationStack extends cdk.Stack {
             command: [
               'bash', '-c',
               'pip install -r requirements.txt -t /asset-output && ' +
-              'cp -r lambda_function.py /asset-output 2>/dev/null || true',
+              'cp -r *.py /asset-output 2>/dev/null || true',
             ],
           },
-          exclude: ['__pycache__', '*.pyc', '*.pyo'],
+          exclude: ['__pycache__', 'tests', '*.pyc', '*.pyo', '.pytest_cache'],
         });
 
     const workerLambda = new lambda.Function(this, 'WorkerLambda', {
@@ -344,18 +483,108 @@ export class VocabRecommendationStack extends cdk.Stack {
       timeout: cdk.Duration.minutes(5), // Must be >= SQS visibility timeout
       environment: {
         ESSAYS_TABLE: essaysTable.tableName,
+        USAGE_LEDGER_TABLE: usageLedgerTable.tableName,
+        WORKER_STATE_TABLE: workerStateTable.tableName,
+        ESSAY_SIGNATURES_TABLE: essaySignaturesTable.tableName,
+        CLASS_REPORTS_TABLE: classReportsTable.tableName,
+        SHADOW_EVALUATIONS_TABLE: shadowEvaluationsTable.tableName,
+        SHADOW_SAMPLE_RATE: '0', // Fraction of essays also run with SHADOW_MODEL/SHADOW_SCHEMA/SHADOW_MODE
+        NEAR_DUPLICATE_THRESHOLD: '0.8',
+        MIN_ESSAY_WORDS: '25',
+        ANALYSIS_SCHEMA: 'compact', // Short-key wire contract for analysis responses (see wire_schema.py)
+        ANALYSIS_MODE: 'single', // 'split' requests review/used/recommended as parallel completions
+        ESSAY_PROCESSING_QUEUE_URL: processingQueue.queueUrl,
+        ESSAY_PROCESSING_DLQ_URL: dlq.queueUrl,
+        MAX_ESSAY_ATTEMPTS: '3',
+        ESSAY_EVENTS_TOPIC_ARN: essayEventsTopic.topicArn,
+        ESSAY_PROGRESS_TABLE: essayProgressTable.tableName,
         OPENAI_API_KEY: process.env.OPENAI_API_KEY || '',
+        LLM_INITIAL_CONCURRENCY: '4',
+        LLM_MAX_CONCURRENCY: '16',
+        // Comma-separated failover order; 'local' is an OpenAI-compatible server at LOCAL_LLM_BASE_URL
+        LLM_BACKENDS: process.env.LLM_BACKENDS || 'openai',
+        LLM_SPILLOVER: process.env.LLM_SPILLOVER || 'false',
+        LOCAL_LLM_BASE_URL: process.env.LOCAL_LLM_BASE_URL || '',
+        LOCAL_LLM_MODEL: process.env.LOCAL_LLM_MODEL || 'local-model',
+        LOCAL_LLM_MAX_CONCURRENCY: '2',
       },
     });
 
+    // Direct (synchronous) analysis for single public demo essays
+    workerLambda.grantInvoke(apiLambda);
+    apiLambda.addEnvironment('WORKER_FUNCTION_NAME', workerLambda.functionName);
+    apiLambda.addEnvironment('DIRECT_ANALYSIS_TIMEOUT_SECONDS', '20'); // API Gateway times out at 29s
+
     // SQS Event Source for Worker Lambda
     workerLambda.addEventSource(
       new lambdaEventSources.SqsEventSource(processingQueue, {
-        batchSize: 10, // Process up to 10 messages at a time
+        // Multi-essay messages carry up to 10 essays each; 3 messages fit the
+        // worker's per-invocation cap (MAX_ESSAYS_PER_INVOCATION) and timeout
+        batchSize: 3,
         maxBatchingWindow: cdk.Duration.seconds(30),
+        // Only failed messages are retried (and eventually dead-lettered)
+        reportBatchItemFailures: true,
       })
     );
 
+    // ============================================
+    // Ingest Lambda (S3-triggered upload ingestion)
+    // ============================================
+
+    // Turns .txt/.docx/.zip files uploaded to {teacher_id}/assignments/{assignment_id}/
+    // into pending essays and queues them for the worker
+    const ingestLambdaRole = new iam.Role(this, 'IngestLambdaRole', {
+      roleName: 'vincent-vocab-ingest-lambda-role',
+      assumedBy: new iam.ServicePrincipal('lambda.amazonaws.com'),
+      description: 'IAM role for Ingest Lambda function',
+      managedPolicies: [
+        iam.ManagedPolicy.fromAwsManagedPolicyName('service-role/AWSLambdaBasicExecutionRole'),
+      ],
+    });
+
+    essaysBucket.grantRead(ingestLambdaRole);
+    essaysTable.grantReadWriteData(ingestLambdaRole);
+    processingQueue.grantSendMessages(ingestLambdaRole);
+
+    const ingestLambdaCode = process.env.CDK_SKIP_BUNDLING === 'true'
+      ? lambda.Code.fromAsset(path.join(__dirname, '../lambda/ingest'))
+      : lambda.Code.fromAsset(path.join(__dirname, '../lambda/ingest'), {
+          bundling: {
+            image: lambda.Runtime.PYTHON_3_12.bundlingImage,
+            command: [
+              'bash', '-c',
+              'pip install -r requirements.txt -t /asset-output && ' +
+              'cp -r *.py /asset-output 2>/dev/null || true',
+            ],
+          },
+          exclude: ['__pycache__', 'tests', '*.pyc', '*.pyo', '.pytest_cache'],
+        });
+
+    const ingestLambda = new lambda.Function(this, 'IngestLambda', {
+      functionName: 'vincent-vocab-ingest-lambda',
+      runtime: lambda.Runtime.PYTHON_3_12,
+      handler: 'lambda_function.handler',
+      code: ingestLambdaCode,
+      role: ingestLambdaRole,
+      timeout: cdk.Duration.minutes(5),
+      memorySize: 512,
+      // Zip uploads are spooled to /tmp (MAX_ARCHIVE_BYTES in extract.py)
+      ephemeralStorageSize: cdk.Size.mebibytes(1024),
+      environment: {
+        ESSAYS_TABLE: essaysTable.tableName,
+        ESSAY_PROCESSING_QUEUE_URL: processingQueue.queueUrl,
+        ESSAYS_PER_MESSAGE: '10',
+      },
+    });
+
+    for (const suffix of ['.txt', '.docx', '.zip']) {
+      essaysBucket.addEventNotification(
+        s3.EventType.OBJECT_CREATED,
+        new s3n.LambdaDestination(ingestLambda),
+        { suffix },
+      );
+    }
+
     // ============================================
     // CloudWatch Observability (Epic 5)
     // ============================================
@@ -436,6 +665,18 @@ export class VocabRecommendationStack extends cdk.Stack {
       exportName: 'ProcessingQueueUrl',
     });
 
+    new cdk.CfnOutput(this, 'EssayEventsTopicArn', {
+      value: essayEventsTopic.topicArn,
+      description: 'SNS topic ARN for essay completion events',
+      exportName: 'EssayEventsTopicArn',
+    });
+
+    new cdk.CfnOutput(this, 'ProcessingDLQUrl', {
+      value: dlq.queueUrl,
+      description: 'SQS dead-letter queue URL (input for dlq_triage.py)',
+      exportName: 'ProcessingDLQUrl',
+    });
+
     // Legacy MetricsTableName output removed - use EssaysTableName instead
 
     new cdk.CfnOutput(this, 'EssaysTableName', {
@@ -444,6 +685,18 @@ export class VocabRecommendationStack extends cdk.Stack {
       exportName: 'EssaysTableName',
     });
 
+    new cdk.CfnOutput(this, 'UsageLedgerTableName', {
+      value: usageLedgerTable.tableName,
+      description: 'DynamoDB table name for token usage ledger',
+      exportName: 'UsageLedgerTableName',
+    });
+
+    new cdk.CfnOutput(this, 'ShadowEvaluationsTableName', {
+      value: shadowEvaluationsTable.tableName,
+      description: 'DynamoDB table name for shadow evaluations (read by shadow_report.py)',
+      exportName: 'ShadowEvaluationsTableName',
+    });
+
     new cdk.CfnOutput(this, 'TeachersTableName', {
       value: teachersTable.tableName,
       description: 'DynamoDB table name for teachers',
@@ -491,6 +744,12 @@ export class VocabRecommendationStack extends cdk.Stack {
       exportName: 'WorkerLambdaFunctionName',
     });
 
+    new cdk.CfnOutput(this, 'IngestLambdaFunctionName', {
+      value: ingestLambda.functionName,
+      description: 'Ingest Lambda function name',
+      exportName: 'IngestLambdaFunctionName',
+    });
+
     new cdk.CfnOutput(this, 'AlarmTopicArn', {
       value: alarmTopic.topicArn,
       description: 'SNS topic ARN for CloudWatch alarm notifications',